@@ -0,0 +1,34 @@
+-- Análisis de rendimiento precalculado (AnalisisRendimientoResponse)
+-- Ejecutar después de progreso_diario.sql
+
+-- =====================================================
+-- TABLAS
+-- =====================================================
+
+-- Un resultado por usuario; el lote nocturno lo reescribe completo
+CREATE TABLE IF NOT EXISTS analisis_rendimiento (
+    usuario_id INTEGER PRIMARY KEY REFERENCES usuario(id_usuario) ON DELETE CASCADE,
+    rendimiento_general NUMERIC(5,2) NOT NULL DEFAULT 0,
+    resultado JSONB NOT NULL,
+    fecha_calculo TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_analisis_rendimiento_fecha
+    ON analisis_rendimiento (fecha_calculo);
+
+-- =====================================================
+-- ÍNDICES PARA LA CARGA POR LOTES
+-- =====================================================
+
+-- Lecturas de teoría por usuario (solo las marcadas como leídas)
+CREATE INDEX IF NOT EXISTS idx_usuario_teoria_leidas
+    ON usuario_teoria (usuario_id, teoria_id)
+    WHERE leido = true;
+
+-- Simulaciones agrupadas por tipo y estado
+CREATE INDEX IF NOT EXISTS idx_simulacion_usuario_tipo
+    ON simulacion (usuario_id, tipo_simulacion, estado);
+
+-- Ventana de semanas recientes sobre el acumulado diario
+CREATE INDEX IF NOT EXISTS idx_progreso_diario_fecha
+    ON progreso_diario (fecha);
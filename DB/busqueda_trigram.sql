@@ -0,0 +1,40 @@
+-- Búsqueda por subcadena con índices trigram (pg_trgm) e insensible a tildes (unaccent)
+-- Ejecutar después de progreso_particionado.sql
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- =====================================================
+-- f_unaccent: VERSIÓN INDEXABLE DE unaccent
+-- =====================================================
+
+-- unaccent() es STABLE (depende del diccionario en search_path) y no puede
+-- usarse en un índice. Fijando el diccionario, la función es IMMUTABLE.
+CREATE OR REPLACE FUNCTION f_unaccent(TEXT)
+RETURNS TEXT AS $$
+    SELECT public.unaccent('public.unaccent'::regdictionary, $1);
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+
+-- =====================================================
+-- ÍNDICES GIN SOBRE LAS EXPRESIONES BUSCADAS
+-- =====================================================
+
+-- El backend filtra con f_unaccent(lower(columna)) LIKE '%termino%': la
+-- expresión tiene que coincidir exactamente con la del índice.
+
+CREATE INDEX IF NOT EXISTS idx_elemento_nombre_trgm
+    ON elemento USING gin (f_unaccent(lower(nombre)) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_elemento_simbolo_trgm
+    ON elemento USING gin (f_unaccent(lower(simbolo)) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_elemento_descripcion_trgm
+    ON elemento USING gin (f_unaccent(lower(descripcion)) gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_utensilio_nombre_trgm
+    ON utensilio USING gin (f_unaccent(lower(nombre)) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_utensilio_descripcion_trgm
+    ON utensilio USING gin (f_unaccent(lower(descripcion)) gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_teoria_titulo_trgm
+    ON teoria USING gin (f_unaccent(lower(titulo)) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_teoria_contenido_trgm
+    ON teoria USING gin (f_unaccent(lower(contenido)) gin_trgm_ops);
@@ -0,0 +1,8 @@
+-- Índices para el historial de simulaciones (total + página en una sola consulta)
+-- Ejecutar después de cambios.sql
+
+-- El historial filtra por usuario (y opcionalmente por estado) y ordena por fecha;
+-- con estos índices el COUNT(*) OVER() y el ORDER BY ... LIMIT se resuelven
+-- recorriendo solo las entradas del usuario, ya ordenadas.
+CREATE INDEX IF NOT EXISTS idx_simulacion_usuario_fecha ON simulacion(usuario_id, fecha DESC);
+CREATE INDEX IF NOT EXISTS idx_simulacion_usuario_estado_fecha ON simulacion(usuario_id, estado, fecha DESC);
@@ -0,0 +1,115 @@
+-- Reglas de logros en logros.condicion_json (evaluadas por logros_service)
+-- Ejecutar después de puntos_incrementales.sql
+
+-- =====================================================
+-- FORMATO DE condicion_json
+-- =====================================================
+-- Condición simple:   {"metrica": "teorias_leidas", "operador": ">=", "valor": 5}
+-- Combinaciones:      {"todas": [<condición>, ...]}  /  {"alguna": [<condición>, ...]}
+-- Métricas: registrado, puntos_totales, simulaciones_completadas, teorias_leidas,
+--           elementos_diferentes, preguntas_ia, sesion_mas_larga_minutos
+-- Operadores: >=, >, ==, <=, <
+
+-- Reglas equivalentes a las que tenía verificar_logros_usuario (y a las descripciones)
+UPDATE logros l
+SET condicion_json = r.condicion::JSONB
+FROM (VALUES
+    ('PRIMERA_CONEXION',    '{"metrica": "registrado", "operador": ">=", "valor": 1}'),
+    ('PRIMER_SIMULACION',   '{"metrica": "simulaciones_completadas", "operador": ">=", "valor": 1}'),
+    ('EXPLORADOR_TEORIA',   '{"metrica": "teorias_leidas", "operador": ">=", "valor": 5}'),
+    ('ESTUDIANTE_DEDICADO', '{"metrica": "puntos_totales", "operador": ">=", "valor": 500}'),
+    ('QUIMICO_EXPERTO',     '{"metrica": "puntos_totales", "operador": ">=", "valor": 1000}'),
+    ('ELEMENTO_MAESTRO',    '{"metrica": "elementos_diferentes", "operador": ">", "valor": 20}'),
+    ('PREGUNTADOR_CURIOSO', '{"metrica": "preguntas_ia", "operador": ">", "valor": 50}'),
+    ('SESION_MARATONIANA',  '{"metrica": "sesion_mas_larga_minutos", "operador": ">", "valor": 120}')
+) AS r(codigo_logro, condicion)
+WHERE l.codigo_logro = r.codigo_logro
+  AND l.condicion_json IS NULL;
+
+-- =====================================================
+-- REGISTRO DE PROGRESO SIN VERIFICACIÓN DE LOGROS EN SQL
+-- =====================================================
+
+-- Los logros los otorga el backend tras guardar, con un único
+-- INSERT ... ON CONFLICT DO NOTHING por usuario.
+CREATE OR REPLACE FUNCTION registrar_progreso(
+    p_usuario_id INTEGER,
+    p_tipo_evento VARCHAR(50),
+    p_descripcion TEXT DEFAULT NULL,
+    p_puntos INTEGER DEFAULT 0,
+    p_datos_json JSONB DEFAULT NULL,
+    p_sesion_id UUID DEFAULT NULL
+)
+RETURNS INTEGER AS $$
+DECLARE
+    nuevo_progreso_id INTEGER;
+BEGIN
+    -- Verificar que el usuario existe y no es anónimo
+    IF NOT EXISTS (
+        SELECT 1 FROM usuario
+        WHERE id_usuario = p_usuario_id
+        AND tipo_usuario = 'registrado'
+    ) THEN
+        RAISE EXCEPTION 'Usuario no válido o no autenticado';
+    END IF;
+
+    -- Insertar el registro de progreso (los puntos del usuario los suma el trigger)
+    INSERT INTO progreso (
+        usuario_id, tipo_evento, descripcion, puntos_ganados, datos_json, sesion_id
+    ) VALUES (
+        p_usuario_id, p_tipo_evento, p_descripcion, puntos_evento(p_tipo_evento, p_puntos), p_datos_json, p_sesion_id
+    ) RETURNING id_progreso INTO nuevo_progreso_id;
+
+    RETURN nuevo_progreso_id;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION registrar_progreso_lote(
+    p_usuario_id INTEGER,
+    p_eventos JSONB
+)
+RETURNS INTEGER[] AS $$
+DECLARE
+    nuevos_ids INTEGER[];
+BEGIN
+    -- Verificar que el usuario existe y no es anónimo
+    IF NOT EXISTS (
+        SELECT 1 FROM usuario
+        WHERE id_usuario = p_usuario_id
+        AND tipo_usuario = 'registrado'
+    ) THEN
+        RAISE EXCEPTION 'Usuario no válido o no autenticado';
+    END IF;
+
+    -- Insertar todos los eventos del lote de una vez
+    WITH insertados AS (
+        INSERT INTO progreso (
+            usuario_id, tipo_evento, descripcion, puntos_ganados, datos_json, sesion_id, fecha_evento
+        )
+        SELECT
+            p_usuario_id,
+            e.accion,
+            e.descripcion,
+            puntos_evento(e.accion, e.puntos),
+            e.datos,
+            e.sesion_id,
+            -- No se aceptan fechas futuras enviadas por el cliente
+            LEAST(COALESCE(e.fecha, CURRENT_TIMESTAMP), CURRENT_TIMESTAMP)
+        FROM jsonb_to_recordset(p_eventos) AS e(
+            accion VARCHAR(50),
+            descripcion TEXT,
+            puntos INTEGER,
+            datos JSONB,
+            sesion_id UUID,
+            fecha TIMESTAMP
+        )
+        RETURNING id_progreso
+    )
+    SELECT array_agg(id_progreso ORDER BY id_progreso) INTO nuevos_ids FROM insertados;
+
+    RETURN COALESCE(nuevos_ids, ARRAY[]::INTEGER[]);
+END;
+$$ LANGUAGE plpgsql;
+
+-- La función con reglas fijas por codigo_logro ya no se usa
+DROP FUNCTION IF EXISTS verificar_logros_usuario(INTEGER);
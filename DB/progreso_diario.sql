@@ -0,0 +1,183 @@
+-- Acumulado diario de progreso por usuario (series temporales de MetricaTiempo)
+-- Ejecutar después de progreso_lote.sql
+
+-- =====================================================
+-- TABLAS
+-- =====================================================
+
+-- Una fila por usuario y día con los contadores ya agregados
+CREATE TABLE IF NOT EXISTS progreso_diario (
+    usuario_id INTEGER NOT NULL REFERENCES usuario(id_usuario) ON DELETE CASCADE,
+    fecha DATE NOT NULL,
+    eventos INTEGER NOT NULL DEFAULT 0,
+    puntos INTEGER NOT NULL DEFAULT 0,
+    simulaciones INTEGER NOT NULL DEFAULT 0,
+    teorias_completadas INTEGER NOT NULL DEFAULT 0,
+    preguntas_ia INTEGER NOT NULL DEFAULT 0,
+    elementos_nuevos INTEGER NOT NULL DEFAULT 0,
+    minutos INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (usuario_id, fecha)
+);
+
+-- Primer uso de cada elemento por usuario, para contar "elementos nuevos" por día
+CREATE TABLE IF NOT EXISTS usuario_elemento_visto (
+    usuario_id INTEGER NOT NULL REFERENCES usuario(id_usuario) ON DELETE CASCADE,
+    simbolo VARCHAR(10) NOT NULL,
+    fecha_primer_uso DATE NOT NULL,
+    PRIMARY KEY (usuario_id, simbolo)
+);
+
+-- =====================================================
+-- FUNCIONES AUXILIARES
+-- =====================================================
+
+-- Minutos dedicados que reporta un evento en datos_json
+CREATE OR REPLACE FUNCTION minutos_evento(p_datos JSONB)
+RETURNS INTEGER AS $$
+    SELECT COALESCE(
+        CASE WHEN jsonb_typeof(p_datos->'tiempo_minutos') = 'number' THEN (p_datos->>'tiempo_minutos')::NUMERIC::INTEGER END,
+        CASE WHEN jsonb_typeof(p_datos->'tiempo_lectura') = 'number' THEN (p_datos->>'tiempo_lectura')::NUMERIC::INTEGER END,
+        CASE WHEN jsonb_typeof(p_datos->'duracion_minutos') = 'number' THEN (p_datos->>'duracion_minutos')::NUMERIC::INTEGER END,
+        0
+    );
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Símbolos de elementos que reporta un evento en datos_json
+CREATE OR REPLACE FUNCTION elementos_evento(p_datos JSONB)
+RETURNS SETOF VARCHAR AS $$
+    SELECT jsonb_array_elements_text(
+        CASE WHEN jsonb_typeof(p_datos->'elementos_usados') = 'array'
+             THEN p_datos->'elementos_usados'
+             ELSE '[]'::JSONB
+        END
+    )::VARCHAR;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- =====================================================
+-- MANTENIMIENTO INCREMENTAL DESDE INSERCIONES EN PROGRESO
+-- =====================================================
+
+CREATE OR REPLACE FUNCTION acumular_progreso_diario()
+RETURNS TRIGGER AS $$
+BEGIN
+    WITH vistos AS (
+        INSERT INTO usuario_elemento_visto (usuario_id, simbolo, fecha_primer_uso)
+        SELECT DISTINCT ON (n.usuario_id, el.simbolo)
+            n.usuario_id, el.simbolo, n.fecha_evento::DATE
+        FROM nuevos_eventos n
+        CROSS JOIN LATERAL elementos_evento(n.datos_json) AS el(simbolo)
+        WHERE n.usuario_id IS NOT NULL AND n.activo IS NOT FALSE
+        ORDER BY n.usuario_id, el.simbolo, n.fecha_evento
+        ON CONFLICT (usuario_id, simbolo) DO NOTHING
+        RETURNING usuario_id, fecha_primer_uso
+    ),
+    nuevos_por_dia AS (
+        SELECT usuario_id, fecha_primer_uso AS fecha, COUNT(*) AS elementos_nuevos
+        FROM vistos
+        GROUP BY usuario_id, fecha_primer_uso
+    ),
+    eventos_por_dia AS (
+        SELECT
+            usuario_id,
+            fecha_evento::DATE AS fecha,
+            COUNT(*) AS eventos,
+            COALESCE(SUM(puntos_ganados), 0) AS puntos,
+            COUNT(*) FILTER (WHERE tipo_evento = 'simulacion_completada') AS simulaciones,
+            COUNT(*) FILTER (WHERE tipo_evento = 'teoria_leida') AS teorias_completadas,
+            COUNT(*) FILTER (WHERE tipo_evento = 'pregunta_ia') AS preguntas_ia,
+            COALESCE(SUM(minutos_evento(datos_json)), 0) AS minutos
+        FROM nuevos_eventos
+        WHERE usuario_id IS NOT NULL AND activo IS NOT FALSE
+        GROUP BY usuario_id, fecha_evento::DATE
+    )
+    INSERT INTO progreso_diario (
+        usuario_id, fecha, eventos, puntos, simulaciones, teorias_completadas,
+        preguntas_ia, elementos_nuevos, minutos
+    )
+    SELECT
+        e.usuario_id, e.fecha, e.eventos, e.puntos, e.simulaciones, e.teorias_completadas,
+        e.preguntas_ia, COALESCE(n.elementos_nuevos, 0), e.minutos
+    FROM eventos_por_dia e
+    LEFT JOIN nuevos_por_dia n ON n.usuario_id = e.usuario_id AND n.fecha = e.fecha
+    ON CONFLICT (usuario_id, fecha) DO UPDATE SET
+        eventos = progreso_diario.eventos + EXCLUDED.eventos,
+        puntos = progreso_diario.puntos + EXCLUDED.puntos,
+        simulaciones = progreso_diario.simulaciones + EXCLUDED.simulaciones,
+        teorias_completadas = progreso_diario.teorias_completadas + EXCLUDED.teorias_completadas,
+        preguntas_ia = progreso_diario.preguntas_ia + EXCLUDED.preguntas_ia,
+        elementos_nuevos = progreso_diario.elementos_nuevos + EXCLUDED.elementos_nuevos,
+        minutos = progreso_diario.minutos + EXCLUDED.minutos;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_progreso_diario ON progreso;
+
+CREATE TRIGGER trigger_progreso_diario
+    AFTER INSERT ON progreso
+    REFERENCING NEW TABLE AS nuevos_eventos
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION acumular_progreso_diario();
+
+-- =====================================================
+-- RECONSTRUCCIÓN (BACKFILL) DESDE EL HISTORIAL
+-- =====================================================
+
+-- Recalcula el acumulado a partir de p_desde (o completo si es NULL).
+-- También corrige días afectados por eventos desactivados (activo = false).
+CREATE OR REPLACE FUNCTION recalcular_progreso_diario(p_desde DATE DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    filas INTEGER;
+BEGIN
+    -- El primer uso de cada elemento depende de todo el historial
+    TRUNCATE usuario_elemento_visto;
+
+    INSERT INTO usuario_elemento_visto (usuario_id, simbolo, fecha_primer_uso)
+    SELECT p.usuario_id, el.simbolo, MIN(p.fecha_evento)::DATE
+    FROM progreso p
+    CROSS JOIN LATERAL elementos_evento(p.datos_json) AS el(simbolo)
+    WHERE p.usuario_id IS NOT NULL AND p.activo = true
+    GROUP BY p.usuario_id, el.simbolo;
+
+    DELETE FROM progreso_diario
+    WHERE p_desde IS NULL OR fecha >= p_desde;
+
+    INSERT INTO progreso_diario (
+        usuario_id, fecha, eventos, puntos, simulaciones, teorias_completadas,
+        preguntas_ia, elementos_nuevos, minutos
+    )
+    SELECT
+        e.usuario_id, e.fecha, e.eventos, e.puntos, e.simulaciones, e.teorias_completadas,
+        e.preguntas_ia, COALESCE(n.elementos_nuevos, 0), e.minutos
+    FROM (
+        SELECT
+            usuario_id,
+            fecha_evento::DATE AS fecha,
+            COUNT(*) AS eventos,
+            COALESCE(SUM(puntos_ganados), 0) AS puntos,
+            COUNT(*) FILTER (WHERE tipo_evento = 'simulacion_completada') AS simulaciones,
+            COUNT(*) FILTER (WHERE tipo_evento = 'teoria_leida') AS teorias_completadas,
+            COUNT(*) FILTER (WHERE tipo_evento = 'pregunta_ia') AS preguntas_ia,
+            COALESCE(SUM(minutos_evento(datos_json)), 0) AS minutos
+        FROM progreso
+        WHERE usuario_id IS NOT NULL
+          AND activo = true
+          AND (p_desde IS NULL OR fecha_evento >= p_desde)
+        GROUP BY usuario_id, fecha_evento::DATE
+    ) e
+    LEFT JOIN (
+        SELECT usuario_id, fecha_primer_uso AS fecha, COUNT(*) AS elementos_nuevos
+        FROM usuario_elemento_visto
+        WHERE p_desde IS NULL OR fecha_primer_uso >= p_desde
+        GROUP BY usuario_id, fecha_primer_uso
+    ) n ON n.usuario_id = e.usuario_id AND n.fecha = e.fecha;
+
+    GET DIAGNOSTICS filas = ROW_COUNT;
+    RETURN filas;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Carga inicial
+SELECT recalcular_progreso_diario();
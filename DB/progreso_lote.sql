@@ -0,0 +1,103 @@
+-- Registro de progreso por lotes para IReNaTech
+-- Ejecutar después de cambios.sql
+
+-- =====================================================
+-- PUNTOS POR DEFECTO DE CADA EVENTO
+-- =====================================================
+
+-- Misma tabla de puntos que usa registrar_progreso cuando p_puntos = 0
+CREATE OR REPLACE FUNCTION puntos_evento(p_tipo_evento VARCHAR(50), p_puntos INTEGER)
+RETURNS INTEGER AS $$
+    SELECT CASE
+        WHEN COALESCE(p_puntos, 0) <> 0 THEN p_puntos
+        ELSE CASE p_tipo_evento
+            WHEN 'simulacion_completada' THEN 50
+            WHEN 'teoria_leida' THEN 30
+            WHEN 'pregunta_ia' THEN 10
+            WHEN 'ejercicio_completado' THEN 25
+            WHEN 'nivel_alcanzado' THEN 100
+            ELSE 5
+        END
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- =====================================================
+-- REGISTRO DE VARIOS EVENTOS EN UNA SOLA SENTENCIA
+-- =====================================================
+
+-- p_eventos es un arreglo JSON de objetos con las claves:
+-- accion, descripcion, puntos, datos, sesion_id, fecha
+CREATE OR REPLACE FUNCTION registrar_progreso_lote(
+    p_usuario_id INTEGER,
+    p_eventos JSONB
+)
+RETURNS INTEGER[] AS $$
+DECLARE
+    nuevos_ids INTEGER[];
+BEGIN
+    -- Verificar que el usuario existe y no es anónimo
+    IF NOT EXISTS (
+        SELECT 1 FROM usuario
+        WHERE id_usuario = p_usuario_id
+        AND tipo_usuario = 'registrado'
+    ) THEN
+        RAISE EXCEPTION 'Usuario no válido o no autenticado';
+    END IF;
+
+    -- Insertar todos los eventos del lote de una vez
+    WITH insertados AS (
+        INSERT INTO progreso (
+            usuario_id, tipo_evento, descripcion, puntos_ganados, datos_json, sesion_id, fecha_evento
+        )
+        SELECT
+            p_usuario_id,
+            e.accion,
+            e.descripcion,
+            puntos_evento(e.accion, e.puntos),
+            e.datos,
+            e.sesion_id,
+            -- No se aceptan fechas futuras enviadas por el cliente
+            LEAST(COALESCE(e.fecha, CURRENT_TIMESTAMP), CURRENT_TIMESTAMP)
+        FROM jsonb_to_recordset(p_eventos) AS e(
+            accion VARCHAR(50),
+            descripcion TEXT,
+            puntos INTEGER,
+            datos JSONB,
+            sesion_id UUID,
+            fecha TIMESTAMP
+        )
+        RETURNING id_progreso
+    )
+    SELECT array_agg(id_progreso ORDER BY id_progreso) INTO nuevos_ids FROM insertados;
+
+    -- Puntos y logros se recalculan una sola vez por lote
+    PERFORM calcular_puntos_usuario(p_usuario_id);
+    PERFORM verificar_logros_usuario(p_usuario_id);
+
+    RETURN COALESCE(nuevos_ids, ARRAY[]::INTEGER[]);
+END;
+$$ LANGUAGE plpgsql;
+
+-- =====================================================
+-- ÚLTIMO ACCESO: UNA ACTUALIZACIÓN POR SENTENCIA
+-- =====================================================
+
+-- El trigger por fila actualizaba la misma fila de usuario una vez por evento;
+-- con lotes basta una actualización por usuario y sentencia.
+DROP TRIGGER IF EXISTS trigger_ultimo_acceso ON progreso;
+
+CREATE OR REPLACE FUNCTION actualizar_ultimo_acceso_lote()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE usuario
+    SET ultimo_acceso = CURRENT_TIMESTAMP
+    WHERE id_usuario IN (SELECT DISTINCT usuario_id FROM nuevos_eventos);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_ultimo_acceso
+    AFTER INSERT ON progreso
+    REFERENCING NEW TABLE AS nuevos_eventos
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION actualizar_ultimo_acceso_lote();
@@ -0,0 +1,499 @@
+-- Tabla progreso particionada por mes (fecha_evento) con retención y archivo
+-- Ejecutar después de logros_reglas.sql
+
+-- progreso es un log de eventos que solo crece. Con particiones mensuales las
+-- consultas con rango de fechas (actividad reciente, recálculos desde una fecha)
+-- solo leen las particiones que tocan, y los meses antiguos se sacan de la tabla
+-- caliente moviéndolos a progreso_archivo sin copiar filas.
+-- El índice parcial idx_progreso_fecha_reciente desaparece: su condición
+-- (CURRENT_DATE - 30 días) quedaba fija al crear el índice.
+--
+-- Qué consultas podan particiones:
+--   - vista_dashboard_usuario (y get_resumen_progreso_usuario, que la lee):
+--     el JOIN con progreso está acotado a los últimos 7 días.
+--   - recalcular_progreso_diario(p_desde): el acumulado por día solo lee
+--     fecha_evento >= p_desde (el primer uso de cada elemento sigue leyendo
+--     todo el historial).
+-- Las lecturas de ProgresoService no tocan progreso: el historial sale de
+-- simulacion, las métricas de progreso_diario y las estadísticas de
+-- usuario_estadisticas y usuario.puntos_totales, así que el particionado no
+-- cambia sus planes. Las reconciliaciones leen progreso_historico completo.
+--
+-- Objetos que se retiran y no se recrean:
+--   - vista_estadisticas_completas (sustituida por usuario_estadisticas);
+--   - la clave foránea usuario_logros.progreso_id: la clave primaria pasa a
+--     ser (id_progreso, fecha_evento) y no se puede referenciar solo el id.
+
+BEGIN;
+
+-- =====================================================
+-- RETIRAR LA TABLA ACTUAL
+-- =====================================================
+
+-- Las vistas siguen a la tabla renombrada; se recrean al final
+DROP VIEW IF EXISTS vista_dashboard_usuario;
+-- Reemplazada por usuario_estadisticas (usuario_estadisticas.sql)
+DROP VIEW IF EXISTS vista_estadisticas_completas;
+
+-- La clave primaria pasa a ser (id_progreso, fecha_evento), así que no se puede
+-- referenciar solo id_progreso. La columna usuario_logros.progreso_id se conserva.
+ALTER TABLE usuario_logros DROP CONSTRAINT IF EXISTS usuario_logros_progreso_id_fkey;
+
+ALTER TABLE progreso RENAME TO progreso_old;
+ALTER TABLE progreso_old RENAME CONSTRAINT progreso_pkey TO progreso_old_pkey;
+-- La secuencia la sigue usando la nueva tabla
+ALTER SEQUENCE progreso_id_progreso_seq OWNED BY NONE;
+
+DROP INDEX IF EXISTS idx_progreso_usuario;
+DROP INDEX IF EXISTS idx_progreso_fecha;
+DROP INDEX IF EXISTS idx_progreso_tipo;
+DROP INDEX IF EXISTS idx_progreso_usuario_fecha;
+DROP INDEX IF EXISTS idx_progreso_sesion;
+DROP INDEX IF EXISTS idx_progreso_usuario_tipo_fecha;
+DROP INDEX IF EXISTS idx_progreso_fecha_reciente;
+DROP INDEX IF EXISTS idx_progreso_activo;
+
+-- =====================================================
+-- TABLA PARTICIONADA
+-- =====================================================
+
+CREATE TABLE progreso (
+    id_progreso INTEGER NOT NULL DEFAULT nextval('progreso_id_progreso_seq'),
+    usuario_id INTEGER,
+    tipo_evento VARCHAR(50) NOT NULL,
+    descripcion TEXT,
+    puntos_ganados INTEGER DEFAULT 0,
+    datos_json JSONB,
+    -- Clave de partición: obligatoria
+    fecha_evento TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    sesion_id UUID,
+    activo BOOLEAN DEFAULT true,
+    PRIMARY KEY (id_progreso, fecha_evento),
+    -- Como en la tabla original: borrar un usuario borra su progreso
+    CONSTRAINT progreso_usuario_id_fkey FOREIGN KEY (usuario_id) REFERENCES usuario(id_usuario) ON DELETE CASCADE,
+    CONSTRAINT progreso_tipo_evento_check CHECK (tipo_evento IN ('simulacion_completada', 'teoria_leida', 'pregunta_ia', 'ejercicio_completado', 'nivel_alcanzado', 'sesion_estudio'))
+) PARTITION BY RANGE (fecha_evento);
+
+ALTER SEQUENCE progreso_id_progreso_seq OWNED BY progreso.id_progreso;
+
+-- Recibe eventos fuera de las particiones creadas (fechas antiguas del lote, etc.)
+CREATE TABLE progreso_default PARTITION OF progreso DEFAULT;
+
+-- Meses archivados: misma estructura, fuera de la tabla caliente.
+-- LIKE no copia claves foráneas: se declara aparte con el mismo ON DELETE CASCADE
+CREATE TABLE progreso_archivo (LIKE progreso) PARTITION BY RANGE (fecha_evento);
+ALTER TABLE progreso_archivo
+    ADD CONSTRAINT progreso_archivo_usuario_id_fkey
+    FOREIGN KEY (usuario_id) REFERENCES usuario(id_usuario) ON DELETE CASCADE;
+
+-- Historial completo para reconciliaciones
+CREATE OR REPLACE VIEW progreso_historico AS
+SELECT * FROM progreso
+UNION ALL
+SELECT * FROM progreso_archivo;
+
+-- =====================================================
+-- CREACIÓN DE PARTICIONES MENSUALES
+-- =====================================================
+
+-- Crea la partición progreso_AAAA_MM del mes de p_mes. Si la partición por
+-- defecto ya tiene filas de ese mes, se mueven a la nueva partición.
+-- Devuelve false si ya existía.
+CREATE OR REPLACE FUNCTION crear_particion_progreso(p_mes DATE)
+RETURNS BOOLEAN AS $$
+DECLARE
+    inicio DATE := date_trunc('month', p_mes)::DATE;
+    fin DATE := (date_trunc('month', p_mes) + INTERVAL '1 month')::DATE;
+    nombre TEXT := 'progreso_' || to_char(p_mes, 'YYYY_MM');
+BEGIN
+    IF to_regclass(nombre) IS NOT NULL THEN
+        RETURN false;
+    END IF;
+
+    IF EXISTS (
+        SELECT 1 FROM progreso_default
+        WHERE fecha_evento >= inicio AND fecha_evento < fin
+    ) THEN
+        -- Con la partición por defecto desconectada no se disparan los
+        -- triggers de progreso al mover las filas
+        ALTER TABLE progreso DETACH PARTITION progreso_default;
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF progreso FOR VALUES FROM (%L) TO (%L)',
+            nombre, inicio, fin
+        );
+        EXECUTE format(
+            'INSERT INTO %I SELECT * FROM progreso_default WHERE fecha_evento >= %L AND fecha_evento < %L',
+            nombre, inicio, fin
+        );
+        DELETE FROM progreso_default
+        WHERE fecha_evento >= inicio AND fecha_evento < fin;
+        ALTER TABLE progreso ATTACH PARTITION progreso_default DEFAULT;
+    ELSE
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF progreso FOR VALUES FROM (%L) TO (%L)',
+            nombre, inicio, fin
+        );
+    END IF;
+
+    RETURN true;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Asegura particiones desde el mes de p_desde hasta p_meses_adelanto meses
+-- después del actual. Devuelve cuántas se crearon.
+CREATE OR REPLACE FUNCTION crear_particiones_progreso(
+    p_meses_adelanto INTEGER DEFAULT 3,
+    p_desde DATE DEFAULT CURRENT_DATE
+)
+RETURNS INTEGER AS $$
+DECLARE
+    mes DATE := date_trunc('month', p_desde)::DATE;
+    ultimo DATE := (date_trunc('month', CURRENT_DATE) + make_interval(months => p_meses_adelanto))::DATE;
+    creadas INTEGER := 0;
+BEGIN
+    WHILE mes <= ultimo LOOP
+        IF crear_particion_progreso(mes) THEN
+            creadas := creadas + 1;
+        END IF;
+        mes := (mes + INTERVAL '1 month')::DATE;
+    END LOOP;
+
+    RETURN creadas;
+END;
+$$ LANGUAGE plpgsql;
+
+-- =====================================================
+-- RETENCIÓN: MESES ANTIGUOS A progreso_archivo
+-- =====================================================
+
+-- Desconecta de progreso las particiones mensuales anteriores a los últimos
+-- p_meses_retencion meses y las conecta a progreso_archivo (solo metadatos).
+-- Las filas antiguas que caigan en progreso_default no se archivan.
+-- Los datos archivados quedan fuera de los acumulados mantenidos por
+-- triggers: al desconectarse, la partición pierde los triggers por fila de
+-- progreso, y progreso_archivo no tiene ni esos ni los de sentencia
+-- (progreso_diario, usuario_estadisticas, puntos). Insertar, desactivar o
+-- borrar un evento archivado no ajusta puntos_totales, usuario_estadisticas
+-- ni progreso_diario hasta la siguiente reconciliación
+-- (reconciliar_puntos_usuarios, recalcular_usuario_estadisticas,
+-- recalcular_progreso_diario).
+-- Devuelve cuántas particiones se archivaron.
+CREATE OR REPLACE FUNCTION archivar_particiones_progreso(p_meses_retencion INTEGER DEFAULT 12)
+RETURNS INTEGER AS $$
+DECLARE
+    limite DATE := (date_trunc('month', CURRENT_DATE) - make_interval(months => p_meses_retencion))::DATE;
+    particion RECORD;
+    archivadas INTEGER := 0;
+BEGIN
+    FOR particion IN
+        SELECT c.relname AS nombre,
+               to_date(substring(c.relname FROM '^progreso_(\d{4}_\d{2})$'), 'YYYY_MM') AS mes
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'progreso'::regclass
+          AND c.relname ~ '^progreso_\d{4}_\d{2}$'
+        ORDER BY mes
+    LOOP
+        EXIT WHEN particion.mes >= limite;
+
+        EXECUTE format('ALTER TABLE progreso DETACH PARTITION %I', particion.nombre);
+        EXECUTE format(
+            'ALTER TABLE progreso_archivo ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+            particion.nombre, particion.mes, (particion.mes + INTERVAL '1 month')::DATE
+        );
+        archivadas := archivadas + 1;
+    END LOOP;
+
+    RETURN archivadas;
+END;
+$$ LANGUAGE plpgsql;
+
+-- =====================================================
+-- MIGRACIÓN DE DATOS
+-- =====================================================
+
+-- Una partición por cada mes con datos, más los meses por adelantado
+SELECT crear_particiones_progreso(
+    3,
+    COALESCE((SELECT MIN(fecha_evento)::DATE FROM progreso_old), CURRENT_DATE)
+);
+
+-- Los triggers se crean después de copiar: los puntos, estadísticas y
+-- acumulados diarios ya incluyen estos eventos
+INSERT INTO progreso (
+    id_progreso, usuario_id, tipo_evento, descripcion, puntos_ganados,
+    datos_json, fecha_evento, sesion_id, activo
+)
+SELECT
+    id_progreso, usuario_id, tipo_evento, descripcion, puntos_ganados,
+    datos_json, COALESCE(fecha_evento, CURRENT_TIMESTAMP), sesion_id, activo
+FROM progreso_old;
+
+DROP TABLE progreso_old;
+
+-- =====================================================
+-- ÍNDICES (SE PROPAGAN A CADA PARTICIÓN)
+-- =====================================================
+
+-- (usuario_id) e (tipo_evento) quedan cubiertos por los compuestos
+CREATE INDEX idx_progreso_usuario_fecha ON progreso (usuario_id, fecha_evento DESC);
+CREATE INDEX idx_progreso_usuario_tipo_fecha ON progreso (usuario_id, tipo_evento, fecha_evento DESC);
+CREATE INDEX idx_progreso_fecha ON progreso (fecha_evento DESC);
+CREATE INDEX idx_progreso_sesion ON progreso (sesion_id);
+
+CREATE INDEX idx_progreso_archivo_usuario_fecha ON progreso_archivo (usuario_id, fecha_evento DESC);
+
+-- =====================================================
+-- TRIGGERS
+-- =====================================================
+
+CREATE TRIGGER trigger_progreso_diario
+    AFTER INSERT ON progreso
+    REFERENCING NEW TABLE AS nuevos_eventos
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION acumular_progreso_diario();
+
+CREATE TRIGGER trigger_estadisticas_progreso
+    AFTER INSERT ON progreso
+    REFERENCING NEW TABLE AS nuevos_eventos
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION estadisticas_progreso_lote();
+
+CREATE TRIGGER trigger_usuario_eventos
+    AFTER INSERT ON progreso
+    REFERENCING NEW TABLE AS nuevos_eventos
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION actualizar_usuario_por_eventos();
+
+-- Triggers por fila: PostgreSQL los replica en cada partición de progreso
+-- (no en las de progreso_archivo, ver archivar_particiones_progreso)
+CREATE TRIGGER trigger_estadisticas_progreso_cambio
+    AFTER DELETE OR UPDATE OF usuario_id, tipo_evento, activo ON progreso
+    FOR EACH ROW
+    EXECUTE FUNCTION estadisticas_progreso_cambio();
+
+CREATE TRIGGER trigger_puntos_cambio
+    AFTER DELETE OR UPDATE OF usuario_id, puntos_ganados, activo ON progreso
+    FOR EACH ROW
+    EXECUTE FUNCTION ajustar_puntos_por_cambio();
+
+-- =====================================================
+-- VISTA DEL DASHBOARD: SOLO PARTICIONES RECIENTES
+-- =====================================================
+
+-- La condición de fecha va en el JOIN para que el planificador descarte las
+-- particiones de meses anteriores en lugar de agregar todo el historial.
+CREATE VIEW vista_dashboard_usuario AS
+SELECT
+    u.id_usuario,
+    u.nombre,
+    u.puntos_totales,
+    u.nivel,
+    u.ultimo_acceso,
+
+    -- Progreso reciente (últimos 7 días)
+    COUNT(p.id_progreso) as actividades_semana,
+    SUM(p.puntos_ganados) as puntos_semana,
+
+    -- Estadísticas generales
+    COUNT(DISTINCT s.id_simulacion) as total_simulaciones,
+    COUNT(DISTINCT s.id_simulacion) FILTER (WHERE s.estado = 'Completada') as simulaciones_completadas,
+    COUNT(DISTINCT ut.teoria_id) as teorias_leidas,
+    COUNT(DISTINCT ul.logro_id) as logros_obtenidos,
+
+    -- Próximo objetivo
+    CASE u.nivel
+        WHEN 'Principiante' THEN 500 - u.puntos_totales
+        WHEN 'Intermedio' THEN 1000 - u.puntos_totales
+        WHEN 'Avanzado' THEN 2000 - u.puntos_totales
+        ELSE 0
+    END as puntos_siguiente_nivel
+
+FROM usuario u
+LEFT JOIN progreso p ON u.id_usuario = p.usuario_id
+    AND p.activo = true
+    AND p.fecha_evento >= CURRENT_DATE - INTERVAL '7 days'
+LEFT JOIN simulacion s ON u.id_usuario = s.usuario_id
+LEFT JOIN usuario_teoria ut ON u.id_usuario = ut.usuario_id AND ut.leido = true
+LEFT JOIN usuario_logros ul ON u.id_usuario = ul.usuario_id
+WHERE u.tipo_usuario = 'registrado'
+GROUP BY u.id_usuario, u.nombre, u.puntos_totales, u.nivel, u.ultimo_acceso;
+
+-- =====================================================
+-- RECONCILIACIONES SOBRE EL HISTORIAL COMPLETO
+-- =====================================================
+
+-- Los puntos incluyen los eventos archivados
+CREATE OR REPLACE FUNCTION reconciliar_puntos_usuarios()
+RETURNS INTEGER AS $$
+DECLARE
+    corregidos INTEGER;
+BEGIN
+    UPDATE usuario u
+    SET puntos_totales = r.puntos,
+        nivel = nivel_por_puntos(r.puntos)
+    FROM (
+        SELECT u2.id_usuario, COALESCE(p.puntos, 0)::INTEGER AS puntos
+        FROM usuario u2
+        LEFT JOIN (
+            SELECT usuario_id, SUM(puntos_ganados) AS puntos
+            FROM progreso_historico
+            WHERE activo = true
+            GROUP BY usuario_id
+        ) p ON p.usuario_id = u2.id_usuario
+        WHERE u2.tipo_usuario = 'registrado'
+    ) r
+    WHERE u.id_usuario = r.id_usuario
+      AND (u.puntos_totales IS DISTINCT FROM r.puntos OR u.nivel IS DISTINCT FROM nivel_por_puntos(r.puntos));
+
+    GET DIAGNOSTICS corregidos = ROW_COUNT;
+    RETURN corregidos;
+END;
+$$ LANGUAGE plpgsql;
+
+-- El primer uso de cada elemento necesita todo el historial; los días a
+-- recalcular (fecha_evento >= p_desde) solo leen sus particiones.
+CREATE OR REPLACE FUNCTION recalcular_progreso_diario(p_desde DATE DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    filas INTEGER;
+BEGIN
+    TRUNCATE usuario_elemento_visto;
+
+    INSERT INTO usuario_elemento_visto (usuario_id, simbolo, fecha_primer_uso)
+    SELECT p.usuario_id, el.simbolo, MIN(p.fecha_evento)::DATE
+    FROM progreso_historico p
+    CROSS JOIN LATERAL elementos_evento(p.datos_json) AS el(simbolo)
+    WHERE p.usuario_id IS NOT NULL AND p.activo = true
+    GROUP BY p.usuario_id, el.simbolo;
+
+    DELETE FROM progreso_diario
+    WHERE p_desde IS NULL OR fecha >= p_desde;
+
+    INSERT INTO progreso_diario (
+        usuario_id, fecha, eventos, puntos, simulaciones, teorias_completadas,
+        preguntas_ia, elementos_nuevos, minutos
+    )
+    SELECT
+        e.usuario_id, e.fecha, e.eventos, e.puntos, e.simulaciones, e.teorias_completadas,
+        e.preguntas_ia, COALESCE(n.elementos_nuevos, 0), e.minutos
+    FROM (
+        SELECT
+            usuario_id,
+            fecha_evento::DATE AS fecha,
+            COUNT(*) AS eventos,
+            COALESCE(SUM(puntos_ganados), 0) AS puntos,
+            COUNT(*) FILTER (WHERE tipo_evento = 'simulacion_completada') AS simulaciones,
+            COUNT(*) FILTER (WHERE tipo_evento = 'teoria_leida') AS teorias_completadas,
+            COUNT(*) FILTER (WHERE tipo_evento = 'pregunta_ia') AS preguntas_ia,
+            COALESCE(SUM(minutos_evento(datos_json)), 0) AS minutos
+        FROM progreso_historico
+        WHERE usuario_id IS NOT NULL
+          AND activo = true
+          AND fecha_evento >= COALESCE(p_desde, '-infinity'::TIMESTAMP)
+        GROUP BY usuario_id, fecha_evento::DATE
+    ) e
+    LEFT JOIN (
+        SELECT usuario_id, fecha_primer_uso AS fecha, COUNT(*) AS elementos_nuevos
+        FROM usuario_elemento_visto
+        WHERE p_desde IS NULL OR fecha_primer_uso >= p_desde
+        GROUP BY usuario_id, fecha_primer_uso
+    ) n ON n.usuario_id = e.usuario_id AND n.fecha = e.fecha;
+
+    GET DIAGNOSTICS filas = ROW_COUNT;
+    RETURN filas;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Eventos y preguntas a la IA cuentan también los archivados
+CREATE OR REPLACE FUNCTION recalcular_usuario_estadisticas(p_usuario_id INTEGER DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    filas INTEGER;
+BEGIN
+    DELETE FROM usuario_elemento_uso
+    WHERE p_usuario_id IS NULL OR usuario_id = p_usuario_id;
+
+    INSERT INTO usuario_elemento_uso (usuario_id, elemento_id, usos)
+    SELECT s.usuario_id, se.elemento_id, COUNT(*)
+    FROM simulacion s
+    JOIN simulacion_elemento se ON se.simulacion_id = s.id_simulacion
+    JOIN usuario u ON u.id_usuario = s.usuario_id
+    WHERE se.elemento_id IS NOT NULL
+      AND (p_usuario_id IS NULL OR s.usuario_id = p_usuario_id)
+    GROUP BY s.usuario_id, se.elemento_id;
+
+    INSERT INTO usuario_estadisticas AS e (
+        usuario_id, total_simulaciones, simulaciones_completadas, simulaciones_en_proceso,
+        simulaciones_fallidas, tiempo_total_simulacion_minutos, teorias_leidas,
+        elementos_diferentes_usados, eventos_progreso, preguntas_ia_realizadas, logros_obtenidos
+    )
+    SELECT
+        u.id_usuario,
+        COALESCE(s.total, 0),
+        COALESCE(s.completadas, 0),
+        COALESCE(s.en_proceso, 0),
+        COALESCE(s.fallidas, 0),
+        COALESCE(s.minutos, 0),
+        COALESCE(t.leidas, 0),
+        COALESCE(el.elementos, 0),
+        COALESCE(p.eventos, 0),
+        COALESCE(p.preguntas, 0),
+        COALESCE(l.logros, 0)
+    FROM usuario u
+    LEFT JOIN (
+        SELECT
+            usuario_id,
+            COUNT(*) AS total,
+            COUNT(*) FILTER (WHERE estado = 'Completada') AS completadas,
+            COUNT(*) FILTER (WHERE estado = 'En proceso') AS en_proceso,
+            COUNT(*) FILTER (WHERE estado = 'Fallida') AS fallidas,
+            SUM(COALESCE(duracion_minutos, 30)) AS minutos
+        FROM simulacion
+        GROUP BY usuario_id
+    ) s ON s.usuario_id = u.id_usuario
+    LEFT JOIN (
+        SELECT usuario_id, COUNT(DISTINCT teoria_id) AS leidas
+        FROM usuario_teoria
+        WHERE leido = true
+        GROUP BY usuario_id
+    ) t ON t.usuario_id = u.id_usuario
+    LEFT JOIN (
+        SELECT usuario_id, COUNT(*) AS elementos
+        FROM usuario_elemento_uso
+        GROUP BY usuario_id
+    ) el ON el.usuario_id = u.id_usuario
+    LEFT JOIN (
+        SELECT
+            usuario_id,
+            COUNT(*) AS eventos,
+            COUNT(*) FILTER (WHERE tipo_evento = 'pregunta_ia') AS preguntas
+        FROM progreso_historico
+        WHERE activo = true
+        GROUP BY usuario_id
+    ) p ON p.usuario_id = u.id_usuario
+    LEFT JOIN (
+        SELECT usuario_id, COUNT(*) AS logros
+        FROM usuario_logros
+        GROUP BY usuario_id
+    ) l ON l.usuario_id = u.id_usuario
+    WHERE p_usuario_id IS NULL OR u.id_usuario = p_usuario_id
+    ON CONFLICT (usuario_id) DO UPDATE SET
+        total_simulaciones = EXCLUDED.total_simulaciones,
+        simulaciones_completadas = EXCLUDED.simulaciones_completadas,
+        simulaciones_en_proceso = EXCLUDED.simulaciones_en_proceso,
+        simulaciones_fallidas = EXCLUDED.simulaciones_fallidas,
+        tiempo_total_simulacion_minutos = EXCLUDED.tiempo_total_simulacion_minutos,
+        teorias_leidas = EXCLUDED.teorias_leidas,
+        elementos_diferentes_usados = EXCLUDED.elementos_diferentes_usados,
+        eventos_progreso = EXCLUDED.eventos_progreso,
+        preguntas_ia_realizadas = EXCLUDED.preguntas_ia_realizadas,
+        logros_obtenidos = EXCLUDED.logros_obtenidos,
+        fecha_actualizacion = CURRENT_TIMESTAMP;
+
+    GET DIAGNOSTICS filas = ROW_COUNT;
+    RETURN filas;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMIT;
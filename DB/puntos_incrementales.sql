@@ -0,0 +1,219 @@
+-- Puntos y nivel del usuario mantenidos por deltas (sin SUM sobre todo el historial)
+-- Ejecutar después de usuario_estadisticas.sql
+
+-- =====================================================
+-- NIVEL SEGÚN PUNTOS
+-- =====================================================
+
+-- Mismos umbrales que calcular_puntos_usuario
+CREATE OR REPLACE FUNCTION nivel_por_puntos(p_puntos INTEGER)
+RETURNS VARCHAR(20) AS $$
+    SELECT CASE
+        WHEN p_puntos >= 2000 THEN 'Experto'
+        WHEN p_puntos >= 1000 THEN 'Avanzado'
+        WHEN p_puntos >= 500 THEN 'Intermedio'
+        ELSE 'Principiante'
+    END::VARCHAR(20);
+$$ LANGUAGE sql IMMUTABLE;
+
+-- =====================================================
+-- INSERCIONES: PUNTOS Y ÚLTIMO ACCESO EN UNA SOLA ACTUALIZACIÓN
+-- =====================================================
+
+-- Sustituye a actualizar_ultimo_acceso_lote(): la misma fila de usuario se
+-- actualiza una sola vez por sentencia, sumando los puntos del lote.
+CREATE OR REPLACE FUNCTION actualizar_usuario_por_eventos()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE usuario u
+    SET puntos_totales = COALESCE(u.puntos_totales, 0) + d.puntos,
+        nivel = nivel_por_puntos(COALESCE(u.puntos_totales, 0) + d.puntos),
+        ultimo_acceso = CURRENT_TIMESTAMP
+    FROM (
+        SELECT
+            usuario_id,
+            COALESCE(SUM(puntos_ganados) FILTER (WHERE activo IS NOT FALSE), 0)::INTEGER AS puntos
+        FROM nuevos_eventos
+        WHERE usuario_id IS NOT NULL
+        GROUP BY usuario_id
+    ) d
+    WHERE u.id_usuario = d.usuario_id;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_ultimo_acceso ON progreso;
+DROP TRIGGER IF EXISTS trigger_usuario_eventos ON progreso;
+
+CREATE TRIGGER trigger_usuario_eventos
+    AFTER INSERT ON progreso
+    REFERENCING NEW TABLE AS nuevos_eventos
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION actualizar_usuario_por_eventos();
+
+-- =====================================================
+-- DESACTIVACIÓN, CORRECCIÓN O BORRADO DE EVENTOS
+-- =====================================================
+
+CREATE OR REPLACE FUNCTION ajustar_puntos_usuario(p_usuario_id INTEGER, p_delta INTEGER)
+RETURNS VOID AS $$
+BEGIN
+    IF p_usuario_id IS NULL OR p_delta = 0 THEN
+        RETURN;
+    END IF;
+
+    UPDATE usuario
+    SET puntos_totales = COALESCE(puntos_totales, 0) + p_delta,
+        nivel = nivel_por_puntos(COALESCE(puntos_totales, 0) + p_delta)
+    WHERE id_usuario = p_usuario_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Un evento cuenta solo si está activo: se resta la versión anterior y se suma la nueva
+CREATE OR REPLACE FUNCTION ajustar_puntos_por_cambio()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.activo IS NOT FALSE THEN
+        PERFORM ajustar_puntos_usuario(OLD.usuario_id, -COALESCE(OLD.puntos_ganados, 0));
+    END IF;
+
+    IF TG_OP = 'UPDATE' AND NEW.activo IS NOT FALSE THEN
+        PERFORM ajustar_puntos_usuario(NEW.usuario_id, COALESCE(NEW.puntos_ganados, 0));
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_puntos_cambio ON progreso;
+
+CREATE TRIGGER trigger_puntos_cambio
+    AFTER DELETE OR UPDATE OF usuario_id, puntos_ganados, activo ON progreso
+    FOR EACH ROW
+    EXECUTE FUNCTION ajustar_puntos_por_cambio();
+
+-- =====================================================
+-- REGISTRO DE PROGRESO SIN RECÁLCULO COMPLETO
+-- =====================================================
+
+CREATE OR REPLACE FUNCTION registrar_progreso(
+    p_usuario_id INTEGER,
+    p_tipo_evento VARCHAR(50),
+    p_descripcion TEXT DEFAULT NULL,
+    p_puntos INTEGER DEFAULT 0,
+    p_datos_json JSONB DEFAULT NULL,
+    p_sesion_id UUID DEFAULT NULL
+)
+RETURNS INTEGER AS $$
+DECLARE
+    nuevo_progreso_id INTEGER;
+BEGIN
+    -- Verificar que el usuario existe y no es anónimo
+    IF NOT EXISTS (
+        SELECT 1 FROM usuario
+        WHERE id_usuario = p_usuario_id
+        AND tipo_usuario = 'registrado'
+    ) THEN
+        RAISE EXCEPTION 'Usuario no válido o no autenticado';
+    END IF;
+
+    -- Insertar el registro de progreso (los puntos del usuario los suma el trigger)
+    INSERT INTO progreso (
+        usuario_id, tipo_evento, descripcion, puntos_ganados, datos_json, sesion_id
+    ) VALUES (
+        p_usuario_id, p_tipo_evento, p_descripcion, puntos_evento(p_tipo_evento, p_puntos), p_datos_json, p_sesion_id
+    ) RETURNING id_progreso INTO nuevo_progreso_id;
+
+    -- Verificar logros
+    PERFORM verificar_logros_usuario(p_usuario_id);
+
+    RETURN nuevo_progreso_id;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION registrar_progreso_lote(
+    p_usuario_id INTEGER,
+    p_eventos JSONB
+)
+RETURNS INTEGER[] AS $$
+DECLARE
+    nuevos_ids INTEGER[];
+BEGIN
+    -- Verificar que el usuario existe y no es anónimo
+    IF NOT EXISTS (
+        SELECT 1 FROM usuario
+        WHERE id_usuario = p_usuario_id
+        AND tipo_usuario = 'registrado'
+    ) THEN
+        RAISE EXCEPTION 'Usuario no válido o no autenticado';
+    END IF;
+
+    -- Insertar todos los eventos del lote de una vez
+    WITH insertados AS (
+        INSERT INTO progreso (
+            usuario_id, tipo_evento, descripcion, puntos_ganados, datos_json, sesion_id, fecha_evento
+        )
+        SELECT
+            p_usuario_id,
+            e.accion,
+            e.descripcion,
+            puntos_evento(e.accion, e.puntos),
+            e.datos,
+            e.sesion_id,
+            -- No se aceptan fechas futuras enviadas por el cliente
+            LEAST(COALESCE(e.fecha, CURRENT_TIMESTAMP), CURRENT_TIMESTAMP)
+        FROM jsonb_to_recordset(p_eventos) AS e(
+            accion VARCHAR(50),
+            descripcion TEXT,
+            puntos INTEGER,
+            datos JSONB,
+            sesion_id UUID,
+            fecha TIMESTAMP
+        )
+        RETURNING id_progreso
+    )
+    SELECT array_agg(id_progreso ORDER BY id_progreso) INTO nuevos_ids FROM insertados;
+
+    -- Los puntos los suma el trigger; los logros se revisan una vez por lote
+    PERFORM verificar_logros_usuario(p_usuario_id);
+
+    RETURN COALESCE(nuevos_ids, ARRAY[]::INTEGER[]);
+END;
+$$ LANGUAGE plpgsql;
+
+-- =====================================================
+-- RECONCILIACIÓN (FUERA DE HORAS PICO)
+-- =====================================================
+
+-- Compara en bloque los totales con el historial y corrige solo los que difieren.
+-- Devuelve cuántos usuarios se corrigieron.
+CREATE OR REPLACE FUNCTION reconciliar_puntos_usuarios()
+RETURNS INTEGER AS $$
+DECLARE
+    corregidos INTEGER;
+BEGIN
+    UPDATE usuario u
+    SET puntos_totales = r.puntos,
+        nivel = nivel_por_puntos(r.puntos)
+    FROM (
+        SELECT u2.id_usuario, COALESCE(p.puntos, 0)::INTEGER AS puntos
+        FROM usuario u2
+        LEFT JOIN (
+            SELECT usuario_id, SUM(puntos_ganados) AS puntos
+            FROM progreso
+            WHERE activo = true
+            GROUP BY usuario_id
+        ) p ON p.usuario_id = u2.id_usuario
+        WHERE u2.tipo_usuario = 'registrado'
+    ) r
+    WHERE u.id_usuario = r.id_usuario
+      AND (u.puntos_totales IS DISTINCT FROM r.puntos OR u.nivel IS DISTINCT FROM nivel_por_puntos(r.puntos));
+
+    GET DIAGNOSTICS corregidos = ROW_COUNT;
+    RETURN corregidos;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Alinear los totales actuales antes de empezar a sumar deltas
+SELECT reconciliar_puntos_usuarios();
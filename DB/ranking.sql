@@ -0,0 +1,42 @@
+-- Ranking de usuarios servido desde memoria (ranking_service)
+-- Ejecutar después de analisis_rendimiento.sql
+
+-- =====================================================
+-- RESUMEN SIN POSICIÓN DE RANKING
+-- =====================================================
+
+-- La posición ya no se consulta en vista_ranking_usuarios: esa vista ordena a
+-- todos los usuarios registrados en cada llamada. El backend la obtiene del
+-- leaderboard en memoria y la completa en la respuesta.
+CREATE OR REPLACE FUNCTION get_resumen_progreso_usuario(p_usuario_id INTEGER)
+RETURNS JSON AS $$
+DECLARE
+    resultado JSON;
+BEGIN
+    SELECT json_build_object(
+        'usuario_id', id_usuario,
+        'nivel', nivel,
+        'puntos_totales', puntos_totales,
+        'simulaciones_completadas', total_simulaciones,
+        'teorias_leidas', teorias_leidas,
+        'logros_obtenidos', logros_obtenidos,
+        'puntos_siguiente_nivel', puntos_siguiente_nivel,
+        'actividad_reciente', actividades_semana > 0,
+        'ultimo_acceso', ultimo_acceso
+    ) INTO resultado
+    FROM vista_dashboard_usuario
+    WHERE id_usuario = p_usuario_id;
+    
+    RETURN COALESCE(resultado, '{}');
+END;
+$$ LANGUAGE plpgsql;
+
+-- =====================================================
+-- ÍNDICES
+-- =====================================================
+
+-- Reconciliación periódica del leaderboard (solo usuarios registrados con puntos)
+CREATE INDEX IF NOT EXISTS idx_usuario_ranking
+    ON usuario (puntos_totales DESC, id_usuario)
+    INCLUDE (nombre)
+    WHERE tipo_usuario = 'registrado' AND puntos_totales > 0;
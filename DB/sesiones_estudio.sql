@@ -0,0 +1,16 @@
+-- Sesiones de estudio registradas en memoria y volcadas por lotes (sesion_service)
+-- Ejecutar después de ranking.sql
+
+-- Consultas de sesiones por usuario, de la más reciente a la más antigua
+CREATE INDEX IF NOT EXISTS idx_sesiones_estudio_usuario_fecha
+    ON sesiones_estudio (usuario_id, fecha_inicio DESC);
+
+-- Último latido recibido: las sesiones activas sin latidos recientes son de
+-- un worker que ya no existe y se cierran por antigüedad
+ALTER TABLE sesiones_estudio ADD COLUMN IF NOT EXISTS ultimo_latido TIMESTAMP;
+
+-- Sesiones que quedaron marcadas como activas (p. ej. tras un reinicio del servidor)
+DROP INDEX IF EXISTS idx_sesiones_estudio_activas;
+CREATE INDEX IF NOT EXISTS idx_sesiones_estudio_activas
+    ON sesiones_estudio (ultimo_latido)
+    WHERE activa = true;
@@ -0,0 +1,43 @@
+-- Búsqueda de texto completo en español para teoria (tsvector ponderado + GIN)
+-- Ejecutar después de busqueda_trigram.sql
+
+-- =====================================================
+-- COLUMNA teoria.busqueda
+-- =====================================================
+
+-- Pesos: título (A) > categoría (B) > contenido (C).
+-- Se indexa el texto sin tildes para que "acido" encuentre "ácido".
+ALTER TABLE teoria ADD COLUMN IF NOT EXISTS busqueda TSVECTOR;
+
+CREATE OR REPLACE FUNCTION teoria_vector_busqueda(p_titulo TEXT, p_categoria TEXT, p_contenido TEXT)
+RETURNS TSVECTOR AS $$
+    SELECT setweight(to_tsvector('spanish', f_unaccent(COALESCE(p_titulo, ''))), 'A')
+        || setweight(to_tsvector('spanish', f_unaccent(COALESCE(p_categoria, ''))), 'B')
+        || setweight(to_tsvector('spanish', f_unaccent(COALESCE(p_contenido, ''))), 'C');
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+CREATE OR REPLACE FUNCTION actualizar_teoria_busqueda()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.busqueda := teoria_vector_busqueda(NEW.titulo, NEW.categoria, NEW.contenido);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_teoria_busqueda ON teoria;
+
+CREATE TRIGGER trigger_teoria_busqueda
+    BEFORE INSERT OR UPDATE OF titulo, categoria, contenido ON teoria
+    FOR EACH ROW
+    EXECUTE FUNCTION actualizar_teoria_busqueda();
+
+-- Teorías existentes
+UPDATE teoria
+SET busqueda = teoria_vector_busqueda(titulo, categoria, contenido);
+
+-- =====================================================
+-- ÍNDICE
+-- =====================================================
+
+CREATE INDEX IF NOT EXISTS idx_teoria_busqueda
+    ON teoria USING gin (busqueda);
@@ -0,0 +1,406 @@
+-- Estadísticas por usuario mantenidas por triggers (reemplaza vista_estadisticas_completas)
+-- Ejecutar después de sesiones_estudio.sql
+
+-- =====================================================
+-- TABLAS
+-- =====================================================
+
+-- Una fila por usuario: leer las estadísticas es una búsqueda por clave primaria
+CREATE TABLE IF NOT EXISTS usuario_estadisticas (
+    usuario_id INTEGER PRIMARY KEY REFERENCES usuario(id_usuario) ON DELETE CASCADE,
+    total_simulaciones INTEGER NOT NULL DEFAULT 0,
+    simulaciones_completadas INTEGER NOT NULL DEFAULT 0,
+    simulaciones_en_proceso INTEGER NOT NULL DEFAULT 0,
+    simulaciones_fallidas INTEGER NOT NULL DEFAULT 0,
+    tiempo_total_simulacion_minutos INTEGER NOT NULL DEFAULT 0,
+    teorias_leidas INTEGER NOT NULL DEFAULT 0,
+    elementos_diferentes_usados INTEGER NOT NULL DEFAULT 0,
+    eventos_progreso INTEGER NOT NULL DEFAULT 0,
+    preguntas_ia_realizadas INTEGER NOT NULL DEFAULT 0,
+    logros_obtenidos INTEGER NOT NULL DEFAULT 0,
+    fecha_actualizacion TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Cuántas veces usó cada usuario cada elemento; permite mantener
+-- elementos_diferentes_usados sin COUNT(DISTINCT) sobre todo el historial
+CREATE TABLE IF NOT EXISTS usuario_elemento_uso (
+    usuario_id INTEGER NOT NULL REFERENCES usuario(id_usuario) ON DELETE CASCADE,
+    elemento_id INTEGER NOT NULL,
+    usos INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (usuario_id, elemento_id)
+);
+
+-- =====================================================
+-- FUNCIÓN AUXILIAR DE SUMA INCREMENTAL
+-- =====================================================
+
+-- Suma (o resta, con valores negativos) contadores a la fila del usuario
+CREATE OR REPLACE FUNCTION sumar_usuario_estadisticas(
+    p_usuario_id INTEGER,
+    p_total_simulaciones INTEGER DEFAULT 0,
+    p_completadas INTEGER DEFAULT 0,
+    p_en_proceso INTEGER DEFAULT 0,
+    p_fallidas INTEGER DEFAULT 0,
+    p_minutos INTEGER DEFAULT 0,
+    p_elementos INTEGER DEFAULT 0,
+    p_eventos INTEGER DEFAULT 0,
+    p_preguntas_ia INTEGER DEFAULT 0,
+    p_logros INTEGER DEFAULT 0
+)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO usuario_estadisticas AS e (
+        usuario_id, total_simulaciones, simulaciones_completadas, simulaciones_en_proceso,
+        simulaciones_fallidas, tiempo_total_simulacion_minutos, elementos_diferentes_usados,
+        eventos_progreso, preguntas_ia_realizadas, logros_obtenidos
+    )
+    VALUES (
+        p_usuario_id, GREATEST(p_total_simulaciones, 0), GREATEST(p_completadas, 0), GREATEST(p_en_proceso, 0),
+        GREATEST(p_fallidas, 0), GREATEST(p_minutos, 0), GREATEST(p_elementos, 0),
+        GREATEST(p_eventos, 0), GREATEST(p_preguntas_ia, 0), GREATEST(p_logros, 0)
+    )
+    ON CONFLICT (usuario_id) DO UPDATE SET
+        total_simulaciones = e.total_simulaciones + p_total_simulaciones,
+        simulaciones_completadas = e.simulaciones_completadas + p_completadas,
+        simulaciones_en_proceso = e.simulaciones_en_proceso + p_en_proceso,
+        simulaciones_fallidas = e.simulaciones_fallidas + p_fallidas,
+        tiempo_total_simulacion_minutos = e.tiempo_total_simulacion_minutos + p_minutos,
+        elementos_diferentes_usados = e.elementos_diferentes_usados + p_elementos,
+        eventos_progreso = e.eventos_progreso + p_eventos,
+        preguntas_ia_realizadas = e.preguntas_ia_realizadas + p_preguntas_ia,
+        logros_obtenidos = e.logros_obtenidos + p_logros,
+        fecha_actualizacion = CURRENT_TIMESTAMP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- =====================================================
+-- TRIGGERS DE MANTENIMIENTO
+-- =====================================================
+
+-- Usuarios nuevos empiezan con su fila en cero
+CREATE OR REPLACE FUNCTION estadisticas_usuario_nuevo()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO usuario_estadisticas (usuario_id)
+    VALUES (NEW.id_usuario)
+    ON CONFLICT (usuario_id) DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_estadisticas_usuario_nuevo ON usuario;
+
+CREATE TRIGGER trigger_estadisticas_usuario_nuevo
+    AFTER INSERT ON usuario
+    FOR EACH ROW
+    EXECUTE FUNCTION estadisticas_usuario_nuevo();
+
+-- Simulaciones: cada cambio resta la versión anterior y suma la nueva
+-- (la duración sin registrar cuenta 30 minutos, como en la vista anterior)
+CREATE OR REPLACE FUNCTION estadisticas_simulacion()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.usuario_id IS NOT NULL THEN
+        PERFORM sumar_usuario_estadisticas(
+            OLD.usuario_id,
+            p_total_simulaciones => -1,
+            p_completadas => -(OLD.estado = 'Completada')::INTEGER,
+            p_en_proceso => -(OLD.estado = 'En proceso')::INTEGER,
+            p_fallidas => -(OLD.estado = 'Fallida')::INTEGER,
+            p_minutos => -COALESCE(OLD.duracion_minutos, 30)
+        );
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.usuario_id IS NOT NULL THEN
+        PERFORM sumar_usuario_estadisticas(
+            NEW.usuario_id,
+            p_total_simulaciones => 1,
+            p_completadas => (NEW.estado = 'Completada')::INTEGER,
+            p_en_proceso => (NEW.estado = 'En proceso')::INTEGER,
+            p_fallidas => (NEW.estado = 'Fallida')::INTEGER,
+            p_minutos => COALESCE(NEW.duracion_minutos, 30)
+        );
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_estadisticas_simulacion ON simulacion;
+
+CREATE TRIGGER trigger_estadisticas_simulacion
+    AFTER INSERT OR DELETE OR UPDATE OF usuario_id, estado, duracion_minutos ON simulacion
+    FOR EACH ROW
+    EXECUTE FUNCTION estadisticas_simulacion();
+
+-- Elementos usados: se lleva la cuenta de usos por elemento y solo cambia
+-- elementos_diferentes_usados cuando un elemento aparece o desaparece.
+-- (Reasignar una simulación a otro usuario no mueve sus elementos; eso lo
+-- corrige recalcular_usuario_estadisticas.)
+CREATE OR REPLACE FUNCTION estadisticas_simulacion_elemento()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_usuario_id INTEGER;
+    v_usos INTEGER;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.elemento_id IS NOT NULL THEN
+        SELECT usuario_id INTO v_usuario_id FROM simulacion WHERE id_simulacion = OLD.simulacion_id;
+
+        IF v_usuario_id IS NOT NULL THEN
+            UPDATE usuario_elemento_uso
+            SET usos = usos - 1
+            WHERE usuario_id = v_usuario_id AND elemento_id = OLD.elemento_id
+            RETURNING usos INTO v_usos;
+
+            IF v_usos = 0 THEN
+                DELETE FROM usuario_elemento_uso
+                WHERE usuario_id = v_usuario_id AND elemento_id = OLD.elemento_id;
+                PERFORM sumar_usuario_estadisticas(v_usuario_id, p_elementos => -1);
+            END IF;
+        END IF;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.elemento_id IS NOT NULL THEN
+        SELECT usuario_id INTO v_usuario_id FROM simulacion WHERE id_simulacion = NEW.simulacion_id;
+
+        IF v_usuario_id IS NOT NULL THEN
+            INSERT INTO usuario_elemento_uso (usuario_id, elemento_id, usos)
+            VALUES (v_usuario_id, NEW.elemento_id, 1)
+            ON CONFLICT (usuario_id, elemento_id) DO UPDATE SET usos = usuario_elemento_uso.usos + 1
+            RETURNING usos INTO v_usos;
+
+            IF v_usos = 1 THEN
+                PERFORM sumar_usuario_estadisticas(v_usuario_id, p_elementos => 1);
+            END IF;
+        END IF;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_estadisticas_simulacion_elemento ON simulacion_elemento;
+
+CREATE TRIGGER trigger_estadisticas_simulacion_elemento
+    AFTER INSERT OR DELETE OR UPDATE OF simulacion_id, elemento_id ON simulacion_elemento
+    FOR EACH ROW
+    EXECUTE FUNCTION estadisticas_simulacion_elemento();
+
+-- Teorías leídas: se recuenta solo el usuario afectado (índice usuario_id, leido)
+CREATE OR REPLACE FUNCTION recontar_teorias_usuario(p_usuario_id INTEGER)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO usuario_estadisticas AS e (usuario_id, teorias_leidas)
+    SELECT p_usuario_id, COUNT(DISTINCT teoria_id)
+    FROM usuario_teoria
+    WHERE usuario_id = p_usuario_id AND leido = true
+    ON CONFLICT (usuario_id) DO UPDATE SET
+        teorias_leidas = EXCLUDED.teorias_leidas,
+        fecha_actualizacion = CURRENT_TIMESTAMP;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION estadisticas_usuario_teoria()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.usuario_id IS NOT NULL THEN
+        PERFORM recontar_teorias_usuario(OLD.usuario_id);
+    END IF;
+
+    IF TG_OP = 'INSERT' AND NEW.usuario_id IS NOT NULL
+       OR TG_OP = 'UPDATE' AND NEW.usuario_id IS DISTINCT FROM OLD.usuario_id THEN
+        PERFORM recontar_teorias_usuario(NEW.usuario_id);
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_estadisticas_usuario_teoria ON usuario_teoria;
+
+CREATE TRIGGER trigger_estadisticas_usuario_teoria
+    AFTER INSERT OR DELETE OR UPDATE OF usuario_id, teoria_id, leido ON usuario_teoria
+    FOR EACH ROW
+    EXECUTE FUNCTION estadisticas_usuario_teoria();
+
+-- Eventos de progreso: una suma por usuario y sentencia (compatible con lotes)
+CREATE OR REPLACE FUNCTION estadisticas_progreso_lote()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM sumar_usuario_estadisticas(
+        usuario_id,
+        p_eventos => eventos,
+        p_preguntas_ia => preguntas
+    )
+    FROM (
+        SELECT
+            usuario_id,
+            COUNT(*)::INTEGER AS eventos,
+            (COUNT(*) FILTER (WHERE tipo_evento = 'pregunta_ia'))::INTEGER AS preguntas
+        FROM nuevos_eventos
+        WHERE usuario_id IS NOT NULL AND activo IS NOT FALSE
+        GROUP BY usuario_id
+    ) n;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_estadisticas_progreso ON progreso;
+
+CREATE TRIGGER trigger_estadisticas_progreso
+    AFTER INSERT ON progreso
+    REFERENCING NEW TABLE AS nuevos_eventos
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION estadisticas_progreso_lote();
+
+-- Desactivar o borrar eventos descuenta lo que sumaban
+CREATE OR REPLACE FUNCTION estadisticas_progreso_cambio()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.usuario_id IS NOT NULL AND OLD.activo IS NOT FALSE THEN
+        PERFORM sumar_usuario_estadisticas(
+            OLD.usuario_id,
+            p_eventos => -1,
+            p_preguntas_ia => -(OLD.tipo_evento = 'pregunta_ia')::INTEGER
+        );
+    END IF;
+
+    IF TG_OP = 'UPDATE' AND NEW.usuario_id IS NOT NULL AND NEW.activo IS NOT FALSE THEN
+        PERFORM sumar_usuario_estadisticas(
+            NEW.usuario_id,
+            p_eventos => 1,
+            p_preguntas_ia => (NEW.tipo_evento = 'pregunta_ia')::INTEGER
+        );
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_estadisticas_progreso_cambio ON progreso;
+
+CREATE TRIGGER trigger_estadisticas_progreso_cambio
+    AFTER DELETE OR UPDATE OF usuario_id, tipo_evento, activo ON progreso
+    FOR EACH ROW
+    EXECUTE FUNCTION estadisticas_progreso_cambio();
+
+-- Logros obtenidos
+CREATE OR REPLACE FUNCTION estadisticas_usuario_logros()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' AND NEW.usuario_id IS NOT NULL THEN
+        PERFORM sumar_usuario_estadisticas(NEW.usuario_id, p_logros => 1);
+    ELSIF TG_OP = 'DELETE' AND OLD.usuario_id IS NOT NULL THEN
+        PERFORM sumar_usuario_estadisticas(OLD.usuario_id, p_logros => -1);
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_estadisticas_usuario_logros ON usuario_logros;
+
+CREATE TRIGGER trigger_estadisticas_usuario_logros
+    AFTER INSERT OR DELETE ON usuario_logros
+    FOR EACH ROW
+    EXECUTE FUNCTION estadisticas_usuario_logros();
+
+-- =====================================================
+-- RECONSTRUCCIÓN (RECONCILIACIÓN) DESDE LAS TABLAS BASE
+-- =====================================================
+
+-- Recalcula la fila de un usuario, o de todos si p_usuario_id es NULL.
+-- Cada agregado se calcula por separado para no multiplicar filas entre tablas.
+CREATE OR REPLACE FUNCTION recalcular_usuario_estadisticas(p_usuario_id INTEGER DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    filas INTEGER;
+BEGIN
+    DELETE FROM usuario_elemento_uso
+    WHERE p_usuario_id IS NULL OR usuario_id = p_usuario_id;
+
+    INSERT INTO usuario_elemento_uso (usuario_id, elemento_id, usos)
+    SELECT s.usuario_id, se.elemento_id, COUNT(*)
+    FROM simulacion s
+    JOIN simulacion_elemento se ON se.simulacion_id = s.id_simulacion
+    JOIN usuario u ON u.id_usuario = s.usuario_id
+    WHERE se.elemento_id IS NOT NULL
+      AND (p_usuario_id IS NULL OR s.usuario_id = p_usuario_id)
+    GROUP BY s.usuario_id, se.elemento_id;
+
+    INSERT INTO usuario_estadisticas AS e (
+        usuario_id, total_simulaciones, simulaciones_completadas, simulaciones_en_proceso,
+        simulaciones_fallidas, tiempo_total_simulacion_minutos, teorias_leidas,
+        elementos_diferentes_usados, eventos_progreso, preguntas_ia_realizadas, logros_obtenidos
+    )
+    SELECT
+        u.id_usuario,
+        COALESCE(s.total, 0),
+        COALESCE(s.completadas, 0),
+        COALESCE(s.en_proceso, 0),
+        COALESCE(s.fallidas, 0),
+        COALESCE(s.minutos, 0),
+        COALESCE(t.leidas, 0),
+        COALESCE(el.elementos, 0),
+        COALESCE(p.eventos, 0),
+        COALESCE(p.preguntas, 0),
+        COALESCE(l.logros, 0)
+    FROM usuario u
+    LEFT JOIN (
+        SELECT
+            usuario_id,
+            COUNT(*) AS total,
+            COUNT(*) FILTER (WHERE estado = 'Completada') AS completadas,
+            COUNT(*) FILTER (WHERE estado = 'En proceso') AS en_proceso,
+            COUNT(*) FILTER (WHERE estado = 'Fallida') AS fallidas,
+            SUM(COALESCE(duracion_minutos, 30)) AS minutos
+        FROM simulacion
+        GROUP BY usuario_id
+    ) s ON s.usuario_id = u.id_usuario
+    LEFT JOIN (
+        SELECT usuario_id, COUNT(DISTINCT teoria_id) AS leidas
+        FROM usuario_teoria
+        WHERE leido = true
+        GROUP BY usuario_id
+    ) t ON t.usuario_id = u.id_usuario
+    LEFT JOIN (
+        SELECT usuario_id, COUNT(*) AS elementos
+        FROM usuario_elemento_uso
+        GROUP BY usuario_id
+    ) el ON el.usuario_id = u.id_usuario
+    LEFT JOIN (
+        SELECT
+            usuario_id,
+            COUNT(*) AS eventos,
+            COUNT(*) FILTER (WHERE tipo_evento = 'pregunta_ia') AS preguntas
+        FROM progreso
+        WHERE activo = true
+        GROUP BY usuario_id
+    ) p ON p.usuario_id = u.id_usuario
+    LEFT JOIN (
+        SELECT usuario_id, COUNT(*) AS logros
+        FROM usuario_logros
+        GROUP BY usuario_id
+    ) l ON l.usuario_id = u.id_usuario
+    WHERE p_usuario_id IS NULL OR u.id_usuario = p_usuario_id
+    ON CONFLICT (usuario_id) DO UPDATE SET
+        total_simulaciones = EXCLUDED.total_simulaciones,
+        simulaciones_completadas = EXCLUDED.simulaciones_completadas,
+        simulaciones_en_proceso = EXCLUDED.simulaciones_en_proceso,
+        simulaciones_fallidas = EXCLUDED.simulaciones_fallidas,
+        tiempo_total_simulacion_minutos = EXCLUDED.tiempo_total_simulacion_minutos,
+        teorias_leidas = EXCLUDED.teorias_leidas,
+        elementos_diferentes_usados = EXCLUDED.elementos_diferentes_usados,
+        eventos_progreso = EXCLUDED.eventos_progreso,
+        preguntas_ia_realizadas = EXCLUDED.preguntas_ia_realizadas,
+        logros_obtenidos = EXCLUDED.logros_obtenidos,
+        fecha_actualizacion = CURRENT_TIMESTAMP;
+
+    GET DIAGNOSTICS filas = ROW_COUNT;
+    RETURN filas;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Carga inicial
+SELECT recalcular_usuario_estadisticas();
@@ -1,9 +1,14 @@
 # app/api/endpoints/chat.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict
-from app.services.ia import chat_completion, chat_stream, test_gemini_connection
+from typing import AsyncIterator, Dict, List, Optional
+from app.services.ia import (
+    chat_completion, chat_stream, test_gemini_connection, limite_chat, ChatSaturadoError,
+    ChatNoDisponibleError, buscar_en_cache, sonda_gemini
+)
+from app.services.streaming_chat import gestor_streams, FIN
+from app.services.registro_preguntas import registro_preguntas
 import logging
 
 # Configurar logging
@@ -18,6 +23,7 @@ class Msg(BaseModel):
 
 class ChatBody(BaseModel):
     messages: List[Msg]
+    usuario_id: Optional[int] = None  # Para guardar la pregunta en su historial
 
 class ChatReply(BaseModel):
     reply: str
@@ -30,27 +36,59 @@ class HealthResponse(BaseModel):
     model: str = ""
     details: Dict = {}
 
+def _saturado(e: ChatSaturadoError) -> HTTPException:
+    """503 con Retry-After: el cliente debe reintentar, no encolar más"""
+    logger.warning(f"⚠️ Chat saturado: {e}")
+    return HTTPException(
+        status_code=503,
+        detail="El asistente está atendiendo demasiadas consultas. Inténtalo de nuevo en unos segundos.",
+        headers={"Retry-After": str(max(int(limite_chat.espera_maxima), 1))}
+    )
+
+async def _registrando(fuente: AsyncIterator[str], pregunta: str, usuario_id: Optional[int]) -> AsyncIterator[str]:
+    """
+    Reenviar los chunks y encolar la respuesta completa (solo si el stream
+    termina bien). Si el modelo falla se envía el aviso y no se registra nada.
+    """
+    partes = []
+    try:
+        async for chunk in fuente:
+            if chunk == FIN:
+                registro_preguntas.registrar(pregunta, "".join(partes), usuario_id)
+            else:
+                partes.append(chunk)
+            yield chunk
+    except ChatNoDisponibleError as e:
+        yield e.respuesta
+        yield FIN
+
 @router.get("/health", response_model=HealthResponse)
-def health_check():
+async def health_check(deep: bool = False):
     """
-    Endpoint para verificar que el servicio de chat funciona con Gemini
+    Endpoint para verificar que el servicio de chat funciona con Gemini.
+
+    Devuelve el último resultado de la sonda en segundo plano; con
+    `?deep=true` hace una generación real contra Gemini (lenta y con coste).
     """
     from app.core.config import settings
     
-    # Probar conexión con Gemini
-    gemini_test = test_gemini_connection()
+    gemini_test = await test_gemini_connection() if deep else sonda_gemini.estado()
     
     return HealthResponse(
         status=gemini_test["status"],
         service="chat",
         message=gemini_test["message"],
         gemini_configured=gemini_test["gemini_configured"],
-        model=settings.GEMINI_MODEL,
-        details=gemini_test
+        model=gemini_test.get("model", settings.GEMINI_MODEL),
+        details={
+            **gemini_test,
+            "streaming": gestor_streams.metricas.resumen(),
+            "registro_preguntas": registro_preguntas.estado()
+        }
     )
 
 @router.post("/", response_model=ChatReply)
-def chat_endpoint(body: ChatBody):
+async def chat_endpoint(body: ChatBody):
     """
     Endpoint para chat sin streaming usando Gemini
     """
@@ -74,25 +112,37 @@ def chat_endpoint(body: ChatBody):
         )
         
         # Obtener respuesta de Gemini
-        reply = chat_completion(msgs)
+        try:
+            reply = await chat_completion(msgs)
+        except ChatNoDisponibleError as e:
+            # El aviso se muestra en el chat, pero no cuenta como pregunta respondida
+            return ChatReply(reply=e.respuesta)
         
         if not reply:
             raise HTTPException(status_code=500, detail="Empty response from Gemini service")
         
         logger.info(f"✅ Respuesta generada exitosamente: {len(reply)} caracteres")
+        registro_preguntas.registrar(msgs[-1]["content"], reply, body.usuario_id)
         
         return ChatReply(reply=reply)
     
     except HTTPException:
         raise
+    except ChatSaturadoError as e:
+        raise _saturado(e)
     except Exception as e:
         logger.error(f"❌ Error en chat endpoint: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
 
 @router.post("/stream")
-def chat_streaming_endpoint(body: ChatBody):
+async def chat_streaming_endpoint(body: ChatBody, request: Request):
     """
-    Endpoint para chat con streaming usando Gemini
+    Endpoint para chat con streaming usando Gemini.
+
+    Con `Accept: text/event-stream` responde en SSE (ids, latidos, evento
+    `done` y reanudación con `Last-Event-ID`); si no, en texto plano por
+    líneas terminado en [DONE]. Si el cliente se desconecta, la generación
+    en Gemini se cancela.
     """
     try:
         logger.info(f"📡 Recibida petición de chat streaming con {len(body.messages)} mensajes")
@@ -108,43 +158,54 @@ def chat_streaming_endpoint(body: ChatBody):
                 raise HTTPException(status_code=400, detail="Message must have role and content")
             msgs.append({"role": m.role, "content": m.content})
         
-        def generator():
-            try:
-                chunk_count = 0
-                for chunk in chat_stream(msgs):
-                    if chunk == "[DONE]":
-                        logger.info(f"🏁 Stream completado con {chunk_count} chunks")
-                        break
-                    chunk_count += 1
-                    yield f"{chunk}\n"
-                yield "[DONE]\n"
-            except Exception as e:
-                logger.error(f"❌ Error en streaming: {str(e)}", exc_info=True)
-                yield f"Error: {str(e)}\n"
-                
+        # Rechazar antes de abrir el stream si la cola ya está llena
+        # (las respuestas cacheadas no ocupan hueco)
+        if buscar_en_cache(msgs) is None:
+            limite_chat.verificar_capacidad()
+
+        def crear_fuente() -> AsyncIterator[str]:
+            return _registrando(chat_stream(msgs), msgs[-1]["content"], body.usuario_id)
+
+        headers = {
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "Access-Control-Allow-Origin": "*",
+            # Sin buffering en proxies (nginx) para que cada chunk llegue al momento
+            "X-Accel-Buffering": "no"
+        }
+
+        if "text/event-stream" in request.headers.get("accept", ""):
+            return StreamingResponse(
+                gestor_streams.eventos_sse(
+                    crear_fuente,
+                    request,
+                    request.headers.get("last-event-id")
+                ),
+                media_type="text/event-stream; charset=utf-8",
+                headers=headers
+            )
+
         return StreamingResponse(
-            generator(), 
+            gestor_streams.texto_plano(crear_fuente, request),
             media_type="text/plain; charset=utf-8",
-            headers={
-                "Cache-Control": "no-cache", 
-                "Connection": "keep-alive",
-                "Access-Control-Allow-Origin": "*"
-            }
+            headers=headers
         )
     
     except HTTPException:
         raise
+    except ChatSaturadoError as e:
+        raise _saturado(e)
     except Exception as e:
         logger.error(f"❌ Error en chat streaming endpoint: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
 
 @router.get("/test-gemini")
-def test_gemini_endpoint():
+async def test_gemini_endpoint(deep: bool = False):
     """
-    Endpoint de prueba específico para Gemini
+    Endpoint de prueba específico para Gemini (estado cacheado salvo `?deep=true`)
     """
     try:
-        result = test_gemini_connection()
+        result = await test_gemini_connection() if deep else sonda_gemini.estado()
         return {
             "endpoint": "test-gemini",
             "timestamp": "now",
@@ -1,7 +1,8 @@
 # app/api/endpoints/progreso.py - VERSIÓN COMPLETAMENTE CORREGIDA
 from fastapi import APIRouter, HTTPException, Query, status, Body
 from typing import List, Optional
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+import functools
 import logging
 
 from app.models.progreso import (
@@ -12,16 +13,27 @@ from app.models.progreso import (
     AnalisisRendimientoResponse,
     LogrosUsuarioResponse,
     RespuestaGuardado,
+    RespuestaGuardadoLote,
     ResumenProgresoResponse,
     EstadisticasRapidas,
+    RankingUsuario,
+    LeaderboardResponse,
+    MetricaTiempo,
     HealthCheckResponse,
     ErrorResponse,
     GuardarProgresoRequest,
+    GuardarProgresoLoteRequest,
     IniciarSesionRequest,
+    ActividadSesionRequest,
+    SesionEstudio,
     FiltroHistorialRequest,
     MetricasRequest
 )
 from app.services.progreso_service import progreso_service
+from app.services.analisis_service import analisis_service
+from app.services.ranking_service import ranking_service
+from app.services.sesion_service import sesion_service
+from app.services.logros_service import logros_service
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -34,7 +46,14 @@ router = APIRouter()
 # =====================================
 
 def handle_progreso_errors(func):
-    """Decorador para manejo consistente de errores con fallback a mock"""
+    """
+    Decorador para manejo consistente de errores.
+
+    Conserva la firma del endpoint (functools.wraps) para que FastAPI vea sus
+    parámetros de ruta y cuerpo. No reintenta: repetir un POST de progreso
+    volvería a insertar los eventos.
+    """
+    @functools.wraps(func)
     async def wrapper(*args, **kwargs):
         try:
             return await func(*args, **kwargs)
@@ -43,12 +62,8 @@ def handle_progreso_errors(func):
         except Exception as e:
             error_msg = str(e)
             logger.error(f"Error en {func.__name__}: {error_msg}")
-            
-            # Si es un error de BD, intentar con datos mock para endpoints clave
-            if "no existe la columna" in error_msg.lower() or "undefinedcolumn" in error_msg.lower():
-                logger.warning("🔄 Error de columna, intentando continuar con datos mock...")
-                # No lanzar excepción, permitir que el servicio use mock data
-                
+
+
             # Manejo específico de errores comunes
             if "no autenticado" in error_msg.lower() or "no autorizado" in error_msg.lower():
                 raise HTTPException(
@@ -66,10 +81,10 @@ def handle_progreso_errors(func):
                     detail=error_msg
                 )
             else:
-                # Para otros errores, permitir que el servicio use mock data
-                logger.warning(f"🔄 Error no crítico en {func.__name__}, continuando: {error_msg}")
-                # No lanzar excepción para permitir fallback a mock
-                return await func(*args, **kwargs)  # Reintentar
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=error_msg
+                )
     return wrapper
 
 # =====================================
@@ -209,6 +224,121 @@ async def get_estadisticas_elementos(
             detail=f"Error interno del servidor: {str(e)}"
         )
 
+@router.get("/{usuario_id}/metricas",
+           response_model=List[MetricaTiempo],
+           summary="Obtener serie temporal de actividad",
+           description="Simulaciones, teorías y elementos nuevos por día o por semana, desde el acumulado diario")
+@handle_progreso_errors
+async def get_metricas_tiempo(
+    usuario_id: int,
+    desde: Optional[date] = Query(None, description="Fecha inicial (por defecto, hace 30 días)"),
+    hasta: Optional[date] = Query(None, description="Fecha final (por defecto, hoy)"),
+    bucket: str = Query("day", pattern="^(day|week)$", description="Agrupación: day o week")
+) -> List[MetricaTiempo]:
+    """
+    Obtiene la actividad del usuario agrupada por periodo.
+    Se responde desde la tabla progreso_diario, por lo que el costo depende
+    del número de días del rango y no del número de eventos.
+    """
+    hasta = hasta or date.today()
+    desde = desde or (hasta - timedelta(days=30))
+    
+    if desde > hasta:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Rango de fechas inválido: 'desde' debe ser anterior a 'hasta'"
+        )
+    if (hasta - desde).days > 366:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Rango de fechas inválido: máximo 366 días"
+        )
+    
+    logger.info(f"📈 Obteniendo métricas para usuario {usuario_id}: {desde} → {hasta} ({bucket})")
+    
+    metricas = await progreso_service.get_metricas_tiempo(usuario_id, desde, hasta, bucket)
+    logger.info(f"✅ Métricas obtenidas: {len(metricas)} periodos")
+    return metricas
+
+@router.get("/{usuario_id}/analisis",
+           response_model=AnalisisRendimientoResponse,
+           summary="Obtener análisis de rendimiento",
+           description="Fortalezas, áreas de mejora, recomendaciones y comparación semanal (precalculado en lote)")
+@handle_progreso_errors
+async def get_analisis_rendimiento(usuario_id: int) -> AnalisisRendimientoResponse:
+    """
+    Devuelve el análisis de rendimiento del usuario.
+    Se sirve desde analisis_rendimiento (lote nocturno); si no existe o está
+    vencido se calcula en el momento y se guarda para las siguientes consultas.
+    """
+    logger.info(f"📊 Obteniendo análisis de rendimiento para usuario {usuario_id}")
+    
+    analisis = await analisis_service.get_analisis_rendimiento(usuario_id)
+    if analisis is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Usuario no encontrado o no registrado"
+        )
+    
+    logger.info(f"✅ Análisis obtenido: rendimiento {analisis.rendimiento_general}%")
+    return analisis
+
+@router.get("/{usuario_id}/logros",
+           response_model=LogrosUsuarioResponse,
+           summary="Obtener logros del usuario",
+           description="Catálogo de logros con los obtenidos por el usuario, su avance y el próximo a desbloquear")
+@handle_progreso_errors
+async def get_logros_usuario(usuario_id: int) -> LogrosUsuarioResponse:
+    """
+    Obtiene los logros del usuario.
+    El catálogo y las estadísticas del usuario salen de caché; solo se consulta
+    el conjunto de logros obtenidos.
+    """
+    logger.info(f"🏅 Obteniendo logros para usuario {usuario_id}")
+    
+    logros = await logros_service.get_logros_usuario(usuario_id)
+    logger.info(f"✅ Logros obtenidos: {logros.logros_obtenidos}/{logros.total_logros_disponibles}")
+    return logros
+
+@router.get("/{usuario_id}/ranking",
+           response_model=RankingUsuario,
+           summary="Obtener posición del usuario en el ranking",
+           description="Posición, percentil y puntuación promedio desde el leaderboard en memoria")
+@handle_progreso_errors
+async def get_ranking_usuario(usuario_id: int) -> RankingUsuario:
+    """
+    Obtiene la posición del usuario entre los usuarios registrados con puntos.
+    Los empates comparten posición, igual que RANK() en la BD.
+    """
+    logger.info(f"🏆 Obteniendo ranking para usuario {usuario_id}")
+    
+    ranking = await ranking_service.get_ranking_usuario(usuario_id)
+    if ranking is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Usuario no encontrado en el ranking (sin puntos o no registrado)"
+        )
+    
+    logger.info(f"✅ Usuario {usuario_id} en posición {ranking.posicion}/{ranking.total_usuarios}")
+    return ranking
+
+@router.get("/leaderboard",
+           response_model=LeaderboardResponse,
+           summary="Obtener top de usuarios",
+           description="Los N usuarios con más puntos")
+@handle_progreso_errors
+async def get_leaderboard(
+    limite: int = Query(10, description="Cantidad de usuarios", ge=1, le=100)
+) -> LeaderboardResponse:
+    """
+    Obtiene el top de usuarios por puntos desde el leaderboard en memoria.
+    """
+    logger.info(f"🏆 Obteniendo leaderboard (top {limite})")
+    
+    leaderboard = await ranking_service.get_leaderboard(limite)
+    logger.info(f"✅ Leaderboard obtenido: {len(leaderboard.usuarios)} de {leaderboard.total_usuarios} usuarios")
+    return leaderboard
+
 # =====================================
 # ENDPOINTS DE ACCIÓN (POST/PUT) MEJORADOS
 # =====================================
@@ -250,6 +380,116 @@ async def guardar_progreso(
             detail=f"Error guardando progreso: {str(e)}"
         )
 
+@router.post("/{usuario_id}/guardar/batch",
+            response_model=RespuestaGuardadoLote,
+            summary="Guardar un lote de eventos de progreso",
+            description="Guarda varios eventos en una sola petición; puntos y logros se recalculan una vez por lote")
+@handle_progreso_errors
+async def guardar_progreso_lote(
+    usuario_id: int,
+    lote: GuardarProgresoLoteRequest
+) -> RespuestaGuardadoLote:
+    """
+    Guarda la actividad encolada por el cliente en un solo viaje.
+    Solo funciona para usuarios autenticados (tipo_usuario != 'anonimo').
+    """
+    logger.info(f"💾 Intentando guardar lote de {len(lote.eventos)} eventos para usuario {usuario_id}")
+
+    try:
+        eventos = [
+            {
+                "accion": evento.accion,
+                "descripcion": evento.descripcion,
+                "puntos": evento.puntos or 0,
+                "datos": evento.datos or {},
+                "sesion_id": evento.sesion_id,
+                "fecha": evento.fecha.isoformat() if evento.fecha else None
+            }
+            for evento in lote.eventos
+        ]
+
+        respuesta = await progreso_service.guardar_progreso_lote(usuario_id, eventos)
+        logger.info(f"✅ Lote guardado para usuario {usuario_id}: {respuesta.eventos_guardados} eventos")
+        return respuesta
+    except Exception as e:
+        logger.error(f"❌ Error guardando lote de progreso: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error guardando progreso: {str(e)}"
+        )
+
+# =====================================
+# SESIONES DE ESTUDIO
+# =====================================
+
+@router.post("/{usuario_id}/sesion",
+            response_model=SesionEstudio,
+            summary="Iniciar sesión de estudio",
+            description="Registra una sesión activa; se guarda en la BD en el siguiente volcado periódico")
+@handle_progreso_errors
+async def iniciar_sesion_estudio(
+    usuario_id: int,
+    datos: IniciarSesionRequest
+) -> SesionEstudio:
+    """
+    Inicia una sesión de estudio y devuelve su id_sesion para los latidos.
+    """
+    logger.info(f"📚 Iniciando sesión de estudio ({datos.tipo_actividad}) para usuario {usuario_id}")
+    
+    sesion = await sesion_service.iniciar(usuario_id, datos.tipo_actividad, datos.dispositivo)
+    logger.info(f"✅ Sesión {sesion.id_sesion} iniciada")
+    return sesion
+
+@router.post("/{usuario_id}/sesion/{id_sesion}/heartbeat",
+            response_model=SesionEstudio,
+            summary="Latido de sesión de estudio",
+            description="Mantiene viva la sesión y suma actividades/puntos (solo en memoria)")
+@handle_progreso_errors
+async def latido_sesion_estudio(
+    usuario_id: int,
+    id_sesion: str,
+    actividad: ActividadSesionRequest = Body(default_factory=ActividadSesionRequest)
+) -> SesionEstudio:
+    """
+    Registra un latido de la sesión. No escribe en la BD.
+    """
+    sesion = sesion_service.latido(usuario_id, id_sesion, actividad.actividades, actividad.puntos)
+    if sesion is None and await sesion_service.adoptar(usuario_id, id_sesion):
+        sesion = sesion_service.latido(usuario_id, id_sesion, actividad.actividades, actividad.puntos)
+    if sesion is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Sesión de estudio no encontrada o ya finalizada"
+        )
+    return sesion
+
+@router.put("/{usuario_id}/sesion/{id_sesion}",
+           response_model=SesionEstudio,
+           summary="Finalizar sesión de estudio",
+           description="Cierra la sesión; la duración final se guarda en el siguiente volcado periódico")
+@handle_progreso_errors
+async def finalizar_sesion_estudio(
+    usuario_id: int,
+    id_sesion: str,
+    actividad: ActividadSesionRequest = Body(default_factory=ActividadSesionRequest)
+) -> SesionEstudio:
+    """
+    Finaliza la sesión de estudio con las últimas actividades y puntos.
+    """
+    logger.info(f"📚 Finalizando sesión {id_sesion} del usuario {usuario_id}")
+    
+    sesion = sesion_service.finalizar(usuario_id, id_sesion, actividad.actividades, actividad.puntos)
+    if sesion is None and await sesion_service.adoptar(usuario_id, id_sesion):
+        sesion = sesion_service.finalizar(usuario_id, id_sesion, actividad.actividades, actividad.puntos)
+    if sesion is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Sesión de estudio no encontrada o ya finalizada"
+        )
+    
+    logger.info(f"✅ Sesión {id_sesion} finalizada: {sesion.duracion_minutos} min, {sesion.actividades_realizadas} actividades")
+    return sesion
+
 # =====================================
 # ENDPOINTS DE UTILIDAD
 # =====================================
@@ -268,7 +508,16 @@ async def health_check() -> HealthCheckResponse:
         "GET /api/progreso/?usuario_id={id} - Progreso general", 
         "GET /api/progreso/{usuario_id}/simulaciones - Historial simulaciones",
         "GET /api/progreso/{usuario_id}/elementos - Estadísticas elementos",
-        "POST /api/progreso/{usuario_id}/guardar - Guardar progreso"
+        "GET /api/progreso/{usuario_id}/metricas - Serie temporal de actividad",
+        "GET /api/progreso/{usuario_id}/analisis - Análisis de rendimiento",
+        "GET /api/progreso/{usuario_id}/logros - Logros del usuario",
+        "GET /api/progreso/{usuario_id}/ranking - Posición en el ranking",
+        "GET /api/progreso/leaderboard - Top de usuarios",
+        "POST /api/progreso/{usuario_id}/sesion - Iniciar sesión de estudio",
+        "POST /api/progreso/{usuario_id}/sesion/{id_sesion}/heartbeat - Latido de sesión",
+        "PUT /api/progreso/{usuario_id}/sesion/{id_sesion} - Finalizar sesión",
+        "POST /api/progreso/{usuario_id}/guardar - Guardar progreso",
+        "POST /api/progreso/{usuario_id}/guardar/batch - Guardar lote de eventos"
     ]
     
     # Verificar conectividad básica
@@ -60,23 +60,20 @@ def get_teorias(
         logger.error(f"Error obteniendo teorías: {e}")
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
-@router.get("/buscar", response_model=List[Teoria])
+@router.get("/buscar", response_model=List[TeoriaResultadoBusqueda])
 def search_teorias(
     q: str = Query(..., min_length=1, description="Término de búsqueda"),
     categoria: Optional[str] = Query(None, description="Filtrar por categoría"),
+    limit: int = Query(20, ge=1, le=100, description="Máximo de resultados"),
     db: Session = Depends(get_db)
 ):
     """
-    Buscar teorías por título o contenido
+    Buscar teorías por título, categoría o contenido.
+    Devuelve fragmentos ordenados por relevancia; el artículo completo se obtiene con GET /{teoria_id}
     """
     try:
-        teorias_db = search_teorias_db(db, search_term=q, categoria=categoria)
-        
-        # Convertir manualmente cada teoría
-        teorias_response = []
-        for teoria_obj in teorias_db:
-            teoria_schema = convert_teoria_to_schema(teoria_obj)
-            teorias_response.append(teoria_schema)
+        resultados = buscar_teorias_texto_db(db, search_term=q, categoria=categoria, limit=limit)
+        teorias_response = [TeoriaResultadoBusqueda(**resultado) for resultado in resultados]
         
         logger.info(f"Búsqueda '{q}': {len(teorias_response)} resultados")
         return teorias_response
@@ -61,10 +61,86 @@ class Settings(BaseSettings):
             logger.warning("⚠️ GEMINI_API_KEY parece ser muy corta")
         return v
 
+    # --- Proveedor del chat ---
+    LLM_PROVEEDOR: str = "gemini"  # "gemini" o "simulado" (pruebas de carga sin red)
+    SIMULADO_TTFT_MS: float = 400.0  # Espera hasta el primer token
+    SIMULADO_TOKENS_POR_SEGUNDO: float = 60.0
+    SIMULADO_TOKENS_RESPUESTA: int = 250
+    SIMULADO_TOKENS_POR_CHUNK: int = 8
+    SIMULADO_TASA_ERROR: float = 0.0  # Fracción de peticiones que fallan (0-1)
+    SIMULADO_JITTER: float = 0.2  # Variación ± sobre latencias y longitud
+    SIMULADO_SEMILLA: int = 42
+
+    # --- Concurrencia del chat ---
+    IA_MAX_CONCURRENTES: int = 16  # Generaciones simultáneas contra Gemini
+    IA_MAX_EN_COLA: int = 64  # Peticiones esperando hueco; por encima se responde 503
+    IA_ESPERA_MAXIMA_SEGUNDOS: float = 10.0  # Espera máxima en cola antes de responder 503
+    IA_KEEPALIVE_SEGUNDOS: int = 120  # Llamada ligera si el canal con Gemini lleva este tiempo inactivo
+
+    # --- Plazos y reintentos de las llamadas a Gemini ---
+    IA_DEADLINE_SEGUNDOS: float = 30.0  # Plazo por respuesta completa (cola y reintentos incluidos)
+    IA_REINTENTOS_MAX: int = 2  # Solo errores transitorios y mientras quede plazo
+    IA_REINTENTO_BASE_SEGUNDOS: float = 0.5  # Espera base; se duplica en cada intento (full jitter)
+    IA_REINTENTO_MAX_ESPERA_SEGUNDOS: float = 4.0
+    IA_COBERTURA_ACTIVA: bool = False  # Segunda petición si la primera supera el p95
+    IA_COBERTURA_MIN_MUESTRAS: int = 50  # Latencias necesarias antes de fiarse del p95
+    IA_COBERTURA_MAX_FRACCION: float = 0.05  # Como mucho un 5 % de llamadas con cobertura
+
+    # --- Sonda de salud de Gemini ---
+    IA_SONDA_INTERVALO_SEGUNDOS: int = 60
+    IA_SONDA_JITTER: float = 0.2  # ±20 % sobre el intervalo
+    IA_SONDA_TIMEOUT_SEGUNDOS: float = 5.0
+
+    # --- Caché de respuestas del chat (preguntas de un solo turno) ---
+    IA_CACHE_MAX_ENTRADAS: int = 5000  # 0 desactiva la caché
+    IA_CACHE_TTL_HORAS: int = 24
+    IA_CACHE_RUTA: str = ""  # Archivo JSON para conservarla entre reinicios (vacío = solo memoria)
+
+    # --- Historial del chat ---
+    IA_HISTORIAL_MAX_TOKENS: int = 3000  # Turnos recientes enviados; los anteriores se resumen
+    IA_HISTORIAL_ESPERA_RESUMEN_SEGUNDOS: float = 3.0  # Espera máxima a un resumen nuevo
+    IA_HISTORIAL_MAX_RESUMENES: int = 2000
+
+    # --- Recuperación sobre la teoría (BM25) ---
+    IA_RAG_ACTIVO: bool = True
+    IA_RAG_PASAJES: int = 3  # Pasajes añadidos al prompt
+    IA_RAG_UMBRAL_CONTEXTO: float = 0.15  # Confianza mínima para añadir un pasaje al prompt
+    IA_RAG_RESPUESTA_DIRECTA: bool = True  # Responder solo con teoría si la confianza es alta
+    IA_RAG_UMBRAL_RESPUESTA: float = 0.6  # ~todos los términos de la pregunta en título y texto
+    IA_RAG_VERIFICAR_MINUTOS: int = 10  # Comprobar cambios en la tabla hechos fuera de la API
+
+    # --- Streaming del chat (text/event-stream) ---
+    IA_SSE_LATIDO_SEGUNDOS: float = 15.0  # Comentario de latido si Gemini tarda en enviar el siguiente chunk
+    IA_SSE_RETENCION_SEGUNDOS: int = 300  # Eventos retenidos para reanudar con Last-Event-ID
+    IA_SSE_MAX_STREAMS: int = 1000
+
+    # --- Registro de preguntas del chat (preguntas_ia, escritura en lote) ---
+    PREGUNTAS_IA_REGISTRAR: bool = True
+    PREGUNTAS_IA_MAX_EN_COLA: int = 5000  # Con la cola llena se desborda a disco o se descarta
+    PREGUNTAS_IA_TAMANO_LOTE: int = 200
+    PREGUNTAS_IA_INTERVALO_SEGUNDOS: float = 5.0
+    PREGUNTAS_IA_RUTA_DESBORDE: str = ""  # Archivo JSONL; vacío = descartar
+
     # --- Configuración específica del servicio de progreso ---
     PROGRESO_CACHE_TTL_MINUTES: int = 5
+    PROGRESO_CACHE_MAX_USUARIOS: int = 10000  # Estadísticas de logros cacheadas (LRU)
     PROGRESO_MAX_REQUESTS_PER_MINUTE: int = 60
     PROGRESO_ENABLE_MOCK_DATA: bool = False  # Para desarrollo sin BD
+    PROGRESO_MESES_ADELANTO: int = 3  # Particiones mensuales creadas por adelantado
+    PROGRESO_MESES_RETENCION: int = 12  # Meses en la tabla caliente antes de archivar
+
+    # --- Análisis de rendimiento (precalculado en lote) ---
+    ANALISIS_VIGENCIA_HORAS: int = 36  # Tras este tiempo se recalcula bajo demanda
+    ANALISIS_SEMANAS_TENDENCIA: int = 8
+    ANALISIS_TAMANO_LOTE: int = 1000  # Usuarios por lote en el cálculo nocturno
+
+    # --- Ranking en memoria ---
+    RANKING_RECONCILIAR_MINUTOS: int = 10  # Reconstrucción completa desde la BD (tarea de fondo)
+
+    # --- Sesiones de estudio (registro en memoria) ---
+    SESIONES_INTERVALO_VOLCADO_SEGUNDOS: int = 30  # Escritura masiva a sesiones_estudio
+    SESIONES_EXPIRACION_MINUTOS: int = 30  # Sin latidos en este tiempo, la sesión se cierra
+    SESIONES_TAMANO_LOTE: int = 1000
     
     # --- Logging ---
     LOG_LEVEL: str = "INFO"
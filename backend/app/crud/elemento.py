@@ -4,6 +4,7 @@ from sqlalchemy import func, or_
 from typing import List, Optional
 from app.models.elemento import Elemento
 from app.schemas.elemento import ElementoCreate, ElementoUpdate
+from app.utils.texto import normalizar_busqueda
 
 def get_elemento(db: Session, elemento_id: int) -> Optional[Elemento]:
     """Obtener un elemento por ID"""
@@ -33,12 +34,14 @@ def search_elementos(
     categoria: Optional[str] = None,
     estado: Optional[str] = None
 ) -> List[Elemento]:
-    """Buscar elementos por nombre, símbolo o descripción"""
+    """Buscar elementos por nombre, símbolo o descripción (sin distinguir tildes)"""
+    termino = normalizar_busqueda(search_term)
+    # f_unaccent(lower(...)) es la expresión de los índices trigram
     query = db.query(Elemento).filter(
         or_(
-            func.lower(Elemento.nombre).contains(search_term.lower()),
-            func.lower(Elemento.simbolo).contains(search_term.lower()),
-            func.lower(Elemento.descripcion).contains(search_term.lower())
+            func.f_unaccent(func.lower(Elemento.nombre)).contains(termino, autoescape=True),
+            func.f_unaccent(func.lower(Elemento.simbolo)).contains(termino, autoescape=True),
+            func.f_unaccent(func.lower(Elemento.descripcion)).contains(termino, autoescape=True)
         )
     )
     
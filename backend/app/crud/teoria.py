@@ -1,9 +1,11 @@
 # backend/app/crud/teoria.py (VERSIÓN CORREGIDA COMPLETA)
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, and_, or_, text
 from typing import List, Optional, Dict, Any
 from app.models.teoria import Teoria, UsuarioTeoria, TeoriaTareaSimulacion
 from app.schemas.teoria import TeoriaCreate, TeoriaUpdate, ProgresoUsuarioCreate
+from app.utils.texto import normalizar_busqueda
+from app.services.recuperacion_service import recuperacion_service
 import logging
 
 logger = logging.getLogger(__name__)
@@ -43,12 +45,14 @@ def search_teorias_db(
     search_term: str, 
     categoria: Optional[str] = None
 ) -> List[Teoria]:
-    """Buscar teorías por título o contenido"""
+    """Buscar teorías por título o contenido (sin distinguir tildes)"""
     try:
+        termino = normalizar_busqueda(search_term)
+        # f_unaccent(lower(...)) es la expresión de los índices trigram
         query = db.query(Teoria).filter(
             or_(
-                func.lower(Teoria.titulo).contains(search_term.lower()),
-                func.lower(Teoria.contenido).contains(search_term.lower())
+                func.f_unaccent(func.lower(Teoria.titulo)).contains(termino, autoescape=True),
+                func.f_unaccent(func.lower(Teoria.contenido)).contains(termino, autoescape=True)
             )
         )
         
@@ -60,6 +64,101 @@ def search_teorias_db(
         logger.error(f"Error buscando teorías: {e}")
         return []
 
+# Opciones de ts_headline: fragmentos cortos con los términos entre [[ ]]
+# (el contenido ya usa ** de markdown, así que no sirve como marca)
+OPCIONES_FRAGMENTO = "StartSel=[[, StopSel=]], MaxFragments=2, MinWords=8, MaxWords=25, FragmentDelimiter=\" … \""
+LONGITUD_FRAGMENTO = 200
+
+def buscar_teorias_texto_db(
+    db: Session,
+    search_term: str,
+    categoria: Optional[str] = None,
+    limit: int = 20
+) -> List[Dict[str, Any]]:
+    """Búsqueda de texto completo ordenada por relevancia, con fragmentos.
+
+    Si la consulta no produce resultados (palabras incompletas como "hidr"),
+    recurre a la búsqueda por subcadena con índices trigram.
+    """
+    try:
+        # ts_headline es costoso: solo se calcula para las filas ya limitadas
+        filas = db.execute(text("""
+            WITH consulta AS (
+                SELECT
+                    websearch_to_tsquery('spanish', f_unaccent(:termino)) AS q,
+                    websearch_to_tsquery('spanish', :termino)
+                        || websearch_to_tsquery('spanish', f_unaccent(:termino)) AS q_fragmento
+            ),
+            mejores AS (
+                SELECT t.id_teoria, t.titulo, t.categoria, t.contenido,
+                       ts_rank(t.busqueda, c.q) AS relevancia
+                FROM teoria t, consulta c
+                WHERE t.busqueda @@ c.q
+                  AND (CAST(:categoria AS VARCHAR) IS NULL OR t.categoria = :categoria)
+                ORDER BY relevancia DESC, t.id_teoria
+                LIMIT :limite
+            )
+            SELECT m.id_teoria, m.titulo, m.categoria, m.relevancia,
+                   ts_headline('spanish', m.contenido, c.q_fragmento, :opciones) AS fragmento
+            FROM mejores m, consulta c
+            ORDER BY m.relevancia DESC, m.id_teoria
+        """), {
+            "termino": search_term,
+            "categoria": categoria,
+            "limite": limit,
+            "opciones": OPCIONES_FRAGMENTO
+        }).fetchall()
+
+        if filas:
+            return [
+                {
+                    'id': fila.id_teoria,
+                    'titulo': fila.titulo,
+                    'categoria': fila.categoria,
+                    'fragmento': fila.fragmento,
+                    'relevancia': float(fila.relevancia)
+                }
+                for fila in filas
+            ]
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error en búsqueda de texto completo: {e}")
+
+    # Respaldo: coincidencia por subcadena (sin orden de relevancia)
+    return [
+        {
+            'id': teoria.id_teoria,
+            'titulo': teoria.titulo,
+            'categoria': teoria.categoria,
+            'fragmento': _fragmento_subcadena(teoria.contenido, search_term),
+            'relevancia': 0.0
+        }
+        for teoria in search_teorias_db(db, search_term, categoria)[:limit]
+    ]
+
+def _fragmento_subcadena(contenido: str, search_term: str) -> str:
+    """Extracto del contenido alrededor de la primera coincidencia, marcada entre [[ ]]"""
+    contenido = contenido.strip()
+    termino = normalizar_busqueda(search_term)
+    # Quitar tildes conserva las posiciones (cada letra sigue siendo un carácter)
+    posicion = normalizar_busqueda(contenido).find(termino) if termino else -1
+    inicio = max(posicion - LONGITUD_FRAGMENTO // 2, 0) if posicion >= 0 else 0
+    fin = inicio + LONGITUD_FRAGMENTO
+    if posicion >= 0:
+        # Mismas marcas que ts_headline (OPCIONES_FRAGMENTO)
+        fin_coincidencia = posicion + len(termino)
+        fragmento = (
+            contenido[inicio:posicion] + "[[" + contenido[posicion:fin_coincidencia] + "]]"
+            + contenido[fin_coincidencia:max(fin, fin_coincidencia)]
+        ).strip()
+    else:
+        fragmento = contenido[inicio:fin].strip()
+    if inicio > 0:
+        fragmento = "… " + fragmento
+    if fin < len(contenido):
+        fragmento += " …"
+    return fragmento
+
 def get_teorias_by_categoria_db(
     db: Session, 
     categoria: str, 
@@ -88,6 +187,7 @@ def create_teoria_db(db: Session, teoria: TeoriaCreate) -> Teoria:
         db.add(db_teoria)
         db.commit()
         db.refresh(db_teoria)
+        recuperacion_service.marcar_desactualizado()
         return db_teoria
     except Exception as e:
         db.rollback()
@@ -111,6 +211,7 @@ def update_teoria_db(
         
         db.commit()
         db.refresh(db_teoria)
+        recuperacion_service.marcar_desactualizado()
         return db_teoria
     except Exception as e:
         db.rollback()
@@ -126,6 +227,7 @@ def delete_teoria_db(db: Session, teoria_id: int) -> bool:
         
         db.delete(db_teoria)
         db.commit()
+        recuperacion_service.marcar_desactualizado()
         return True
     except Exception as e:
         db.rollback()
@@ -4,6 +4,7 @@ from sqlalchemy import func
 from typing import List, Optional
 from app.models.utensilio import Utensilio
 from app.schemas.utensilio import UtensilioCreate, UtensilioUpdate
+from app.utils.texto import normalizar_busqueda
 
 def get_utensilio(db: Session, utensilio_id: int) -> Optional[Utensilio]:
     """Obtener un utensilio por ID"""
@@ -28,10 +29,12 @@ def search_utensilios(
     search_term: str, 
     tipo: Optional[str] = None
 ) -> List[Utensilio]:
-    """Buscar utensilios por nombre o descripción"""
+    """Buscar utensilios por nombre o descripción (sin distinguir tildes)"""
+    termino = normalizar_busqueda(search_term)
+    # f_unaccent(lower(...)) es la expresión de los índices trigram
     query = db.query(Utensilio).filter(
-        func.lower(Utensilio.nombre).contains(search_term.lower()) |
-        func.lower(Utensilio.descripcion).contains(search_term.lower())
+        func.f_unaccent(func.lower(Utensilio.nombre)).contains(termino, autoescape=True) |
+        func.f_unaccent(func.lower(Utensilio.descripcion)).contains(termino, autoescape=True)
     )
     
     if tipo:
@@ -5,6 +5,12 @@ from fastapi.staticfiles import StaticFiles
 from starlette.middleware.gzip import GZipMiddleware
 from app.api import api_router
 from app.core.config import settings
+from app.services.sesion_service import sesion_service
+from app.services.ranking_service import ranking_service
+from app.services.ia import proveedor_llm, sonda_gemini
+from app.services.cache_respuestas import cache_respuestas
+from app.services.recuperacion_service import recuperacion_service
+from app.services.registro_preguntas import registro_preguntas
 import logging
 import os
 
@@ -110,7 +116,7 @@ app = create_application()
 async def startup_event():
     logger.info("🚀 Servidor iniciado y listo para recibir solicitudes.")
     logger.info(f"📁 API Base URL: {settings.API_PREFIX}")
-    logger.info(f"🤖 Servicio de IA: Google Gemini")
+    logger.info(f"🤖 Servicio de IA: {proveedor_llm.nombre}")
     logger.info(f"🔑 Gemini API Key configurada: {'✅' if settings.GEMINI_API_KEY else '❌'}")
     logger.info(f"📊 Modelo Gemini: {settings.GEMINI_MODEL}")
     logger.info(f"🧪 Endpoints de Utensilios:")
@@ -131,6 +137,26 @@ async def startup_event():
     logger.info(f"   - Chat: {settings.API_PREFIX}/chat/health")
     logger.info(f"   - Utensilios: {settings.API_PREFIX}/utensilios/health/status")
 
+    # Volcado periódico de sesiones de estudio a la BD
+    sesion_service.iniciar_volcado_periodico()
+    # Leaderboard en memoria reconstruido desde la BD fuera de las peticiones
+    ranking_service.iniciar_reconciliacion_periodica()
+
+    # Modelos de Gemini creados y canal abierto antes de la primera pregunta
+    proveedor_llm.iniciar()
+    # Estado de Gemini cacheado para /chat/health
+    sonda_gemini.iniciar()
+    # Índice BM25 de la teoría para el chat
+    recuperacion_service.iniciar_precarga()
+    # Escritura en lote de las preguntas del chat en preguntas_ia
+    registro_preguntas.iniciar()
+
 @app.on_event("shutdown")
 async def shutdown_event():
+    await sesion_service.detener_volcado_periodico()
+    await ranking_service.detener_reconciliacion_periodica()
+    await proveedor_llm.detener()
+    await sonda_gemini.detener()
+    await registro_preguntas.detener()
+    cache_respuestas.persistir()
     logger.info("🛑 Servidor detenido correctamente.")
\ No newline at end of file
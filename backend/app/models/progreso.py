@@ -19,6 +19,7 @@ __all__ = [
     "LogroUsuario",
     "SesionEstudio",
     "RankingUsuario",
+    "EntradaLeaderboard",
     "MetricaTiempo",
     "ResumenSemanal",
     
@@ -28,6 +29,7 @@ __all__ = [
     "EstadisticasElementosResponse",
     "LogrosUsuarioResponse",
     "DashboardProgresoResponse",
+    "LeaderboardResponse",
     "AnalisisRendimientoResponse",
     
     # Nuevo response de resumen
@@ -37,10 +39,14 @@ __all__ = [
     "FiltroHistorialRequest",
     "MetricasRequest",
     "GuardarProgresoRequest",
+    "EventoProgresoLote",
+    "GuardarProgresoLoteRequest",
     "IniciarSesionRequest",
+    "ActividadSesionRequest",
     
     # Responses específicas
     "RespuestaGuardado",
+    "RespuestaGuardadoLote",
     "EstadisticasRapidas",
     "HealthCheckResponse",
     
@@ -127,6 +133,7 @@ class LogroUsuario(BaseModel):
     puntos_requeridos: int
     obtenido: bool
     fecha_obtenido: Optional[datetime] = None
+    progreso: Optional[float] = None  # Avance 0-100 hacia el logro
 
 class SesionEstudio(BaseModel):
     """Sesión de estudio del usuario"""
@@ -149,6 +156,14 @@ class RankingUsuario(BaseModel):
     puntuacion_usuario: int
     puntuacion_promedio: float
 
+class EntradaLeaderboard(BaseModel):
+    """Usuario dentro del top del ranking"""
+    posicion: int
+    usuario_id: int
+    nombre: str
+    puntos: int
+    nivel: str
+
 class MetricaTiempo(BaseModel):
     """Métrica temporal para gráficos"""
     fecha: datetime
@@ -206,6 +221,13 @@ class DashboardProgresoResponse(BaseModel):
     ranking: Optional[RankingUsuario] = None
     metricas_temporales: List[MetricaTiempo]
 
+class LeaderboardResponse(BaseModel):
+    """Top de usuarios por puntos"""
+    total_usuarios: int
+    puntuacion_promedio: float
+    usuarios: List[EntradaLeaderboard]
+    fecha_actualizacion: datetime
+
 class AnalisisRendimientoResponse(BaseModel):
     """Análisis detallado del rendimiento del usuario"""
     usuario_id: int
@@ -264,11 +286,24 @@ class GuardarProgresoRequest(BaseModel):
     datos: Optional[Dict[str, Any]] = {}
     sesion_id: Optional[str] = None
 
+class EventoProgresoLote(GuardarProgresoRequest):
+    """Evento de progreso encolado por el cliente para envío por lote"""
+    fecha: Optional[datetime] = Field(default=None, description="Momento en que ocurrió el evento en el cliente")
+
+class GuardarProgresoLoteRequest(BaseModel):
+    """Request para guardar varios eventos de progreso en una sola petición"""
+    eventos: List[EventoProgresoLote] = Field(min_length=1, max_length=500)
+
 class IniciarSesionRequest(BaseModel):
     """Request para iniciar sesión de estudio"""
     tipo_actividad: str = Field(description="simulacion, teoria, mixto")
     dispositivo: Optional[str] = "web"
 
+class ActividadSesionRequest(BaseModel):
+    """Request para latido o cierre de sesión de estudio"""
+    actividades: int = Field(default=0, ge=0, description="Actividades realizadas desde el último latido")
+    puntos: int = Field(default=0, ge=0, description="Puntos obtenidos desde el último latido")
+
 # =====================================
 # RESPONSES ESPECÍFICAS
 # =====================================
@@ -281,6 +316,15 @@ class RespuestaGuardado(BaseModel):
     usuario_id: int
     progreso_id: Optional[int] = None
 
+class RespuestaGuardadoLote(BaseModel):
+    """Respuesta del guardado de un lote de eventos"""
+    success: bool
+    message: str
+    timestamp: str
+    usuario_id: int
+    eventos_guardados: int
+    progreso_ids: List[int] = []
+
 class EstadisticasRapidas(BaseModel):
     """Estadísticas rápidas para componentes ligeros"""
     puntos_totales: int
@@ -156,6 +156,13 @@ class TeoriasResponse(BaseModel):
     size: int
     categoria: Optional[str] = None
 
+class TeoriaResultadoBusqueda(BaseModel):
+    id: int = Field(..., description="ID único de la teoría")
+    titulo: str
+    categoria: str
+    fragmento: str = Field(..., description="Extracto del contenido con los términos marcados entre [[ y ]]")
+    relevancia: float = Field(0.0, description="Puntuación ts_rank (0 si viene de la búsqueda por subcadena)")
+
 class TeoriaSearch(BaseModel):
     search_term: Optional[str] = None
     categoria: Optional[str] = None
@@ -4,5 +4,10 @@ Servicios de la aplicación IReNaTech
 """
 
 from .progreso_service import progreso_service
+from .analisis_service import analisis_service
+from .ranking_service import ranking_service
+from .sesion_service import sesion_service
+from .logros_service import logros_service
+from .recuperacion_service import recuperacion_service
 
-__all__ = ["progreso_service"]
\ No newline at end of file
+__all__ = ["progreso_service", "analisis_service", "ranking_service", "sesion_service", "logros_service", "recuperacion_service"]
\ No newline at end of file
@@ -0,0 +1,412 @@
+# app/services/analisis_service.py
+"""
+Motor de análisis de rendimiento (AnalisisRendimientoResponse).
+
+El historial agregado de cada usuario se carga en arreglos NumPy (una fila por
+usuario) y las tasas por categoría, tendencias semanales y percentiles se
+calculan de forma vectorizada. El lote nocturno analiza a todos los usuarios
+registrados y guarda el resultado en analisis_rendimiento; el endpoint sirve
+lo precalculado y solo recalcula bajo demanda si falta o está vencido.
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from typing import List, Optional
+from datetime import date, datetime, time, timedelta
+import logging
+import json
+
+import numpy as np
+
+from app.core.config import settings
+from app.database import get_db
+from app.models.progreso import AnalisisRendimientoResponse, MetricaTiempo
+
+logger = logging.getLogger(__name__)
+
+# Mismos umbrales que calcular_puntos_usuario() en la BD
+NIVELES = ["Principiante", "Intermedio", "Avanzado", "Experto"]
+UMBRALES_NIVEL = np.array([0, 500, 1000, 2000])
+
+UMBRAL_FORTALEZA = 0.7
+UMBRAL_MEJORA = 0.5
+MAX_AREAS = 3
+
+# Peso de cada componente de rendimiento_general: teoría, simulaciones, percentil
+PESOS_RENDIMIENTO = np.array([0.35, 0.45, 0.20])
+
+class AnalisisService:
+    def __init__(self):
+        self.db_session = None
+
+    async def get_db(self) -> Session:
+        """Obtener sesión de base de datos"""
+        if not self.db_session:
+            self.db_session = next(get_db())
+        return self.db_session
+
+    # ==================== CARGA DE DATOS ====================
+
+    @staticmethod
+    def _columnas(filas, n_columnas: int) -> List[np.ndarray]:
+        """Transponer filas de la BD a una lista de arreglos (vacíos si no hay filas)"""
+        if not filas:
+            return [np.array([]) for _ in range(n_columnas)]
+        return [np.array(columna) for columna in zip(*filas)]
+
+    @staticmethod
+    def _matriz(filas: np.ndarray, columnas: np.ndarray, valores: np.ndarray, forma: tuple) -> np.ndarray:
+        """Construir una matriz densa usuario x columna a partir de tripletas"""
+        matriz = np.zeros(forma)
+        if len(valores):
+            np.add.at(matriz, (filas.astype(int), columnas.astype(int)), valores.astype(float))
+        return matriz
+
+    def _cargar_puntos_registrados(self, db: Session) -> tuple:
+        """Ids y puntos de todos los usuarios registrados (ordenados por id)"""
+        filas = db.execute(text("""
+            SELECT id_usuario, COALESCE(puntos_totales, 0) AS puntos
+            FROM usuario
+            WHERE tipo_usuario = 'registrado'
+            ORDER BY id_usuario
+        """)).fetchall()
+        ids, puntos = self._columnas(filas, 2)
+        return ids.astype(np.int64), puntos.astype(float)
+
+    def _cargar_datos(self, db: Session, usuario_ids: np.ndarray, inicio: date, semanas: int) -> dict:
+        """Cargar en arreglos el historial agregado de los usuarios indicados"""
+        n_usuarios = len(usuario_ids)
+        parametros = {"ids": usuario_ids.tolist()}
+
+        # Catálogo de teoría activa por categoría
+        filas = db.execute(text("""
+            SELECT categoria, COUNT(*) AS total
+            FROM teoria
+            WHERE activo = true
+            GROUP BY categoria
+        """)).fetchall()
+        categorias_bd, totales_bd = self._columnas(filas, 2)
+        orden = np.argsort(categorias_bd)
+        categorias = categorias_bd[orden]
+        total_categoria = totales_bd[orden].astype(float)
+
+        # Teorías leídas por usuario y categoría
+        filas = db.execute(text("""
+            SELECT ut.usuario_id, t.categoria, COUNT(DISTINCT ut.teoria_id) AS leidas
+            FROM usuario_teoria ut
+            JOIN teoria t ON t.id_teoria = ut.teoria_id AND t.activo = true
+            WHERE ut.leido = true
+              AND ut.usuario_id = ANY(:ids)
+            GROUP BY ut.usuario_id, t.categoria
+        """), parametros).fetchall()
+        uid, categoria, leidas = self._columnas(filas, 3)
+        leidas_categoria = self._matriz(
+            np.searchsorted(usuario_ids, uid),
+            np.searchsorted(categorias, categoria),
+            leidas,
+            (n_usuarios, len(categorias))
+        )
+
+        # Simulaciones intentadas y completadas por tipo
+        filas = db.execute(text("""
+            SELECT
+                usuario_id,
+                COALESCE(tipo_simulacion, 'General') AS tipo,
+                COUNT(*) AS total,
+                COUNT(*) FILTER (WHERE estado = 'Completada') AS completadas
+            FROM simulacion
+            WHERE usuario_id = ANY(:ids)
+            GROUP BY usuario_id, COALESCE(tipo_simulacion, 'General')
+        """), parametros).fetchall()
+        uid, tipo, total, completadas = self._columnas(filas, 4)
+        tipos, indice_tipo = np.unique(tipo, return_inverse=True)
+        filas_usuario = np.searchsorted(usuario_ids, uid)
+        forma = (n_usuarios, len(tipos))
+        simulaciones_tipo = self._matriz(filas_usuario, indice_tipo, total, forma)
+        completadas_tipo = self._matriz(filas_usuario, indice_tipo, completadas, forma)
+
+        # Actividad semanal reciente desde el acumulado diario
+        filas = db.execute(text("""
+            SELECT
+                usuario_id,
+                (fecha - CAST(:inicio AS date)) / 7 AS semana,
+                SUM(simulaciones) AS simulaciones,
+                SUM(teorias_completadas) AS teorias_completadas,
+                SUM(elementos_nuevos) AS elementos_nuevos,
+                SUM(puntos) AS puntos
+            FROM progreso_diario
+            WHERE fecha >= :inicio
+              AND fecha < :fin
+              AND usuario_id = ANY(:ids)
+            GROUP BY 1, 2
+        """), {**parametros, "inicio": inicio, "fin": inicio + timedelta(weeks=semanas)}).fetchall()
+        uid, semana, sim_sem, teo_sem, elem_sem, pts_sem = self._columnas(filas, 6)
+        filas_usuario = np.searchsorted(usuario_ids, uid)
+        forma = (n_usuarios, semanas)
+
+        return {
+            "categorias": categorias,
+            "total_categoria": total_categoria,
+            "leidas_categoria": leidas_categoria,
+            "tipos": tipos,
+            "simulaciones_tipo": simulaciones_tipo,
+            "completadas_tipo": completadas_tipo,
+            "simulaciones_semana": self._matriz(filas_usuario, semana, sim_sem, forma),
+            "teorias_semana": self._matriz(filas_usuario, semana, teo_sem, forma),
+            "elementos_semana": self._matriz(filas_usuario, semana, elem_sem, forma),
+            "puntos_semana": self._matriz(filas_usuario, semana, pts_sem, forma),
+        }
+
+    # ==================== CÁLCULO VECTORIZADO ====================
+
+    def _calcular(
+        self,
+        usuario_ids: np.ndarray,
+        puntos: np.ndarray,
+        puntos_ordenados: np.ndarray,
+        datos: dict,
+        inicio: date
+    ) -> List[AnalisisRendimientoResponse]:
+        """Calcular el análisis de todos los usuarios del lote a la vez"""
+        n_usuarios = len(usuario_ids)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            # Tasas por área: lectura por categoría y éxito por tipo de simulación
+            tasa_teoria = np.minimum(datos["leidas_categoria"] / np.maximum(datos["total_categoria"], 1), 1.0)
+            tasa_simulacion = np.where(
+                datos["simulaciones_tipo"] > 0,
+                datos["completadas_tipo"] / datos["simulaciones_tipo"],
+                np.nan
+            )
+
+            # Componentes globales (NaN si el usuario no tiene datos en ese componente)
+            total_teorias = datos["total_categoria"].sum()
+            teoria_global = (
+                np.minimum(datos["leidas_categoria"].sum(axis=1) / total_teorias, 1.0)
+                if total_teorias > 0 else np.full(n_usuarios, np.nan)
+            )
+            intentos = datos["simulaciones_tipo"].sum(axis=1)
+            simulacion_global = np.where(intentos > 0, datos["completadas_tipo"].sum(axis=1) / intentos, np.nan)
+            percentil = np.searchsorted(puntos_ordenados, puntos, side="right") / max(len(puntos_ordenados), 1)
+
+            componentes = np.column_stack([teoria_global, simulacion_global, percentil])
+            pesos = np.where(np.isnan(componentes), 0.0, PESOS_RENDIMIENTO)
+            rendimiento = np.nansum(componentes * PESOS_RENDIMIENTO, axis=1) / np.maximum(pesos.sum(axis=1), 1e-9) * 100
+
+        # Tendencia: pendiente por mínimos cuadrados de los puntos semanales
+        puntos_semana = datos["puntos_semana"]
+        semanas = puntos_semana.shape[1]
+        x = np.arange(semanas) - (semanas - 1) / 2
+        pendiente = puntos_semana @ x / max(float(x @ x), 1.0)
+        tendencia = pendiente / np.maximum(puntos_semana.mean(axis=1), 1.0)
+        activo_ultima_semana = puntos_semana[:, -1] > 0 if semanas else np.zeros(n_usuarios, dtype=bool)
+
+        # Nivel actual, siguiente y avance entre ambos umbrales
+        indice_nivel = np.clip(np.searchsorted(UMBRALES_NIVEL, puntos, side="right") - 1, 0, len(NIVELES) - 1)
+        indice_proximo = np.minimum(indice_nivel + 1, len(NIVELES) - 1)
+        base = UMBRALES_NIVEL[indice_nivel]
+        meta = UMBRALES_NIVEL[indice_proximo]
+        progreso_nivel = np.where(
+            indice_nivel == len(NIVELES) - 1,
+            100.0,
+            (puntos - base) / np.maximum(meta - base, 1) * 100
+        )
+
+        # Fortalezas y áreas de mejora: las MAX_AREAS mejores/peores por usuario
+        etiquetas = np.array(
+            [f"Teoría: {c}" for c in datos["categorias"]] +
+            [f"Simulaciones: {t}" for t in datos["tipos"]],
+            dtype=object
+        )
+        tasas = np.hstack([tasa_teoria, tasa_simulacion])
+        orden_fortaleza = np.argsort(-np.nan_to_num(tasas, nan=-1.0), axis=1, kind="stable")[:, :MAX_AREAS]
+        orden_mejora = np.argsort(np.nan_to_num(tasas, nan=np.inf), axis=1, kind="stable")[:, :MAX_AREAS]
+        es_fortaleza = np.take_along_axis(tasas, orden_fortaleza, axis=1) >= UMBRAL_FORTALEZA
+        es_mejora = np.take_along_axis(tasas, orden_mejora, axis=1) < UMBRAL_MEJORA
+        tasa_mejora = np.take_along_axis(tasas, orden_mejora, axis=1)
+
+        fechas_semana = [
+            datetime.combine(inicio + timedelta(weeks=i), time.min)
+            for i in range(semanas)
+        ]
+
+        resultados = []
+        for i in range(n_usuarios):
+            areas_mejora = etiquetas[orden_mejora[i][es_mejora[i]]].tolist()
+            resultados.append(AnalisisRendimientoResponse(
+                usuario_id=int(usuario_ids[i]),
+                rendimiento_general=round(float(rendimiento[i]), 2),
+                areas_fortaleza=etiquetas[orden_fortaleza[i][es_fortaleza[i]]].tolist(),
+                areas_mejora=areas_mejora,
+                recomendaciones=self._recomendaciones(
+                    areas_mejora,
+                    tasa_mejora[i][es_mejora[i]],
+                    float(tendencia[i]),
+                    bool(activo_ultima_semana[i]),
+                    float(progreso_nivel[i]),
+                    NIVELES[indice_proximo[i]] if indice_proximo[i] != indice_nivel[i] else None
+                ),
+                comparacion_tiempo=[
+                    MetricaTiempo(
+                        fecha=fechas_semana[s],
+                        simulaciones=int(datos["simulaciones_semana"][i, s]),
+                        teorias_completadas=int(datos["teorias_semana"][i, s]),
+                        elementos_nuevos=int(datos["elementos_semana"][i, s])
+                    )
+                    for s in range(semanas)
+                ],
+                nivel_actual=NIVELES[indice_nivel[i]],
+                proximo_nivel=NIVELES[indice_proximo[i]],
+                progreso_nivel=round(float(progreso_nivel[i]), 2)
+            ))
+
+        return resultados
+
+    def _recomendaciones(
+        self,
+        areas_mejora: List[str],
+        tasas_mejora: np.ndarray,
+        tendencia: float,
+        activo_ultima_semana: bool,
+        progreso_nivel: float,
+        proximo_nivel: Optional[str]
+    ) -> List[str]:
+        """Redactar recomendaciones a partir de las métricas ya calculadas"""
+        recomendaciones = []
+
+        for area, tasa in zip(areas_mejora, tasas_mejora):
+            tipo, nombre = area.split(": ", 1)
+            if tipo == "Teoría":
+                recomendaciones.append(f"Repasa la teoría de {nombre}: llevas {tasa:.0%} leído")
+            else:
+                recomendaciones.append(f"Practica simulaciones de tipo {nombre}: completaste {tasa:.0%}")
+
+        if not activo_ultima_semana:
+            recomendaciones.append("No registraste actividad esta semana: una sesión corta te ayudará a retomar el ritmo")
+        elif tendencia < -0.1:
+            recomendaciones.append("Tu actividad viene bajando en las últimas semanas: intenta mantener una rutina fija")
+        elif tendencia > 0.1:
+            recomendaciones.append("¡Tu actividad va en aumento! Sigue con ese ritmo")
+
+        if proximo_nivel and progreso_nivel >= 80:
+            recomendaciones.append(f"Estás a punto de alcanzar el nivel {proximo_nivel}")
+
+        if not recomendaciones:
+            recomendaciones.append("Buen trabajo: prueba simulaciones de mayor dificultad para seguir avanzando")
+
+        return recomendaciones
+
+    # ==================== API DEL SERVICIO ====================
+
+    def _inicio_ventana(self, semanas: int) -> date:
+        """Lunes de la primera semana de la ventana de comparación"""
+        hoy = date.today()
+        return hoy - timedelta(days=hoy.weekday()) - timedelta(weeks=semanas - 1)
+
+    async def analizar_usuarios(
+        self,
+        usuario_ids: Optional[List[int]] = None,
+        puntos_ordenados: Optional[np.ndarray] = None
+    ) -> List[AnalisisRendimientoResponse]:
+        """Analizar un conjunto de usuarios registrados (todos si usuario_ids es None)"""
+        db = await self.get_db()
+        ids_registrados, puntos_registrados = self._cargar_puntos_registrados(db)
+        if puntos_ordenados is None:
+            puntos_ordenados = np.sort(puntos_registrados)
+
+        seleccion = (
+            np.isin(ids_registrados, np.asarray(usuario_ids, dtype=np.int64))
+            if usuario_ids is not None else np.ones(len(ids_registrados), dtype=bool)
+        )
+        return self._analizar_lote(db, ids_registrados[seleccion], puntos_registrados[seleccion], puntos_ordenados)
+
+    def _analizar_lote(
+        self,
+        db: Session,
+        ids: np.ndarray,
+        puntos: np.ndarray,
+        puntos_ordenados: np.ndarray
+    ) -> List[AnalisisRendimientoResponse]:
+        """Analizar usuarios ya cargados (ids y puntos alineados), sin volver a leer usuario"""
+        if len(ids) == 0:
+            return []
+        semanas = max(settings.ANALISIS_SEMANAS_TENDENCIA, 1)
+        inicio = self._inicio_ventana(semanas)
+        datos = self._cargar_datos(db, ids, inicio, semanas)
+        return self._calcular(ids, puntos, puntos_ordenados, datos, inicio)
+
+    def _guardar(self, db: Session, analisis: List[AnalisisRendimientoResponse]) -> None:
+        """Guardar (upsert) un lote de resultados en una sola sentencia"""
+        lote = json.dumps([a.model_dump(mode="json") for a in analisis])
+        db.execute(text("""
+            INSERT INTO analisis_rendimiento (usuario_id, rendimiento_general, resultado, fecha_calculo)
+            SELECT
+                (r->>'usuario_id')::INTEGER,
+                (r->>'rendimiento_general')::NUMERIC,
+                r,
+                CURRENT_TIMESTAMP
+            FROM jsonb_array_elements(CAST(:lote AS jsonb)) AS r
+            ON CONFLICT (usuario_id) DO UPDATE SET
+                rendimiento_general = EXCLUDED.rendimiento_general,
+                resultado = EXCLUDED.resultado,
+                fecha_calculo = EXCLUDED.fecha_calculo
+        """), {"lote": lote})
+
+    async def calcular_analisis_todos(self) -> int:
+        """Lote nocturno: analizar y guardar a todos los usuarios registrados"""
+        db = await self.get_db()
+        try:
+            ids, puntos = self._cargar_puntos_registrados(db)
+            puntos_ordenados = np.sort(puntos)
+            tamano = max(settings.ANALISIS_TAMANO_LOTE, 1)
+            guardados = 0
+
+            # Una sola lectura de usuario para todo el lote nocturno
+            for desde in range(0, len(ids), tamano):
+                analisis = self._analizar_lote(
+                    db, ids[desde:desde + tamano], puntos[desde:desde + tamano], puntos_ordenados
+                )
+                if analisis:
+                    self._guardar(db, analisis)
+                    db.commit()
+                    guardados += len(analisis)
+                logger.info(f"📊 Análisis guardados: {guardados}/{len(ids)}")
+
+            logger.info(f"✅ Análisis de rendimiento recalculado para {guardados} usuarios")
+            return guardados
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Error calculando análisis de rendimiento: {str(e)}")
+            raise
+
+    async def get_analisis_rendimiento(self, usuario_id: int) -> Optional[AnalisisRendimientoResponse]:
+        """Servir el análisis precalculado; recalcular solo si falta o está vencido"""
+        db = await self.get_db()
+        try:
+            fila = db.execute(text("""
+                SELECT resultado
+                FROM analisis_rendimiento
+                WHERE usuario_id = :usuario_id
+                  AND fecha_calculo >= CURRENT_TIMESTAMP - make_interval(hours => :horas)
+            """), {"usuario_id": usuario_id, "horas": settings.ANALISIS_VIGENCIA_HORAS}).fetchone()
+
+            if fila and fila.resultado:
+                logger.info(f"📊 Análisis precalculado servido para usuario {usuario_id}")
+                return AnalisisRendimientoResponse(**fila.resultado)
+
+            logger.info(f"📊 Análisis ausente o vencido para usuario {usuario_id}, calculando...")
+            analisis = await self.analizar_usuarios([usuario_id])
+            if not analisis:
+                return None
+
+            self._guardar(db, analisis)
+            db.commit()
+            return analisis[0]
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Error obteniendo análisis de rendimiento: {str(e)}")
+            raise
+
+# Instancia singleton
+analisis_service = AnalisisService()
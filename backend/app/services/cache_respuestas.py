@@ -0,0 +1,180 @@
+# app/services/cache_respuestas.py
+"""
+Caché de respuestas del chat para preguntas de un solo turno.
+
+La clave es la forma normalizada de la pregunta (sin tildes, espacios ni
+signos de puntuación sobrantes) más una huella del contexto: modelo, prompt
+de sistema e historial previo. Solo se guardan preguntas sin turnos
+anteriores del asistente, así que una respuesta nunca depende de una
+conversación que el siguiente estudiante no ha tenido.
+
+Expulsión LRU con TTL; opcionalmente se persiste en disco (IA_CACHE_RUTA) al
+detener el servidor y se recarga al arrancar.
+"""
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.utils.texto import normalizar_busqueda
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_PUNTUACION = re.compile(r"[¿?¡!.,;:\"'«»]+")
+
+def _es_formula(palabra: str) -> bool:
+    """H2, O2, CO, NaCl, H2SO4: conservan mayúsculas porque "CO" no es "Co" """
+    if any(c.isdigit() for c in palabra):
+        return True
+    mayusculas = sum(1 for c in palabra if c.isupper())
+    if palabra.isupper():
+        # Siglas cortas como CO; "ÁCIDO" escrito en mayúsculas es texto
+        return len(palabra) <= 3
+    return mayusculas >= 2
+
+def normalizar_pregunta(texto: str) -> str:
+    """
+    "¿Qué es un ÁCIDO?" -> "que es un acido"; "Balancea H2 + O2" -> "balancea H2 + O2"
+    """
+    return " ".join(
+        palabra if _es_formula(palabra) else normalizar_busqueda(palabra)
+        for palabra in _PUNTUACION.sub(" ", texto).split()
+    )
+
+class CacheRespuestas:
+    """LRU con TTL de respuestas completas del asistente"""
+
+    def __init__(self, max_entradas: int, ttl_segundos: float, ruta: str = ""):
+        self.max_entradas = max(max_entradas, 0)
+        self.ttl_segundos = ttl_segundos
+        self.ruta = Path(ruta) if ruta else None
+        self._entradas: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.cargar()
+
+    # ---------- Claves ----------
+
+    @staticmethod
+    def clave(messages: List[Dict[str, str]], contexto: str) -> Optional[str]:
+        """
+        None si la conversación no es cacheable (hay turnos del asistente o
+        la última intervención no es del usuario).
+        """
+        if not messages or messages[-1].get("role") != "user":
+            return None
+        if any(m.get("role") == "assistant" for m in messages):
+            return None
+
+        pregunta = normalizar_pregunta(messages[-1].get("content", ""))
+        if not pregunta:
+            return None
+
+        historial = [normalizar_pregunta(m.get("content", "")) for m in messages[:-1]]
+        huella = hashlib.sha256(
+            json.dumps([contexto, historial], ensure_ascii=False).encode("utf-8")
+        ).hexdigest()[:16]
+        return f"{huella}:{pregunta}"
+
+    # ---------- Lectura y escritura ----------
+
+    def obtener(self, clave: Optional[str], registrar: bool = True) -> Optional[str]:
+        """registrar=False para consultas previas que no deben contar en las estadísticas"""
+        if clave is None or self.max_entradas == 0:
+            return None
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and entrada[1] <= time.time():
+                del self._entradas[clave]
+                entrada = None
+            if entrada is None:
+                self.fallos += registrar
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += registrar
+            return entrada[0]
+
+    def guardar(self, clave: Optional[str], respuesta: str) -> None:
+        if clave is None or self.max_entradas == 0 or not respuesta:
+            return
+        with self._lock:
+            self._entradas[clave] = (respuesta, time.time() + self.ttl_segundos)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+
+    def estado(self) -> Dict:
+        total = self.aciertos + self.fallos
+        return {
+            "entradas": len(self._entradas),
+            "max_entradas": self.max_entradas,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_aciertos": round(self.aciertos / total, 3) if total else 0.0
+        }
+
+    # ---------- Persistencia ----------
+
+    def cargar(self) -> None:
+        """Recuperar las entradas vigentes del archivo, si está configurado"""
+        if self.ruta is None or not self.ruta.exists():
+            return
+        try:
+            datos = json.loads(self.ruta.read_text(encoding="utf-8"))
+            ahora = time.time()
+            with self._lock:
+                for clave, (respuesta, expira) in datos.items():
+                    if expira > ahora:
+                        self._entradas[clave] = (respuesta, expira)
+                while len(self._entradas) > self.max_entradas:
+                    self._entradas.popitem(last=False)
+            logger.info(f"💾 Caché de respuestas cargada: {len(self._entradas)} entradas")
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo cargar la caché de respuestas: {e}")
+
+    def persistir(self) -> None:
+        """Escribir las entradas vigentes (reemplazo atómico del archivo)"""
+        if self.ruta is None:
+            return
+        try:
+            ahora = time.time()
+            with self._lock:
+                datos = {c: [r, e] for c, (r, e) in self._entradas.items() if e > ahora}
+            self.ruta.parent.mkdir(parents=True, exist_ok=True)
+            temporal = self.ruta.with_suffix(self.ruta.suffix + ".tmp")
+            temporal.write_text(json.dumps(datos, ensure_ascii=False), encoding="utf-8")
+            temporal.replace(self.ruta)
+            logger.info(f"💾 Caché de respuestas guardada: {len(datos)} entradas")
+        except Exception as e:
+            logger.error(f"❌ Error guardando la caché de respuestas: {e}")
+
+def trocear(respuesta: str, tamano: int = 80) -> List[str]:
+    """Partir una respuesta cacheada en chunks para reproducirla como stream"""
+    chunks = []
+    actual = ""
+    for palabra in re.split(r"(\s+)", respuesta):
+        actual += palabra
+        if len(actual) >= tamano:
+            chunks.append(actual)
+            actual = ""
+    if actual:
+        chunks.append(actual)
+    return chunks
+
+# Instancia singleton
+cache_respuestas = CacheRespuestas(
+    settings.IA_CACHE_MAX_ENTRADAS,
+    settings.IA_CACHE_TTL_HORAS * 3600,
+    settings.IA_CACHE_RUTA
+)
@@ -0,0 +1,194 @@
+# app/services/historial_chat.py
+"""
+Ventana de historial con presupuesto de tokens para las llamadas a Gemini.
+
+Se conservan los turnos más recientes que caben en IA_HISTORIAL_MAX_TOKENS;
+los anteriores se sustituyen por un resumen acumulado. El resumen se cachea
+por la huella encadenada de los mensajes resumidos, así que en una sesión
+larga cada turno solo resume lo que acaba de salir de la ventana partiendo
+del resumen anterior, en lugar de volver a resumir toda la conversación.
+
+Si todavía no hay resumen para el prefijo actual se calcula en segundo plano
+y se espera como mucho IA_HISTORIAL_ESPERA_RESUMEN_SEGUNDOS; mientras tanto
+se usa el resumen más reciente disponible. El resumen ocupa su propio hueco
+de limite_chat, por eso ajustar() se llama antes de que la generación
+principal tome el suyo.
+"""
+
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.utils.texto import estimar_tokens
+import asyncio
+import hashlib
+import logging
+import statistics
+
+logger = logging.getLogger(__name__)
+
+# Coste fijo aproximado por mensaje (rol y separadores)
+TOKENS_POR_MENSAJE = 4
+
+PROMPT_RESUMEN = (
+    "Resume en español, en menos de 150 palabras, la conversación de tutoría de química "
+    "que sigue. Conserva los temas tratados, las fórmulas, los datos numéricos y las dudas "
+    "pendientes del estudiante. No añadas información nueva.\n\n"
+)
+
+def _texto(mensaje: Dict) -> str:
+    return mensaje["parts"][0]["text"]
+
+def _huella(anterior: str, mensaje: Dict) -> str:
+    return hashlib.sha256(f"{anterior}|{mensaje['role']}|{_texto(mensaje)}".encode("utf-8")).hexdigest()[:20]
+
+class GestorHistorial:
+    """Recorte por presupuesto y resúmenes acumulados de los turnos antiguos"""
+
+    def __init__(self, max_tokens: int, espera_resumen: float, max_resumenes: int):
+        self.max_tokens = max(max_tokens, 0)
+        self.espera_resumen = espera_resumen
+        self.max_resumenes = max(max_resumenes, 1)
+        self._resumenes: "OrderedDict[str, str]" = OrderedDict()
+        self._en_curso: Dict[str, asyncio.Task] = {}
+        self._tokens_prompt: deque = deque(maxlen=500)
+        self.recortes = 0
+
+    # ---------- Estimación ----------
+
+    @staticmethod
+    def tokens(mensajes: List[Dict]) -> int:
+        return sum(estimar_tokens(_texto(m)) + TOKENS_POR_MENSAJE for m in mensajes)
+
+    # ---------- Ventana ----------
+
+    def _corte(self, historial: List[Dict]) -> int:
+        """
+        Índice del primer mensaje que se conserva. La ventana empieza siempre
+        en un turno del usuario para mantener la alternancia user/model.
+        """
+        usados = 0
+        corte = len(historial)
+        for i in range(len(historial) - 1, -1, -1):
+            usados += estimar_tokens(_texto(historial[i])) + TOKENS_POR_MENSAJE
+            if usados > self.max_tokens:
+                break
+            if historial[i]["role"] == "user":
+                corte = i
+        return corte
+
+    async def ajustar(self, gemini_messages: List[Dict]) -> List[Dict]:
+        """
+        Mensajes a enviar: [resumen] + turnos recientes + último mensaje.
+        El último mensaje se envía siempre completo.
+        """
+        if len(gemini_messages) <= 1:
+            return gemini_messages
+
+        historial, ultimo = gemini_messages[:-1], gemini_messages[-1]
+        if self.tokens(historial) <= self.max_tokens:
+            return gemini_messages
+
+        corte = self._corte(historial)
+        antiguos, recientes = historial[:corte], historial[corte:]
+        if not antiguos:
+            return gemini_messages
+
+        self.recortes += 1
+        resumen = await self._resumen(antiguos)
+        if not resumen:
+            return recientes + [ultimo]
+
+        return [
+            {"role": "user", "parts": [{"text": f"Resumen de la conversación anterior:\n{resumen}"}]},
+            {"role": "model", "parts": [{"text": "Entendido, continúo a partir de ese contexto."}]},
+        ] + recientes + [ultimo]
+
+    # ---------- Resúmenes acumulados ----------
+
+    async def _resumen(self, antiguos: List[Dict]) -> Optional[str]:
+        """Resumen de `antiguos`: cacheado, calculado ahora o el más reciente disponible"""
+        huellas = []
+        huella = ""
+        for mensaje in antiguos:
+            huella = _huella(huella, mensaje)
+            huellas.append(huella)
+
+        objetivo = huellas[-1]
+        if objetivo in self._resumenes:
+            self._resumenes.move_to_end(objetivo)
+            return self._resumenes[objetivo]
+
+        # Resumen más largo ya disponible para un prefijo de estos mensajes
+        base: Optional[Tuple[int, str]] = None
+        for i in range(len(huellas) - 2, -1, -1):
+            if huellas[i] in self._resumenes:
+                base = (i + 1, self._resumenes[huellas[i]])
+                break
+
+        tarea = self._en_curso.get(objetivo)
+        if tarea is None:
+            tarea = asyncio.create_task(self._calcular(objetivo, antiguos, base))
+            self._en_curso[objetivo] = tarea
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(tarea), timeout=self.espera_resumen)
+        except asyncio.TimeoutError:
+            logger.info("⏳ Resumen del historial en segundo plano; se usa el anterior")
+            return base[1] if base else None
+        except Exception:
+            return base[1] if base else None
+
+    async def _calcular(self, objetivo: str, antiguos: List[Dict], base: Optional[Tuple[int, str]]) -> Optional[str]:
+        # Importación diferida: app.services.ia importa este módulo
+        from app.services.ia import llamadas_llm, limite_chat
+
+        desde, resumen_previo = base if base else (0, "")
+        transcripcion = "\n".join(
+            f"{'Estudiante' if m['role'] == 'user' else 'Asistente'}: {_texto(m)}"
+            for m in antiguos[desde:]
+        )
+        prompt = PROMPT_RESUMEN
+        if resumen_previo:
+            prompt += f"Resumen previo:\n{resumen_previo}\n\nContinuación:\n"
+        prompt += transcripcion
+
+        try:
+            async with limite_chat.turno():
+                respuesta = await llamadas_llm.generar(
+                    [{"role": "user", "parts": [{"text": prompt}]}],
+                    "resumen"
+                )
+            resumen = respuesta.texto.strip()
+            if resumen:
+                self._resumenes[objetivo] = resumen
+                while len(self._resumenes) > self.max_resumenes:
+                    self._resumenes.popitem(last=False)
+                logger.info(f"🗜️ Historial resumido: {len(antiguos) - desde} mensajes nuevos -> {len(resumen)} caracteres")
+            return resumen or None
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo resumir el historial: {e}")
+            return None
+        finally:
+            self._en_curso.pop(objetivo, None)
+
+    # ---------- Métricas ----------
+
+    def registrar_prompt(self, tokens_prompt: int) -> None:
+        self._tokens_prompt.append(tokens_prompt)
+
+    def estado(self) -> Dict:
+        muestras = sorted(self._tokens_prompt)
+        return {
+            "max_tokens_historial": self.max_tokens,
+            "recortes": self.recortes,
+            "resumenes_cacheados": len(self._resumenes),
+            "tokens_prompt_p50": statistics.median(muestras) if muestras else 0,
+            "tokens_prompt_p95": muestras[min(len(muestras) - 1, int(len(muestras) * 0.95))] if muestras else 0
+        }
+
+# Instancia singleton
+historial_chat = GestorHistorial(
+    settings.IA_HISTORIAL_MAX_TOKENS,
+    settings.IA_HISTORIAL_ESPERA_RESUMEN_SEGUNDOS,
+    settings.IA_HISTORIAL_MAX_RESUMENES
+)
@@ -1,20 +1,48 @@
 # app/services/ia.py
-from typing import Iterable, List, Dict
-import google.generativeai as genai
+"""
+Cliente de LLM para el chat (Google Gemini en producción).
+
+Las llamadas pasan por proveedor_llm (proveedores_llm.py), elegido con
+LLM_PROVEEDOR: Gemini con la API asíncrona del SDK o un simulador local para
+pruebas de carga. Una generación de varios segundos no ocupa un hilo del
+threadpool de FastAPI. El número de generaciones simultáneas
+está acotado por un semáforo y la cola de espera tiene un límite: por encima,
+las peticiones se rechazan (ChatSaturadoError -> 503) en lugar de acumularse.
+
+Las preguntas de un solo turno se sirven desde cache_respuestas cuando ya se
+contestaron; los aciertos no ocupan hueco de concurrencia. Las peticiones
+idénticas simultáneas se coalescen (vuelos_chat) en una sola llamada. En
+conversaciones largas, historial_chat recorta el historial a un presupuesto
+de tokens.
+
+Cada pregunta se acompaña de los pasajes de teoría más pertinentes
+(recuperacion_service); si una pregunta de un solo turno queda cubierta con
+confianza alta por un pasaje, se responde con él sin llamar a Gemini.
+
+Las respuestas completas tienen un plazo (IA_DEADLINE_SEGUNDOS) que empieza
+al llegar la petición y se pasa a la llamada del SDK; los fallos transitorios
+se reintentan con espera exponencial con jitter mientras quede plazo, y
+opcionalmente se lanza una petición de cobertura si la primera supera el p95.
+"""
+
+from typing import AsyncIterator, Awaitable, Callable, List, Dict, Optional
+from collections import deque
+from contextlib import asynccontextmanager
 from app.core.config import settings
-import logging
+from app.services.cache_respuestas import cache_respuestas, trocear
+from app.services.historial_chat import historial_chat
+from app.services.recuperacion_service import recuperacion_service
+from app.services.proveedores_llm import crear_proveedor, RespuestaLLM
+from app.utils.texto import estimar_tokens
+import asyncio
+import hashlib
 import json
+import logging
+import random
+import time
 
 logger = logging.getLogger(__name__)
 
-# Configurar Gemini
-if settings.GEMINI_API_KEY:
-    try:
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        logger.info("✅ Google Gemini configurado correctamente")
-    except Exception as e:
-        logger.error(f"❌ Error configurando Gemini: {e}")
-
 SYSTEM_PROMPT = (
     "Eres 'Asistente Químico' de IReNaTech. Respondes en español neutro.\n"
     "- Especialista en química (general, orgánica, inorgánica, analítica y fisicoquímica).\n"
@@ -24,6 +52,197 @@ SYSTEM_PROMPT = (
     "- Si no sabes algo, admítelo y sugiere recursos adicionales."
 )
 
+_HUELLA_PROMPT = hashlib.sha256(SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:8]
+_TOKENS_SISTEMA = estimar_tokens(SYSTEM_PROMPT)
+
+# Instancia singleton
+proveedor_llm = crear_proveedor(SYSTEM_PROMPT)
+
+class ChatSaturadoError(Exception):
+    """No hay capacidad para atender otra petición de chat"""
+
+class ChatNoDisponibleError(Exception):
+    """
+    No se obtuvo respuesta del modelo (sin API key, plazo agotado, error del
+    proveedor o respuesta vacía). `respuesta` es el aviso que se muestra al
+    usuario; no es una respuesta real y no debe registrarse.
+    """
+
+    def __init__(self, respuesta: str):
+        super().__init__(respuesta)
+        self.respuesta = respuesta
+
+class _LimiteConcurrencia:
+    """Semáforo de generaciones simultáneas con cola de espera acotada"""
+
+    def __init__(self, maximo: int, max_en_cola: int, espera_maxima: float):
+        self._semaforo = asyncio.Semaphore(max(maximo, 1))
+        self.maximo = max(maximo, 1)
+        self.max_en_cola = max(max_en_cola, 0)
+        self.espera_maxima = espera_maxima
+        self.en_cola = 0
+        self.activas = 0
+
+    def verificar_capacidad(self) -> None:
+        """Rechazar de inmediato si la cola ya está llena"""
+        if self._semaforo.locked() and self.en_cola >= self.max_en_cola:
+            raise ChatSaturadoError(f"{self.activas} generaciones activas y {self.en_cola} en cola")
+
+    @asynccontextmanager
+    async def turno(self):
+        """Esperar un hueco (como mucho espera_maxima segundos) y ocuparlo"""
+        self.verificar_capacidad()
+        self.en_cola += 1
+        try:
+            await asyncio.wait_for(self._semaforo.acquire(), timeout=self.espera_maxima)
+        except asyncio.TimeoutError:
+            raise ChatSaturadoError(f"Sin hueco tras {self.espera_maxima}s de espera")
+        finally:
+            self.en_cola -= 1
+
+        self.activas += 1
+        try:
+            yield
+        finally:
+            self.activas -= 1
+            self._semaforo.release()
+
+    def estado(self) -> Dict:
+        return {"activas": self.activas, "en_cola": self.en_cola, "maximo": self.maximo, "max_en_cola": self.max_en_cola}
+
+limite_chat = _LimiteConcurrencia(
+    settings.IA_MAX_CONCURRENTES,
+    settings.IA_MAX_EN_COLA,
+    settings.IA_ESPERA_MAXIMA_SEGUNDOS
+)
+
+class _LlamadasLLM:
+    """
+    Plazo, reintentos y cobertura (hedging) de las generaciones completas.
+
+    La cobertura solo se activa con IA_COBERTURA_ACTIVA y con suficientes
+    muestras de latencia del perfil; se limita a IA_COBERTURA_MAX_FRACCION de
+    las llamadas para no duplicar la carga sobre Gemini cuando va lento.
+    """
+
+    def __init__(self):
+        self._latencias: Dict[str, deque] = {}
+        self.llamadas = 0
+        self.reintentos = 0
+        self.coberturas = 0
+        self.coberturas_ganadoras = 0
+        self.plazos_agotados = 0
+
+    def _p95(self, perfil: str) -> Optional[float]:
+        muestras = self._latencias.get(perfil)
+        if not muestras or len(muestras) < settings.IA_COBERTURA_MIN_MUESTRAS:
+            return None
+        ordenadas = sorted(muestras)
+        return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * 0.95))]
+
+    def _puede_cubrir(self) -> bool:
+        return (
+            settings.IA_COBERTURA_ACTIVA
+            and self.coberturas < max(self.llamadas, 1) * settings.IA_COBERTURA_MAX_FRACCION
+        )
+
+    async def generar(
+        self,
+        mensajes: List[Dict],
+        perfil: str = "chat",
+        modelo: Optional[str] = None,
+        limite: Optional[float] = None
+    ) -> RespuestaLLM:
+        """
+        `limite` es el instante (time.monotonic) en que vence el plazo de la
+        petición; por defecto, IA_DEADLINE_SEGUNDOS desde ahora.
+        """
+        limite = limite or time.monotonic() + settings.IA_DEADLINE_SEGUNDOS
+        self.llamadas += 1
+        intento = 0
+        while True:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                self.plazos_agotados += 1
+                raise asyncio.TimeoutError(f"Plazo de {settings.IA_DEADLINE_SEGUNDOS:.0f}s agotado")
+            try:
+                return await self._intento(mensajes, perfil, modelo, limite)
+            except Exception as e:
+                espera = random.uniform(0, min(
+                    settings.IA_REINTENTO_MAX_ESPERA_SEGUNDOS,
+                    settings.IA_REINTENTO_BASE_SEGUNDOS * 2 ** intento
+                ))
+                if (
+                    intento >= settings.IA_REINTENTOS_MAX
+                    or not proveedor_llm.reintentable(e)
+                    or time.monotonic() + espera >= limite
+                ):
+                    if isinstance(e, asyncio.TimeoutError):
+                        self.plazos_agotados += 1
+                    raise
+                intento += 1
+                self.reintentos += 1
+                logger.warning(f"🔁 Reintento {intento} en {espera:.2f}s tras error transitorio: {e}")
+                await asyncio.sleep(espera)
+
+    async def _intento(self, mensajes: List[Dict], perfil: str, modelo: Optional[str], limite: float) -> RespuestaLLM:
+        """Una llamada y, si tarda más que el p95, otra en paralelo; gana la primera"""
+        inicio = time.monotonic()
+
+        def lanzar() -> asyncio.Task:
+            restante = max(limite - time.monotonic(), 0.001)
+            return asyncio.create_task(asyncio.wait_for(
+                proveedor_llm.generar(mensajes, perfil, modelo, timeout=restante),
+                timeout=restante
+            ))
+
+        tareas = [lanzar()]
+        try:
+            p95 = self._p95(perfil)
+            if p95 is not None and self._puede_cubrir():
+                hechas, _ = await asyncio.wait(tareas, timeout=min(p95, max(limite - inicio, 0)))
+                if not hechas and time.monotonic() < limite:
+                    self.coberturas += 1
+                    logger.info(f"🪂 Petición de cobertura tras {p95:.2f}s (p95 de '{perfil}')")
+                    tareas.append(lanzar())
+
+            pendientes = set(tareas)
+            error: Optional[BaseException] = None
+            while pendientes:
+                hechas, pendientes = await asyncio.wait(pendientes, return_when=asyncio.FIRST_COMPLETED)
+                for tarea in hechas:
+                    if tarea.exception() is None:
+                        if tarea is not tareas[0]:
+                            self.coberturas_ganadoras += 1
+                        self._latencias.setdefault(perfil, deque(maxlen=500)).append(time.monotonic() - inicio)
+                        return tarea.result()
+                    error = error or tarea.exception()
+            raise error
+        finally:
+            for tarea in tareas:
+                if not tarea.done():
+                    tarea.cancel()
+
+    def estado(self) -> Dict:
+        latencias = {}
+        for perfil, muestras in self._latencias.items():
+            ordenadas = sorted(muestras)
+            latencias[perfil] = {
+                f"p{p}_ms": round(ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * p / 100))] * 1000)
+                for p in (50, 95, 99)
+            }
+        return {
+            "llamadas": self.llamadas,
+            "reintentos": self.reintentos,
+            "coberturas": self.coberturas,
+            "coberturas_ganadoras": self.coberturas_ganadoras,
+            "plazos_agotados": self.plazos_agotados,
+            "latencia": latencias
+        }
+
+# Instancia singleton
+llamadas_llm = _LlamadasLLM()
+
 def _no_key_reply() -> str:
     return (
         "⚠️ **Error de Configuración**\n\n"
@@ -71,192 +290,422 @@ def _convert_messages_to_gemini(messages: List[Dict[str, str]]) -> List[Dict[str
     
     return gemini_messages
 
-def chat_completion(messages: List[Dict[str, str]], model: str = None) -> str:
+async def _preparar(messages: List[Dict[str, str]]) -> List[Dict]:
     """
-    Genera una respuesta completa usando Google Gemini
+    Mensajes que se envían al proveedor: historial recortado a presupuesto
+    y pasajes de teoría junto a la última pregunta. Registra el tamaño real.
     """
-    if not settings.GEMINI_API_KEY:
+    originales = _convert_messages_to_gemini(messages)
+    gemini_messages = await historial_chat.ajustar(originales)
+    gemini_messages = await _con_contexto_teoria(gemini_messages)
+
+    tokens_prompt = _TOKENS_SISTEMA + historial_chat.tokens(gemini_messages)
+    historial_chat.registrar_prompt(tokens_prompt)
+    logger.info(
+        f"📏 Prompt: ~{tokens_prompt} tokens, {len(gemini_messages)} mensajes"
+        + (f" (de {len(originales)}, ~{_TOKENS_SISTEMA + historial_chat.tokens(originales)} tokens sin recortar)"
+           if len(gemini_messages) != len(originales) else "")
+    )
+    return gemini_messages
+
+def _clave_cache(messages: List[Dict[str, str]], model: Optional[str] = None) -> Optional[str]:
+    """La huella incluye modelo y prompt: cambiarlos invalida lo cacheado"""
+    contexto = f"{model or proveedor_llm.modelo}:{_HUELLA_PROMPT}"
+    return cache_respuestas.clave(messages, contexto)
+
+def buscar_en_cache(messages: List[Dict[str, str]], model: Optional[str] = None) -> Optional[str]:
+    """Respuesta cacheada para esta conversación, si la hay"""
+    return cache_respuestas.obtener(_clave_cache(messages, model), registrar=False)
+
+def _clave_vuelo(messages: List[Dict[str, str]], model: Optional[str] = None) -> str:
+    """Para coalescer: la clave de la caché si es de un turno; si no, la huella exacta del payload"""
+    clave = _clave_cache(messages, model)
+    if clave is not None:
+        return clave
+    payload = json.dumps([model or proveedor_llm.modelo, _HUELLA_PROMPT, messages], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class _Difusion:
+    """Un stream de Gemini repartido entre todos sus suscriptores"""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.terminado = False
+        self.error: Optional[BaseException] = None
+        self.suscriptores: List[asyncio.Queue] = []
+        self.tarea: Optional[asyncio.Task] = None
+
+    def publicar(self, chunk: str) -> None:
+        self.chunks.append(chunk)
+        for cola in self.suscriptores:
+            cola.put_nowait(chunk)
+
+    def cerrar(self, error: Optional[BaseException] = None) -> None:
+        self.terminado = True
+        self.error = error
+        for cola in self.suscriptores:
+            cola.put_nowait(None)
+
+class _VuelosChat:
+    """
+    Single-flight: peticiones idénticas simultáneas comparten una sola
+    llamada a Gemini. La generación corre en su propia tarea, así que si la
+    petición que la inició se cancela, las demás siguen recibiendo el
+    resultado. Un stream solo se aborta cuando no le queda ningún suscriptor.
+    """
+
+    def __init__(self):
+        self._completos: Dict[str, asyncio.Task] = {}
+        self._streams: Dict[str, _Difusion] = {}
+        self.compartidas = 0
+
+    async def completar(self, clave: str, crear: Callable[[], Awaitable[str]]) -> str:
+        tarea = self._completos.get(clave)
+        if tarea is None:
+            tarea = asyncio.create_task(crear())
+            self._completos[clave] = tarea
+            tarea.add_done_callback(lambda t: self._completos.pop(clave, None) if self._completos.get(clave) is t else None)
+        else:
+            self.compartidas += 1
+            logger.info("🔗 Petición unida a una generación en curso")
+        return await asyncio.shield(tarea)
+
+    async def suscribir(self, clave: str, crear: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        difusion = self._streams.get(clave)
+        if difusion is None:
+            difusion = _Difusion()
+            self._streams[clave] = difusion
+            difusion.tarea = asyncio.create_task(self._producir(clave, difusion, crear))
+        else:
+            self.compartidas += 1
+            logger.info(f"🔗 Stream unido a una generación en curso ({len(difusion.suscriptores) + 1} suscriptores)")
+
+        # Lo ya emitido se reenvía primero; sin await entre medias no se pierde nada
+        cola: asyncio.Queue = asyncio.Queue()
+        for chunk in difusion.chunks:
+            cola.put_nowait(chunk)
+        if difusion.terminado:
+            cola.put_nowait(None)
+        difusion.suscriptores.append(cola)
+
+        try:
+            while True:
+                chunk = await cola.get()
+                if chunk is None:
+                    if difusion.error is not None:
+                        raise difusion.error
+                    return
+                yield chunk
+        finally:
+            difusion.suscriptores.remove(cola)
+            if not difusion.suscriptores and not difusion.terminado:
+                # Nadie escucha: abortar la generación en Gemini
+                if self._streams.get(clave) is difusion:
+                    del self._streams[clave]
+                difusion.tarea.cancel()
+
+    async def _producir(self, clave: str, difusion: _Difusion, crear: Callable[[], AsyncIterator[str]]) -> None:
+        try:
+            async for chunk in crear():
+                difusion.publicar(chunk)
+            difusion.cerrar()
+        except asyncio.CancelledError:
+            difusion.cerrar()
+            raise
+        except Exception as e:
+            difusion.cerrar(e)
+        finally:
+            if self._streams.get(clave) is difusion:
+                del self._streams[clave]
+
+    def estado(self) -> Dict:
+        return {
+            "completas_en_curso": len(self._completos),
+            "streams_en_curso": len(self._streams),
+            "peticiones_compartidas": self.compartidas
+        }
+
+# Instancia singleton
+vuelos_chat = _VuelosChat()
+
+async def _con_contexto_teoria(gemini_messages: List[Dict]) -> List[Dict]:
+    """Añadir al último mensaje del usuario los pasajes de teoría pertinentes"""
+    if not gemini_messages or gemini_messages[-1]["role"] != "user":
+        return gemini_messages
+    pregunta = gemini_messages[-1]["parts"][0]["text"]
+    contexto = await recuperacion_service.contexto(pregunta)
+    if not contexto:
+        return gemini_messages
+    return gemini_messages[:-1] + [{
+        "role": "user",
+        "parts": [{"text": (
+            "Material de teoría de IReNaTech (úsalo si es pertinente y cítalo por su título):\n"
+            f"{contexto}\n\nPregunta del estudiante:\n{pregunta}"
+        )}]
+    }]
+
+async def _respuesta_desde_teoria(messages: List[Dict[str, str]]) -> Optional[str]:
+    """Solo para preguntas de un solo turno: con historial la respuesta depende del contexto"""
+    if not messages or messages[-1]["role"] != "user" or any(m["role"] == "assistant" for m in messages):
+        return None
+    return await recuperacion_service.respuesta_directa(messages[-1]["content"])
+
+async def chat_completion(messages: List[Dict[str, str]], model: str = None) -> str:
+    """
+    Genera una respuesta completa usando Google Gemini.
+    Lanza ChatSaturadoError si no hay hueco en el límite de concurrencia y
+    ChatNoDisponibleError (con el aviso para el usuario) si no hay respuesta.
+    """
+    if not proveedor_llm.configurado:
         logger.warning("🚨 Intento de usar IA sin API key configurada")
-        return _no_key_reply()
-    
+        raise ChatNoDisponibleError(_no_key_reply())
+
+    clave = _clave_cache(messages, model)
+    en_cache = cache_respuestas.obtener(clave)
+    if en_cache is not None:
+        logger.info(f"⚡ Respuesta servida desde caché: {len(en_cache)} caracteres")
+        return en_cache
+
+    directa = await _respuesta_desde_teoria(messages)
+    if directa is not None:
+        return directa
+
+    return await vuelos_chat.completar(
+        _clave_vuelo(messages, model),
+        lambda: _generar_respuesta(messages, model, clave)
+    )
+
+async def _generar_respuesta(messages: List[Dict[str, str]], model: Optional[str], clave: Optional[str]) -> str:
+    # El plazo cuenta desde que llega la petición, espera en cola incluida
+    limite = time.monotonic() + settings.IA_DEADLINE_SEGUNDOS
     try:
-        logger.info(f"🤖 Enviando {len(messages)} mensajes a Gemini (modelo: {settings.GEMINI_MODEL})")
-        
-        # Inicializar el modelo con el system_instruction
-        gemini_model = genai.GenerativeModel(
-            model_name=settings.GEMINI_MODEL,
-            system_instruction=SYSTEM_PROMPT
-        )
-        
-        # Convertir mensajes al formato de Gemini
-        gemini_messages = _convert_messages_to_gemini(messages)
-        
-        # Si hay mensajes de conversación, usamos chat
-        if len(gemini_messages) > 1:
-            # Crear chat con historial
-            chat = gemini_model.start_chat(history=gemini_messages[:-1])
-            
-            # Obtener el último mensaje del usuario
-            last_message = gemini_messages[-1]
-            if last_message["role"] == "user":
-                response = chat.send_message(
-                    last_message["parts"][0]["text"],
-                    generation_config=genai.types.GenerationConfig(
-                        temperature=0.2,
-                        max_output_tokens=2000,
-                        candidate_count=1,
-                    )
-                )
-            else:
-                # Fallback: generar respuesta directa
-                response = gemini_model.generate_content(
-                    last_message["parts"][0]["text"],
-                    generation_config=genai.types.GenerationConfig(
-                        temperature=0.2,
-                        max_output_tokens=2000,
-                        candidate_count=1,
-                    )
-                )
-        else:
-            # Solo un mensaje, generar respuesta directa
-            user_message = gemini_messages[0]["parts"][0]["text"] if gemini_messages else "Hola"
-            response = gemini_model.generate_content(
-                user_message,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.2,
-                    max_output_tokens=2000,
-                    candidate_count=1,
-                )
-            )
-        
-        reply = response.text if response.text else ""
-        
+        # Antes de ocupar hueco: el resumen del historial pide el suyo propio
+        gemini_messages = await _preparar(messages)
+        async with limite_chat.turno():
+            logger.info(f"🤖 Enviando {len(messages)} mensajes a {proveedor_llm.nombre} (modelo: {model or proveedor_llm.modelo})")
+            respuesta = await llamadas_llm.generar(gemini_messages, "chat", model, limite)
+
+        reply = respuesta.texto
+
         if not reply:
             logger.warning("⚠️ Gemini devolvió una respuesta vacía")
-            return "Lo siento, no pude generar una respuesta. Por favor, inténtalo de nuevo."
-        
+            raise ChatNoDisponibleError("Lo siento, no pude generar una respuesta. Por favor, inténtalo de nuevo.")
+
+        if respuesta.tokens_prompt is not None:
+            logger.info(f"📏 Tokens según el proveedor: {respuesta.tokens_prompt} de prompt, {respuesta.tokens_respuesta} de respuesta")
         logger.info(f"✅ Respuesta recibida de Gemini: {len(reply)} caracteres")
+        cache_respuestas.guardar(clave, reply)
         return reply
-        
+
+    except (ChatSaturadoError, ChatNoDisponibleError):
+        raise
+    except asyncio.TimeoutError as e:
+        logger.error(f"⏱️ Sin respuesta de {proveedor_llm.nombre} dentro del plazo: {e}")
+        raise ChatNoDisponibleError(_connection_error_reply(str(e) or "Tiempo de espera agotado")) from e
     except Exception as e:
         error_msg = str(e)
         logger.error(f"❌ Error en chat_completion: {error_msg}", exc_info=True)
-        return _connection_error_reply(error_msg)
+        raise ChatNoDisponibleError(_connection_error_reply(error_msg)) from e
 
-def chat_stream(messages: List[Dict[str, str]], model: str = None) -> Iterable[str]:
+async def chat_stream(messages: List[Dict[str, str]], model: str = None) -> AsyncIterator[str]:
     """
-    Genera chunks de texto para streaming usando Google Gemini
+    Genera chunks de texto para streaming usando Google Gemini.
+    Streams idénticos simultáneos comparten la generación; el hueco de
+    concurrencia se mantiene hasta que termina. Si falla lanza
+    ChatNoDisponibleError, aunque ya se hayan emitido chunks.
     """
-    if not settings.GEMINI_API_KEY:
+    if not proveedor_llm.configurado:
         logger.warning("🚨 Intento de usar streaming sin API key configurada")
-        yield _no_key_reply()
+        raise ChatNoDisponibleError(_no_key_reply())
+
+    clave = _clave_cache(messages, model)
+    en_cache = cache_respuestas.obtener(clave)
+    if en_cache is not None:
+        logger.info(f"⚡ Stream servido desde caché: {len(en_cache)} caracteres")
+        for chunk in trocear(en_cache):
+            yield chunk
         yield "[DONE]"
         return
 
+    directa = await _respuesta_desde_teoria(messages)
+    if directa is not None:
+        for chunk in trocear(directa):
+            yield chunk
+        yield "[DONE]"
+        return
+
+    async for chunk in vuelos_chat.suscribir(
+        _clave_vuelo(messages, model),
+        lambda: _generar_stream(messages, model, clave)
+    ):
+        yield chunk
+    yield "[DONE]"
+
+async def _generar_stream(messages: List[Dict[str, str]], model: Optional[str], clave: Optional[str]) -> AsyncIterator[str]:
     try:
-        logger.info(f"📡 Iniciando streaming con {len(messages)} mensajes (modelo: {settings.GEMINI_MODEL})")
-        
-        # Inicializar el modelo con el system_instruction
-        gemini_model = genai.GenerativeModel(
-            model_name=settings.GEMINI_MODEL,
-            system_instruction=SYSTEM_PROMPT
-        )
-        
-        # Convertir mensajes al formato de Gemini
-        gemini_messages = _convert_messages_to_gemini(messages)
-        
-        # Preparar el contenido para streaming
-        if len(gemini_messages) > 1:
-            # Crear chat con historial
-            chat = gemini_model.start_chat(history=gemini_messages[:-1])
-            last_message = gemini_messages[-1]
-            
-            if last_message["role"] == "user":
-                response = chat.send_message(
-                    last_message["parts"][0]["text"],
-                    generation_config=genai.types.GenerationConfig(
-                        temperature=0.2,
-                        max_output_tokens=2000,
-                        candidate_count=1,
-                    ),
-                    stream=True
-                )
-            else:
-                response = gemini_model.generate_content(
-                    last_message["parts"][0]["text"],
-                    generation_config=genai.types.GenerationConfig(
-                        temperature=0.2,
-                        max_output_tokens=2000,
-                        candidate_count=1,
-                    ),
-                    stream=True
-                )
-        else:
-            # Solo un mensaje
-            user_message = gemini_messages[0]["parts"][0]["text"] if gemini_messages else "Hola"
-            response = gemini_model.generate_content(
-                user_message,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.2,
-                    max_output_tokens=2000,
-                    candidate_count=1,
-                ),
-                stream=True
-            )
-        
-        chunk_count = 0
-        for chunk in response:
-            if chunk.text:
+        # Antes de ocupar hueco: el resumen del historial pide el suyo propio
+        gemini_messages = await _preparar(messages)
+        async with limite_chat.turno():
+            logger.info(f"📡 Iniciando streaming con {len(messages)} mensajes (modelo: {model or proveedor_llm.modelo})")
+
+            chunk_count = 0
+            partes = []
+            async for chunk in proveedor_llm.generar_stream(gemini_messages, "chat", model):
                 chunk_count += 1
-                yield chunk.text
-        
+                partes.append(chunk)
+                yield chunk
+
         logger.info(f"✅ Streaming completado: {chunk_count} chunks enviados")
-        yield "[DONE]"
-        
+        # Solo streams completos: uno cortado a medias no llega aquí
+        cache_respuestas.guardar(clave, "".join(partes))
+
+    except ChatSaturadoError:
+        raise
     except Exception as e:
         error_msg = str(e)
         logger.error(f"❌ Error en chat_stream: {error_msg}", exc_info=True)
-        yield _connection_error_reply(error_msg)
-        yield "[DONE]"
+        raise ChatNoDisponibleError(_connection_error_reply(error_msg)) from e
+
+def _estado_servicio() -> Dict:
+    """Contadores locales del chat (no consultan a Gemini)"""
+    return {
+        "concurrencia": limite_chat.estado(),
+        "cache": cache_respuestas.estado(),
+        "historial": historial_chat.estado(),
+        "coalescencia": vuelos_chat.estado(),
+        "llamadas": llamadas_llm.estado(),
+        "teoria": recuperacion_service.estado()
+    }
 
 # Función auxiliar para verificar la configuración de Gemini
-def test_gemini_connection() -> Dict:
+async def test_gemini_connection() -> Dict:
     """
-    Prueba la conexión con Gemini y devuelve información del estado
+    Prueba la conexión con Gemini generando una respuesta real (sondeo
+    profundo, con coste). Actualiza también el estado cacheado de la sonda.
     """
-    if not settings.GEMINI_API_KEY:
+    if not proveedor_llm.configurado:
         return {
             "status": "error",
             "message": "API key no configurada",
             "gemini_configured": False
         }
-    
+
+    inicio = time.monotonic()
     try:
         # Probar una consulta simple
-        model = genai.GenerativeModel(
-            model_name=settings.GEMINI_MODEL,
-            system_instruction=SYSTEM_PROMPT
+        respuesta = await proveedor_llm.generar(
+            [{"role": "user", "parts": [{"text": "Responde solo 'OK' si me recibes"}]}],
+            "prueba"
         )
-        response = model.generate_content(
-            "Responde solo 'OK' si me recibes",
-            generation_config=genai.types.GenerationConfig(
-                temperature=0.1,
-                max_output_tokens=10,
-                candidate_count=1,
-            )
-        )
-        
-        return {
+
+        resultado = {
             "status": "ok",
-            "message": "Conexión exitosa con Gemini",
+            "message": f"Conexión exitosa con {proveedor_llm.nombre}",
             "gemini_configured": True,
-            "model": settings.GEMINI_MODEL,
-            "test_response": response.text[:50] if response.text else "Sin respuesta"
+            "proveedor": proveedor_llm.nombre,
+            "model": proveedor_llm.modelo,
+            "test_response": respuesta.texto[:50] if respuesta.texto else "Sin respuesta",
+            "latencia_ms": round((time.monotonic() - inicio) * 1000),
+            **_estado_servicio()
         }
-    
+
     except Exception as e:
-        return {
-            "status": "error", 
+        resultado = {
+            "status": "error",
             "message": f"Error de conexión: {str(e)}",
-            "gemini_configured": False
-        }
\ No newline at end of file
+            "gemini_configured": False,
+            "latencia_ms": round((time.monotonic() - inicio) * 1000),
+            **_estado_servicio()
+        }
+
+    sonda_gemini.actualizar(resultado, profundo=True)
+    return resultado
+
+class _SondaGemini:
+    """
+    Estado de Gemini comprobado en segundo plano. La sonda periódica usa
+    count_tokens (valida clave y conectividad sin generar texto ni coste);
+    el intervalo lleva jitter para que varias réplicas no sondeen a la vez.
+    """
+
+    def __init__(self):
+        self._estado: Dict = {
+            "status": "unknown",
+            "message": "Sin sondeos todavía",
+            "gemini_configured": proveedor_llm.configurado,
+            "proveedor": proveedor_llm.nombre,
+            "model": proveedor_llm.modelo
+        }
+        self._comprobado: Optional[float] = None
+        self._tarea: Optional[asyncio.Task] = None
+
+    def actualizar(self, resultado: Dict, profundo: bool = False) -> None:
+        self._estado = {
+            clave: valor for clave, valor in resultado.items()
+            if clave not in ("concurrencia", "cache", "historial", "coalescencia", "teoria")
+        }
+        self._estado["sondeo"] = "profundo" if profundo else "ligero"
+        self._comprobado = time.time()
+
+    def estado(self) -> Dict:
+        """Último resultado conocido más los contadores locales, sin llamar a Gemini"""
+        return {
+            **self._estado,
+            "comprobado_hace_segundos": round(time.time() - self._comprobado, 1) if self._comprobado else None,
+            **_estado_servicio()
+        }
+
+    async def sondear(self) -> Dict:
+        if not proveedor_llm.configurado:
+            resultado = {"status": "error", "message": "API key no configurada", "gemini_configured": False}
+            self.actualizar(resultado)
+            return resultado
+
+        inicio = time.monotonic()
+        try:
+            await asyncio.wait_for(proveedor_llm.sondear(), timeout=settings.IA_SONDA_TIMEOUT_SEGUNDOS)
+            resultado = {
+                "status": "ok",
+                "message": f"{proveedor_llm.nombre} responde",
+                "gemini_configured": True,
+                "proveedor": proveedor_llm.nombre,
+                "model": proveedor_llm.modelo
+            }
+        except Exception as e:
+            logger.warning(f"⚠️ Sonda de {proveedor_llm.nombre} fallida: {e}")
+            resultado = {
+                "status": "error",
+                "message": f"Error de conexión: {str(e) or type(e).__name__}",
+                "gemini_configured": True,
+                "proveedor": proveedor_llm.nombre,
+                "model": proveedor_llm.modelo
+            }
+        resultado["latencia_ms"] = round((time.monotonic() - inicio) * 1000)
+        self.actualizar(resultado)
+        return resultado
+
+    def iniciar(self) -> None:
+        if self._tarea is not None:
+            return
+        self._tarea = asyncio.create_task(self._bucle())
+        logger.info(f"🩺 Sonda de Gemini cada ~{settings.IA_SONDA_INTERVALO_SEGUNDOS}s")
+
+    async def detener(self) -> None:
+        if self._tarea is None:
+            return
+        self._tarea.cancel()
+        try:
+            await self._tarea
+        except asyncio.CancelledError:
+            pass
+        self._tarea = None
+
+    async def _bucle(self) -> None:
+        intervalo = max(settings.IA_SONDA_INTERVALO_SEGUNDOS, 1)
+        while True:
+            await self.sondear()
+            jitter = random.uniform(-settings.IA_SONDA_JITTER, settings.IA_SONDA_JITTER)
+            await asyncio.sleep(intervalo * (1 + jitter))
+
+# Instancia singleton
+sonda_gemini = _SondaGemini()
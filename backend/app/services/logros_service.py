@@ -0,0 +1,366 @@
+# app/services/logros_service.py
+"""
+Logros del usuario (LogrosUsuarioResponse) y motor de reglas.
+
+El catálogo de logros activos cambia muy poco, así que se mantiene en memoria
+con TTL junto con sus reglas (logros.condicion_json) ya compiladas a funciones.
+Por petición solo se consulta el conjunto de logros obtenidos del usuario; el
+avance y el otorgamiento se evalúan contra las estadísticas cacheadas del
+usuario, y los logros nuevos se insertan en una sola sentencia.
+
+El otorgamiento se hace después de confirmar el progreso y, si falla, solo
+se registra un aviso; reconciliar_logros() (tarea programada
+reconciliar-logros) vuelve a evaluar a todos los usuarios y otorga los que
+faltan.
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+import logging
+import json
+import operator
+
+from app.core.config import settings
+from app.database import get_db
+from app.models.progreso import LogroUsuario, LogrosUsuarioResponse
+
+logger = logging.getLogger(__name__)
+
+# Métricas que pueden usar las condiciones (columnas de get_estadisticas_usuario)
+METRICAS_LOGROS = {
+    "registrado",
+    "puntos_totales",
+    "simulaciones_completadas",
+    "teorias_leidas",
+    "elementos_diferentes",
+    "preguntas_ia",
+    "sesion_mas_larga_minutos",
+}
+
+OPERADORES = {
+    ">=": operator.ge,
+    ">": operator.gt,
+    "==": operator.eq,
+    "<=": operator.le,
+    "<": operator.lt,
+}
+
+# Contadores por usuario que evalúan las reglas (una fila por usuario)
+SQL_ESTADISTICAS = """
+    SELECT
+        u.id_usuario,
+        CASE WHEN u.tipo_usuario = 'registrado' THEN 1 ELSE 0 END AS registrado,
+        COALESCE(u.puntos_totales, 0) AS puntos_totales,
+        COALESCE(e.simulaciones_completadas, 0) AS simulaciones_completadas,
+        COALESCE(e.teorias_leidas, 0) AS teorias_leidas,
+        COALESCE(e.elementos_diferentes_usados, 0) AS elementos_diferentes,
+        COALESCE(e.preguntas_ia_realizadas, 0) AS preguntas_ia,
+        (SELECT COALESCE(MAX(se.duracion_minutos), 0) FROM sesiones_estudio se
+         WHERE se.usuario_id = u.id_usuario) AS sesion_mas_larga_minutos
+    FROM usuario u
+    LEFT JOIN usuario_estadisticas e ON e.usuario_id = u.id_usuario
+"""
+
+Regla = Callable[[dict], bool]
+Avance = Callable[[dict], Optional[float]]
+
+class LogrosService:
+    def __init__(self):
+        self.db_session = None
+        self._catalogo: List[dict] = []
+        self._catalogo_cargado: Optional[datetime] = None
+        # usuario_id -> (estadísticas, momento de carga); LRU de PROGRESO_CACHE_MAX_USUARIOS
+        self._estadisticas: "OrderedDict[int, Tuple[dict, datetime]]" = OrderedDict()
+
+    async def get_db(self) -> Session:
+        """Obtener sesión de base de datos"""
+        if not self.db_session:
+            self.db_session = next(get_db())
+        return self.db_session
+
+    def _vigente(self, cargado: Optional[datetime]) -> bool:
+        """¿Sigue dentro del TTL de caché?"""
+        ttl = timedelta(minutes=settings.PROGRESO_CACHE_TTL_MINUTES)
+        return cargado is not None and datetime.now() - cargado < ttl
+
+    # ==================== COMPILACIÓN DE REGLAS ====================
+
+    def _compilar(self, condicion: dict) -> Tuple[Regla, Avance]:
+        """Convertir una condición de condicion_json en (regla, avance)"""
+        for clave, combinar_regla, combinar_avance in (
+            ("todas", all, min),
+            ("alguna", any, max),
+        ):
+            if clave in condicion:
+                partes = [self._compilar(c) for c in condicion[clave]]
+                if not partes:
+                    raise ValueError(f"'{clave}' sin condiciones")
+                reglas = [regla for regla, _ in partes]
+                avances = [avance for _, avance in partes]
+
+                def regla(e, reglas=reglas, combinar=combinar_regla):
+                    return combinar(r(e) for r in reglas)
+
+                def avance(e, avances=avances, combinar=combinar_avance):
+                    valores = [a(e) for a in avances]
+                    valores = [v for v in valores if v is not None]
+                    return combinar(valores) if valores else None
+
+                return regla, avance
+
+        metrica = condicion["metrica"]
+        if metrica not in METRICAS_LOGROS:
+            raise ValueError(f"métrica desconocida '{metrica}'")
+        simbolo = condicion.get("operador", ">=")
+        comparar = OPERADORES[simbolo]
+        valor = condicion["valor"]
+        # Un valor no numérico fallaría al evaluar, no al compilar
+        if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+            raise TypeError(f"valor no numérico {valor!r} para '{metrica}'")
+
+        def regla(e):
+            return comparar(e.get(metrica, 0), valor)
+
+        # El avance solo tiene sentido para metas del tipo "al menos N"
+        if simbolo in (">=", ">"):
+            objetivo = valor + 1 if simbolo == ">" else valor
+
+            def avance(e):
+                return min(e.get(metrica, 0) / max(objetivo, 1), 1.0) * 100
+        else:
+            def avance(e):
+                return None
+
+        return regla, avance
+
+    def _compilar_logro(self, logro: dict) -> dict:
+        """Adjuntar al logro su regla y avance compilados"""
+        condicion = logro.get("condicion_json")
+        if isinstance(condicion, str):
+            condicion = json.loads(condicion)
+
+        try:
+            if condicion:
+                logro["regla"], logro["avance"] = self._compilar(condicion)
+            elif logro["puntos_requeridos"] > 0:
+                logro["regla"], logro["avance"] = self._compilar(
+                    {"metrica": "puntos_totales", "operador": ">=", "valor": logro["puntos_requeridos"]}
+                )
+            else:
+                logro["regla"], logro["avance"] = None, None
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"⚠️ Condición inválida en logro {logro['codigo_logro']}: {str(e)}")
+            logro["regla"], logro["avance"] = None, None
+
+        return logro
+
+    # ==================== CACHÉS ====================
+
+    async def get_catalogo(self) -> List[dict]:
+        """Catálogo de logros activos (cacheado)"""
+        if self._vigente(self._catalogo_cargado):
+            return self._catalogo
+
+        db = await self.get_db()
+        try:
+            filas = db.execute(text("""
+                SELECT id_logro, codigo_logro, nombre, descripcion, icono,
+                       COALESCE(puntos_requeridos, 0) AS puntos_requeridos, condicion_json
+                FROM logros
+                WHERE activo = true
+                ORDER BY puntos_requeridos, id_logro
+            """)).fetchall()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Error cargando catálogo de logros: {str(e)}")
+            raise
+
+        # Las reglas se compilan una vez por carga del catálogo
+        self._catalogo = [self._compilar_logro(dict(fila._mapping)) for fila in filas]
+        self._catalogo_cargado = datetime.now()
+        logger.info(f"🏅 Catálogo de logros cargado: {len(self._catalogo)} logros")
+        return self._catalogo
+
+    async def get_estadisticas_usuario(self, usuario_id: int) -> dict:
+        """Contadores que usan las reglas de logros (cacheados por usuario)"""
+        en_cache = self._estadisticas.get(usuario_id)
+        if en_cache is not None:
+            if self._vigente(en_cache[1]):
+                self._estadisticas.move_to_end(usuario_id)
+                return en_cache[0]
+            del self._estadisticas[usuario_id]
+
+        db = await self.get_db()
+        try:
+            fila = db.execute(
+                text(SQL_ESTADISTICAS + " WHERE u.id_usuario = :usuario_id"),
+                {"usuario_id": usuario_id}
+            ).fetchone()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Error cargando estadísticas de logros: {str(e)}")
+            raise
+
+        estadisticas = {
+            clave: int(valor) for clave, valor in fila._mapping.items() if clave != "id_usuario"
+        } if fila else {}
+        self._estadisticas[usuario_id] = (estadisticas, datetime.now())
+        while len(self._estadisticas) > max(settings.PROGRESO_CACHE_MAX_USUARIOS, 0):
+            self._estadisticas.popitem(last=False)
+        return estadisticas
+
+    def invalidar_usuario(self, usuario_id: int) -> None:
+        """Descartar las estadísticas cacheadas de un usuario (p. ej. tras guardar progreso)"""
+        self._estadisticas.pop(usuario_id, None)
+
+    def invalidar_catalogo(self) -> None:
+        """Forzar la recarga del catálogo en la siguiente consulta"""
+        self._catalogo_cargado = None
+
+    # ==================== LOGROS DEL USUARIO ====================
+
+    def _avance(self, logro: dict, estadisticas: dict) -> Optional[float]:
+        """Porcentaje de avance (0-100) hacia un logro, o None si no hay regla"""
+        if logro["avance"] is None:
+            return None
+        avance = logro["avance"](estadisticas)
+        return round(avance, 2) if avance is not None else None
+
+    async def otorgar_logros(self, usuario_id: int) -> List[int]:
+        """Evaluar las reglas con estadísticas frescas y otorgar los logros cumplidos"""
+        self.invalidar_usuario(usuario_id)
+        catalogo = await self.get_catalogo()
+        estadisticas = await self.get_estadisticas_usuario(usuario_id)
+        if not estadisticas:
+            return []
+
+        cumplidos = [
+            logro["id_logro"] for logro in catalogo
+            if logro["regla"] is not None and logro["regla"](estadisticas)
+        ]
+        if not cumplidos:
+            return []
+
+        db = await self.get_db()
+        try:
+            # Los ya obtenidos los descarta el índice único (usuario_id, logro_id)
+            filas = db.execute(text("""
+                INSERT INTO usuario_logros (usuario_id, logro_id)
+                SELECT :usuario_id, unnest(CAST(:logros AS integer[]))
+                ON CONFLICT (usuario_id, logro_id) DO NOTHING
+                RETURNING logro_id
+            """), {"usuario_id": usuario_id, "logros": cumplidos}).fetchall()
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Error otorgando logros: {str(e)}")
+            raise
+
+        nuevos = [int(fila.logro_id) for fila in filas]
+        if nuevos:
+            logger.info(f"🏅 Usuario {usuario_id} obtuvo {len(nuevos)} logros nuevos")
+        return nuevos
+
+    async def reconciliar_logros(self, tamano_lote: int = 1000) -> int:
+        """
+        Evaluar las reglas para todos los usuarios y otorgar los logros que
+        falten (p. ej. si falló el otorgamiento tras guardar progreso).
+        Devuelve cuántos logros se otorgaron.
+        """
+        self.invalidar_catalogo()
+        catalogo = [logro for logro in await self.get_catalogo() if logro["regla"] is not None]
+        if not catalogo:
+            return 0
+
+        db = await self.get_db()
+        otorgados = 0
+        desde = 0
+        try:
+            while True:
+                filas = db.execute(
+                    text(SQL_ESTADISTICAS + " WHERE u.id_usuario > :desde ORDER BY u.id_usuario LIMIT :limite"),
+                    {"desde": desde, "limite": tamano_lote}
+                ).fetchall()
+                if not filas:
+                    break
+                desde = int(filas[-1].id_usuario)
+
+                pares = []
+                for fila in filas:
+                    datos = dict(fila._mapping)
+                    usuario_id = int(datos.pop("id_usuario"))
+                    estadisticas = {clave: int(valor) for clave, valor in datos.items()}
+                    pares.extend(
+                        (usuario_id, logro["id_logro"]) for logro in catalogo
+                        if logro["regla"](estadisticas)
+                    )
+                if not pares:
+                    continue
+
+                resultado = db.execute(text("""
+                    INSERT INTO usuario_logros (usuario_id, logro_id)
+                    SELECT * FROM unnest(CAST(:usuarios AS integer[]), CAST(:logros AS integer[]))
+                    ON CONFLICT (usuario_id, logro_id) DO NOTHING
+                """), {"usuarios": [u for u, _ in pares], "logros": [l for _, l in pares]})
+                db.commit()
+                otorgados += resultado.rowcount
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Error reconciliando logros: {str(e)}")
+            raise
+
+        self._estadisticas.clear()
+        logger.info(f"🏅 Reconciliación de logros: {otorgados} logros otorgados")
+        return otorgados
+
+    async def get_logros_usuario(self, usuario_id: int) -> LogrosUsuarioResponse:
+        """Catálogo cacheado + logros obtenidos del usuario en una consulta"""
+        catalogo = await self.get_catalogo()
+        estadisticas = await self.get_estadisticas_usuario(usuario_id)
+
+        db = await self.get_db()
+        try:
+            filas = db.execute(text("""
+                SELECT logro_id, fecha_obtenido
+                FROM usuario_logros
+                WHERE usuario_id = :usuario_id
+            """), {"usuario_id": usuario_id}).fetchall()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Error obteniendo logros del usuario: {str(e)}")
+            raise
+
+        obtenidos = {int(fila.logro_id): fila.fecha_obtenido for fila in filas}
+
+        logros = []
+        for logro in catalogo:
+            obtenido = logro["id_logro"] in obtenidos
+            logros.append(LogroUsuario(
+                id_logro=logro["id_logro"],
+                codigo_logro=logro["codigo_logro"],
+                nombre=logro["nombre"],
+                descripcion=logro["descripcion"] or "",
+                icono=logro["icono"] or "award",
+                puntos_requeridos=logro["puntos_requeridos"],
+                obtenido=obtenido,
+                fecha_obtenido=obtenidos.get(logro["id_logro"]),
+                progreso=100.0 if obtenido else self._avance(logro, estadisticas)
+            ))
+
+        # El próximo logro es el pendiente con mayor avance
+        pendientes = [l for l in logros if not l.obtenido and l.progreso is not None]
+        proximo = max(pendientes, key=lambda l: l.progreso, default=None)
+
+        return LogrosUsuarioResponse(
+            usuario_id=usuario_id,
+            total_logros_disponibles=len(logros),
+            logros_obtenidos=sum(1 for l in logros if l.obtenido),
+            logros=logros,
+            proximo_logro=proximo
+        )
+
+# Instancia singleton
+logros_service = LogrosService()
@@ -2,12 +2,15 @@
     # app/services/progreso_service.py - VERSIÓN COMPLETAMENTE CORREGIDA
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from typing import Optional
-from datetime import datetime
+from typing import Dict, List, Optional
+from datetime import date, datetime, time
 import logging
 import json
 
+from app.core.config import settings
 from app.database import get_db
+from app.services.ranking_service import ranking_service
+from app.services.logros_service import logros_service
 from app.models.progreso import (
     EstadisticaGeneral,
     EstadisticaElement,
@@ -16,7 +19,9 @@ from app.models.progreso import (
     ProgresoGeneralResponse,
     HistorialSimulacionesResponse,
     EstadisticasElementosResponse,
+    MetricaTiempo,
     RespuestaGuardado,
+    RespuestaGuardadoLote,
     ResumenProgresoResponse
 )
 
@@ -197,7 +202,8 @@ class ProgresoService:
                     tiempo_total_legible=str(data.get('tiempo_total_legible', '0h 0m')),
                     puede_guardar_progreso=bool(data.get('puede_guardar_progreso', False)),
                     es_usuario_anonimo=bool(data.get('es_usuario_anonimo', True)),
-                    posicion_ranking=int(data.get('posicion_ranking')) if data.get('posicion_ranking') else None
+                    # La posición sale del leaderboard en memoria, no de vista_ranking_usuarios
+                    posicion_ranking=await ranking_service.get_posicion(usuario_id)
                 )
                 
                 logger.info(f"✅ Resumen REAL obtenido para usuario {usuario_id}")
@@ -295,44 +301,59 @@ class ProgresoService:
                 where_clause += " AND s.estado = :estado"
                 params["estado"] = estado
             
-            # Query para el total
-            query_count = text(f"SELECT COUNT(*) as total FROM simulacion s {where_clause}")
-            total_result = db.execute(query_count, params).fetchone()
-            total_simulaciones = int(total_result.total) if total_result else 0
-            
-            # Query para las simulaciones
+            # Total y página en una sola consulta: COUNT(*) OVER() se evalúa antes del
+            # LIMIT, y los elementos solo se cuentan para las filas de la página
             query_simulaciones = text(f"""
+                WITH pagina AS (
+                    SELECT 
+                        s.id_simulacion,
+                        s.nombre,
+                        s.fecha,
+                        COALESCE(s.descripcion, 'Simulación química') as descripcion,
+                        COALESCE(s.estado, 'Completada') as estado,
+                        COALESCE(s.duracion_minutos, 30) as duracion_minutos,
+                        COALESCE(s.tipo_simulacion, 'General') as tipo_simulacion,
+                        COALESCE(s.puntos_obtenidos, 0) as puntos_obtenidos,
+                        COUNT(*) OVER() as total
+                    FROM simulacion s
+                    {where_clause}
+                    ORDER BY s.fecha DESC
+                    LIMIT :limite OFFSET :offset
+                )
                 SELECT 
-                    s.id_simulacion,
-                    s.nombre,
-                    s.fecha,
-                    COALESCE(s.descripcion, 'Simulación química') as descripcion,
-                    COALESCE(s.estado, 'Completada') as estado,
-                    COALESCE(s.duracion_minutos, 30) as duracion_minutos,
-                    COALESCE(s.tipo_simulacion, 'General') as tipo_simulacion,
-                    COALESCE(s.puntos_obtenidos, 0) as puntos_obtenidos,
-                    COUNT(se.elemento_id) as elementos_usados
-                FROM simulacion s
-                LEFT JOIN simulacion_elemento se ON s.id_simulacion = se.simulacion_id
-                {where_clause}
-                GROUP BY s.id_simulacion
-                ORDER BY s.fecha DESC
-                LIMIT :limite OFFSET :offset
+                    p.*,
+                    COALESCE(se.elementos_usados, 0) as elementos_usados,
+                    CASE 
+                        WHEN p.estado <> 'Completada' THEN NULL
+                        WHEN p.puntos_obtenidos > 0 THEN LEAST(100.0, (p.puntos_obtenidos / 50.0) * 100)
+                        ELSE LEAST(95.0, 70.0 + COALESCE(se.elementos_usados, 0) * 5)
+                    END as rendimiento
+                FROM pagina p
+                LEFT JOIN LATERAL (
+                    SELECT COUNT(*) as elementos_usados
+                    FROM simulacion_elemento
+                    WHERE simulacion_id = p.id_simulacion
+                ) se ON true
+                ORDER BY p.fecha DESC
             """)
             
             params.update({"limite": limite, "offset": offset})
             results = db.execute(query_simulaciones, params).fetchall()
             
+            if results:
+                total_simulaciones = int(results[0].total)
+            elif offset > 0:
+                # Página fuera de rango: el total no viaja en ninguna fila
+                query_count = text(f"SELECT COUNT(*) as total FROM simulacion s {where_clause}")
+                total_result = db.execute(query_count, params).fetchone()
+                total_simulaciones = int(total_result.total) if total_result else 0
+            else:
+                total_simulaciones = 0
+            
             simulaciones = []
             for row in results:
                 try:
-                    # Calcular rendimiento
-                    rendimiento = None
-                    if row.estado == 'Completada':
-                        if row.puntos_obtenidos > 0:
-                            rendimiento = min(100.0, (row.puntos_obtenidos / 50.0) * 100)
-                        else:
-                            rendimiento = min(95.0, 70.0 + (row.elementos_usados * 5))
+                    rendimiento = float(row.rendimiento) if row.rendimiento is not None else None
                     
                     simulacion = SimulacionHistorial(
                         id_simulacion=int(row.id_simulacion),
@@ -397,21 +418,23 @@ class ProgresoService:
         try:
             db = await self.get_db()
             
+            # usuario_estadisticas se mantiene por triggers: búsqueda por clave primaria
             query = text("""
                 SELECT 
-                    COALESCE(total_simulaciones, 0) as total_simulaciones,
-                    COALESCE(simulaciones_completadas, 0) as simulaciones_completadas,
-                    COALESCE(simulaciones_en_proceso, 0) as simulaciones_en_proceso,
-                    COALESCE(simulaciones_fallidas, 0) as simulaciones_fallidas,
-                    COALESCE(elementos_diferentes_usados, 0) as elementos_diferentes_usados,
-                    COALESCE(teorias_leidas, 0) as teorias_leidas,
-                    COALESCE(total_teorias_disponibles, 0) as total_teorias_disponibles,
-                    COALESCE(preguntas_ia_realizadas, 0) as preguntas_ia_realizadas,
-                    COALESCE(puntos_totales, 0) as puntos_totales,
-                    COALESCE(nivel, 'Principiante') as nivel,
-                    COALESCE(tiempo_total_simulacion_minutos, 0) as tiempo_total_simulacion_minutos
-                FROM vista_estadisticas_completas
-                WHERE id_usuario = :usuario_id
+                    COALESCE(e.total_simulaciones, 0) as total_simulaciones,
+                    COALESCE(e.simulaciones_completadas, 0) as simulaciones_completadas,
+                    COALESCE(e.simulaciones_en_proceso, 0) as simulaciones_en_proceso,
+                    COALESCE(e.simulaciones_fallidas, 0) as simulaciones_fallidas,
+                    COALESCE(e.elementos_diferentes_usados, 0) as elementos_diferentes_usados,
+                    COALESCE(e.teorias_leidas, 0) as teorias_leidas,
+                    (SELECT COUNT(*) FROM teoria WHERE activo = true) as total_teorias_disponibles,
+                    COALESCE(e.preguntas_ia_realizadas, 0) as preguntas_ia_realizadas,
+                    COALESCE(u.puntos_totales, 0) as puntos_totales,
+                    COALESCE(u.nivel, 'Principiante') as nivel,
+                    COALESCE(e.tiempo_total_simulacion_minutos, 0) as tiempo_total_simulacion_minutos
+                FROM usuario u
+                LEFT JOIN usuario_estadisticas e ON e.usuario_id = u.id_usuario
+                WHERE u.id_usuario = :usuario_id
             """)
             
             result = db.execute(query, {"usuario_id": usuario_id}).fetchone()
@@ -462,6 +485,172 @@ class ProgresoService:
                 puntuacion_total=0
             )
 
+    async def get_metricas_tiempo(
+        self,
+        usuario_id: int,
+        desde: date,
+        hasta: date,
+        bucket: str = "day"
+    ) -> List[MetricaTiempo]:
+        """Serie temporal desde el acumulado diario (una fila por día, no por evento)"""
+        try:
+            logger.info(f"📈 Obteniendo métricas ({bucket}) para usuario {usuario_id}: {desde} → {hasta}")
+            db = await self.get_db()
+
+            # bucket ya viene validado por el endpoint ('day' o 'week')
+            intervalo = "1 week" if bucket == "week" else "1 day"
+
+            query = text("""
+                WITH periodos AS (
+                    SELECT generate_series(
+                        date_trunc(:bucket, CAST(:desde AS date)),
+                        date_trunc(:bucket, CAST(:hasta AS date)),
+                        CAST(:intervalo AS interval)
+                    )::date AS periodo
+                ),
+                acumulado AS (
+                    SELECT
+                        date_trunc(:bucket, fecha)::date AS periodo,
+                        SUM(simulaciones) AS simulaciones,
+                        SUM(teorias_completadas) AS teorias_completadas,
+                        SUM(elementos_nuevos) AS elementos_nuevos
+                    FROM progreso_diario
+                    WHERE usuario_id = :usuario_id
+                      AND fecha BETWEEN :desde AND :hasta
+                    GROUP BY 1
+                )
+                SELECT
+                    p.periodo,
+                    COALESCE(a.simulaciones, 0) AS simulaciones,
+                    COALESCE(a.teorias_completadas, 0) AS teorias_completadas,
+                    COALESCE(a.elementos_nuevos, 0) AS elementos_nuevos
+                FROM periodos p
+                LEFT JOIN acumulado a ON a.periodo = p.periodo
+                ORDER BY p.periodo
+            """)
+
+            results = db.execute(query, {
+                "usuario_id": usuario_id,
+                "desde": desde,
+                "hasta": hasta,
+                "bucket": bucket,
+                "intervalo": intervalo
+            }).fetchall()
+
+            metricas = [
+                MetricaTiempo(
+                    fecha=datetime.combine(row.periodo, time.min),
+                    simulaciones=int(row.simulaciones),
+                    teorias_completadas=int(row.teorias_completadas),
+                    elementos_nuevos=int(row.elementos_nuevos)
+                )
+                for row in results
+            ]
+
+            logger.info(f"✅ Métricas obtenidas: {len(metricas)} periodos")
+            return metricas
+
+        except Exception as e:
+            if self.db_session:
+                self.db_session.rollback()
+            logger.error(f"❌ Error BD en métricas: {str(e)}")
+            return []
+
+    async def recalcular_progreso_diario(self, desde: Optional[date] = None) -> int:
+        """Reconstruir el acumulado diario desde el historial de progreso"""
+        db = await self.get_db()
+        try:
+            result = db.execute(
+                text("SELECT recalcular_progreso_diario(:desde) AS filas"),
+                {"desde": desde}
+            ).fetchone()
+            db.commit()
+            filas = int(result.filas) if result else 0
+            logger.info(f"✅ Acumulado diario recalculado: {filas} filas")
+            return filas
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Error recalculando acumulado diario: {str(e)}")
+            raise
+
+    async def recalcular_usuario_estadisticas(self, usuario_id: Optional[int] = None) -> int:
+        """Reconciliar usuario_estadisticas con las tablas base"""
+        db = await self.get_db()
+        try:
+            result = db.execute(
+                text("SELECT recalcular_usuario_estadisticas(:usuario_id) AS filas"),
+                {"usuario_id": usuario_id}
+            ).fetchone()
+            db.commit()
+            filas = int(result.filas) if result else 0
+            logger.info(f"✅ Estadísticas de usuario recalculadas: {filas} filas")
+            return filas
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Error recalculando estadísticas de usuario: {str(e)}")
+            raise
+
+    async def reconciliar_puntos_usuarios(self) -> int:
+        """Verificar en bloque los puntos acumulados contra el historial"""
+        db = await self.get_db()
+        try:
+            result = db.execute(text("SELECT reconciliar_puntos_usuarios() AS corregidos")).fetchone()
+            db.commit()
+            corregidos = int(result.corregidos) if result else 0
+            if corregidos:
+                logger.warning(f"⚠️ Puntos corregidos en {corregidos} usuarios")
+            else:
+                logger.info("✅ Puntos de usuarios consistentes con el historial")
+            return corregidos
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Error reconciliando puntos: {str(e)}")
+            raise
+
+    async def mantener_particiones_progreso(self) -> Dict[str, int]:
+        """Crear las particiones mensuales próximas y archivar las antiguas"""
+        db = await self.get_db()
+        try:
+            creadas = db.execute(
+                text("SELECT crear_particiones_progreso(:meses) AS creadas"),
+                {"meses": settings.PROGRESO_MESES_ADELANTO}
+            ).scalar()
+            archivadas = db.execute(
+                text("SELECT archivar_particiones_progreso(:meses) AS archivadas"),
+                {"meses": settings.PROGRESO_MESES_RETENCION}
+            ).scalar()
+            db.commit()
+            resultado = {"creadas": int(creadas or 0), "archivadas": int(archivadas or 0)}
+            logger.info(f"✅ Particiones de progreso: {resultado['creadas']} creadas, {resultado['archivadas']} archivadas")
+            return resultado
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Error manteniendo particiones de progreso: {str(e)}")
+            raise
+
+    async def _otorgar_logros(self, usuario_id: int) -> None:
+        """Otorgar los logros que el usuario cumple tras guardar progreso"""
+        try:
+            await logros_service.otorgar_logros(usuario_id)
+        except Exception as e:
+            # El progreso ya está guardado; el siguiente guardado o la tarea
+            # reconciliar-logros volverán a evaluar
+            logger.warning(f"⚠️ No se pudieron otorgar logros al usuario {usuario_id}: {str(e)}")
+
+    async def _actualizar_ranking(self, usuario_id: int) -> None:
+        """Llevar al leaderboard en memoria los puntos recién recalculados"""
+        try:
+            db = await self.get_db()
+            fila = db.execute(
+                text("SELECT nombre, puntos_totales, tipo_usuario FROM usuario WHERE id_usuario = :usuario_id"),
+                {"usuario_id": usuario_id}
+            ).fetchone()
+            if fila and fila.tipo_usuario == 'registrado':
+                ranking_service.actualizar(usuario_id, int(fila.puntos_totales or 0), fila.nombre)
+        except Exception as e:
+            # La reconciliación periódica corregirá el ranking
+            logger.warning(f"⚠️ No se pudo actualizar el ranking del usuario {usuario_id}: {str(e)}")
+
     async def guardar_progreso(self, usuario_id: int, progreso_data: dict) -> RespuestaGuardado:
         """Guardar progreso"""
         try:
@@ -497,6 +686,8 @@ class ProgresoService:
             }).fetchone()
             
             db.commit()
+            await self._actualizar_ranking(usuario_id)
+            await self._otorgar_logros(usuario_id)
             
             return RespuestaGuardado(
                 success=True,
@@ -510,5 +701,58 @@ class ProgresoService:
             logger.error(f"Error guardando progreso: {str(e)}")
             raise
 
+    async def guardar_progreso_lote(self, usuario_id: int, eventos: List[dict]) -> RespuestaGuardadoLote:
+        """Guardar varios eventos de progreso en una sola sentencia"""
+        try:
+            logger.info(f"💾 Guardando lote de {len(eventos)} eventos para usuario {usuario_id}")
+
+            db = await self.get_db()
+
+            # Normalizar los eventos al formato que espera registrar_progreso_lote
+            eventos_json = json.dumps([
+                {
+                    "accion": str(evento.get('accion', 'sesion_estudio')),
+                    "descripcion": str(evento.get('descripcion') or 'Progreso guardado'),
+                    "puntos": int(evento.get('puntos') or 0),
+                    "datos": evento.get('datos') or {},
+                    "sesion_id": evento.get('sesion_id'),
+                    "fecha": evento.get('fecha')
+                }
+                for evento in eventos
+            ])
+
+            query = text("""
+                SELECT registrar_progreso_lote(
+                    :usuario_id,
+                    :eventos_json::jsonb
+                ) as progreso_ids
+            """)
+
+            result = db.execute(query, {
+                "usuario_id": usuario_id,
+                "eventos_json": eventos_json
+            }).fetchone()
+
+            db.commit()
+            await self._actualizar_ranking(usuario_id)
+            await self._otorgar_logros(usuario_id)
+
+            progreso_ids = [int(i) for i in (result.progreso_ids or [])] if result else []
+
+            return RespuestaGuardadoLote(
+                success=True,
+                message=f"{len(progreso_ids)} eventos guardados exitosamente",
+                timestamp=datetime.now().isoformat(),
+                usuario_id=usuario_id,
+                eventos_guardados=len(progreso_ids),
+                progreso_ids=progreso_ids
+            )
+
+        except Exception as e:
+            if self.db_session:
+                self.db_session.rollback()
+            logger.error(f"Error guardando lote de progreso: {str(e)}")
+            raise
+
 # Instancia singleton
 progreso_service = ProgresoService()
\ No newline at end of file
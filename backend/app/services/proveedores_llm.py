@@ -0,0 +1,359 @@
+# app/services/proveedores_llm.py
+"""
+Proveedores de LLM para el chat, seleccionados con LLM_PROVEEDOR.
+
+  - "gemini": Google Gemini con el SDK google.generativeai (producción).
+  - "simulado": generador local sin red con latencia hasta el primer token,
+    velocidad de generación, longitud y tasa de errores configurables. Sirve
+    para medir concurrencia, streaming y contrapresión del chat en local
+    (benchmarks/carga_chat.py) sin coste ni dependencia de la API.
+
+Los mensajes llegan ya en formato Gemini (role user/model y parts), que es el
+que usa el resto de app/services/ia.py.
+"""
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.utils.texto import estimar_tokens
+import asyncio
+import hashlib
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+# Perfiles de generación: nombre -> parámetros de GenerationConfig
+PERFILES_GENERACION: Dict[str, Dict] = {
+    "chat": {"temperature": 0.2, "max_output_tokens": 2000},
+    "prueba": {"temperature": 0.1, "max_output_tokens": 10},
+    "resumen": {"temperature": 0.1, "max_output_tokens": 400},
+}
+
+class ErrorProveedorLLM(Exception):
+    """Fallo devuelto por el proveedor (red, cuota, error simulado...)"""
+
+@dataclass
+class RespuestaLLM:
+    texto: str
+    tokens_prompt: Optional[int] = None
+    tokens_respuesta: Optional[int] = None
+
+class ProveedorLLM(ABC):
+    """Interfaz común de los proveedores"""
+
+    nombre: str = ""
+
+    def __init__(self, system_prompt: str):
+        self.system_prompt = system_prompt
+
+    @property
+    @abstractmethod
+    def configurado(self) -> bool:
+        """¿Puede atender peticiones (p. ej. hay API key)?"""
+
+    @property
+    def modelo(self) -> str:
+        return settings.GEMINI_MODEL
+
+    @abstractmethod
+    async def generar(
+        self,
+        mensajes: List[Dict],
+        perfil: str = "chat",
+        modelo: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> RespuestaLLM:
+        """Respuesta completa; `timeout` es el plazo que queda a la petición"""
+
+    @abstractmethod
+    def generar_stream(self, mensajes: List[Dict], perfil: str = "chat", modelo: Optional[str] = None) -> AsyncIterator[str]:
+        """Chunks de texto a medida que se generan"""
+
+    @abstractmethod
+    async def sondear(self) -> None:
+        """Comprobación ligera de disponibilidad; lanza excepción si falla"""
+
+    def reintentable(self, error: BaseException) -> bool:
+        """¿Es un fallo transitorio (red, cuota, plazo) que merece otro intento?"""
+        return isinstance(error, (ErrorProveedorLLM, asyncio.TimeoutError, ConnectionError))
+
+    def iniciar(self) -> None:
+        """Tareas de fondo del proveedor (calentamiento, keep-alive)"""
+
+    async def detener(self) -> None:
+        pass
+
+# ==================== GEMINI ====================
+
+class ProveedorGemini(ProveedorLLM):
+    """
+    GenerativeModel y GenerationConfig se construyen una sola vez por
+    (modelo, perfil). El SDK comparte un único cliente gRPC por proceso, así
+    que reutilizar los modelos mantiene el canal HTTP/2 abierto: se calienta
+    al arrancar y se mantiene vivo con una llamada ligera periódica.
+    """
+
+    nombre = "gemini"
+
+    def __init__(self, system_prompt: str):
+        super().__init__(system_prompt)
+        import google.generativeai as genai
+
+        self._genai = genai
+        self._modelos: Dict[Tuple[str, str], Any] = {}
+        self._configs: Dict[str, Any] = {}
+        self._ultimo_uso = 0.0
+        self._tarea_keepalive: Optional[asyncio.Task] = None
+
+        if settings.GEMINI_API_KEY:
+            try:
+                genai.configure(api_key=settings.GEMINI_API_KEY)
+                logger.info("✅ Google Gemini configurado correctamente")
+            except Exception as e:
+                logger.error(f"❌ Error configurando Gemini: {e}")
+
+    @property
+    def configurado(self) -> bool:
+        return bool(settings.GEMINI_API_KEY)
+
+    def obtener(self, perfil: str = "chat", modelo: Optional[str] = None) -> Tuple[Any, Any]:
+        nombre = modelo or settings.GEMINI_MODEL
+        clave = (nombre, perfil)
+        if clave not in self._modelos:
+            self._modelos[clave] = self._genai.GenerativeModel(
+                model_name=nombre,
+                system_instruction=self.system_prompt,
+                generation_config=self._config(perfil)
+            )
+            logger.info(f"🧩 Modelo {nombre} creado para el perfil '{perfil}'")
+        self._ultimo_uso = time.monotonic()
+        return self._modelos[clave], self._config(perfil)
+
+    def _config(self, perfil: str):
+        if perfil not in self._configs:
+            parametros = PERFILES_GENERACION[perfil]
+            self._configs[perfil] = self._genai.types.GenerationConfig(candidate_count=1, **parametros)
+        return self._configs[perfil]
+
+    async def _enviar(
+        self,
+        mensajes: List[Dict],
+        perfil: str,
+        modelo: Optional[str],
+        stream: bool,
+        timeout: Optional[float] = None
+    ):
+        """Con historial usa un chat; con un solo mensaje, generate_content"""
+        gemini_model, generation_config = self.obtener(perfil, modelo)
+        # El plazo llega hasta la llamada gRPC: Gemini deja de generar al vencer
+        opciones = {"timeout": timeout} if timeout else None
+        if len(mensajes) > 1 and mensajes[-1]["role"] == "user":
+            chat = gemini_model.start_chat(history=mensajes[:-1])
+            return await chat.send_message_async(
+                mensajes[-1]["parts"][0]["text"],
+                generation_config=generation_config,
+                stream=stream,
+                request_options=opciones
+            )
+
+        user_message = mensajes[-1]["parts"][0]["text"] if mensajes else "Hola"
+        return await gemini_model.generate_content_async(
+            user_message,
+            generation_config=generation_config,
+            stream=stream,
+            request_options=opciones
+        )
+
+    async def generar(
+        self,
+        mensajes: List[Dict],
+        perfil: str = "chat",
+        modelo: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> RespuestaLLM:
+        response = await self._enviar(mensajes, perfil, modelo, stream=False, timeout=timeout)
+        uso = getattr(response, "usage_metadata", None)
+        return RespuestaLLM(
+            texto=response.text or "",
+            tokens_prompt=getattr(uso, "prompt_token_count", None),
+            tokens_respuesta=getattr(uso, "candidates_token_count", None)
+        )
+
+    async def generar_stream(self, mensajes: List[Dict], perfil: str = "chat", modelo: Optional[str] = None) -> AsyncIterator[str]:
+        response = await self._enviar(mensajes, perfil, modelo, stream=True)
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+    async def sondear(self) -> None:
+        """count_tokens valida clave y conectividad sin generar texto ni coste"""
+        gemini_model, _ = self.obtener("prueba")
+        await gemini_model.count_tokens_async("ping")
+
+    def reintentable(self, error: BaseException) -> bool:
+        from google.api_core import exceptions
+
+        return super().reintentable(error) or isinstance(error, (
+            exceptions.ResourceExhausted,
+            exceptions.ServiceUnavailable,
+            exceptions.DeadlineExceeded,
+            exceptions.InternalServerError,
+        ))
+
+    # ---------- Calentamiento y keep-alive ----------
+
+    async def calentar(self) -> None:
+        """Crear los modelos y abrir el canal con una llamada que no genera texto"""
+        if not self.configurado:
+            return
+        for perfil in PERFILES_GENERACION:
+            self.obtener(perfil)
+        try:
+            await self.sondear()
+            logger.info("🔥 Conexión con Gemini precalentada")
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo precalentar Gemini: {e}")
+
+    def iniciar(self) -> None:
+        if not self.configurado or self._tarea_keepalive is not None:
+            return
+        self._tarea_keepalive = asyncio.create_task(self._bucle_keepalive())
+        logger.info(f"🔁 Keep-alive de Gemini cada {settings.IA_KEEPALIVE_SEGUNDOS}s")
+
+    async def detener(self) -> None:
+        if self._tarea_keepalive is None:
+            return
+        self._tarea_keepalive.cancel()
+        try:
+            await self._tarea_keepalive
+        except asyncio.CancelledError:
+            pass
+        self._tarea_keepalive = None
+
+    async def _bucle_keepalive(self) -> None:
+        await self.calentar()
+        intervalo = max(settings.IA_KEEPALIVE_SEGUNDOS, 1)
+        while True:
+            await asyncio.sleep(intervalo)
+            # Solo hace falta si el canal lleva un rato sin tráfico real
+            if time.monotonic() - self._ultimo_uso < intervalo:
+                continue
+            try:
+                await self.sondear()
+            except Exception as e:
+                logger.warning(f"⚠️ Keep-alive de Gemini fallido: {e}")
+
+# ==================== SIMULADO ====================
+
+_VOCABULARIO_SIMULADO = (
+    "el ácido clorhídrico reacciona con el hidróxido de sodio formando cloruro de sodio y agua "
+    "en una neutralización exotérmica donde los moles de protones igualan a los de hidroxilo "
+    "la estequiometría permite calcular masas a partir de la ecuación balanceada y la masa molar "
+    "conviene usar guantes y gafas al manipular reactivos corrosivos en el laboratorio"
+).split()
+
+class ProveedorSimulado(ProveedorLLM):
+    """
+    Generador local determinista: la n-ésima llamada con la misma pregunta
+    produce siempre el mismo texto, la misma latencia y el mismo resultado de
+    error (la semilla se combina con el contenido y n), independientemente
+    del orden de llegada. Así un reintento no repite por fuerza el fallo.
+    """
+
+    nombre = "simulado"
+
+    def __init__(self, system_prompt: str):
+        super().__init__(system_prompt)
+        self._repeticiones: Dict[str, int] = {}
+
+    @property
+    def configurado(self) -> bool:
+        return True
+
+    @property
+    def modelo(self) -> str:
+        return "simulado"
+
+    def _rng(self, mensajes: List[Dict]) -> random.Random:
+        contenido = "|".join(m["parts"][0]["text"] for m in mensajes)
+        clave = hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+        if len(self._repeticiones) > 100_000:
+            self._repeticiones.clear()
+        repeticion = self._repeticiones.get(clave, 0)
+        self._repeticiones[clave] = repeticion + 1
+        huella = hashlib.sha256(f"{settings.SIMULADO_SEMILLA}|{repeticion}|{clave}".encode("utf-8")).digest()
+        return random.Random(int.from_bytes(huella[:8], "big"))
+
+    @staticmethod
+    def _variar(valor: float, rng: random.Random) -> float:
+        return max(valor * (1 + rng.uniform(-settings.SIMULADO_JITTER, settings.SIMULADO_JITTER)), 0.0)
+
+    def _plan(self, mensajes: List[Dict], perfil: str) -> Tuple[random.Random, List[str], float, float]:
+        """Tokens a emitir, espera hasta el primero y espera por token"""
+        rng = self._rng(mensajes)
+        if rng.random() < settings.SIMULADO_TASA_ERROR:
+            raise ErrorProveedorLLM("Error simulado del proveedor (503 UNAVAILABLE)")
+
+        maximo = PERFILES_GENERACION[perfil]["max_output_tokens"]
+        total = min(max(int(self._variar(settings.SIMULADO_TOKENS_RESPUESTA, rng)), 1), maximo)
+        inicio = rng.randrange(len(_VOCABULARIO_SIMULADO))
+        tokens = [
+            _VOCABULARIO_SIMULADO[(inicio + i) % len(_VOCABULARIO_SIMULADO)]
+            for i in range(total)
+        ]
+        ttft = self._variar(settings.SIMULADO_TTFT_MS, rng) / 1000
+        por_token = 1 / max(self._variar(settings.SIMULADO_TOKENS_POR_SEGUNDO, rng), 1e-3)
+        return rng, tokens, ttft, por_token
+
+    async def generar(
+        self,
+        mensajes: List[Dict],
+        perfil: str = "chat",
+        modelo: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> RespuestaLLM:
+        _, tokens, ttft, por_token = self._plan(mensajes, perfil)
+        if timeout is not None and ttft + por_token * len(tokens) > timeout:
+            await asyncio.sleep(timeout)
+            raise asyncio.TimeoutError(f"Plazo de {timeout:.1f}s agotado")
+        await asyncio.sleep(ttft + por_token * len(tokens))
+        return RespuestaLLM(
+            texto=" ".join(tokens),
+            tokens_prompt=sum(estimar_tokens(m["parts"][0]["text"]) for m in mensajes),
+            tokens_respuesta=len(tokens)
+        )
+
+    async def generar_stream(self, mensajes: List[Dict], perfil: str = "chat", modelo: Optional[str] = None) -> AsyncIterator[str]:
+        rng, tokens, ttft, por_token = self._plan(mensajes, perfil)
+        await asyncio.sleep(ttft)
+        tamano = max(settings.SIMULADO_TOKENS_POR_CHUNK, 1)
+        for inicio in range(0, len(tokens), tamano):
+            if inicio:
+                await asyncio.sleep(por_token * tamano)
+                # Los errores también pueden llegar a mitad del stream
+                if rng.random() < settings.SIMULADO_TASA_ERROR / 10:
+                    raise ErrorProveedorLLM("Stream simulado interrumpido")
+            yield (" " if inicio else "") + " ".join(tokens[inicio:inicio + tamano])
+
+    async def sondear(self) -> None:
+        await asyncio.sleep(0)
+
+# ==================== SELECCIÓN ====================
+
+PROVEEDORES = {
+    ProveedorGemini.nombre: ProveedorGemini,
+    ProveedorSimulado.nombre: ProveedorSimulado,
+}
+
+def crear_proveedor(system_prompt: str) -> ProveedorLLM:
+    """Instancia del proveedor indicado en LLM_PROVEEDOR"""
+    nombre = settings.LLM_PROVEEDOR.strip().lower()
+    clase = PROVEEDORES.get(nombre)
+    if clase is None:
+        raise ValueError(f"LLM_PROVEEDOR desconocido: {settings.LLM_PROVEEDOR} (opciones: {', '.join(PROVEEDORES)})")
+    if clase is not ProveedorGemini:
+        logger.warning(f"🧪 Chat usando el proveedor '{nombre}': las respuestas no son reales")
+    return clase(system_prompt)
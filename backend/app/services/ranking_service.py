@@ -0,0 +1,204 @@
+# app/services/ranking_service.py
+"""
+Leaderboard en memoria para RankingUsuario.
+
+Mantiene los puntos de los usuarios registrados en una lista ordenada, de modo
+que la posición de un usuario, el top N y el percentil se resuelven con búsqueda
+binaria en lugar de ordenar a todos los usuarios en cada petición (como hacía
+vista_ranking_usuarios). Se actualiza al guardar progreso y una tarea de fondo
+lo reconstruye cada RANKING_RECONCILIAR_MINUTOS desde la tabla usuario, así
+ninguna petición paga el recorrido completo (salvo la primera si la tarea aún
+no ha cargado nada).
+
+Cada worker tiene su propia lista: actualizar() solo ve el progreso guardado
+en ese proceso, de modo que con varios workers la posición de un usuario puede
+ir por detrás de la BD hasta la siguiente reconciliación.
+
+La lista ordenada se busca en O(log n), pero insertar o quitar una entrada
+desplaza el resto (O(n) con un memmove). Con decenas de miles de usuarios eso
+son microsegundos por cambio de puntos, bastante menos que la escritura en BD
+que lo provoca, así que se prefiere a un árbol indexado más complejo.
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+from bisect import bisect_left, insort
+import asyncio
+import logging
+
+from app.core.config import settings
+from app.database import get_db
+from app.models.progreso import EntradaLeaderboard, LeaderboardResponse, RankingUsuario
+
+logger = logging.getLogger(__name__)
+
+# Mismos umbrales que calcular_puntos_usuario() en la BD
+UMBRALES_NIVEL = [(2000, "Experto"), (1000, "Avanzado"), (500, "Intermedio"), (0, "Principiante")]
+
+class RankingService:
+    def __init__(self):
+        self.db_session = None
+        # Entradas (-puntos, usuario_id): orden descendente por puntos y desempate estable
+        self._orden: List[Tuple[int, int]] = []
+        self._puntos: Dict[int, int] = {}
+        self._nombres: Dict[int, str] = {}
+        self._suma_puntos = 0
+        self._ultima_reconciliacion: Optional[datetime] = None
+        self._tarea: Optional[asyncio.Task] = None
+        # La sesión no admite dos consultas a la vez desde hilos distintos
+        self._cerrojo_reconciliacion = asyncio.Lock()
+
+    async def get_db(self) -> Session:
+        """Obtener sesión de base de datos"""
+        if not self.db_session:
+            self.db_session = next(get_db())
+        return self.db_session
+
+    def _nivel(self, puntos: int) -> str:
+        """Nivel correspondiente a una cantidad de puntos"""
+        for umbral, nivel in UMBRALES_NIVEL:
+            if puntos >= umbral:
+                return nivel
+        return "Principiante"
+
+    # ==================== MANTENIMIENTO ====================
+
+    def _leer_usuarios(self, db: Session) -> List:
+        """Consulta completa de puntos (bloqueante, se ejecuta en un hilo)"""
+        try:
+            return db.execute(text("""
+                SELECT id_usuario, nombre, puntos_totales
+                FROM usuario
+                WHERE tipo_usuario = 'registrado' AND puntos_totales > 0
+            """)).fetchall()
+        except Exception:
+            db.rollback()
+            raise
+
+    async def reconciliar(self) -> int:
+        """Reconstruir el leaderboard completo desde la tabla usuario"""
+        db = await self.get_db()
+        async with self._cerrojo_reconciliacion:
+            try:
+                # Fuera del event loop: recorre toda la tabla usuario
+                filas = await asyncio.to_thread(self._leer_usuarios, db)
+            except Exception as e:
+                logger.error(f"❌ Error reconciliando ranking: {str(e)}")
+                raise
+
+        self._puntos = {int(f.id_usuario): int(f.puntos_totales) for f in filas}
+        self._nombres = {int(f.id_usuario): f.nombre or f"Usuario {f.id_usuario}" for f in filas}
+        self._orden = sorted((-puntos, usuario_id) for usuario_id, puntos in self._puntos.items())
+        self._suma_puntos = sum(self._puntos.values())
+        self._ultima_reconciliacion = datetime.now()
+
+        logger.info(f"🏆 Ranking reconciliado: {len(self._orden)} usuarios")
+        return len(self._orden)
+
+    async def _asegurar_vigente(self) -> None:
+        """Cargar si nunca se cargó; el refresco periódico es cosa de la tarea de fondo"""
+        if self._ultima_reconciliacion is None:
+            await self.reconciliar()
+
+    async def _bucle_reconciliacion(self) -> None:
+        """Reconciliar al arrancar y después cada RANKING_RECONCILIAR_MINUTOS"""
+        intervalo = timedelta(minutes=max(settings.RANKING_RECONCILIAR_MINUTOS, 1)).total_seconds()
+        while True:
+            try:
+                await self.reconciliar()
+            except Exception:
+                # Ya registrado en reconciliar(); se reintenta en el siguiente ciclo
+                pass
+            await asyncio.sleep(intervalo)
+
+    def iniciar_reconciliacion_periodica(self) -> None:
+        """Arrancar la tarea de reconciliación (llamar en el startup de la app)"""
+        if self._tarea is None or self._tarea.done():
+            self._tarea = asyncio.create_task(self._bucle_reconciliacion())
+            logger.info(f"🏆 Reconciliación del ranking cada {settings.RANKING_RECONCILIAR_MINUTOS} min")
+
+    async def detener_reconciliacion_periodica(self) -> None:
+        """Detener la tarea de reconciliación (llamar en el shutdown)"""
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+
+    def actualizar(self, usuario_id: int, puntos: int, nombre: Optional[str] = None) -> None:
+        """Registrar los puntos actuales de un usuario (búsqueda O(log n), inserción O(n))"""
+        anterior = self._puntos.pop(usuario_id, None)
+        if anterior is not None:
+            indice = bisect_left(self._orden, (-anterior, usuario_id))
+            if indice < len(self._orden) and self._orden[indice] == (-anterior, usuario_id):
+                del self._orden[indice]
+            self._suma_puntos -= anterior
+
+        if nombre:
+            self._nombres[usuario_id] = nombre
+
+        # Igual que la vista: solo usuarios con puntos
+        if puntos > 0:
+            insort(self._orden, (-puntos, usuario_id))
+            self._puntos[usuario_id] = puntos
+            self._suma_puntos += puntos
+            self._nombres.setdefault(usuario_id, f"Usuario {usuario_id}")
+
+    # ==================== CONSULTAS ====================
+
+    def _posicion(self, puntos: int) -> int:
+        """Posición con empates (RANK): usuarios con más puntos + 1"""
+        return bisect_left(self._orden, (-puntos, 0)) + 1
+
+    async def get_posicion(self, usuario_id: int) -> Optional[int]:
+        """Posición del usuario o None si no participa en el ranking"""
+        await self._asegurar_vigente()
+        puntos = self._puntos.get(usuario_id)
+        return self._posicion(puntos) if puntos is not None else None
+
+    async def get_ranking_usuario(self, usuario_id: int) -> Optional[RankingUsuario]:
+        """Posición, percentil y promedio para un usuario"""
+        await self._asegurar_vigente()
+        puntos = self._puntos.get(usuario_id)
+        if puntos is None:
+            return None
+
+        total = len(self._orden)
+        posicion = self._posicion(puntos)
+        return RankingUsuario(
+            posicion=posicion,
+            total_usuarios=total,
+            porcentaje_superior=round(posicion / total * 100, 2),
+            puntuacion_usuario=puntos,
+            puntuacion_promedio=round(self._suma_puntos / total, 2)
+        )
+
+    async def get_leaderboard(self, limite: int = 10) -> LeaderboardResponse:
+        """Top N usuarios por puntos"""
+        await self._asegurar_vigente()
+        total = len(self._orden)
+
+        usuarios = []
+        for neg_puntos, usuario_id in self._orden[:limite]:
+            puntos = -neg_puntos
+            usuarios.append(EntradaLeaderboard(
+                posicion=self._posicion(puntos),
+                usuario_id=usuario_id,
+                nombre=self._nombres.get(usuario_id, f"Usuario {usuario_id}"),
+                puntos=puntos,
+                nivel=self._nivel(puntos)
+            ))
+
+        return LeaderboardResponse(
+            total_usuarios=total,
+            puntuacion_promedio=round(self._suma_puntos / total, 2) if total else 0.0,
+            usuarios=usuarios,
+            fecha_actualizacion=self._ultima_reconciliacion or datetime.now()
+        )
+
+# Instancia singleton
+ranking_service = RankingService()
@@ -0,0 +1,347 @@
+# app/services/recuperacion_service.py
+"""
+Recuperación de pasajes de teoría para el chat (BM25 en memoria).
+
+El contenido de cada teoría se parte en pasajes de unos cientos de
+caracteres y se indexa con BM25. El índice invertido se guarda en formato
+CSR con arreglos NumPy (indptr / pasajes / frecuencias por término), así que
+puntuar una consulta es sumar unas pocas rebanadas de arreglos, sin recorrer
+los documentos.
+
+El índice se reconstruye cuando el CRUD de teoría avisa de un cambio y,
+para cambios hechos fuera de la API (seed_teoria.py, SQL manual), cuando la
+firma de la tabla (recuento, id máximo y tamaño total) deja de coincidir.
+
+La confianza de un resultado es su puntuación dividida entre la máxima
+alcanzable por la consulta (todos los términos presentes con frecuencia
+alta), un valor en [0, 1) comparable entre consultas.
+"""
+
+from sqlalchemy import text
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass
+import asyncio
+import logging
+import re
+import threading
+import time
+
+import numpy as np
+
+from app.core.config import settings
+from app.utils.texto import normalizar_busqueda
+
+logger = logging.getLogger(__name__)
+
+# Parámetros estándar de BM25
+K1 = 1.5
+B = 0.75
+
+# Tamaño objetivo de un pasaje (caracteres)
+TAMANO_PASAJE = 700
+
+# El título cuenta como si apareciera este número de veces en cada pasaje
+PESO_TITULO = 2
+
+# Segundo resultado (de otra teoría) por encima de esta fracción del primero = ambiguo
+MARGEN_AMBIGUEDAD = 0.85
+
+STOPWORDS = {
+    "a", "al", "algo", "como", "con", "cual", "cuales", "cuando", "de", "del", "define",
+    "definicion", "dime", "donde", "el", "ella", "en", "entre", "es", "esa", "ese", "eso",
+    "esta", "este", "esto", "explica", "explicame", "hay", "la", "las", "le", "lo", "los",
+    "mas", "me", "mi", "muy", "o", "para", "pero", "por", "porque", "puedes", "que", "quien",
+    "se", "ser", "si", "sin", "sobre", "son", "su", "sus", "te", "tu", "un", "una", "uno",
+    "unos", "unas", "y", "ya", "significa", "funciona", "sirve",
+}
+
+_PALABRA = re.compile(r"[a-z0-9]+")
+
+_VOCALES = "aeiou"
+
+# Plurales en -ces cuyo singular termina en -z (el resto, como enlaces o
+# índices, vienen de un singular en -ce)
+_PLURALES_EN_Z = {
+    "luces", "voces", "veces", "peces", "cruces", "raices", "matrices", "nueces",
+    "lapices", "narices", "cicatrices", "acideces", "capaces", "eficaces", "veloces",
+}
+
+# Singular en -e aunque encajen en las reglas de -es (bases, aires...)
+_PLURALES_EN_E = {"bases", "fases", "clases", "frases", "aires", "viajes", "sedes"}
+
+def _singular(palabra: str) -> str:
+    """
+    Plurales regulares: ácidos -> acido, enlaces -> enlace, luces -> luz,
+    gases -> gas, leyes -> ley, electrones -> electron, redes -> red
+    """
+    if len(palabra) <= 3 or not palabra.endswith("s"):
+        return palabra
+    if palabra in _PLURALES_EN_Z:
+        return palabra[:-3] + "z"
+    if palabra in _PLURALES_EN_E:
+        return palabra[:-1]
+    if palabra.endswith("es"):
+        anterior = palabra[-3]
+        # gas -> gases, ley -> leyes
+        if anterior in "syz":
+            return palabra[:-2]
+        # metal -> metales, electron -> electrones, red -> redes; tras grupo
+        # consonántico (verdes, dobles) o -ides (coloides) el singular acaba en -e
+        if anterior in "lnr" and palabra[-4] in _VOCALES:
+            return palabra[:-2]
+        if anterior == "d" and palabra[-4] in "aeu":
+            return palabra[:-2]
+    return palabra[:-1]
+
+def tokenizar(texto: str) -> List[str]:
+    """Minúsculas, sin tildes ni stopwords y en singular"""
+    return [
+        _singular(palabra)
+        for palabra in _PALABRA.findall(normalizar_busqueda(texto))
+        if palabra not in STOPWORDS and len(palabra) >= 2
+    ]
+
+def partir_pasajes(contenido: str) -> List[str]:
+    """Párrafos agrupados hasta ~TAMANO_PASAJE; los muy largos se parten por frases"""
+    piezas: List[str] = []
+    for parrafo in re.split(r"\n\s*\n", contenido.strip()):
+        parrafo = parrafo.strip()
+        if len(parrafo) <= TAMANO_PASAJE:
+            if parrafo:
+                piezas.append(parrafo)
+            continue
+        actual = ""
+        for frase in re.split(r"(?<=[.!?])\s+", parrafo):
+            if actual and len(actual) + len(frase) > TAMANO_PASAJE:
+                piezas.append(actual)
+                actual = ""
+            actual = f"{actual} {frase}".strip()
+        if actual:
+            piezas.append(actual)
+
+    pasajes: List[str] = []
+    for pieza in piezas:
+        if pasajes and len(pasajes[-1]) + len(pieza) < TAMANO_PASAJE // 2:
+            pasajes[-1] = f"{pasajes[-1]}\n\n{pieza}"
+        else:
+            pasajes.append(pieza)
+    return pasajes
+
+@dataclass
+class Pasaje:
+    teoria_id: int
+    titulo: str
+    categoria: str
+    texto: str
+
+@dataclass
+class ResultadoRecuperacion:
+    pasaje: Pasaje
+    puntuacion: float
+    confianza: float
+
+class _IndiceBM25:
+    """Índice invertido inmutable; se sustituye entero al reconstruir"""
+
+    def __init__(self, pasajes: List[Pasaje]):
+        self.pasajes = pasajes
+        vocabulario: Dict[str, int] = {}
+        filas: List[int] = []
+        columnas: List[int] = []
+        longitudes = np.zeros(len(pasajes), dtype=np.float32)
+
+        for indice, pasaje in enumerate(pasajes):
+            tokens = tokenizar(pasaje.texto) + tokenizar(pasaje.titulo) * PESO_TITULO
+            longitudes[indice] = len(tokens)
+            for token in tokens:
+                columnas.append(vocabulario.setdefault(token, len(vocabulario)))
+                filas.append(indice)
+
+        self.vocabulario = vocabulario
+        self.longitudes = longitudes
+        self.longitud_media = float(longitudes.mean()) if len(pasajes) else 0.0
+
+        # Ordenar por (término, pasaje) y contar repeticiones -> CSR por término
+        terminos = np.asarray(columnas, dtype=np.int64)
+        documentos = np.asarray(filas, dtype=np.int64)
+        clave = terminos * max(len(pasajes), 1) + documentos
+        unicas, frecuencias = np.unique(clave, return_counts=True)
+        terminos_unicos = unicas // max(len(pasajes), 1)
+
+        self.pasaje_ids = (unicas % max(len(pasajes), 1)).astype(np.int32)
+        self.frecuencias = frecuencias.astype(np.float32)
+        self.indptr = np.zeros(len(vocabulario) + 1, dtype=np.int64)
+        np.add.at(self.indptr, terminos_unicos + 1, 1)
+        np.cumsum(self.indptr, out=self.indptr)
+
+        df = np.diff(self.indptr).astype(np.float32)
+        n = float(len(pasajes))
+        self.idf = np.log1p((n - df + 0.5) / (df + 0.5))
+
+    def buscar(self, consulta: str, limite: int) -> List[ResultadoRecuperacion]:
+        ids = sorted({self.vocabulario[t] for t in tokenizar(consulta) if t in self.vocabulario})
+        if not ids or not self.pasajes:
+            return []
+
+        puntuaciones = np.zeros(len(self.pasajes), dtype=np.float32)
+        normalizacion = K1 * (1 - B + B * self.longitudes / max(self.longitud_media, 1e-6))
+        for termino in ids:
+            inicio, fin = self.indptr[termino], self.indptr[termino + 1]
+            pasajes = self.pasaje_ids[inicio:fin]
+            tf = self.frecuencias[inicio:fin]
+            puntuaciones[pasajes] += self.idf[termino] * tf * (K1 + 1) / (tf + normalizacion[pasajes])
+
+        # Cota superior: todos los términos de la consulta (incluidos los que
+        # no están en el índice, con el idf de un término no visto)
+        terminos_consulta = set(tokenizar(consulta))
+        idf_ausente = float(np.log1p((len(self.pasajes) + 0.5) / 0.5))
+        maximo = (K1 + 1) * (
+            float(self.idf[ids].sum()) + idf_ausente * (len(terminos_consulta) - len(ids))
+        )
+
+        limite = min(limite, len(self.pasajes))
+        mejores = np.argpartition(-puntuaciones, limite - 1)[:limite]
+        mejores = mejores[np.argsort(-puntuaciones[mejores])]
+        return [
+            ResultadoRecuperacion(self.pasajes[i], float(puntuaciones[i]), float(puntuaciones[i]) / maximo)
+            for i in mejores if puntuaciones[i] > 0
+        ]
+
+class RecuperacionService:
+    def __init__(self):
+        self._indice: Optional[_IndiceBM25] = None
+        self._firma: Optional[Tuple] = None
+        self._desactualizado = True
+        self._verificado = 0.0
+        self._lock = threading.Lock()
+
+    # ==================== CONSTRUCCIÓN ====================
+
+    @staticmethod
+    def _firma_tabla(db) -> Tuple:
+        fila = db.execute(text("""
+            SELECT COUNT(*), COALESCE(MAX(id_teoria), 0),
+                   COALESCE(SUM(length(titulo) + length(contenido)), 0)
+            FROM teoria
+        """)).fetchone()
+        return tuple(fila)
+
+    def _construir(self) -> None:
+        from app.database import SessionLocal
+
+        if SessionLocal is None:
+            return
+        db = SessionLocal()
+        try:
+            firma = self._firma_tabla(db)
+            if not self._desactualizado and firma == self._firma:
+                return
+            filas = db.execute(text("""
+                SELECT id_teoria, titulo, categoria, contenido
+                FROM teoria
+                ORDER BY id_teoria
+            """)).fetchall()
+        finally:
+            db.close()
+
+        inicio = time.monotonic()
+        pasajes = [
+            Pasaje(fila.id_teoria, fila.titulo, fila.categoria, texto)
+            for fila in filas
+            for texto in partir_pasajes(fila.contenido or "")
+        ]
+        self._indice = _IndiceBM25(pasajes)
+        self._firma = firma
+        self._desactualizado = False
+        logger.info(
+            f"📚 Índice de teoría construido: {len(filas)} teorías, {len(pasajes)} pasajes, "
+            f"{len(self._indice.vocabulario)} términos en {(time.monotonic() - inicio) * 1000:.0f} ms"
+        )
+
+    def _asegurar_indice(self) -> Optional[_IndiceBM25]:
+        """Reconstruir si se marcó como desactualizado o cambió la firma de la tabla"""
+        ahora = time.monotonic()
+        verificar = ahora - self._verificado >= settings.IA_RAG_VERIFICAR_MINUTOS * 60
+        if self._indice is not None and not self._desactualizado and not verificar:
+            return self._indice
+
+        with self._lock:
+            try:
+                self._verificado = ahora
+                self._construir()
+            except Exception as e:
+                logger.error(f"❌ Error construyendo el índice de teoría: {e}")
+        return self._indice
+
+    def iniciar_precarga(self) -> None:
+        """Construir el índice al arrancar, fuera del camino de la primera pregunta"""
+        if settings.IA_RAG_ACTIVO:
+            asyncio.get_running_loop().run_in_executor(None, self._asegurar_indice)
+
+    def marcar_desactualizado(self) -> None:
+        """Llamado por el CRUD de teoría tras crear, actualizar o borrar"""
+        self._desactualizado = True
+
+    # ==================== CONSULTAS ====================
+
+    async def buscar(self, consulta: str, limite: Optional[int] = None) -> List[ResultadoRecuperacion]:
+        """Mejores pasajes; la (re)construcción va a un hilo para no bloquear el bucle"""
+        if not settings.IA_RAG_ACTIVO:
+            return []
+        indice = self._indice
+        if indice is None or self._desactualizado or \
+                time.monotonic() - self._verificado >= settings.IA_RAG_VERIFICAR_MINUTOS * 60:
+            indice = await asyncio.to_thread(self._asegurar_indice)
+        if indice is None:
+            return []
+        return indice.buscar(consulta, limite or settings.IA_RAG_PASAJES)
+
+    async def contexto(self, consulta: str) -> Optional[str]:
+        """Bloque de contexto para el prompt con los pasajes pertinentes"""
+        resultados = [
+            r for r in await self.buscar(consulta)
+            if r.confianza >= settings.IA_RAG_UMBRAL_CONTEXTO
+        ]
+        if not resultados:
+            return None
+        bloques = [
+            f"[{i}] {r.pasaje.titulo} ({r.pasaje.categoria})\n{r.pasaje.texto}"
+            for i, r in enumerate(resultados, 1)
+        ]
+        return "\n\n".join(bloques)
+
+    async def respuesta_directa(self, consulta: str) -> Optional[str]:
+        """
+        Respuesta compuesta solo con teoría cuando el mejor pasaje cubre la
+        pregunta con confianza alta; None si hay que preguntar a Gemini.
+        """
+        if not settings.IA_RAG_RESPUESTA_DIRECTA or len(set(tokenizar(consulta))) < 2:
+            return None
+        resultados = await self.buscar(consulta, 2)
+        if not resultados or resultados[0].confianza < settings.IA_RAG_UMBRAL_RESPUESTA:
+            return None
+
+        mejor = resultados[0]
+        # Si otra teoría puntúa casi igual, la pregunta es ambigua
+        if len(resultados) > 1 and resultados[1].pasaje.teoria_id != mejor.pasaje.teoria_id \
+                and resultados[1].confianza >= mejor.confianza * MARGEN_AMBIGUEDAD:
+            return None
+
+        logger.info(f"📚 Respuesta desde la teoría '{mejor.pasaje.titulo}' (confianza {mejor.confianza:.2f})")
+        return (
+            f"{mejor.pasaje.texto}\n\n"
+            f"📖 *Fuente: teoría «{mejor.pasaje.titulo}» ({mejor.pasaje.categoria}). "
+            "Si necesitas más detalle, pregúntame sobre un punto concreto.*"
+        )
+
+    def estado(self) -> Dict:
+        indice = self._indice
+        return {
+            "activo": settings.IA_RAG_ACTIVO,
+            "pasajes": len(indice.pasajes) if indice else 0,
+            "terminos": len(indice.vocabulario) if indice else 0,
+            "desactualizado": self._desactualizado
+        }
+
+# Instancia singleton
+recuperacion_service = RecuperacionService()
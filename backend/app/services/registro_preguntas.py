@@ -0,0 +1,268 @@
+# app/services/registro_preguntas.py
+"""
+Registro en segundo plano de las preguntas del chat en preguntas_ia.
+
+Los endpoints solo encolan (pregunta, respuesta, usuario) en memoria; una
+tarea de fondo inserta los registros en lote cada PREGUNTAS_IA_TAMANO_LOTE
+registros o cada PREGUNTAS_IA_INTERVALO_SEGUNDOS, lo que llegue antes. Si el
+usuario existe se añade además un evento 'pregunta_ia' en progreso (con sus
+puntos, de donde salen también las estadísticas preguntas_ia_realizadas) y,
+tras cada lote, se evalúan los logros de los usuarios afectados.
+
+La cola está acotada y registrar() nunca espera: con la cola llena (o si la
+BD falla) los registros se guardan en un archivo JSONL de desborde
+(PREGUNTAS_IA_RUTA_DESBORDE) que se reinserta cuando la BD vuelve a
+responder; sin archivo configurado se descartan y se cuentan.
+"""
+
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Deque, Dict, List, Optional
+from sqlalchemy import text
+from app.core.config import settings
+from app.services.logros_service import logros_service
+import asyncio
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class RegistroPreguntas:
+    """Cola acotada y escritura masiva de preguntas del chat"""
+
+    def __init__(self, max_en_cola: int, tamano_lote: int, intervalo_segundos: float, ruta_desborde: str = ""):
+        self.max_en_cola = max(max_en_cola, 1)
+        self.tamano_lote = max(tamano_lote, 1)
+        self.intervalo_segundos = max(intervalo_segundos, 0.1)
+        self.ruta_desborde = Path(ruta_desborde) if ruta_desborde else None
+        self._cola: Deque[Dict] = deque()
+        # Registros que no cupieron en la cola; la tarea de fondo los pasa a disco
+        self._desborde: Deque[Dict] = deque()
+        self._hay_datos: Optional[asyncio.Event] = None
+        self._tarea: Optional[asyncio.Task] = None
+        self.encolados = 0
+        self.escritos = 0
+        self.desbordados = 0
+        self.descartados = 0
+        self.lotes_fallidos = 0
+        self._ultimo_lote_ms = 0.0
+
+    # ---------- Entrada desde los endpoints (nunca bloquea) ----------
+
+    def registrar(self, pregunta: str, respuesta: str, usuario_id: Optional[int] = None) -> None:
+        if not settings.PREGUNTAS_IA_REGISTRAR or not pregunta or not respuesta:
+            return
+
+        registro = {
+            "usuario_id": usuario_id,
+            "pregunta": pregunta,
+            "respuesta": respuesta,
+            "fecha": datetime.now().isoformat()
+        }
+        if len(self._cola) < self.max_en_cola:
+            self._cola.append(registro)
+            self.encolados += 1
+            if len(self._cola) >= self.tamano_lote and self._hay_datos is not None:
+                self._hay_datos.set()
+        elif self.ruta_desborde is not None and len(self._desborde) < self.max_en_cola:
+            self._desborde.append(registro)
+            self.desbordados += 1
+            if self._hay_datos is not None:
+                self._hay_datos.set()
+        else:
+            self.descartados += 1
+            if self.descartados % 100 == 1:
+                logger.warning(f"⚠️ Cola de preguntas llena: {self.descartados} registros descartados")
+
+    # ---------- Escritura en la BD ----------
+
+    @staticmethod
+    def _insertar(registros: List[Dict]) -> List[int]:
+        """
+        Un INSERT por lote; se ejecuta en un hilo para no ocupar el event loop.
+        Devuelve los usuarios con eventos nuevos.
+        """
+        from app.database import SessionLocal
+
+        if SessionLocal is None:
+            raise RuntimeError("Base de datos no configurada")
+
+        db = SessionLocal()
+        try:
+            # usuario_id desconocido se guarda como NULL en lugar de romper el lote por la FK
+            filas = db.execute(text("""
+                WITH lote AS (
+                    SELECT r.pregunta, r.respuesta, r.fecha, u.id_usuario AS usuario_id
+                    FROM jsonb_to_recordset(CAST(:lote AS jsonb)) AS r(
+                        usuario_id INTEGER,
+                        pregunta TEXT,
+                        respuesta TEXT,
+                        fecha TIMESTAMP
+                    )
+                    LEFT JOIN usuario u ON u.id_usuario = r.usuario_id
+                ),
+                preguntas AS (
+                    INSERT INTO preguntas_ia (usuario_id, pregunta, respuesta, fecha)
+                    SELECT usuario_id, pregunta, respuesta, fecha
+                    FROM lote
+                )
+                INSERT INTO progreso (usuario_id, tipo_evento, descripcion, puntos_ganados, fecha_evento)
+                SELECT usuario_id, 'pregunta_ia', LEFT(pregunta, 200), puntos_evento('pregunta_ia', NULL), fecha
+                FROM lote
+                WHERE usuario_id IS NOT NULL
+                RETURNING usuario_id
+            """), {"lote": json.dumps(registros, ensure_ascii=False)})
+            usuarios = sorted({int(fila.usuario_id) for fila in filas})
+            db.commit()
+            return usuarios
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def _escribir(self, registros: List[Dict]) -> bool:
+        """Insertar en lotes; lo que falle pasa al archivo de desborde"""
+        for desde in range(0, len(registros), self.tamano_lote):
+            lote = registros[desde:desde + self.tamano_lote]
+            inicio = time.monotonic()
+            try:
+                usuarios = await asyncio.to_thread(self._insertar, lote)
+            except Exception as e:
+                self.lotes_fallidos += 1
+                logger.error(f"❌ Error guardando {len(lote)} preguntas del chat: {e}")
+                pendientes = registros[desde:]
+                if self.ruta_desborde is not None:
+                    await asyncio.to_thread(self._a_disco, pendientes)
+                    self.desbordados += len(pendientes)
+                else:
+                    self.descartados += len(pendientes)
+                return False
+            self.escritos += len(lote)
+            self._ultimo_lote_ms = (time.monotonic() - inicio) * 1000
+            await self._otorgar_logros(usuarios)
+        return True
+
+    async def _otorgar_logros(self, usuarios: List[int]) -> None:
+        """Logros como PREGUNTADOR_CURIOSO para los usuarios del lote ya guardado"""
+        for usuario_id in usuarios:
+            try:
+                await logros_service.otorgar_logros(usuario_id)
+            except Exception as e:
+                # Las preguntas ya están guardadas; el siguiente lote del usuario vuelve a evaluar
+                logger.warning(f"⚠️ No se pudieron otorgar logros al usuario {usuario_id}: {e}")
+
+    # ---------- Archivo de desborde ----------
+
+    def _a_disco(self, registros: List[Dict]) -> None:
+        try:
+            self.ruta_desborde.parent.mkdir(parents=True, exist_ok=True)
+            with self.ruta_desborde.open("a", encoding="utf-8") as archivo:
+                for registro in registros:
+                    archivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        except Exception as e:
+            self.descartados += len(registros)
+            logger.error(f"❌ No se pudo escribir el desborde de preguntas: {e}")
+
+    def _leer_disco(self) -> List[Dict]:
+        """Vaciar el archivo de desborde (se renombra antes de leerlo)"""
+        if self.ruta_desborde is None or not self.ruta_desborde.exists():
+            return []
+        procesando = self.ruta_desborde.with_suffix(self.ruta_desborde.suffix + ".procesando")
+        self.ruta_desborde.replace(procesando)
+        registros = []
+        with procesando.open(encoding="utf-8") as archivo:
+            for linea in archivo:
+                try:
+                    registros.append(json.loads(linea))
+                except ValueError:
+                    # Línea cortada por una parada brusca
+                    continue
+        procesando.unlink()
+        return registros
+
+    async def _recuperar_disco(self) -> None:
+        try:
+            registros = await asyncio.to_thread(self._leer_disco)
+        except Exception as e:
+            logger.error(f"❌ No se pudo leer el desborde de preguntas: {e}")
+            return
+        if registros:
+            logger.info(f"📥 Reinsertando {len(registros)} preguntas del archivo de desborde")
+            await self._escribir(registros)
+
+    # ---------- Tarea de fondo ----------
+
+    def _sacar(self, cola: Deque[Dict]) -> List[Dict]:
+        registros = list(cola)
+        cola.clear()
+        return registros
+
+    async def volcar(self) -> None:
+        """Escribir lo encolado y pasar a disco lo desbordado"""
+        if self._desborde:
+            await asyncio.to_thread(self._a_disco, self._sacar(self._desborde))
+        if self._cola and await self._escribir(self._sacar(self._cola)):
+            # La BD responde: buen momento para reinsertar lo desbordado
+            await self._recuperar_disco()
+
+    async def _bucle(self) -> None:
+        await self._recuperar_disco()
+        while True:
+            try:
+                await asyncio.wait_for(self._hay_datos.wait(), timeout=self.intervalo_segundos)
+            except asyncio.TimeoutError:
+                pass
+            self._hay_datos.clear()
+            try:
+                await self.volcar()
+            except Exception as e:
+                logger.error(f"❌ Error en el registro de preguntas: {e}")
+
+    def iniciar(self) -> None:
+        """Arrancar la tarea de escritura (llamar en el startup de la app)"""
+        if not settings.PREGUNTAS_IA_REGISTRAR:
+            return
+        if self._tarea is None or self._tarea.done():
+            self._hay_datos = asyncio.Event()
+            self._tarea = asyncio.create_task(self._bucle())
+            logger.info(
+                f"📝 Registro de preguntas cada {self.tamano_lote} registros o {self.intervalo_segundos}s"
+            )
+
+    async def detener(self) -> None:
+        """Detener la tarea y escribir lo pendiente (llamar en el shutdown)"""
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+
+        try:
+            await self.volcar()
+        except Exception as e:
+            logger.error(f"❌ No se pudieron guardar las preguntas pendientes al detener: {e}")
+
+    def estado(self) -> Dict:
+        return {
+            "en_cola": len(self._cola),
+            "max_en_cola": self.max_en_cola,
+            "encolados": self.encolados,
+            "escritos": self.escritos,
+            "desbordados": self.desbordados,
+            "descartados": self.descartados,
+            "lotes_fallidos": self.lotes_fallidos,
+            "ultimo_lote_ms": round(self._ultimo_lote_ms, 1)
+        }
+
+# Instancia singleton
+registro_preguntas = RegistroPreguntas(
+    settings.PREGUNTAS_IA_MAX_EN_COLA,
+    settings.PREGUNTAS_IA_TAMANO_LOTE,
+    settings.PREGUNTAS_IA_INTERVALO_SEGUNDOS,
+    settings.PREGUNTAS_IA_RUTA_DESBORDE
+)
@@ -0,0 +1,371 @@
+# app/services/sesion_service.py
+"""
+Registro en memoria de sesiones de estudio activas.
+
+Los latidos (heartbeats) solo actualizan memoria; los contadores y duraciones
+se vuelcan a sesiones_estudio en escrituras masivas periódicas, de forma que
+miles de estudiantes conectados no se traducen en un UPDATE por latido.
+
+El registro es por proceso. Con varios workers conviene afinidad de sesión en
+el balanceador; sin ella, un latido que llega a otro worker adopta la sesión
+desde la BD (con el estado del último volcado) y, en el volcado, gana la
+copia con el latido más reciente (una sesión que aún no se ha volcado solo
+la conoce su worker). Las sesiones de un proceso que ya no existe
+se cierran por antigüedad de su último latido, no por no estar en memoria.
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from typing import Dict, List, Optional, Set
+from datetime import datetime, timedelta
+import asyncio
+import logging
+import json
+import uuid
+
+from app.core.config import settings
+from app.database import get_db
+from app.models.progreso import SesionEstudio
+
+logger = logging.getLogger(__name__)
+
+class SesionService:
+    def __init__(self):
+        self.db_session = None
+        self._activas: Dict[str, SesionEstudio] = {}
+        self._ultimo_latido: Dict[str, datetime] = {}
+        # Sesiones cerradas que aún no se escribieron en la BD
+        self._finalizadas: Dict[str, SesionEstudio] = {}
+        # Sesiones activas con cambios desde el último volcado
+        self._pendientes: Set[str] = set()
+        self._tarea: Optional[asyncio.Task] = None
+
+    async def get_db(self) -> Session:
+        """Obtener sesión de base de datos"""
+        if not self.db_session:
+            self.db_session = next(get_db())
+        return self.db_session
+
+    def _duracion_minutos(self, sesion: SesionEstudio, hasta: datetime) -> int:
+        """Minutos transcurridos desde el inicio de la sesión"""
+        return max(int((hasta - sesion.fecha_inicio).total_seconds() // 60), 0)
+
+    def _desde_fila(self, fila) -> SesionEstudio:
+        """Sesión activa a partir de una fila de sesiones_estudio"""
+        return SesionEstudio(
+            id_sesion=fila["id_sesion"],
+            usuario_id=fila["usuario_id"],
+            fecha_inicio=fila["fecha_inicio"],
+            duracion_minutos=fila["duracion_minutos"] or 0,
+            actividades_realizadas=fila["actividades_realizadas"] or 0,
+            puntos_sesion=fila["puntos_sesion"] or 0,
+            tipo_actividad_principal=fila["tipo_actividad_principal"],
+            dispositivo=fila["dispositivo"]
+        )
+
+    def _obtener(self, usuario_id: int, id_sesion: str) -> Optional[SesionEstudio]:
+        """Sesión activa del usuario o None si no existe o es de otro usuario"""
+        sesion = self._activas.get(id_sesion)
+        if sesion is None or sesion.usuario_id != usuario_id:
+            return None
+        return sesion
+
+    # ==================== CICLO DE VIDA (SOLO MEMORIA) ====================
+
+    async def iniciar(self, usuario_id: int, tipo_actividad: str, dispositivo: Optional[str] = None) -> SesionEstudio:
+        """Registrar una nueva sesión activa (el usuario debe existir)"""
+        db = await self.get_db()
+        existe = db.execute(
+            text("SELECT 1 FROM usuario WHERE id_usuario = :usuario_id"),
+            {"usuario_id": usuario_id}
+        ).first()
+        if existe is None:
+            raise ValueError(f"Usuario {usuario_id} no encontrado")
+
+        ahora = datetime.now()
+        sesion = SesionEstudio(
+            id_sesion=str(uuid.uuid4()),
+            usuario_id=usuario_id,
+            fecha_inicio=ahora,
+            duracion_minutos=0,
+            tipo_actividad_principal=tipo_actividad,
+            dispositivo=dispositivo or "web"
+        )
+        self._activas[sesion.id_sesion] = sesion
+        self._ultimo_latido[sesion.id_sesion] = ahora
+        self._pendientes.add(sesion.id_sesion)
+        return sesion
+
+    def latido(self, usuario_id: int, id_sesion: str, actividades: int = 0, puntos: int = 0) -> Optional[SesionEstudio]:
+        """Registrar actividad de una sesión activa"""
+        sesion = self._obtener(usuario_id, id_sesion)
+        if sesion is None:
+            return None
+
+        ahora = datetime.now()
+        sesion.actividades_realizadas += actividades
+        sesion.puntos_sesion += puntos
+        sesion.duracion_minutos = self._duracion_minutos(sesion, ahora)
+        self._ultimo_latido[id_sesion] = ahora
+        self._pendientes.add(id_sesion)
+        return sesion
+
+    async def adoptar(self, usuario_id: int, id_sesion: str) -> bool:
+        """
+        Cargar desde la BD una sesión activa que inició otro worker (o este
+        mismo antes de reiniciarse). Devuelve False si no existe o ya terminó.
+        """
+        if id_sesion in self._activas:
+            return self._activas[id_sesion].usuario_id == usuario_id
+        try:
+            uuid.UUID(id_sesion)
+        except ValueError:
+            return False
+
+        db = await self.get_db()
+        fila = db.execute(text("""
+            SELECT id_sesion::text AS id_sesion, usuario_id, fecha_inicio, duracion_minutos,
+                   actividades_realizadas, puntos_sesion, tipo_actividad_principal, dispositivo,
+                   COALESCE(ultimo_latido, fecha_inicio) AS ultimo_latido
+            FROM sesiones_estudio
+            WHERE id_sesion = CAST(:id_sesion AS uuid) AND usuario_id = :usuario_id AND activa = true
+        """), {"id_sesion": id_sesion, "usuario_id": usuario_id}).mappings().first()
+        if fila is None:
+            return False
+
+        sesion = self._desde_fila(fila)
+        self._activas[id_sesion] = sesion
+        self._ultimo_latido[id_sesion] = fila["ultimo_latido"]
+        logger.info(f"🔀 Sesión {id_sesion} adoptada desde la BD")
+        return True
+
+    def _terminar(self, sesion: SesionEstudio, fecha_fin: datetime) -> SesionEstudio:
+        """
+        Marcar una sesión como terminada con su duración final. Es el único
+        cierre: lo usan el PUT, la expiración en memoria y las huérfanas, y al
+        guardarse con _guardar() suma sesiones_completadas una sola vez.
+        """
+        sesion.fecha_fin = fecha_fin
+        sesion.duracion_minutos = self._duracion_minutos(sesion, fecha_fin)
+        sesion.activa = False
+        return sesion
+
+    def _cerrar(self, id_sesion: str, fecha_fin: datetime) -> SesionEstudio:
+        """Sacar una sesión del registro activo y dejarla pendiente de volcado"""
+        sesion = self._activas.pop(id_sesion)
+        self._ultimo_latido.pop(id_sesion, None)
+        self._pendientes.discard(id_sesion)
+        self._terminar(sesion, fecha_fin)
+        self._finalizadas[id_sesion] = sesion
+        return sesion
+
+    def finalizar(self, usuario_id: int, id_sesion: str, actividades: int = 0, puntos: int = 0) -> Optional[SesionEstudio]:
+        """Cerrar una sesión activa"""
+        sesion = self.latido(usuario_id, id_sesion, actividades, puntos)
+        if sesion is None:
+            return None
+        return self._cerrar(id_sesion, datetime.now())
+
+    def _expirar_inactivas(self) -> int:
+        """Cerrar sesiones sin latidos recientes (pestaña cerrada, sin conexión...)"""
+        limite = datetime.now() - timedelta(minutes=settings.SESIONES_EXPIRACION_MINUTOS)
+        vencidas = [id_sesion for id_sesion, latido in self._ultimo_latido.items() if latido < limite]
+        for id_sesion in vencidas:
+            # La sesión termina en el último latido recibido, no al detectarla
+            self._cerrar(id_sesion, self._ultimo_latido[id_sesion])
+        return len(vencidas)
+
+    # ==================== PERSISTENCIA POR LOTES ====================
+
+    async def volcar(self) -> int:
+        """Escribir en sesiones_estudio todas las sesiones con cambios pendientes"""
+        expiradas = self._expirar_inactivas()
+        if expiradas:
+            logger.info(f"⏱️ {expiradas} sesiones cerradas por inactividad")
+
+        pendientes = [self._activas[id_sesion] for id_sesion in self._pendientes if id_sesion in self._activas]
+        finalizadas = list(self._finalizadas.values())
+        sesiones = pendientes + finalizadas
+        if not sesiones:
+            return 0
+
+        # Se vacían antes de escribir para no perder latidos que lleguen durante el volcado
+        self._pendientes.clear()
+        self._finalizadas.clear()
+
+        registros = [
+            self._registro(sesion, self._ultimo_latido.get(sesion.id_sesion) or sesion.fecha_fin)
+            for sesion in sesiones
+        ]
+
+        db = await self.get_db()
+        try:
+            self._guardar_por_lotes(db, registros)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            # Reintentar en el siguiente volcado
+            self._pendientes.update(s.id_sesion for s in pendientes if s.id_sesion in self._activas)
+            for sesion in finalizadas:
+                self._finalizadas.setdefault(sesion.id_sesion, sesion)
+            logger.error(f"❌ Error volcando sesiones de estudio: {str(e)}")
+            raise
+
+        logger.info(f"💾 Sesiones volcadas: {len(pendientes)} activas, {len(finalizadas)} finalizadas")
+        return len(sesiones)
+
+    def _registro(self, sesion: SesionEstudio, latido: Optional[datetime]) -> Dict:
+        """Fila JSON de una sesión para el upsert masivo"""
+        registro = sesion.model_dump(mode="json")
+        registro["ultimo_latido"] = latido.isoformat() if latido else None
+        return registro
+
+    def _guardar_por_lotes(self, db: Session, registros: List[Dict]) -> None:
+        """Upsert en lotes de SESIONES_TAMANO_LOTE (sin commit)"""
+        tamano = max(settings.SESIONES_TAMANO_LOTE, 1)
+        for desde in range(0, len(registros), tamano):
+            self._guardar(db, registros[desde:desde + tamano])
+
+    def _guardar(self, db: Session, registros: List[Dict]) -> None:
+        """
+        Upsert de un lote de sesiones en una sola sentencia. Si otro worker
+        guardó un latido más reciente de la misma sesión, su copia se conserva.
+        """
+        lote = json.dumps(registros)
+
+        # Solo usuarios existentes; las sesiones de otros ids se descartan
+        db.execute(text("""
+            WITH lote AS (
+                SELECT s.*
+                FROM jsonb_to_recordset(CAST(:lote AS jsonb)) AS s(
+                    id_sesion UUID,
+                    usuario_id INTEGER,
+                    fecha_inicio TIMESTAMP,
+                    fecha_fin TIMESTAMP,
+                    duracion_minutos INTEGER,
+                    actividades_realizadas INTEGER,
+                    puntos_sesion INTEGER,
+                    tipo_actividad_principal VARCHAR(50),
+                    dispositivo VARCHAR(50),
+                    activa BOOLEAN,
+                    ultimo_latido TIMESTAMP
+                )
+                JOIN usuario u ON u.id_usuario = s.usuario_id
+            ),
+            guardadas AS (
+                INSERT INTO sesiones_estudio AS se (
+                    id_sesion, usuario_id, fecha_inicio, fecha_fin, duracion_minutos,
+                    actividades_realizadas, puntos_sesion, tipo_actividad_principal, dispositivo, activa,
+                    ultimo_latido
+                )
+                SELECT
+                    id_sesion, usuario_id, fecha_inicio, fecha_fin, duracion_minutos,
+                    actividades_realizadas, puntos_sesion, tipo_actividad_principal, dispositivo, activa,
+                    ultimo_latido
+                FROM lote
+                ON CONFLICT (id_sesion) DO UPDATE SET
+                    fecha_fin = EXCLUDED.fecha_fin,
+                    duracion_minutos = EXCLUDED.duracion_minutos,
+                    actividades_realizadas = EXCLUDED.actividades_realizadas,
+                    puntos_sesion = EXCLUDED.puntos_sesion,
+                    activa = EXCLUDED.activa,
+                    ultimo_latido = EXCLUDED.ultimo_latido
+                WHERE se.activa
+                  AND (se.ultimo_latido IS NULL OR EXCLUDED.ultimo_latido >= se.ultimo_latido)
+                RETURNING usuario_id, activa
+            )
+            UPDATE usuario u
+            SET sesiones_completadas = COALESCE(u.sesiones_completadas, 0) + c.cerradas
+            FROM (
+                SELECT usuario_id, COUNT(*) AS cerradas
+                FROM guardadas
+                WHERE NOT activa
+                GROUP BY usuario_id
+            ) c
+            WHERE u.id_usuario = c.usuario_id
+        """), {"lote": lote})
+
+    # ==================== TAREA PERIÓDICA ====================
+
+    async def cerrar_sesiones_huerfanas(self) -> int:
+        """
+        Cerrar en la BD las sesiones activas sin latidos desde hace más de la
+        expiración más dos volcados: su worker se detuvo o ya no existe. Es
+        seguro con varios workers, porque los vivos vuelcan sus latidos antes.
+
+        Se cierran igual que con el PUT: terminan en su último latido, guardan
+        la duración y suman sesiones_completadas mediante el mismo upsert, que
+        descarta las que otro worker ya cerró o actualizó mientras tanto.
+        """
+        db = await self.get_db()
+        minutos = settings.SESIONES_EXPIRACION_MINUTOS + 2 * settings.SESIONES_INTERVALO_VOLCADO_SEGUNDOS / 60
+        try:
+            filas = db.execute(text("""
+                SELECT id_sesion::text AS id_sesion, usuario_id, fecha_inicio, duracion_minutos,
+                       actividades_realizadas, puntos_sesion, tipo_actividad_principal, dispositivo,
+                       COALESCE(
+                           ultimo_latido,
+                           fecha_inicio + make_interval(mins => COALESCE(duracion_minutos, 0))
+                       ) AS ultimo_latido
+                FROM sesiones_estudio
+                WHERE activa = true
+                  AND COALESCE(
+                        ultimo_latido,
+                        fecha_inicio + make_interval(mins => COALESCE(duracion_minutos, 0))
+                      ) < CURRENT_TIMESTAMP - make_interval(secs => :segundos)
+                  AND NOT (id_sesion = ANY(CAST(:en_memoria AS uuid[])))
+            """), {"segundos": minutos * 60, "en_memoria": list(self._activas.keys())}).mappings().all()
+            if not filas:
+                return 0
+
+            registros = []
+            for fila in filas:
+                sesion = self._terminar(self._desde_fila(fila), fila["ultimo_latido"])
+                registros.append(self._registro(sesion, fila["ultimo_latido"]))
+
+            self._guardar_por_lotes(db, registros)
+            db.commit()
+            return len(registros)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Error cerrando sesiones huérfanas: {str(e)}")
+            return 0
+
+    async def _bucle_volcado(self) -> None:
+        """Volcar periódicamente hasta que se cancele la tarea"""
+        while True:
+            await asyncio.sleep(settings.SESIONES_INTERVALO_VOLCADO_SEGUNDOS)
+            try:
+                await self.volcar()
+            except Exception:
+                # Ya registrado en volcar(); se reintenta en el siguiente ciclo
+                continue
+
+            # Sesiones de workers detenidos o de un proceso anterior
+            cerradas = await self.cerrar_sesiones_huerfanas()
+            if cerradas:
+                logger.info(f"⏱️ {cerradas} sesiones sin latidos recientes marcadas como finalizadas")
+
+    def iniciar_volcado_periodico(self) -> None:
+        """Arrancar la tarea de volcado (llamar en el startup de la app)"""
+        if self._tarea is None or self._tarea.done():
+            self._tarea = asyncio.create_task(self._bucle_volcado())
+            logger.info(f"🗂️ Volcado de sesiones cada {settings.SESIONES_INTERVALO_VOLCADO_SEGUNDOS}s")
+
+    async def detener_volcado_periodico(self) -> None:
+        """Detener la tarea y escribir lo pendiente (llamar en el shutdown)"""
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+
+        try:
+            await self.volcar()
+        except Exception as e:
+            logger.error(f"❌ No se pudieron guardar las sesiones pendientes al detener: {str(e)}")
+
+# Instancia singleton
+sesion_service = SesionService()
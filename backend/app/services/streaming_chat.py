@@ -0,0 +1,269 @@
+# app/services/streaming_chat.py
+"""
+Streaming del chat hacia el navegador.
+
+Envuelve el generador de chat_stream en dos formatos:
+  - text/event-stream: eventos con id "<stream>:<n>", latidos periódicos y
+    reanudación con Last-Event-ID (se reenvían los eventos retenidos);
+  - texto plano por líneas con el centinela [DONE] (formato anterior).
+
+En ambos se vigila la desconexión del cliente: en cuanto se detecta, se
+cancela la lectura pendiente de Gemini, lo que aborta la llamada en curso y
+libera el hueco de concurrencia. Cada stream registra el tiempo hasta el
+primer token y los tokens por segundo.
+"""
+
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+from fastapi import Request
+from app.core.config import settings
+from app.services.ia import ChatSaturadoError
+from app.utils.texto import estimar_tokens
+import asyncio
+import json
+import logging
+import statistics
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+FIN = "[DONE]"
+# Espera sugerida al navegador antes de reconectar (campo retry de SSE)
+REINTENTO_MS = 3000
+MENSAJE_SATURADO = "El asistente está atendiendo demasiadas consultas. Inténtalo de nuevo en unos segundos."
+
+class _Stream:
+    """Eventos SSE ya emitidos de un stream, retenidos para reanudarlo"""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex[:12]
+        self.eventos: List[str] = []
+        self.terminado = False
+        self.actualizado = time.time()
+
+    def evento(self, data: str, tipo: Optional[str] = None) -> str:
+        lineas = [f"id: {self.id}:{len(self.eventos)}"]
+        if tipo:
+            lineas.append(f"event: {tipo}")
+        lineas.extend(f"data: {linea}" for linea in data.split("\n"))
+        texto = "\n".join(lineas) + "\n\n"
+        self.eventos.append(texto)
+        self.actualizado = time.time()
+        return texto
+
+class MetricasStream:
+    """Muestras recientes de TTFT y velocidad de generación"""
+
+    def __init__(self, max_muestras: int = 500):
+        self._ttft_ms: deque = deque(maxlen=max_muestras)
+        self._tokens_por_segundo: deque = deque(maxlen=max_muestras)
+        self.completados = 0
+        self.cancelados = 0
+
+    def registrar(self, ttft_ms: Optional[float], tokens_por_segundo: Optional[float], cancelado: bool) -> None:
+        if ttft_ms is not None:
+            self._ttft_ms.append(ttft_ms)
+        if tokens_por_segundo is not None:
+            self._tokens_por_segundo.append(tokens_por_segundo)
+        if cancelado:
+            self.cancelados += 1
+        else:
+            self.completados += 1
+
+    @staticmethod
+    def _percentiles(muestras: deque) -> Dict[str, float]:
+        if not muestras:
+            return {"p50": 0.0, "p95": 0.0}
+        ordenadas = sorted(muestras)
+        return {
+            "p50": round(statistics.median(ordenadas), 1),
+            "p95": round(ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * 0.95))], 1)
+        }
+
+    def resumen(self) -> Dict:
+        return {
+            "completados": self.completados,
+            "cancelados": self.cancelados,
+            "ttft_ms": self._percentiles(self._ttft_ms),
+            "tokens_por_segundo": self._percentiles(self._tokens_por_segundo)
+        }
+
+class GestorStreams:
+    """Streams activos y recientes, latidos, cancelación y métricas"""
+
+    def __init__(self, latido_segundos: float, retencion_segundos: float, max_streams: int):
+        self.latido_segundos = latido_segundos
+        self.retencion_segundos = retencion_segundos
+        self.max_streams = max(max_streams, 1)
+        self._streams: "OrderedDict[str, _Stream]" = OrderedDict()
+        self.metricas = MetricasStream()
+
+    # ---------- Retención para Last-Event-ID ----------
+
+    def _nuevo(self) -> _Stream:
+        limite = time.time() - self.retencion_segundos
+        while self._streams:
+            antiguo = next(iter(self._streams.values()))
+            if antiguo.actualizado >= limite and len(self._streams) < self.max_streams:
+                break
+            self._streams.popitem(last=False)
+        stream = _Stream()
+        self._streams[stream.id] = stream
+        return stream
+
+    def _buscar(self, last_event_id: Optional[str]) -> Optional[Tuple[_Stream, int]]:
+        """Stream y posición del último evento recibido por el cliente"""
+        if not last_event_id or ":" not in last_event_id:
+            return None
+        stream_id, _, indice = last_event_id.partition(":")
+        stream = self._streams.get(stream_id)
+        if stream is None or not indice.isdigit():
+            return None
+        return stream, int(indice)
+
+    # ---------- Lectura del generador ----------
+
+    async def _consumir(
+        self,
+        fuente: AsyncIterator[str],
+        request: Request
+    ) -> AsyncIterator[Optional[str]]:
+        """
+        Chunks de la fuente; None cuando toca latido. Si el cliente se
+        desconecta (o Starlette cancela la respuesta) se cancela la lectura
+        pendiente, lo que aborta la generación en Gemini.
+        """
+        inicio = time.monotonic()
+        primer_token: Optional[float] = None
+        tokens = 0
+        cancelado = True
+        pendiente: Optional[asyncio.Task] = None
+        iterador = fuente.__aiter__()
+        try:
+            while True:
+                if pendiente is None:
+                    pendiente = asyncio.ensure_future(iterador.__anext__())
+                hechas, _ = await asyncio.wait({pendiente}, timeout=self.latido_segundos)
+
+                if await request.is_disconnected():
+                    logger.info("🔌 Cliente desconectado: se cancela la generación")
+                    return
+
+                if not hechas:
+                    yield None
+                    continue
+
+                tarea, pendiente = pendiente, None
+                try:
+                    chunk = tarea.result()
+                except StopAsyncIteration:
+                    cancelado = False
+                    return
+
+                if chunk == FIN:
+                    cancelado = False
+                    return
+                if primer_token is None:
+                    primer_token = time.monotonic()
+                tokens += estimar_tokens(chunk)
+                yield chunk
+        finally:
+            if pendiente is not None and not pendiente.done():
+                pendiente.cancel()
+                try:
+                    await pendiente
+                except (asyncio.CancelledError, Exception):
+                    pass
+            if hasattr(iterador, "aclose"):
+                try:
+                    await iterador.aclose()
+                except Exception:
+                    pass
+
+            ttft_ms = (primer_token - inicio) * 1000 if primer_token is not None else None
+            duracion = time.monotonic() - primer_token if primer_token is not None else 0
+            tokens_por_segundo = tokens / duracion if duracion > 0 else None
+            self.metricas.registrar(ttft_ms, tokens_por_segundo, cancelado)
+            logger.info(
+                f"📈 Stream {'cancelado' if cancelado else 'completado'}: "
+                f"TTFT {ttft_ms or 0:.0f} ms, ~{tokens} tokens, {tokens_por_segundo or 0:.1f} tokens/s"
+            )
+
+    # ---------- Formatos de salida ----------
+
+    async def eventos_sse(
+        self,
+        crear_fuente: Callable[[], AsyncIterator[str]],
+        request: Request,
+        last_event_id: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream text/event-stream. Con un Last-Event-ID conocido se reenvían
+        los eventos posteriores; si aquel stream quedó a medias se emite
+        'reset' y se genera de nuevo (Gemini no puede continuar un stream cortado).
+        """
+        previo = self._buscar(last_event_id)
+        if previo is not None:
+            stream, indice = previo
+            logger.info(f"⏯️ Reanudando stream {stream.id} desde el evento {indice + 1}")
+            for evento in stream.eventos[indice + 1:]:
+                yield evento
+            if stream.terminado:
+                return
+
+        stream = self._nuevo()
+        yield f"retry: {REINTENTO_MS}\n\n"
+        if previo is not None:
+            yield stream.evento("", "reset")
+
+        inicio = time.monotonic()
+        texto_total = 0
+        try:
+            async for chunk in self._consumir(crear_fuente(), request):
+                if chunk is None:
+                    yield ": latido\n\n"
+                    continue
+                texto_total += len(chunk)
+                yield stream.evento(chunk)
+        except ChatSaturadoError as e:
+            logger.warning(f"⚠️ Stream sin hueco tras esperar en cola: {e}")
+            stream.terminado = True
+            yield stream.evento(MENSAJE_SATURADO, "error")
+            return
+
+        if await request.is_disconnected():
+            return
+        stream.terminado = True
+        yield stream.evento(json.dumps({
+            "caracteres": texto_total,
+            "duracion_ms": round((time.monotonic() - inicio) * 1000)
+        }), "done")
+
+    async def texto_plano(
+        self,
+        crear_fuente: Callable[[], AsyncIterator[str]],
+        request: Request
+    ) -> AsyncIterator[str]:
+        """Formato anterior: un chunk por línea y [DONE] al final"""
+        chunk_count = 0
+        try:
+            async for chunk in self._consumir(crear_fuente(), request):
+                if chunk is None:
+                    continue
+                chunk_count += 1
+                yield f"{chunk}\n"
+        except ChatSaturadoError as e:
+            logger.warning(f"⚠️ Stream sin hueco tras esperar en cola: {e}")
+            yield f"{MENSAJE_SATURADO}\n"
+        if await request.is_disconnected():
+            return
+        logger.info(f"🏁 Stream completado con {chunk_count} chunks")
+        yield f"{FIN}\n"
+
+# Instancia singleton
+gestor_streams = GestorStreams(
+    settings.IA_SSE_LATIDO_SEGUNDOS,
+    settings.IA_SSE_RETENCION_SEGUNDOS,
+    settings.IA_SSE_MAX_STREAMS
+)
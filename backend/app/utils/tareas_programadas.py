@@ -0,0 +1,127 @@
+# backend/app/utils/tareas_programadas.py
+"""
+Tareas de mantenimiento para ejecutar fuera de horas pico (cron, systemd timer, etc.)
+
+Uso (desde backend/):
+    python -m app.utils.tareas_programadas progreso-diario [--desde AAAA-MM-DD]
+    python -m app.utils.tareas_programadas analisis-rendimiento
+    python -m app.utils.tareas_programadas estadisticas-usuario [--usuario ID]
+    python -m app.utils.tareas_programadas reconciliar-puntos
+    python -m app.utils.tareas_programadas reconciliar-logros
+    python -m app.utils.tareas_programadas particiones-progreso
+"""
+
+import argparse
+import asyncio
+import logging
+from datetime import date
+
+from app.services.progreso_service import progreso_service
+from app.services.analisis_service import analisis_service
+from app.services.logros_service import logros_service
+
+logger = logging.getLogger(__name__)
+
+async def tarea_progreso_diario(desde: date = None) -> int:
+    """Reconstruir el acumulado diario (progreso_diario) desde el historial"""
+    logger.info(f"🗓️ Recalculando acumulado diario desde {desde or 'el inicio'}")
+    return await progreso_service.recalcular_progreso_diario(desde)
+
+async def tarea_estadisticas_usuario(usuario_id: int = None) -> int:
+    """Reconciliar usuario_estadisticas con las tablas base"""
+    logger.info(f"📋 Recalculando estadísticas de {'usuario ' + str(usuario_id) if usuario_id else 'todos los usuarios'}")
+    return await progreso_service.recalcular_usuario_estadisticas(usuario_id)
+
+async def tarea_reconciliar_puntos() -> int:
+    """Verificar los puntos acumulados por deltas contra el historial de progreso"""
+    logger.info("🔢 Reconciliando puntos de usuarios")
+    return await progreso_service.reconciliar_puntos_usuarios()
+
+async def tarea_reconciliar_logros() -> int:
+    """Otorgar los logros cumplidos que no se otorgaron al guardar progreso"""
+    logger.info("🏅 Reconciliando logros de usuarios")
+    return await logros_service.reconciliar_logros()
+
+async def tarea_particiones_progreso() -> dict:
+    """Crear particiones mensuales de progreso por adelantado y archivar las antiguas"""
+    logger.info("🗄️ Manteniendo particiones de progreso")
+    return await progreso_service.mantener_particiones_progreso()
+
+async def tarea_analisis_rendimiento() -> int:
+    """Recalcular y guardar el análisis de rendimiento de todos los usuarios"""
+    logger.info("📊 Calculando análisis de rendimiento de todos los usuarios")
+    return await analisis_service.calcular_analisis_todos()
+
+def main():
+    parser = argparse.ArgumentParser(description="Tareas programadas de IReNaTech")
+    subparsers = parser.add_subparsers(dest="tarea", required=True)
+
+    parser_diario = subparsers.add_parser(
+        "progreso-diario",
+        help="Reconstruir el acumulado diario de progreso"
+    )
+    parser_diario.add_argument(
+        "--desde",
+        type=date.fromisoformat,
+        default=None,
+        help="Recalcular solo a partir de esta fecha (AAAA-MM-DD)"
+    )
+
+    subparsers.add_parser(
+        "analisis-rendimiento",
+        help="Recalcular el análisis de rendimiento de todos los usuarios"
+    )
+
+    parser_estadisticas = subparsers.add_parser(
+        "estadisticas-usuario",
+        help="Reconciliar las estadísticas materializadas por usuario"
+    )
+    parser_estadisticas.add_argument(
+        "--usuario",
+        type=int,
+        default=None,
+        help="Recalcular solo este usuario"
+    )
+
+    subparsers.add_parser(
+        "reconciliar-puntos",
+        help="Verificar y corregir los puntos totales de los usuarios"
+    )
+
+    subparsers.add_parser(
+        "reconciliar-logros",
+        help="Otorgar los logros cumplidos que falten"
+    )
+
+    subparsers.add_parser(
+        "particiones-progreso",
+        help="Crear particiones mensuales de progreso y archivar las antiguas"
+    )
+
+    args = parser.parse_args()
+
+    if args.tarea == "progreso-diario":
+        asyncio.run(tarea_progreso_diario(args.desde))
+    elif args.tarea == "analisis-rendimiento":
+        asyncio.run(tarea_analisis_rendimiento())
+    elif args.tarea == "estadisticas-usuario":
+        asyncio.run(tarea_estadisticas_usuario(args.usuario))
+    elif args.tarea == "reconciliar-puntos":
+        asyncio.run(tarea_reconciliar_puntos())
+    elif args.tarea == "reconciliar-logros":
+        asyncio.run(tarea_reconciliar_logros())
+    elif args.tarea == "particiones-progreso":
+        asyncio.run(tarea_particiones_progreso())
+
+if __name__ == "__main__":
+    # Configurar logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    try:
+        main()
+    except Exception as e:
+        logger.error(f"Fallo en la tarea programada: {e}")
+        raise
@@ -0,0 +1,18 @@
+# backend/app/utils/texto.py
+"""
+Utilidades de texto.
+
+normalizar_busqueda debe producir lo mismo que f_unaccent(lower(...)) en la
+BD, que es la expresión indexada con pg_trgm (DB/busqueda_trigram.sql).
+"""
+
+import unicodedata
+
+def normalizar_busqueda(texto: str) -> str:
+    """Minúsculas y sin tildes ni diéresis: "Hidrógeno" -> "hidrogeno" """
+    descompuesto = unicodedata.normalize("NFKD", texto.strip().lower())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+def estimar_tokens(texto: str) -> int:
+    """Aproximación de ~4 caracteres por token, suficiente para métricas y presupuestos"""
+    return max(1, (len(texto) + 3) // 4) if texto else 0
@@ -0,0 +1,16 @@
+# backend/benchmarks/__init__.py
+"""
+Regresión de planes de consulta sobre un volumen de datos realista.
+
+Se ejecuta contra una base PostgreSQL local y desechable (nunca la de
+producción), indicada en BENCHMARK_DATABASE_URL y con el esquema de DB/ ya
+aplicado.
+
+Uso (desde backend/):
+    python -m benchmarks.regresion_planes sembrar --usuarios 100000 --eventos 10000000
+    python -m benchmarks.regresion_planes ejecutar --guardar-linea-base
+    python -m benchmarks.regresion_planes ejecutar
+
+Prueba de carga del chat (servidor local con LLM_PROVEEDOR=simulado):
+    python -m benchmarks.carga_chat --concurrencia 64 --peticiones 500 --stream
+"""
@@ -0,0 +1,149 @@
+# backend/benchmarks/carga_chat.py
+"""
+Prueba de carga del chat contra un servidor local arrancado con
+LLM_PROVEEDOR=simulado, de modo que la latencia y el ritmo de tokens los
+fija la configuración (SIMULADO_*) y no la red ni la cuota de Gemini.
+
+Lanza N peticiones con una concurrencia dada contra /chat o /chat/stream
+(SSE) y resume latencia total, tiempo hasta el primer evento y respuestas
+503 por saturación. Solo usa la biblioteca estándar.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+PREGUNTAS = [
+    "¿Qué es un enlace covalente?",
+    "Explica la diferencia entre un ácido y una base.",
+    "¿Cómo se balancea H2 + O2 -> H2O?",
+    "¿Qué es la electronegatividad?",
+    "¿Qué es un mol y para qué sirve?",
+]
+
+# ==================== CLIENTE HTTP MÍNIMO ====================
+
+async def _peticion(
+    host: str,
+    puerto: int,
+    ruta: str,
+    cuerpo: Dict,
+    stream: bool,
+    timeout: float
+) -> Tuple[int, Optional[float], float]:
+    """(código HTTP, segundos hasta el primer chunk de cuerpo, segundos totales)"""
+    inicio = time.monotonic()
+    datos = json.dumps(cuerpo).encode("utf-8")
+    cabeceras = (
+        f"POST {ruta} HTTP/1.1\r\n"
+        f"Host: {host}:{puerto}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Accept: {'text/event-stream' if stream else 'application/json'}\r\n"
+        f"Content-Length: {len(datos)}\r\n"
+        "Connection: close\r\n\r\n"
+    ).encode("ascii")
+
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, puerto), timeout)
+    try:
+        writer.write(cabeceras + datos)
+        await writer.drain()
+
+        linea_estado = await asyncio.wait_for(reader.readline(), timeout)
+        codigo = int(linea_estado.split()[1])
+        while (await asyncio.wait_for(reader.readline(), timeout)) not in (b"\r\n", b""):
+            pass
+
+        primer_chunk: Optional[float] = None
+        while True:
+            bloque = await asyncio.wait_for(reader.read(4096), timeout)
+            if not bloque:
+                break
+            if primer_chunk is None:
+                primer_chunk = time.monotonic() - inicio
+        return codigo, primer_chunk, time.monotonic() - inicio
+    finally:
+        writer.close()
+
+# ==================== EJECUCIÓN ====================
+
+def _percentil(muestras: List[float], p: float) -> float:
+    if not muestras:
+        return 0.0
+    ordenadas = sorted(muestras)
+    return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * p))]
+
+async def ejecutar(url: str, concurrencia: int, peticiones: int, stream: bool, timeout: float) -> Dict:
+    partes = urlsplit(url)
+    host, puerto = partes.hostname or "127.0.0.1", partes.port or 80
+    ruta = partes.path.rstrip("/") + ("/stream" if stream else "")
+
+    semaforo = asyncio.Semaphore(max(concurrencia, 1))
+    latencias: List[float] = []
+    primeros: List[float] = []
+    codigos: Dict[str, int] = {}
+
+    async def una(i: int) -> None:
+        cuerpo = {"messages": [{"role": "user", "content": f"{PREGUNTAS[i % len(PREGUNTAS)]} (#{i})"}]}
+        async with semaforo:
+            try:
+                codigo, primer_chunk, total = await _peticion(host, puerto, ruta, cuerpo, stream, timeout)
+            except Exception as e:
+                clave = type(e).__name__
+                codigos[clave] = codigos.get(clave, 0) + 1
+                return
+        codigos[str(codigo)] = codigos.get(str(codigo), 0) + 1
+        if codigo == 200:
+            latencias.append(total)
+            if primer_chunk is not None:
+                primeros.append(primer_chunk)
+
+    inicio = time.monotonic()
+    await asyncio.gather(*(una(i) for i in range(peticiones)))
+    duracion = time.monotonic() - inicio
+
+    return {
+        "url": url + ("/stream" if stream else ""),
+        "concurrencia": concurrencia,
+        "peticiones": peticiones,
+        "duracion_s": round(duracion, 2),
+        "peticiones_por_segundo": round(peticiones / duracion, 1) if duracion > 0 else 0.0,
+        "codigos": codigos,
+        "saturadas_503": codigos.get("503", 0),
+        "latencia_ms": {
+            "p50": round(statistics.median(latencias) * 1000, 1) if latencias else 0.0,
+            "p95": round(_percentil(latencias, 0.95) * 1000, 1),
+            "max": round(max(latencias) * 1000, 1) if latencias else 0.0
+        },
+        "primer_chunk_ms": {
+            "p50": round(statistics.median(primeros) * 1000, 1) if primeros else 0.0,
+            "p95": round(_percentil(primeros, 0.95) * 1000, 1)
+        }
+    }
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Prueba de carga del chat de IReNaTech")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/chat", help="Base del router de chat")
+    parser.add_argument("--concurrencia", type=int, default=32)
+    parser.add_argument("--peticiones", type=int, default=200)
+    parser.add_argument("--stream", action="store_true", help="Usar /chat/stream en modo SSE")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Segundos máximos por lectura")
+    args = parser.parse_args()
+
+    resultado = asyncio.run(ejecutar(args.url, args.concurrencia, args.peticiones, args.stream, args.timeout))
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+    return 0 if resultado["codigos"].get("200") else 1
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    sys.exit(main())
@@ -0,0 +1,206 @@
+# backend/benchmarks/datos_sinteticos.py
+"""
+Carga de un conjunto de datos sintético con generate_series.
+
+Todo se genera dentro de PostgreSQL (sin viajar filas desde Python) y pasa por
+los triggers reales, así que usuario_estadisticas, progreso_diario y los puntos
+quedan como en producción. Los eventos de progreso se insertan mes a mes para
+que las tablas de transición de los triggers no crezcan sin límite.
+"""
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from datetime import date
+import logging
+
+logger = logging.getLogger(__name__)
+
+PREFIJO_CORREO = "bench_"
+
+TIPOS_EVENTO = [
+    "simulacion_completada",
+    "teoria_leida",
+    "pregunta_ia",
+    "ejercicio_completado",
+    "sesion_estudio",
+]
+
+CATEGORIAS_TEORIA = [
+    "Fundamentos",
+    "Estructura Atómica",
+    "Enlace Químico",
+    "Estequiometría",
+    "Termoquímica",
+    "Cinética Química",
+    "Equilibrio Químico",
+    "Ácidos y Bases",
+    "Redox",
+    "Química Orgánica",
+]
+
+def _meses(cantidad: int) -> list:
+    """Primer día de los últimos `cantidad` meses, del más antiguo al actual"""
+    hoy = date.today().replace(day=1)
+    meses = []
+    for atras in range(cantidad - 1, -1, -1):
+        anio, mes = divmod(hoy.year * 12 + hoy.month - 1 - atras, 12)
+        meses.append(date(anio, mes + 1, 1))
+    return meses
+
+def limpiar(conn: Connection) -> None:
+    """Vaciar las tablas de actividad (la base de benchmark es desechable)"""
+    conn.execute(text("""
+        TRUNCATE progreso, progreso_diario, usuario_elemento_visto, usuario_elemento_uso,
+                 usuario_estadisticas, usuario_logros, usuario_teoria, simulacion_elemento,
+                 simulacion, sesiones_estudio, analisis_rendimiento CASCADE
+    """))
+    conn.execute(text("DELETE FROM usuario WHERE correo LIKE :patron"), {"patron": f"{PREFIJO_CORREO}%"})
+    conn.execute(text("DELETE FROM teoria WHERE titulo LIKE 'Benchmark %'"))
+
+def sembrar_catalogos(conn: Connection, teorias: int) -> None:
+    """Elementos (si faltan) y teorías con texto suficiente para la búsqueda"""
+    conn.execute(text("""
+        INSERT INTO elemento (nombre, simbolo, numero_atomico, estado, categoria, descripcion)
+        SELECT 'Elemento ' || n, 'E' || n, n,
+               (ARRAY['Gas', 'Líquido', 'Sólido'])[1 + n % 3],
+               (ARRAY['Metales', 'No metales', 'Gases y Halógenos'])[1 + n % 3],
+               'Elemento sintético número ' || n
+        FROM generate_series(1, 118) AS n
+        WHERE (SELECT COUNT(*) FROM elemento) < 118
+    """))
+
+    conn.execute(text("""
+        INSERT INTO teoria (titulo, contenido, categoria)
+        SELECT
+            'Benchmark ' || n || ': ' || (ARRAY['ácidos', 'enlaces', 'gases', 'reacciones', 'átomos'])[1 + n % 5],
+            repeat(
+                'El hidrógeno y el oxígeno forman agua mediante un enlace covalente polar. '
+                || 'La estequiometría relaciona masas y moles en cada reacción química. ',
+                20 + n % 30
+            ),
+            (CAST(:categorias AS varchar[]))[1 + n % :total_categorias]
+        FROM generate_series(1, :teorias) AS n
+    """), {
+        "teorias": teorias,
+        "categorias": CATEGORIAS_TEORIA,
+        "total_categorias": len(CATEGORIAS_TEORIA),
+    })
+
+def sembrar_usuarios(conn: Connection, usuarios: int) -> None:
+    """Usuarios registrados (y un 10 % anónimos)"""
+    conn.execute(text("""
+        INSERT INTO usuario (nombre, correo, tipo_usuario, fecha_registro, ultimo_acceso)
+        SELECT
+            'Usuario ' || n,
+            :prefijo || n || '@example.com',
+            CASE WHEN n % 10 = 0 THEN 'anonimo' ELSE 'registrado' END,
+            CURRENT_TIMESTAMP - make_interval(days => n % 540),
+            CURRENT_TIMESTAMP - make_interval(hours => n % 720)
+        FROM generate_series(1, :usuarios) AS n
+    """), {"usuarios": usuarios, "prefijo": PREFIJO_CORREO})
+
+def sembrar_simulaciones(conn: Connection, por_usuario: int, elementos_por_simulacion: int) -> None:
+    """Simulaciones con distribución sesgada: pocos usuarios concentran muchas"""
+    conn.execute(text("""
+        INSERT INTO simulacion (usuario_id, nombre, fecha, estado, duracion_minutos, puntos_obtenidos, tipo_simulacion)
+        SELECT
+            u.id_usuario,
+            'Simulación ' || s,
+            CURRENT_TIMESTAMP - make_interval(days => (u.id_usuario + s) % 540),
+            (ARRAY['Completada', 'Completada', 'Completada', 'En proceso', 'Fallida'])[1 + (u.id_usuario + s) % 5],
+            5 + (u.id_usuario * s) % 55,
+            (u.id_usuario * s) % 60,
+            (ARRAY['General', 'Ácido-Base', 'Redox', 'Precipitación'])[1 + s % 4]
+        FROM usuario u
+        CROSS JOIN LATERAL generate_series(1, 1 + (u.id_usuario % (2 * :por_usuario))) AS s
+        WHERE u.correo LIKE :patron AND u.tipo_usuario = 'registrado'
+    """), {"por_usuario": por_usuario, "patron": f"{PREFIJO_CORREO}%"})
+
+    conn.execute(text("""
+        INSERT INTO simulacion_elemento (simulacion_id, elemento_id, cantidad, unidad)
+        SELECT
+            s.id_simulacion,
+            e.ids[1 + (s.id_simulacion * k) % array_length(e.ids, 1)],
+            round(((s.id_simulacion * k) % 250) / 100.0, 2),
+            'mol'
+        FROM simulacion s
+        CROSS JOIN (SELECT array_agg(id_elemento) AS ids FROM elemento) e
+        CROSS JOIN generate_series(1, :por_simulacion) AS k
+    """), {"por_simulacion": elementos_por_simulacion})
+
+def sembrar_lecturas(conn: Connection) -> None:
+    """Teorías leídas por una parte de los usuarios"""
+    conn.execute(text("""
+        INSERT INTO usuario_teoria (usuario_id, teoria_id, leido, fecha)
+        SELECT u.id_usuario, t.id_teoria, true, CURRENT_TIMESTAMP - make_interval(days => t.id_teoria % 300)
+        FROM usuario u
+        JOIN teoria t ON (u.id_usuario + t.id_teoria) % 17 = 0
+        WHERE u.correo LIKE :patron AND u.tipo_usuario = 'registrado'
+    """), {"patron": f"{PREFIJO_CORREO}%"})
+
+def sembrar_progreso(conn: Connection, eventos: int, meses: int) -> None:
+    """Eventos de progreso repartidos en los últimos `meses` meses"""
+    lista_meses = _meses(meses)
+    conn.execute(
+        text("SELECT crear_particiones_progreso(3, :desde)"),
+        {"desde": lista_meses[0]}
+    )
+
+    usuarios = conn.execute(text("""
+        SELECT array_agg(id_usuario)
+        FROM usuario
+        WHERE correo LIKE :patron AND tipo_usuario = 'registrado'
+    """), {"patron": f"{PREFIJO_CORREO}%"}).scalar() or []
+    if not usuarios:
+        raise RuntimeError("No hay usuarios sintéticos: ejecutar antes sembrar_usuarios")
+
+    por_mes = max(eventos // len(lista_meses), 1)
+    for mes in lista_meses:
+        # Elevar al cuadrado un aleatorio concentra la actividad en pocos usuarios
+        conn.execute(text("""
+            INSERT INTO progreso (usuario_id, tipo_evento, descripcion, puntos_ganados, datos_json, fecha_evento)
+            SELECT
+                (CAST(:usuarios AS integer[]))[1 + floor(power(random(), 2) * :total_usuarios)::int],
+                (CAST(:tipos AS varchar[]))[1 + n % :total_tipos],
+                'Evento sintético',
+                (ARRAY[50, 25, 10, 30, 15])[1 + n % 5],
+                jsonb_build_object(
+                    'tiempo_minutos', n % 40,
+                    'elementos_usados', jsonb_build_array('E' || (1 + n % 118), 'E' || (1 + (n * 7) % 118))
+                ),
+                LEAST(
+                    CAST(:mes AS timestamp) + random() * (CAST(:mes AS timestamp) + INTERVAL '1 month' - CAST(:mes AS timestamp)),
+                    CURRENT_TIMESTAMP
+                )
+            FROM generate_series(1, :por_mes) AS n
+        """), {
+            "usuarios": usuarios,
+            "total_usuarios": len(usuarios),
+            "tipos": TIPOS_EVENTO,
+            "total_tipos": len(TIPOS_EVENTO),
+            "mes": mes,
+            "por_mes": por_mes,
+        })
+        logger.info(f"🌱 Progreso {mes:%Y-%m}: {por_mes} eventos")
+
+def sembrar(
+    conn: Connection,
+    usuarios: int,
+    eventos: int,
+    meses: int = 18,
+    simulaciones_por_usuario: int = 10,
+    elementos_por_simulacion: int = 3,
+    teorias: int = 500
+) -> None:
+    """Carga completa; reemplaza cualquier carga sintética anterior"""
+    limpiar(conn)
+    sembrar_catalogos(conn, teorias)
+    sembrar_usuarios(conn, usuarios)
+    logger.info(f"🌱 {usuarios} usuarios")
+    sembrar_simulaciones(conn, simulaciones_por_usuario, elementos_por_simulacion)
+    logger.info("🌱 Simulaciones y elementos usados")
+    sembrar_lecturas(conn)
+    sembrar_progreso(conn, eventos, meses)
+    conn.execute(text("SELECT reconciliar_puntos_usuarios()"))
+    conn.execute(text("ANALYZE"))
+    logger.info("✅ Datos sintéticos cargados")
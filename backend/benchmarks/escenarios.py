@@ -0,0 +1,154 @@
+# backend/benchmarks/escenarios.py
+"""
+Escenarios medidos: llamadas reales a los servicios y al CRUD, más las vistas
+de DB/cambios.sql. Las sentencias SQL no se copian aquí; se capturan al
+ejecutar cada escenario, así que la suite sigue al código sin mantenimiento.
+
+Cada escenario define un presupuesto de latencia (ms, por sentencia) y las
+tablas grandes en las que un Seq Scan es esperable (agregados globales).
+"""
+
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List
+
+from sqlalchemy import text
+
+# Perfiles de usuario: el más activo, uno mediano y uno con poca actividad
+Usuarios = Dict[str, int]
+
+@dataclass
+class Escenario:
+    nombre: str
+    ejecutar: Callable[[Usuarios], Awaitable[Any]]
+    presupuesto_ms: float = 50.0
+    permitir_seq_scan: FrozenSet[str] = field(default_factory=frozenset)
+
+def _con_sesion(funcion: Callable) -> Callable[[Usuarios], Awaitable[Any]]:
+    """Adaptar una función del CRUD (db, usuarios) a un escenario asíncrono"""
+    async def ejecutar(usuarios: Usuarios):
+        from app.database import SessionLocal
+        db = SessionLocal()
+        try:
+            return funcion(db, usuarios)
+        finally:
+            db.rollback()
+            db.close()
+    return ejecutar
+
+def _vista(sql: str) -> Callable[[Usuarios], Awaitable[Any]]:
+    """Consulta directa a una vista, con :usuario_id del usuario más activo"""
+    return _con_sesion(lambda db, u: db.execute(text(sql), {"usuario_id": u["intenso"]}).fetchall())
+
+def cargar_escenarios() -> List[Escenario]:
+    """Importa los servicios aquí: DATABASE_URL ya apunta a la base de benchmark"""
+    from app.services.progreso_service import progreso_service
+    from app.services.analisis_service import analisis_service
+    from app.services.logros_service import logros_service
+    from app.services.ranking_service import ranking_service
+    from app.crud import teoria as crud_teoria
+    from app.crud.elemento import search_elementos
+    from app.crud.utensilio import search_utensilios
+
+    hoy = date.today()
+
+    return [
+        # ---------- progreso_service ----------
+        Escenario(
+            "progreso.resumen",
+            lambda u: progreso_service.get_resumen_progreso(u["intenso"]),
+        ),
+        Escenario(
+            "progreso.estadisticas_elementos",
+            lambda u: progreso_service.get_estadisticas_elementos(u["intenso"]),
+        ),
+        Escenario(
+            "progreso.historial_primera_pagina",
+            lambda u: progreso_service.get_historial_simulaciones(u["intenso"], limite=10, offset=0),
+        ),
+        Escenario(
+            "progreso.historial_pagina_profunda",
+            lambda u: progreso_service.get_historial_simulaciones(u["intenso"], limite=10, offset=200),
+        ),
+        Escenario(
+            "progreso.general",
+            lambda u: progreso_service.get_progreso_general(u["medio"]),
+        ),
+        Escenario(
+            "progreso.estadisticas_generales",
+            lambda u: progreso_service.get_estadisticas_generales(u["intenso"]),
+        ),
+        Escenario(
+            "progreso.metricas_30_dias",
+            lambda u: progreso_service.get_metricas_tiempo(u["intenso"], hoy - timedelta(days=30), hoy),
+        ),
+        Escenario(
+            "progreso.metricas_semanales_1_anio",
+            lambda u: progreso_service.get_metricas_tiempo(u["intenso"], hoy - timedelta(days=365), hoy, "week"),
+        ),
+
+        # ---------- análisis, logros y ranking ----------
+        Escenario(
+            "analisis.usuario",
+            lambda u: analisis_service.analizar_usuarios([u["intenso"]]),
+            presupuesto_ms=500.0,
+            # Los percentiles necesitan los puntos de todos los usuarios
+            permitir_seq_scan=frozenset({"usuario"}),
+        ),
+        Escenario(
+            "logros.usuario",
+            lambda u: logros_service.get_logros_usuario(u["ligero"]),
+        ),
+        Escenario(
+            "ranking.reconciliar",
+            lambda u: ranking_service.reconciliar(),
+            presupuesto_ms=1000.0,
+            permitir_seq_scan=frozenset({"usuario"}),
+        ),
+
+        # ---------- crud/teoria y búsquedas ----------
+        Escenario(
+            "teoria.buscar_texto",
+            _con_sesion(lambda db, u: crud_teoria.buscar_teorias_texto_db(db, "enlace covalente")),
+        ),
+        Escenario(
+            "teoria.buscar_subcadena",
+            _con_sesion(lambda db, u: crud_teoria.search_teorias_db(db, "hidrogeno")),
+        ),
+        Escenario(
+            "teoria.progreso_detallado",
+            _con_sesion(lambda db, u: crud_teoria.get_progreso_detallado_usuario(db, u["intenso"])),
+        ),
+        Escenario(
+            "teoria.no_leidas",
+            _con_sesion(lambda db, u: crud_teoria.get_teorias_no_leidas(db, u["intenso"])),
+        ),
+        Escenario(
+            "teoria.mas_leida",
+            _con_sesion(lambda db, u: crud_teoria.get_teoria_mas_leida(db)),
+            presupuesto_ms=2000.0,
+            # Agregado global sobre todas las lecturas
+            permitir_seq_scan=frozenset({"usuario_teoria"}),
+        ),
+        Escenario(
+            "catalogo.buscar_elementos",
+            _con_sesion(lambda db, u: search_elementos(db, "hidr")),
+        ),
+        Escenario(
+            "catalogo.buscar_utensilios",
+            _con_sesion(lambda db, u: search_utensilios(db, "vaso")),
+        ),
+
+        # ---------- vistas de DB/cambios.sql ----------
+        Escenario(
+            "vista.dashboard_usuario",
+            _vista("SELECT * FROM vista_dashboard_usuario WHERE id_usuario = :usuario_id"),
+        ),
+        Escenario(
+            "vista.ranking_top10",
+            _vista("SELECT * FROM vista_ranking_usuarios LIMIT 10"),
+            presupuesto_ms=2000.0,
+            # La vista numera a todos los usuarios antes de limitar
+            permitir_seq_scan=frozenset({"usuario"}),
+        ),
+    ]
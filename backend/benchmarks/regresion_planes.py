@@ -0,0 +1,284 @@
+# backend/benchmarks/regresion_planes.py
+"""
+Regresión de planes: ejecuta los escenarios, captura cada sentencia SQL que
+emiten y la repite con EXPLAIN (ANALYZE, BUFFERS) dentro de una transacción
+que se revierte.
+
+Falla (código de salida 1) si una sentencia:
+  - hace Seq Scan sobre una tabla grande no permitida en su escenario, o
+  - supera el presupuesto de latencia del escenario.
+
+Los tiempos y la forma de cada plan se guardan como línea base en JSON; los
+cambios respecto a ella se informan como avisos.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import statistics
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+RUTA_LINEA_BASE = Path(__file__).parent / "lineas_base" / "planes.json"
+
+# Tablas con menos filas estimadas que esto pueden recorrerse enteras
+UMBRAL_FILAS_SEQ_SCAN = 10_000
+# Un tiempo por encima de la línea base multiplicada por esto se avisa
+TOLERANCIA_LINEA_BASE = 1.5
+
+SENTENCIAS_MEDIBLES = re.compile(r"^\s*(SELECT|WITH|INSERT|UPDATE|DELETE)\b", re.IGNORECASE)
+
+def _preparar_entorno() -> str:
+    """Apuntar la app a la base de benchmark antes de importar nada de app.*"""
+    url = os.environ.get("BENCHMARK_DATABASE_URL")
+    if not url:
+        raise SystemExit("❌ Define BENCHMARK_DATABASE_URL (una base local desechable)")
+    os.environ["DATABASE_URL"] = url
+    os.environ["DEBUG"] = "false"
+    return url
+
+# ==================== CAPTURA DE SENTENCIAS ====================
+
+class Capturador:
+    """Guarda las sentencias que ejecuta el engine, agrupadas por escenario"""
+
+    def __init__(self):
+        self.escenario: Optional[str] = None
+        self.sentencias: Dict[str, List[Tuple[str, object]]] = {}
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if self.escenario is None or executemany or not SENTENCIAS_MEDIBLES.match(statement):
+            return
+        # pool_pre_ping y comprobaciones de conexión
+        if statement.strip().upper() == "SELECT 1":
+            return
+        self.sentencias.setdefault(self.escenario, []).append((statement, parameters))
+
+# ==================== ANÁLISIS DE PLANES ====================
+
+def _nodos(plan: dict):
+    """Recorrido en preorden del árbol del plan"""
+    yield plan
+    for hijo in plan.get("Plans", []):
+        yield from _nodos(hijo)
+
+def _tablas(conn) -> Dict[str, Tuple[str, float]]:
+    """relación -> (tabla padre o ella misma, filas estimadas)"""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT c.relname, COALESCE(p.relname, c.relname), GREATEST(c.reltuples, 0)
+            FROM pg_class c
+            LEFT JOIN pg_inherits i ON i.inhrelid = c.oid
+            LEFT JOIN pg_class p ON p.oid = i.inhparent
+            WHERE c.relkind IN ('r', 'p')
+        """)
+        return {relname: (padre, float(filas)) for relname, padre, filas in cur.fetchall()}
+
+def _explicar(conn, statement: str, parameters, repeticiones: int) -> Tuple[dict, float]:
+    """Plan de la última ejecución y mediana del tiempo de ejecución (ms)"""
+    tiempos = []
+    plan = None
+    for _ in range(repeticiones):
+        try:
+            with conn.cursor() as cur:
+                cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement, parameters)
+                resultado = cur.fetchone()[0]
+        finally:
+            # Las escrituras medidas no deben quedar en la base
+            conn.rollback()
+        resultado = json.loads(resultado) if isinstance(resultado, str) else resultado
+        plan = resultado[0]
+        tiempos.append(float(plan["Execution Time"]) + float(plan.get("Planning Time", 0)))
+    return plan, statistics.median(tiempos)
+
+def _resumir(plan: dict, tablas: Dict[str, Tuple[str, float]]) -> dict:
+    """Forma del plan y recorridos secuenciales sobre tablas grandes"""
+    forma = []
+    seq_scans = set()
+    for nodo in _nodos(plan["Plan"]):
+        relacion = nodo.get("Relation Name")
+        padre, filas = tablas.get(relacion, (relacion, 0.0)) if relacion else (None, 0.0)
+        forma.append(f"{nodo['Node Type']}({padre})" if padre else nodo["Node Type"])
+        if nodo["Node Type"] == "Seq Scan" and filas >= UMBRAL_FILAS_SEQ_SCAN:
+            seq_scans.add(padre)
+    return {"forma": forma, "seq_scans": sorted(seq_scans)}
+
+# ==================== EJECUCIÓN ====================
+
+async def _capturar(escenarios, usuarios: Dict[str, int], capturador: Capturador) -> None:
+    for escenario in escenarios:
+        capturador.escenario = escenario.nombre
+        try:
+            await escenario.ejecutar(usuarios)
+        except Exception as e:
+            logger.warning(f"⚠️ {escenario.nombre}: el escenario falló ({e}); se miden las sentencias capturadas")
+        finally:
+            capturador.escenario = None
+
+def _usuarios_de_referencia(conn) -> Dict[str, int]:
+    """Usuario con más eventos, uno mediano y uno con poca actividad"""
+    with conn.cursor() as cur:
+        cur.execute("""
+            WITH ordenados AS (
+                SELECT e.usuario_id, ROW_NUMBER() OVER (ORDER BY e.eventos_progreso DESC, e.usuario_id) AS puesto,
+                       COUNT(*) OVER () AS total
+                FROM usuario_estadisticas e
+                JOIN usuario u ON u.id_usuario = e.usuario_id
+                WHERE u.tipo_usuario = 'registrado'
+            )
+            SELECT
+                MAX(usuario_id) FILTER (WHERE puesto = 1),
+                MAX(usuario_id) FILTER (WHERE puesto = GREATEST(total / 2, 1)),
+                MAX(usuario_id) FILTER (WHERE puesto = total)
+            FROM ordenados
+        """)
+        intenso, medio, ligero = cur.fetchone()
+    conn.rollback()
+    if intenso is None:
+        raise SystemExit("❌ La base no tiene usuarios: ejecutar antes 'sembrar'")
+    return {"intenso": intenso, "medio": medio, "ligero": ligero}
+
+def ejecutar(repeticiones: int, guardar_linea_base: bool) -> int:
+    _preparar_entorno()
+    from sqlalchemy import event
+    from app.database import engine
+    from benchmarks.escenarios import cargar_escenarios
+
+    if engine is None:
+        raise SystemExit("❌ No se pudo crear el engine de la base de benchmark")
+
+    escenarios = cargar_escenarios()
+    conn = engine.raw_connection()
+    try:
+        usuarios = _usuarios_de_referencia(conn)
+        logger.info(f"👥 Usuarios de referencia: {usuarios}")
+
+        capturador = Capturador()
+        event.listen(engine, "before_cursor_execute", capturador)
+        try:
+            asyncio.run(_capturar(escenarios, usuarios, capturador))
+        finally:
+            event.remove(engine, "before_cursor_execute", capturador)
+
+        tablas = _tablas(conn)
+        resultados = {}
+        for escenario in escenarios:
+            for indice, (statement, parameters) in enumerate(capturador.sentencias.get(escenario.nombre, []), 1):
+                nombre = f"{escenario.nombre}#{indice}"
+                try:
+                    plan, tiempo_ms = _explicar(conn, statement, parameters, repeticiones)
+                except Exception as e:
+                    logger.warning(f"⚠️ {nombre}: no se pudo explicar ({e})")
+                    continue
+                resumen = _resumir(plan, tablas)
+                resultados[nombre] = {
+                    "tiempo_ms": round(tiempo_ms, 3),
+                    "presupuesto_ms": escenario.presupuesto_ms,
+                    "forma": resumen["forma"],
+                    "seq_scans": resumen["seq_scans"],
+                    "seq_scans_permitidos": sorted(escenario.permitir_seq_scan),
+                    "sql": statement,
+                }
+    finally:
+        conn.close()
+
+    fallos = _comparar(resultados, _cargar_linea_base())
+
+    if guardar_linea_base:
+        RUTA_LINEA_BASE.parent.mkdir(parents=True, exist_ok=True)
+        RUTA_LINEA_BASE.write_text(json.dumps({
+            "generado": datetime.now().isoformat(timespec="seconds"),
+            "usuarios": usuarios,
+            "consultas": resultados,
+        }, indent=2, ensure_ascii=False), encoding="utf-8")
+        logger.info(f"💾 Línea base guardada en {RUTA_LINEA_BASE}")
+
+    logger.info(f"{'❌' if fallos else '✅'} {len(resultados)} sentencias medidas, {fallos} fallos")
+    return 1 if fallos else 0
+
+def _cargar_linea_base() -> dict:
+    if not RUTA_LINEA_BASE.exists():
+        return {}
+    return json.loads(RUTA_LINEA_BASE.read_text(encoding="utf-8")).get("consultas", {})
+
+def _comparar(resultados: dict, linea_base: dict) -> int:
+    """Registrar el informe y devolver el número de fallos"""
+    fallos = 0
+    for nombre, r in resultados.items():
+        problemas = []
+        no_permitidos = sorted(set(r["seq_scans"]) - set(r["seq_scans_permitidos"]))
+        if no_permitidos:
+            problemas.append(f"Seq Scan sobre {', '.join(no_permitidos)}")
+        if r["tiempo_ms"] > r["presupuesto_ms"]:
+            problemas.append(f"{r['tiempo_ms']:.1f} ms > presupuesto {r['presupuesto_ms']:.0f} ms")
+
+        if problemas:
+            fallos += 1
+            logger.error(f"❌ {nombre}: {'; '.join(problemas)}")
+        else:
+            logger.info(f"✅ {nombre}: {r['tiempo_ms']:.1f} ms")
+
+        base = linea_base.get(nombre)
+        if base is None:
+            continue
+        if r["forma"] != base.get("forma"):
+            logger.warning(f"⚠️ {nombre}: el plan cambió respecto a la línea base")
+        if r["tiempo_ms"] > base.get("tiempo_ms", 0) * TOLERANCIA_LINEA_BASE:
+            logger.warning(f"⚠️ {nombre}: {r['tiempo_ms']:.1f} ms frente a {base['tiempo_ms']:.1f} ms en la línea base")
+    return fallos
+
+# ==================== CLI ====================
+
+def sembrar(args) -> int:
+    _preparar_entorno()
+    from app.database import engine
+    from benchmarks.datos_sinteticos import sembrar as cargar_datos
+
+    if engine is None:
+        raise SystemExit("❌ No se pudo crear el engine de la base de benchmark")
+
+    with engine.begin() as conn:
+        cargar_datos(
+            conn,
+            usuarios=args.usuarios,
+            eventos=args.eventos,
+            meses=args.meses,
+            simulaciones_por_usuario=args.simulaciones_por_usuario,
+            teorias=args.teorias,
+        )
+    return 0
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Regresión de planes de consulta de IReNaTech")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    parser_sembrar = subparsers.add_parser("sembrar", help="Cargar el conjunto de datos sintético")
+    parser_sembrar.add_argument("--usuarios", type=int, default=100_000)
+    parser_sembrar.add_argument("--eventos", type=int, default=10_000_000, help="Filas de progreso")
+    parser_sembrar.add_argument("--meses", type=int, default=18, help="Meses de historial de progreso")
+    parser_sembrar.add_argument("--simulaciones-por-usuario", type=int, default=10)
+    parser_sembrar.add_argument("--teorias", type=int, default=500)
+
+    parser_ejecutar = subparsers.add_parser("ejecutar", help="Medir las consultas y comparar con la línea base")
+    parser_ejecutar.add_argument("--repeticiones", type=int, default=3, help="Ejecuciones por sentencia (se usa la mediana)")
+    parser_ejecutar.add_argument("--guardar-linea-base", action="store_true", help="Sobrescribir la línea base con esta medición")
+
+    args = parser.parse_args()
+
+    if args.comando == "sembrar":
+        return sembrar(args)
+    return ejecutar(max(args.repeticiones, 1), args.guardar_linea_base)
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    sys.exit(main())
@@ -0,0 +1,83 @@
+# tests/bd_falsa.py
+"""
+Sesión de SQLAlchemy falsa para probar servicios sin PostgreSQL: registra
+cada sentencia con sus parámetros y devuelve, en orden, los resultados
+preparados (lista de filas como dicts, un escalar o una excepción a lanzar).
+"""
+
+from collections import deque
+from types import SimpleNamespace
+from typing import Any, Dict, List, Tuple
+
+class Fila(SimpleNamespace):
+    """Como Row de SQLAlchemy: acceso por atributo y desempaquetado como tupla"""
+
+    def __iter__(self):
+        return iter(vars(self).values())
+
+    @property
+    def _mapping(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+class ResultadoFalso:
+    def __init__(self, datos: Any):
+        self._datos = datos
+
+    def _filas(self) -> List[Fila]:
+        if isinstance(self._datos, list):
+            return [Fila(**fila) for fila in self._datos]
+        return []
+
+    def fetchall(self) -> List[Fila]:
+        return self._filas()
+
+    def fetchone(self):
+        filas = self._filas()
+        return filas[0] if filas else None
+
+    first = fetchone
+
+    def mappings(self) -> "MapeosFalsos":
+        return MapeosFalsos(self._datos if isinstance(self._datos, list) else [])
+
+    def scalar(self) -> Any:
+        if isinstance(self._datos, list):
+            filas = self._filas()
+            return next(iter(vars(filas[0]).values())) if filas else None
+        return self._datos
+
+    def __iter__(self):
+        return iter(self._filas())
+
+class MapeosFalsos:
+    def __init__(self, filas: List[Dict[str, Any]]):
+        self._filas = [dict(fila) for fila in filas]
+
+    def all(self) -> List[Dict[str, Any]]:
+        return self._filas
+
+    def first(self):
+        return self._filas[0] if self._filas else None
+
+class BDFalsa:
+    def __init__(self, *resultados: Any):
+        self.resultados = deque(resultados)
+        self.sentencias: List[Tuple[str, Dict[str, Any]]] = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def execute(self, sentencia, parametros=None) -> ResultadoFalso:
+        self.sentencias.append((str(sentencia), dict(parametros or {})))
+        datos = self.resultados.popleft() if self.resultados else []
+        if isinstance(datos, Exception):
+            raise datos
+        return ResultadoFalso(datos)
+
+    def commit(self) -> None:
+        self.commits += 1
+
+    def rollback(self) -> None:
+        self.rollbacks += 1
+
+    def close(self) -> None:
+        pass
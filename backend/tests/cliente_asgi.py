@@ -0,0 +1,87 @@
+# tests/cliente_asgi.py
+"""
+Cliente ASGI mínimo para probar rutas sin httpx (no es dependencia del
+proyecto): envía una petición a la app y recoge estado, cabeceras y cuerpo.
+"""
+
+import asyncio
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+@dataclass
+class Respuesta:
+    status: int
+    headers: Dict[str, str]
+    cuerpo: bytes
+    chunks: List[bytes] = field(default_factory=list)
+
+    def json(self) -> Any:
+        return json.loads(self.cuerpo)
+
+async def llamar(
+    app,
+    metodo: str,
+    ruta: str,
+    cuerpo: Optional[Any] = None,
+    cabeceras: Optional[Dict[str, str]] = None,
+    desconectar_tras: Optional[int] = None
+) -> Respuesta:
+    """
+    Ejecutar una petición contra `app`. Con desconectar_tras=N el cliente se
+    desconecta después de recibir N chunks del cuerpo.
+    """
+    datos = json.dumps(cuerpo).encode("utf-8") if cuerpo is not None else b""
+    ruta, _, consulta = ruta.partition("?")
+    lista_cabeceras = [(b"host", b"test"), (b"content-length", str(len(datos)).encode())]
+    if cuerpo is not None:
+        lista_cabeceras.append((b"content-type", b"application/json"))
+    for nombre, valor in (cabeceras or {}).items():
+        lista_cabeceras.append((nombre.lower().encode(), valor.encode()))
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": metodo.upper(),
+        "scheme": "http",
+        "path": ruta,
+        "raw_path": ruta.encode(),
+        "query_string": consulta.encode(),
+        "root_path": "",
+        "headers": lista_cabeceras,
+        "client": ("127.0.0.1", 12345),
+        "server": ("test", 80),
+    }
+
+    enviado = False
+    desconectado = asyncio.Event()
+    respuesta = Respuesta(status=0, headers={}, cuerpo=b"")
+
+    async def receive():
+        nonlocal enviado
+        if not enviado:
+            enviado = True
+            return {"type": "http.request", "body": datos, "more_body": False}
+        await desconectado.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(mensaje):
+        if mensaje["type"] == "http.response.start":
+            respuesta.status = mensaje["status"]
+            respuesta.headers = {k.decode().lower(): v.decode() for k, v in mensaje.get("headers", [])}
+        elif mensaje["type"] == "http.response.body":
+            if mensaje.get("body"):
+                respuesta.chunks.append(mensaje["body"])
+            if desconectar_tras is not None and len(respuesta.chunks) >= desconectar_tras:
+                desconectado.set()
+            if not mensaje.get("more_body", False):
+                desconectado.set()
+
+    await app(scope, receive, send)
+    respuesta.cuerpo = b"".join(respuesta.chunks)
+    return respuesta
+
+def peticion(app, metodo: str, ruta: str, **kwargs) -> Respuesta:
+    """Versión síncrona de llamar() para pruebas sencillas"""
+    return asyncio.run(llamar(app, metodo, ruta, **kwargs))
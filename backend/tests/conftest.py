@@ -0,0 +1,29 @@
+# tests/conftest.py
+"""Configuración común: las pruebas no dependen de Gemini ni de la red"""
+
+import os
+
+import pytest
+
+# Debe fijarse antes de importar app.services.ia (el proveedor se crea al importar)
+os.environ.setdefault("LLM_PROVEEDOR", "simulado")
+
+@pytest.fixture
+def app_progreso():
+    """App mínima con solo el router de progreso, montado como en app.api"""
+    from fastapi import FastAPI
+    from app.api.endpoints.progreso import router
+
+    app = FastAPI()
+    app.include_router(router, prefix="/progreso")
+    return app
+
+@pytest.fixture
+def app_chat():
+    """App mínima con solo el router de chat, montado como en app.api"""
+    from fastapi import FastAPI
+    from app.api.endpoints.chat import router
+
+    app = FastAPI()
+    app.include_router(router, prefix="/chat")
+    return app
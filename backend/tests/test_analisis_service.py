@@ -0,0 +1,92 @@
+# tests/test_analisis_service.py
+"""Análisis de rendimiento vectorizado, lote nocturno y ruta /analisis"""
+
+import asyncio
+import re
+from datetime import date
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services.analisis_service import AnalisisService, analisis_service
+from tests.bd_falsa import BDFalsa
+from tests.cliente_asgi import peticion
+
+INICIO = date(2026, 9, 28)
+
+def _datos() -> dict:
+    """Usuario 1: lee y completa casi todo; usuario 2: poca lectura y sin simulaciones"""
+    ceros = np.zeros((2, 2))
+    return {
+        "categorias": np.array(["Ácidos", "Enlaces"]),
+        "total_categoria": np.array([4.0, 2.0]),
+        "leidas_categoria": np.array([[4.0, 0.0], [1.0, 1.0]]),
+        "tipos": np.array(["Síntesis"]),
+        "simulaciones_tipo": np.array([[4.0], [0.0]]),
+        "completadas_tipo": np.array([[4.0], [0.0]]),
+        "simulaciones_semana": np.array([[1.0, 3.0], [2.0, 0.0]]),
+        "teorias_semana": ceros,
+        "elementos_semana": ceros,
+        "puntos_semana": np.array([[10.0, 30.0], [20.0, 0.0]]),
+    }
+
+def _calculado():
+    puntos = np.array([1200.0, 100.0])
+    return AnalisisService()._calcular(np.array([1, 2]), puntos, np.sort(puntos), _datos(), INICIO)
+
+def test_calculo_vectorizado_por_usuario():
+    experto, novato = _calculado()
+
+    assert experto.rendimiento_general == pytest.approx(88.33)
+    assert experto.areas_fortaleza == ["Teoría: Ácidos", "Simulaciones: Síntesis"]
+    assert experto.areas_mejora == ["Teoría: Enlaces"]
+    assert (experto.nivel_actual, experto.proximo_nivel, experto.progreso_nivel) == ("Avanzado", "Experto", 20.0)
+    assert "¡Tu actividad va en aumento! Sigue con ese ritmo" in experto.recomendaciones
+
+    # Sin simulaciones, ese componente no pesa en el rendimiento
+    assert novato.rendimiento_general == pytest.approx(39.39)
+    assert novato.areas_fortaleza == []
+    assert novato.areas_mejora == ["Teoría: Ácidos"]
+    assert novato.recomendaciones[0] == "Repasa la teoría de Ácidos: llevas 25% leído"
+    assert any("No registraste actividad" in r for r in novato.recomendaciones)
+
+def test_comparacion_semanal():
+    experto, _ = _calculado()
+    assert [(m.fecha.date(), m.simulaciones) for m in experto.comparacion_tiempo] == [
+        (date(2026, 9, 28), 1), (date(2026, 10, 5), 3)
+    ]
+
+def test_lote_nocturno_lee_usuario_una_vez(monkeypatch):
+    monkeypatch.setattr(settings, "ANALISIS_TAMANO_LOTE", 1)
+    usuarios = [{"id_usuario": 1, "puntos": 1200}, {"id_usuario": 2, "puntos": 100}]
+    # Por tramo: catálogo, lecturas, simulaciones, semanas y el upsert
+    bd = BDFalsa(usuarios, *([[]] * 5 * 2))
+    servicio = AnalisisService()
+    servicio.db_session = bd
+
+    assert asyncio.run(servicio.calcular_analisis_todos()) == 2
+    assert sum(bool(re.search(r"FROM usuario\b", sentencia)) for sentencia, _ in bd.sentencias) == 1
+    assert sum("INSERT INTO analisis_rendimiento" in sentencia for sentencia, _ in bd.sentencias) == 2
+    assert bd.commits == 2
+
+def test_analisis_precalculado_no_recalcula():
+    experto, _ = _calculado()
+    bd = BDFalsa([{"resultado": experto.model_dump(mode="json")}])
+    servicio = AnalisisService()
+    servicio.db_session = bd
+
+    assert asyncio.run(servicio.get_analisis_rendimiento(1)) == experto
+    assert len(bd.sentencias) == 1
+
+def test_ruta_analisis(app_progreso, monkeypatch):
+    experto, _ = _calculado()
+
+    async def analisis(usuario_id):
+        return experto if usuario_id == 1 else None
+
+    monkeypatch.setattr(analisis_service, "get_analisis_rendimiento", analisis)
+    respuesta = peticion(app_progreso, "GET", "/progreso/1/analisis")
+    assert respuesta.status == 200, respuesta.cuerpo
+    assert respuesta.json()["nivel_actual"] == "Avanzado"
+    assert peticion(app_progreso, "GET", "/progreso/9/analisis").status == 404
@@ -0,0 +1,64 @@
+# tests/test_cache_respuestas.py
+"""Normalización de preguntas, claves y LRU de cache_respuestas"""
+
+import pytest
+
+from app.services.cache_respuestas import CacheRespuestas, _es_formula, normalizar_pregunta, trocear
+
+@pytest.mark.parametrize("palabra, esperado", [
+    ("H2", True), ("O2", True), ("H2SO4", True), ("NaCl", True), ("CO", True),
+    ("ÁCIDO", False), ("Co", False), ("agua", False), ("Qué", False),
+])
+def test_es_formula(palabra, esperado):
+    assert _es_formula(palabra) is esperado
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("¿Qué es un ÁCIDO?", "que es un acido"),
+    ("Balancea H2 + O2", "balancea H2 + O2"),
+    ("  ¿Qué   es el   CO? ", "que es el CO"),
+    ("¿Qué es el Co?", "que es el co"),
+    ("¡¿?!", ""),
+])
+def test_normalizar_pregunta(texto, esperado):
+    assert normalizar_pregunta(texto) == esperado
+
+def test_trocear_conserva_el_texto():
+    respuesta = "El enlace covalente se forma cuando dos átomos comparten electrones. " * 10
+    chunks = trocear(respuesta, tamano=40)
+    assert "".join(chunks) == respuesta
+    # Todos salvo el último llegan al tamaño y se cortan en un límite de palabra
+    assert all(len(c) >= 40 for c in chunks[:-1])
+    assert all(c[-1].isspace() or c.endswith(".") or c[-1].isalpha() for c in chunks)
+
+def test_trocear_vacio_y_corto():
+    assert trocear("") == []
+    assert trocear("Hola") == ["Hola"]
+
+def test_clave_solo_para_preguntas_de_un_turno():
+    pregunta = [{"role": "user", "content": "¿Qué es un mol?"}]
+    assert CacheRespuestas.clave(pregunta, "") == CacheRespuestas.clave(
+        [{"role": "user", "content": "  que es un mol"}], ""
+    )
+    assert CacheRespuestas.clave(pregunta, "") != CacheRespuestas.clave(pregunta, "otro contexto")
+    assert CacheRespuestas.clave(pregunta + [{"role": "assistant", "content": "..."}], "") is None
+    assert CacheRespuestas.clave([{"role": "user", "content": "¿?"}], "") is None
+
+def test_lru_y_ttl(monkeypatch):
+    cache = CacheRespuestas(max_entradas=2, ttl_segundos=60)
+    cache.guardar("a", "respuesta a")
+    cache.guardar("b", "respuesta b")
+    assert cache.obtener("a") == "respuesta a"
+    # "b" es la menos usada y sale al entrar "c"
+    cache.guardar("c", "respuesta c")
+    assert cache.obtener("b") is None
+    assert cache.obtener("c") == "respuesta c"
+
+    ahora = __import__("time").time()
+    monkeypatch.setattr("app.services.cache_respuestas.time.time", lambda: ahora + 61)
+    assert cache.obtener("a") is None
+    assert cache.estado()["aciertos"] == 2
+
+def test_cache_desactivada():
+    cache = CacheRespuestas(max_entradas=0, ttl_segundos=60)
+    cache.guardar("a", "respuesta a")
+    assert cache.obtener("a") is None
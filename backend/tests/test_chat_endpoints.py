@@ -0,0 +1,78 @@
+# tests/test_chat_endpoints.py
+"""Registro de preguntas desde /chat: solo las respuestas reales cuentan"""
+
+import asyncio
+
+import pytest
+
+import app.api.endpoints.chat as chat
+from app.services import ia
+from app.services.ia import ChatNoDisponibleError
+from app.services.registro_preguntas import registro_preguntas
+from tests.cliente_asgi import peticion
+
+PREGUNTA = {"messages": [{"role": "user", "content": "¿Qué es un mol?"}], "usuario_id": 7}
+
+@pytest.fixture
+def registradas(monkeypatch):
+    registros = []
+    monkeypatch.setattr(
+        registro_preguntas, "registrar",
+        lambda pregunta, respuesta, usuario_id=None: registros.append((pregunta, respuesta, usuario_id))
+    )
+    return registros
+
+def test_respuesta_real_se_registra(app_chat, registradas, monkeypatch):
+    async def responder(messages, model=None):
+        return "Un mol son 6,022·10²³ partículas."
+
+    monkeypatch.setattr(chat, "chat_completion", responder)
+    respuesta = peticion(app_chat, "POST", "/chat/", cuerpo=PREGUNTA)
+    assert respuesta.status == 200
+    assert registradas == [("¿Qué es un mol?", "Un mol son 6,022·10²³ partículas.", 7)]
+
+def test_aviso_de_error_no_se_registra(app_chat, registradas, monkeypatch):
+    async def fallar(messages, model=None):
+        raise ChatNoDisponibleError("⚠️ **Error de Conexión**")
+
+    monkeypatch.setattr(chat, "chat_completion", fallar)
+    respuesta = peticion(app_chat, "POST", "/chat/", cuerpo=PREGUNTA)
+    assert respuesta.status == 200
+    assert respuesta.json()["reply"] == "⚠️ **Error de Conexión**"
+    assert registradas == []
+
+def test_stream_con_error_no_se_registra(app_chat, registradas, monkeypatch):
+    async def stream_fallido(messages, model=None):
+        yield "Un mol "
+        raise ChatNoDisponibleError("⚠️ **Error de Conexión**")
+
+    monkeypatch.setattr(chat, "chat_stream", stream_fallido)
+    monkeypatch.setattr(chat, "buscar_en_cache", lambda messages: "en caché")
+    respuesta = peticion(app_chat, "POST", "/chat/stream", cuerpo=PREGUNTA)
+    assert respuesta.status == 200
+    assert respuesta.cuerpo.decode().splitlines() == ["Un mol ", "⚠️ **Error de Conexión**", "[DONE]"]
+    assert registradas == []
+
+def test_stream_completo_se_registra(app_chat, registradas, monkeypatch):
+    async def stream(messages, model=None):
+        yield "Un mol "
+        yield "son 6,022·10²³ partículas."
+        yield "[DONE]"
+
+    monkeypatch.setattr(chat, "chat_stream", stream)
+    monkeypatch.setattr(chat, "buscar_en_cache", lambda messages: "en caché")
+    peticion(app_chat, "POST", "/chat/stream", cuerpo=PREGUNTA)
+    assert registradas == [("¿Qué es un mol?", "Un mol son 6,022·10²³ partículas.", 7)]
+
+def test_sin_api_key_lanza_el_aviso(monkeypatch):
+    monkeypatch.setattr(ia, "proveedor_llm", type("SinClave", (), {"configurado": False})())
+
+    with pytest.raises(ChatNoDisponibleError) as error:
+        asyncio.run(ia.chat_completion([{"role": "user", "content": "hola"}]))
+    assert "GEMINI_API_KEY" in error.value.respuesta
+
+    async def leer():
+        return [chunk async for chunk in ia.chat_stream([{"role": "user", "content": "hola"}])]
+
+    with pytest.raises(ChatNoDisponibleError):
+        asyncio.run(leer())
@@ -0,0 +1,54 @@
+# tests/test_historial_chat.py
+"""Ventana de historial por presupuesto de tokens (sin llamar a Gemini)"""
+
+import asyncio
+
+from app.services.historial_chat import TOKENS_POR_MENSAJE, GestorHistorial, _huella
+
+def _mensaje(rol, texto):
+    return {"role": rol, "parts": [{"text": texto}]}
+
+def _conversacion(turnos, caracteres=40):
+    mensajes = []
+    for i in range(turnos):
+        mensajes.append(_mensaje("user", f"pregunta {i} " + "x" * caracteres))
+        mensajes.append(_mensaje("model", f"respuesta {i} " + "y" * caracteres))
+    return mensajes
+
+def test_corte_empieza_en_un_turno_del_usuario():
+    historial = _conversacion(6)
+    # Caben unos tres mensajes: la ventana no puede empezar en uno del modelo
+    por_mensaje = GestorHistorial.tokens(historial[-1:])
+    gestor = GestorHistorial(max_tokens=3 * por_mensaje, espera_resumen=0, max_resumenes=10)
+    corte = gestor._corte(historial)
+    assert historial[corte]["role"] == "user"
+    assert corte == len(historial) - 2
+    assert GestorHistorial.tokens(historial[corte:]) <= gestor.max_tokens
+
+def test_corte_sin_presupuesto_no_conserva_nada():
+    historial = _conversacion(2)
+    gestor = GestorHistorial(max_tokens=TOKENS_POR_MENSAJE, espera_resumen=0, max_resumenes=10)
+    assert gestor._corte(historial) == len(historial)
+
+def test_ajustar_dentro_del_presupuesto_no_toca_nada():
+    mensajes = _conversacion(2) + [_mensaje("user", "¿y ahora?")]
+    gestor = GestorHistorial(max_tokens=10_000, espera_resumen=0, max_resumenes=10)
+    assert asyncio.run(gestor.ajustar(mensajes)) == mensajes
+    assert gestor.recortes == 0
+
+def test_ajustar_usa_el_resumen_cacheado():
+    historial = _conversacion(6)
+    ultimo = _mensaje("user", "¿y ahora?")
+    por_mensaje = GestorHistorial.tokens(historial[-1:])
+    gestor = GestorHistorial(max_tokens=3 * por_mensaje, espera_resumen=0, max_resumenes=10)
+
+    corte = gestor._corte(historial)
+    huella = ""
+    for mensaje in historial[:corte]:
+        huella = _huella(huella, mensaje)
+    gestor._resumenes[huella] = "resumen previo"
+
+    ajustados = asyncio.run(gestor.ajustar(historial + [ultimo]))
+    assert "resumen previo" in ajustados[0]["parts"][0]["text"]
+    assert ajustados[2:] == historial[corte:] + [ultimo]
+    assert gestor.recortes == 1
@@ -0,0 +1,84 @@
+# tests/test_limite_concurrencia.py
+"""Semáforo de generaciones del chat y respuesta 503 cuando está saturado"""
+
+import asyncio
+
+import pytest
+
+import app.api.endpoints.chat as chat
+from app.services.ia import ChatSaturadoError, _LimiteConcurrencia
+from tests.cliente_asgi import llamar, peticion
+
+PREGUNTA = {"messages": [{"role": "user", "content": "¿Qué es un mol?"}]}
+
+def test_no_supera_el_maximo_de_generaciones():
+    limite = _LimiteConcurrencia(maximo=2, max_en_cola=10, espera_maxima=1)
+    maximo_visto = 0
+
+    async def generar():
+        nonlocal maximo_visto
+        async with limite.turno():
+            maximo_visto = max(maximo_visto, limite.activas)
+            await asyncio.sleep(0.01)
+
+    async def varias():
+        await asyncio.gather(*(generar() for _ in range(6)))
+
+    asyncio.run(varias())
+    assert maximo_visto == 2
+    assert limite.estado() == {"activas": 0, "en_cola": 0, "maximo": 2, "max_en_cola": 10}
+
+def test_cola_llena_rechaza_sin_esperar():
+    limite = _LimiteConcurrencia(maximo=1, max_en_cola=0, espera_maxima=5)
+
+    async def escenario():
+        async with limite.turno():
+            with pytest.raises(ChatSaturadoError):
+                limite.verificar_capacidad()
+            with pytest.raises(ChatSaturadoError):
+                async with limite.turno():
+                    pass
+
+    asyncio.run(escenario())
+
+def test_espera_maxima_agotada():
+    limite = _LimiteConcurrencia(maximo=1, max_en_cola=5, espera_maxima=0.01)
+
+    async def escenario():
+        async with limite.turno():
+            with pytest.raises(ChatSaturadoError):
+                async with limite.turno():
+                    pass
+            assert limite.en_cola == 0
+
+    asyncio.run(escenario())
+    # El hueco se liberó: un turno nuevo entra sin esperar
+    asyncio.run(_turno_libre(limite))
+
+async def _turno_libre(limite):
+    async with limite.turno():
+        assert limite.activas == 1
+
+def test_chat_saturado_responde_503(app_chat, monkeypatch):
+    async def saturado(messages, model=None):
+        raise ChatSaturadoError("4 generaciones activas y 16 en cola")
+
+    monkeypatch.setattr(chat, "chat_completion", saturado)
+    monkeypatch.setattr(chat.limite_chat, "espera_maxima", 7.5)
+
+    respuesta = peticion(app_chat, "POST", "/chat/", cuerpo=PREGUNTA)
+    assert respuesta.status == 503
+    assert respuesta.headers["retry-after"] == "7"
+
+def test_stream_saturado_responde_503_antes_de_abrir(app_chat, monkeypatch):
+    limite = _LimiteConcurrencia(maximo=1, max_en_cola=0, espera_maxima=1)
+    monkeypatch.setattr(chat, "limite_chat", limite)
+    monkeypatch.setattr(chat, "buscar_en_cache", lambda messages: None)
+
+    async def escenario():
+        async with limite.turno():
+            return await llamar(app_chat, "POST", "/chat/stream", cuerpo=PREGUNTA)
+
+    respuesta = asyncio.run(escenario())
+    assert respuesta.status == 503
+    assert "retry-after" in respuesta.headers
@@ -0,0 +1,128 @@
+# tests/test_llamadas_llm.py
+"""Plazo, reintentos con jitter y cobertura (hedging) de _LlamadasLLM"""
+
+import asyncio
+import time
+from collections import deque
+
+import pytest
+
+from app.core.config import settings
+from app.services import ia
+from app.services.ia import _LlamadasLLM
+from app.services.proveedores_llm import ErrorProveedorLLM, ProveedorLLM, RespuestaLLM
+
+MENSAJES = [{"role": "user", "parts": [{"text": "hola"}]}]
+
+class _ProveedorGuionado:
+    """Cada llamada sigue el siguiente paso del guion: (espera, texto o excepción)"""
+
+    reintentable = ProveedorLLM.reintentable
+
+    def __init__(self, *guion):
+        self.guion = deque(guion)
+        self.plazos = []
+        self.canceladas = 0
+
+    async def generar(self, mensajes, perfil="chat", modelo=None, timeout=None):
+        self.plazos.append(timeout)
+        espera, resultado = self.guion.popleft() if self.guion else (0, "ok")
+        try:
+            await asyncio.sleep(espera)
+        except asyncio.CancelledError:
+            self.canceladas += 1
+            raise
+        if isinstance(resultado, BaseException):
+            raise resultado
+        return RespuestaLLM(texto=resultado)
+
+@pytest.fixture
+def proveedor(monkeypatch):
+    monkeypatch.setattr(settings, "IA_REINTENTO_BASE_SEGUNDOS", 0.001)
+    monkeypatch.setattr(settings, "IA_REINTENTO_MAX_ESPERA_SEGUNDOS", 0.002)
+    monkeypatch.setattr(settings, "IA_REINTENTOS_MAX", 2)
+    monkeypatch.setattr(settings, "IA_COBERTURA_ACTIVA", False)
+
+    def instalar(*guion):
+        falso = _ProveedorGuionado(*guion)
+        monkeypatch.setattr(ia, "proveedor_llm", falso)
+        return falso
+    return instalar
+
+def test_reintenta_errores_transitorios(proveedor):
+    falso = proveedor((0, ErrorProveedorLLM("503")), (0, "respuesta"))
+    llamadas = _LlamadasLLM()
+
+    assert asyncio.run(llamadas.generar(MENSAJES)).texto == "respuesta"
+    assert llamadas.reintentos == 1 and len(falso.plazos) == 2
+
+def test_no_reintenta_errores_permanentes(proveedor):
+    falso = proveedor((0, ValueError("petición inválida")))
+    with pytest.raises(ValueError):
+        asyncio.run(_LlamadasLLM().generar(MENSAJES))
+    assert len(falso.plazos) == 1
+
+def test_limite_de_reintentos(proveedor):
+    falso = proveedor(*[(0, ErrorProveedorLLM("503"))] * 5)
+    llamadas = _LlamadasLLM()
+    with pytest.raises(ErrorProveedorLLM):
+        asyncio.run(llamadas.generar(MENSAJES))
+    assert len(falso.plazos) == 3 and llamadas.reintentos == 2
+
+def test_el_plazo_llega_al_proveedor_y_se_respeta(proveedor):
+    falso = proveedor((1, "tarde"))
+    llamadas = _LlamadasLLM()
+
+    async def llamar():
+        return await llamadas.generar(MENSAJES, limite=time.monotonic() + 0.05)
+
+    inicio = time.monotonic()
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(llamar())
+    assert time.monotonic() - inicio < 0.5
+    assert falso.plazos[0] <= 0.05
+    assert llamadas.plazos_agotados == 1
+
+def test_plazo_vencido_no_llama(proveedor):
+    falso = proveedor()
+    llamadas = _LlamadasLLM()
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(llamadas.generar(MENSAJES, limite=time.monotonic() - 1))
+    assert falso.plazos == [] and llamadas.plazos_agotados == 1
+
+def _con_p95(llamadas: _LlamadasLLM, segundos: float) -> _LlamadasLLM:
+    llamadas._latencias["chat"] = deque([segundos] * 10, maxlen=500)
+    return llamadas
+
+def test_cobertura_gana_y_cancela_la_lenta(proveedor, monkeypatch):
+    monkeypatch.setattr(settings, "IA_COBERTURA_ACTIVA", True)
+    monkeypatch.setattr(settings, "IA_COBERTURA_MIN_MUESTRAS", 5)
+    monkeypatch.setattr(settings, "IA_COBERTURA_MAX_FRACCION", 1.0)
+    falso = proveedor((1, "lenta"), (0, "cobertura"))
+    llamadas = _con_p95(_LlamadasLLM(), 0.01)
+
+    assert asyncio.run(llamadas.generar(MENSAJES)).texto == "cobertura"
+    assert (llamadas.coberturas, llamadas.coberturas_ganadoras) == (1, 1)
+    assert falso.canceladas == 1
+
+def test_sin_cobertura_por_defecto(proveedor):
+    falso = proveedor((0.05, "única"))
+    llamadas = _con_p95(_LlamadasLLM(), 0.01)
+
+    assert asyncio.run(llamadas.generar(MENSAJES)).texto == "única"
+    assert llamadas.coberturas == 0 and len(falso.plazos) == 1
+
+def test_cobertura_acotada_por_fraccion(proveedor, monkeypatch):
+    monkeypatch.setattr(settings, "IA_COBERTURA_ACTIVA", True)
+    monkeypatch.setattr(settings, "IA_COBERTURA_MIN_MUESTRAS", 5)
+    monkeypatch.setattr(settings, "IA_COBERTURA_MAX_FRACCION", 0.05)
+    proveedor(*[(0.03, "ok")] * 20)
+    llamadas = _con_p95(_LlamadasLLM(), 0.01)
+
+    async def varias():
+        for _ in range(10):
+            await llamadas.generar(MENSAJES)
+
+    asyncio.run(varias())
+    # 5 % de 10 llamadas: solo la primera puede llevar cobertura
+    assert llamadas.coberturas == 1
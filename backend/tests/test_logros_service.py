@@ -0,0 +1,135 @@
+# tests/test_logros_service.py
+"""Compilación de reglas de logros (condicion_json) y logros del usuario sin base de datos"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from app.core.config import settings
+from app.services.logros_service import LogrosService
+from tests.bd_falsa import BDFalsa
+from tests.cliente_asgi import peticion
+
+def _logro(condicion, puntos_requeridos=0):
+    return {"codigo_logro": "PRUEBA", "puntos_requeridos": puntos_requeridos, "condicion_json": condicion}
+
+def test_regla_y_avance_simples():
+    regla, avance = LogrosService()._compilar({"metrica": "preguntas_ia", "operador": ">", "valor": 50})
+    assert not regla({"preguntas_ia": 50})
+    assert regla({"preguntas_ia": 51})
+    assert avance({"preguntas_ia": 17}) == pytest.approx(100 / 3)
+
+def test_reglas_combinadas():
+    regla, avance = LogrosService()._compilar({"todas": [
+        {"metrica": "teorias_leidas", "valor": 10},
+        {"metrica": "simulaciones_completadas", "valor": 4},
+    ]})
+    assert not regla({"teorias_leidas": 10, "simulaciones_completadas": 3})
+    assert regla({"teorias_leidas": 10, "simulaciones_completadas": 4})
+    # "todas" avanza al ritmo de la condición más atrasada
+    assert avance({"teorias_leidas": 10, "simulaciones_completadas": 1}) == 25.0
+
+@pytest.mark.parametrize("valor", ["50", None, True, [50]])
+@pytest.mark.parametrize("operador", [">=", ">", "==", "<"])
+def test_valor_no_numerico_desactiva_el_logro(operador, valor):
+    logro = LogrosService()._compilar_logro(_logro({"metrica": "preguntas_ia", "operador": operador, "valor": valor}))
+    assert logro["regla"] is None and logro["avance"] is None
+
+def test_metrica_desconocida_desactiva_el_logro():
+    logro = LogrosService()._compilar_logro(_logro('{"metrica": "inventada", "valor": 1}'))
+    assert logro["regla"] is None
+
+def test_puntos_requeridos_sin_condicion():
+    logro = LogrosService()._compilar_logro(_logro(None, puntos_requeridos=500))
+    assert logro["regla"]({"puntos_totales": 500})
+    assert not logro["regla"]({"puntos_totales": 499})
+
+class _FilaFalsa:
+    def __init__(self, usuario_id):
+        self._mapping = {"id_usuario": usuario_id, "preguntas_ia": usuario_id}
+
+class _BDFalsa:
+    def __init__(self):
+        self.consultas = 0
+
+    def execute(self, sentencia, parametros):
+        self.consultas += 1
+        usuario_id = parametros["usuario_id"]
+        return type("Resultado", (), {"fetchone": lambda _: _FilaFalsa(usuario_id)})()
+
+def test_cache_de_estadisticas_acotada(monkeypatch):
+    monkeypatch.setattr(settings, "PROGRESO_CACHE_MAX_USUARIOS", 2)
+    servicio = LogrosService()
+    servicio.db_session = bd = _BDFalsa()
+
+    async def consultar(*usuarios):
+        for usuario_id in usuarios:
+            await servicio.get_estadisticas_usuario(usuario_id)
+
+    asyncio.run(consultar(1, 2, 1, 3))
+    # El 2 es el menos usado y sale al entrar el 3
+    assert list(servicio._estadisticas) == [1, 3]
+    assert servicio._estadisticas[3][0] == {"preguntas_ia": 3}
+
+    asyncio.run(consultar(1, 2))
+    assert bd.consultas == 4
+
+# ==================== LOGROS DEL USUARIO (sesión falsa) ====================
+
+CATALOGO = [
+    {"id_logro": 1, "codigo_logro": "PRIMERA_SIM", "nombre": "Primera simulación", "descripcion": None,
+     "icono": None, "puntos_requeridos": 0,
+     "condicion_json": {"metrica": "simulaciones_completadas", "valor": 1}},
+    {"id_logro": 2, "codigo_logro": "LECTOR", "nombre": "Lector", "descripcion": "Lee 10 teorías",
+     "icono": "book", "puntos_requeridos": 0, "condicion_json": {"metrica": "teorias_leidas", "valor": 10}},
+    {"id_logro": 3, "codigo_logro": "CURIOSO", "nombre": "Curioso", "descripcion": "Haz 50 preguntas",
+     "icono": "chat", "puntos_requeridos": 0, "condicion_json": {"metrica": "preguntas_ia", "valor": 50}},
+]
+ESTADISTICAS = {"id_usuario": 7, "simulaciones_completadas": 2, "teorias_leidas": 8, "preguntas_ia": 5}
+
+def _con_bd(*resultados):
+    servicio = LogrosService()
+    servicio.db_session = BDFalsa(*resultados)
+    return servicio
+
+def test_logros_usuario_y_proximo_logro():
+    obtenido = datetime(2026, 10, 2, 18, 30)
+    servicio = _con_bd(CATALOGO, [ESTADISTICAS], [{"logro_id": 1, "fecha_obtenido": obtenido}])
+
+    respuesta = asyncio.run(servicio.get_logros_usuario(7))
+
+    assert (respuesta.total_logros_disponibles, respuesta.logros_obtenidos) == (3, 1)
+    primero, lector, curioso = respuesta.logros
+    assert primero.obtenido and primero.fecha_obtenido == obtenido and primero.progreso == 100.0
+    assert (primero.descripcion, primero.icono) == ("", "award")
+    assert (lector.progreso, curioso.progreso) == (80.0, 10.0)
+    assert respuesta.proximo_logro.codigo_logro == "LECTOR"
+
+def test_logros_usuario_reutiliza_catalogo_y_estadisticas():
+    servicio = _con_bd(CATALOGO, [ESTADISTICAS], [], [])
+    asyncio.run(servicio.get_logros_usuario(7))
+    asyncio.run(servicio.get_logros_usuario(7))
+
+    # La segunda vez solo se consulta usuario_logros
+    consultas = [sentencia for sentencia, _ in servicio.db_session.sentencias]
+    assert len(consultas) == 4
+    assert "usuario_logros" in consultas[-1]
+
+def test_otorgar_solo_los_cumplidos():
+    servicio = _con_bd(CATALOGO, [ESTADISTICAS], [{"logro_id": 1}])
+    assert asyncio.run(servicio.otorgar_logros(7)) == [1]
+    _, parametros = servicio.db_session.sentencias[-1]
+    assert parametros == {"usuario_id": 7, "logros": [1]}
+    assert servicio.db_session.commits == 1
+
+def test_ruta_logros(app_progreso, monkeypatch):
+    servicio = _con_bd(CATALOGO, [ESTADISTICAS], [])
+    monkeypatch.setattr("app.api.endpoints.progreso.logros_service", servicio)
+
+    respuesta = peticion(app_progreso, "GET", "/progreso/7/logros")
+    assert respuesta.status == 200, respuesta.cuerpo
+    cuerpo = respuesta.json()
+    assert cuerpo["usuario_id"] == 7 and cuerpo["logros_obtenidos"] == 0
+    # Cumplido pero aún sin otorgar: es el próximo, al 100%
+    assert (cuerpo["proximo_logro"]["id_logro"], cuerpo["proximo_logro"]["progreso"]) == (1, 100.0)
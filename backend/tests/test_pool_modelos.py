@@ -0,0 +1,72 @@
+# tests/test_pool_modelos.py
+"""Reutilización de GenerativeModel por (modelo, perfil) en ProveedorGemini"""
+
+import asyncio
+import sys
+import types
+
+import pytest
+
+from app.core.config import settings
+from app.services.proveedores_llm import PERFILES_GENERACION, ProveedorGemini
+
+class _ModeloFalso:
+    creados = 0
+
+    def __init__(self, model_name, system_instruction, generation_config):
+        _ModeloFalso.creados += 1
+        self.model_name = model_name
+        self.generation_config = generation_config
+        self.sondeos = 0
+
+    async def count_tokens_async(self, texto):
+        self.sondeos += 1
+
+@pytest.fixture
+def sdk_falso(monkeypatch):
+    """google.generativeai mínimo: solo lo que usa ProveedorGemini"""
+    _ModeloFalso.creados = 0
+    configs = []
+
+    def generation_config(**parametros):
+        configs.append(parametros)
+        return types.SimpleNamespace(**parametros)
+
+    genai = types.ModuleType("google.generativeai")
+    genai.configure = lambda api_key: None
+    genai.GenerativeModel = _ModeloFalso
+    genai.types = types.SimpleNamespace(GenerationConfig=generation_config)
+    google = types.ModuleType("google")
+    google.generativeai = genai
+    monkeypatch.setitem(sys.modules, "google", google)
+    monkeypatch.setitem(sys.modules, "google.generativeai", genai)
+    monkeypatch.setattr(settings, "GEMINI_API_KEY", "clave-de-prueba")
+    return configs
+
+def test_mismo_modelo_y_perfil_se_reutiliza(sdk_falso):
+    proveedor = ProveedorGemini("sistema")
+    modelo, config = proveedor.obtener("chat")
+    otra_vez, misma_config = proveedor.obtener("chat")
+
+    assert modelo is otra_vez and config is misma_config
+    assert _ModeloFalso.creados == 1
+    assert config.temperature == PERFILES_GENERACION["chat"]["temperature"]
+
+def test_un_modelo_por_perfil_y_nombre(sdk_falso):
+    proveedor = ProveedorGemini("sistema")
+    chat, _ = proveedor.obtener("chat")
+    resumen, _ = proveedor.obtener("resumen")
+    otro, _ = proveedor.obtener("chat", "gemini-otro")
+
+    assert len({id(chat), id(resumen), id(otro)}) == 3
+    assert otro.model_name == "gemini-otro"
+    # La configuración es por perfil, no por modelo
+    assert len(sdk_falso) == 2
+
+def test_calentar_crea_todos_los_perfiles_y_sondea(sdk_falso):
+    proveedor = ProveedorGemini("sistema")
+    asyncio.run(proveedor.calentar())
+
+    assert _ModeloFalso.creados == len(PERFILES_GENERACION)
+    prueba, _ = proveedor.obtener("prueba")
+    assert prueba.sondeos == 1
@@ -0,0 +1,115 @@
+# tests/test_progreso_endpoints.py
+"""Rutas de progreso llamadas por ASGI, con los servicios sustituidos"""
+
+from datetime import date, datetime
+
+import pytest
+
+from app.models.progreso import HistorialSimulacionesResponse, RespuestaGuardadoLote
+from app.services.progreso_service import progreso_service
+from tests.cliente_asgi import peticion
+
+LOTE = {"eventos": [
+    {"accion": "simulacion_completada", "puntos": 10, "fecha": "2026-10-01T10:00:00"},
+    {"accion": "teoria_leida", "descripcion": "Enlace covalente"},
+]}
+
+@pytest.fixture
+def llamadas_lote(monkeypatch):
+    llamadas = []
+
+    async def guardar_lote(usuario_id, eventos):
+        llamadas.append((usuario_id, eventos))
+        return RespuestaGuardadoLote(
+            success=True,
+            message="ok",
+            timestamp=datetime.now().isoformat(),
+            usuario_id=usuario_id,
+            eventos_guardados=len(eventos),
+            progreso_ids=list(range(1, len(eventos) + 1))
+        )
+
+    monkeypatch.setattr(progreso_service, "guardar_progreso_lote", guardar_lote)
+    return llamadas
+
+def test_lote_recibe_ruta_y_cuerpo(app_progreso, llamadas_lote):
+    respuesta = peticion(app_progreso, "POST", "/progreso/7/guardar/batch", cuerpo=LOTE)
+    assert respuesta.status == 200, respuesta.cuerpo
+    assert respuesta.json()["eventos_guardados"] == 2
+
+    [(usuario_id, eventos)] = llamadas_lote
+    assert usuario_id == 7
+    assert [e["accion"] for e in eventos] == ["simulacion_completada", "teoria_leida"]
+    assert eventos[0]["fecha"] == "2026-10-01T10:00:00"
+    assert eventos[1]["puntos"] == 0
+
+def test_lote_vacio_se_rechaza(app_progreso, llamadas_lote):
+    respuesta = peticion(app_progreso, "POST", "/progreso/7/guardar/batch", cuerpo={"eventos": []})
+    assert respuesta.status == 422
+    assert llamadas_lote == []
+
+def test_error_no_repite_el_guardado(app_progreso, monkeypatch):
+    llamadas = []
+
+    async def fallar(usuario_id, eventos):
+        llamadas.append(usuario_id)
+        raise RuntimeError("conexión perdida")
+
+    monkeypatch.setattr(progreso_service, "guardar_progreso_lote", fallar)
+    respuesta = peticion(app_progreso, "POST", "/progreso/7/guardar/batch", cuerpo=LOTE)
+    assert respuesta.status == 500
+    assert llamadas == [7]
+
+def test_decorador_conserva_la_firma():
+    from app.api.endpoints.progreso import router
+
+    rutas = {(tuple(r.methods), r.path): r.dependant for r in router.routes}
+    dependiente = rutas[(("POST",), "/{usuario_id}/guardar/batch")]
+    assert [p.name for p in dependiente.path_params] == ["usuario_id"]
+    assert [p.name for p in dependiente.body_params] == ["lote"]
+    assert not dependiente.query_params
+
+def test_historial_pasa_filtros_y_pagina(app_progreso, monkeypatch):
+    llamadas = []
+
+    async def historial(**kwargs):
+        llamadas.append(kwargs)
+        return HistorialSimulacionesResponse(usuario_id=kwargs["usuario_id"], total_simulaciones=12, simulaciones=[])
+
+    monkeypatch.setattr(progreso_service, "get_historial_simulaciones", historial)
+    respuesta = peticion(app_progreso, "GET", "/progreso/3/simulaciones?limite=5&offset=10&estado=Fallida")
+
+    assert respuesta.status == 200, respuesta.cuerpo
+    assert respuesta.json()["total_simulaciones"] == 12
+    assert llamadas == [{"usuario_id": 3, "limite": 5, "offset": 10, "estado": "Fallida"}]
+    assert peticion(app_progreso, "GET", "/progreso/3/simulaciones?limite=500").status == 422
+
+@pytest.fixture
+def llamadas_metricas(monkeypatch):
+    llamadas = []
+
+    async def metricas(usuario_id, desde, hasta, bucket):
+        llamadas.append((usuario_id, desde, hasta, bucket))
+        return []
+
+    monkeypatch.setattr(progreso_service, "get_metricas_tiempo", metricas)
+    return llamadas
+
+def test_metricas_rango_y_bucket(app_progreso, llamadas_metricas):
+    respuesta = peticion(app_progreso, "GET", "/progreso/3/metricas?desde=2026-09-01&hasta=2026-09-30&bucket=week")
+    assert respuesta.status == 200, respuesta.cuerpo
+    assert llamadas_metricas == [(3, date(2026, 9, 1), date(2026, 9, 30), "week")]
+
+def test_metricas_por_defecto_ultimos_30_dias(app_progreso, llamadas_metricas):
+    assert peticion(app_progreso, "GET", "/progreso/3/metricas").status == 200
+    [(_, desde, hasta, bucket)] = llamadas_metricas
+    assert (hasta - desde).days == 30 and bucket == "day"
+
+@pytest.mark.parametrize("consulta", [
+    "desde=2026-10-01&hasta=2026-09-01",
+    "desde=2024-01-01&hasta=2026-01-01",
+    "bucket=month",
+])
+def test_metricas_rechaza_parametros_invalidos(app_progreso, llamadas_metricas, consulta):
+    assert peticion(app_progreso, "GET", f"/progreso/3/metricas?{consulta}").status == 422
+    assert llamadas_metricas == []
@@ -0,0 +1,162 @@
+# tests/test_progreso_service.py
+"""Lógica de ProgresoService que no depende del SQL (con una sesión falsa)"""
+
+import asyncio
+from datetime import date, datetime
+
+import pytest
+
+from app.core.config import settings
+from app.services.logros_service import logros_service
+from app.services.progreso_service import ProgresoService
+from app.services.ranking_service import ranking_service
+from tests.bd_falsa import BDFalsa
+
+def _servicio(bd: BDFalsa) -> ProgresoService:
+    servicio = ProgresoService()
+    servicio.db_session = bd
+    return servicio
+
+def test_mantener_particiones_crea_y_archiva(monkeypatch):
+    monkeypatch.setattr(settings, "PROGRESO_MESES_ADELANTO", 2)
+    monkeypatch.setattr(settings, "PROGRESO_MESES_RETENCION", 6)
+    bd = BDFalsa(1, 3)
+
+    resultado = asyncio.run(_servicio(bd).mantener_particiones_progreso())
+
+    assert resultado == {"creadas": 1, "archivadas": 3}
+    [(crear, p_crear), (archivar, p_archivar)] = bd.sentencias
+    assert "crear_particiones_progreso" in crear and p_crear == {"meses": 2}
+    assert "archivar_particiones_progreso" in archivar and p_archivar == {"meses": 6}
+    assert bd.commits == 1
+
+def test_mantener_particiones_deshace_si_falla():
+    bd = BDFalsa(1, RuntimeError("lock timeout"))
+    with pytest.raises(RuntimeError):
+        asyncio.run(_servicio(bd).mantener_particiones_progreso())
+    assert bd.commits == 0 and bd.rollbacks == 1
+
+# ==================== HISTORIAL ====================
+
+def _simulacion(id_simulacion: int, total: int) -> dict:
+    return {
+        "id_simulacion": id_simulacion, "nombre": f"Simulación {id_simulacion}",
+        "fecha": datetime(2026, 10, id_simulacion, 9, 0), "descripcion": "Simulación química",
+        "estado": "Completada", "duracion_minutos": 45, "tipo_simulacion": "Síntesis",
+        "puntos_obtenidos": 25, "total": total, "elementos_usados": 3, "rendimiento": 50.0,
+    }
+
+def test_historial_total_y_pagina_en_una_consulta():
+    bd = BDFalsa([_simulacion(2, total=7), _simulacion(1, total=7)])
+    historial = asyncio.run(_servicio(bd).get_historial_simulaciones(4, limite=2, estado="Completada"))
+
+    assert historial.total_simulaciones == 7
+    assert [s.id_simulacion for s in historial.simulaciones] == [2, 1]
+    [(sentencia, parametros)] = bd.sentencias
+    assert "COUNT(*) OVER()" in sentencia
+    assert parametros == {"usuario_id": 4, "estado": "Completada", "limite": 2, "offset": 0}
+
+def test_historial_pagina_fuera_de_rango_cuenta_aparte():
+    bd = BDFalsa([], [{"total": 7}])
+    historial = asyncio.run(_servicio(bd).get_historial_simulaciones(4, limite=5, offset=20))
+
+    assert historial.total_simulaciones == 7 and historial.simulaciones == []
+    assert len(bd.sentencias) == 2
+
+def test_historial_vacio_sin_segunda_consulta():
+    bd = BDFalsa([])
+    historial = asyncio.run(_servicio(bd).get_historial_simulaciones(4))
+    assert historial.total_simulaciones == 0
+    assert len(bd.sentencias) == 1
+
+# ==================== MÉTRICAS ====================
+
+def test_metricas_desde_el_acumulado_diario():
+    bd = BDFalsa([
+        {"periodo": date(2026, 9, 28), "simulaciones": 3, "teorias_completadas": 1, "elementos_nuevos": 2},
+        {"periodo": date(2026, 10, 5), "simulaciones": 0, "teorias_completadas": 0, "elementos_nuevos": 0},
+    ])
+    metricas = asyncio.run(_servicio(bd).get_metricas_tiempo(4, date(2026, 10, 1), date(2026, 10, 7), "week"))
+
+    assert [(m.fecha, m.simulaciones) for m in metricas] == [
+        (datetime(2026, 9, 28), 3), (datetime(2026, 10, 5), 0)
+    ]
+    [(sentencia, parametros)] = bd.sentencias
+    assert "FROM progreso_diario" in sentencia and "FROM progreso " not in sentencia
+    assert parametros["bucket"] == "week" and parametros["intervalo"] == "1 week"
+
+def test_metricas_error_devuelve_lista_vacia():
+    bd = BDFalsa(RuntimeError("relation progreso_diario does not exist"))
+    assert asyncio.run(_servicio(bd).get_metricas_tiempo(4, date(2026, 10, 1), date(2026, 10, 7))) == []
+    assert bd.rollbacks == 1
+
+# ==================== ESTADÍSTICAS MATERIALIZADAS ====================
+
+def test_estadisticas_generales_desde_usuario_estadisticas():
+    bd = BDFalsa([{
+        "total_simulaciones": 9, "simulaciones_completadas": 6, "simulaciones_en_proceso": 2,
+        "simulaciones_fallidas": 1, "elementos_diferentes_usados": 14, "teorias_leidas": 5,
+        "total_teorias_disponibles": 40, "preguntas_ia_realizadas": 12, "puntos_totales": 640,
+        "nivel": "Intermedio", "tiempo_total_simulacion_minutos": 310,
+    }])
+    estadisticas = asyncio.run(_servicio(bd).get_estadisticas_generales(4))
+
+    assert (estadisticas.simulaciones_completadas, estadisticas.teoria_completadas) == (6, 5)
+    assert (estadisticas.puntuacion_total, estadisticas.nivel_experiencia) == (640, "Intermedio")
+    [(sentencia, parametros)] = bd.sentencias
+    assert "usuario_estadisticas" in sentencia and "vista_estadisticas_completas" not in sentencia
+    assert parametros == {"usuario_id": 4}
+
+def test_estadisticas_generales_usuario_inexistente():
+    estadisticas = asyncio.run(_servicio(BDFalsa([])).get_estadisticas_generales(404))
+    assert estadisticas.total_simulaciones == 0 and estadisticas.nivel_experiencia == "Principiante"
+
+def test_recalcular_usuario_estadisticas():
+    bd = BDFalsa([{"filas": 1}])
+    assert asyncio.run(_servicio(bd).recalcular_usuario_estadisticas(4)) == 1
+    [(sentencia, parametros)] = bd.sentencias
+    assert "recalcular_usuario_estadisticas" in sentencia and parametros == {"usuario_id": 4}
+    assert bd.commits == 1
+
+def test_recalcular_usuario_estadisticas_deshace_si_falla():
+    bd = BDFalsa(RuntimeError("deadlock detected"))
+    with pytest.raises(RuntimeError):
+        asyncio.run(_servicio(bd).recalcular_usuario_estadisticas())
+    assert bd.rollbacks == 1 and bd.sentencias[0][1] == {"usuario_id": None}
+
+# ==================== PUNTOS INCREMENTALES ====================
+
+def test_reconciliar_puntos_devuelve_corregidos():
+    bd = BDFalsa([{"corregidos": 3}])
+    assert asyncio.run(_servicio(bd).reconciliar_puntos_usuarios()) == 3
+    assert "reconciliar_puntos_usuarios()" in bd.sentencias[0][0]
+    assert bd.commits == 1
+
+def test_reconciliar_puntos_deshace_si_falla():
+    bd = BDFalsa(RuntimeError("statement timeout"))
+    with pytest.raises(RuntimeError):
+        asyncio.run(_servicio(bd).reconciliar_puntos_usuarios())
+    assert bd.rollbacks == 1
+
+def test_guardar_lote_no_recalcula_puntos(monkeypatch):
+    actualizados = []
+    monkeypatch.setattr(ranking_service, "actualizar", lambda *args: actualizados.append(args))
+
+    async def sin_logros(usuario_id):
+        return []
+
+    monkeypatch.setattr(logros_service, "otorgar_logros", sin_logros)
+    bd = BDFalsa(
+        [{"progreso_ids": [31, 32]}],
+        [{"nombre": "Ana", "puntos_totales": 540, "tipo_usuario": "registrado"}],
+    )
+    respuesta = asyncio.run(_servicio(bd).guardar_progreso_lote(4, [
+        {"accion": "simulacion_completada", "puntos": 30},
+        {"accion": "teoria_leida", "puntos": 10},
+    ]))
+
+    assert respuesta.progreso_ids == [31, 32]
+    # Los puntos los suma el trigger de sentencia; la app solo lee el total
+    sentencias = [sentencia for sentencia, _ in bd.sentencias]
+    assert not any("calcular_puntos_usuario" in sentencia for sentencia in sentencias)
+    assert actualizados == [(4, 540, "Ana")]
@@ -0,0 +1,70 @@
+# tests/test_proveedores_llm.py
+"""Selección del proveedor con LLM_PROVEEDOR y comportamiento del simulado"""
+
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services.proveedores_llm import (
+    ErrorProveedorLLM, ProveedorSimulado, crear_proveedor
+)
+
+MENSAJES = [{"role": "user", "parts": [{"text": "¿Qué es una neutralización?"}]}]
+
+@pytest.fixture
+def rapido(monkeypatch):
+    """Simulado sin esperas apreciables"""
+    monkeypatch.setattr(settings, "SIMULADO_TTFT_MS", 0.0)
+    monkeypatch.setattr(settings, "SIMULADO_TOKENS_POR_SEGUNDO", 1e6)
+    monkeypatch.setattr(settings, "SIMULADO_TOKENS_RESPUESTA", 20)
+    monkeypatch.setattr(settings, "SIMULADO_TOKENS_POR_CHUNK", 8)
+    monkeypatch.setattr(settings, "SIMULADO_JITTER", 0.0)
+    monkeypatch.setattr(settings, "SIMULADO_TASA_ERROR", 0.0)
+
+@pytest.mark.parametrize("nombre", ["simulado", " Simulado "])
+def test_seleccion_por_configuracion(monkeypatch, nombre):
+    monkeypatch.setattr(settings, "LLM_PROVEEDOR", nombre)
+    proveedor = crear_proveedor("sistema")
+    assert isinstance(proveedor, ProveedorSimulado)
+    assert proveedor.configurado and proveedor.modelo == "simulado"
+
+def test_proveedor_desconocido(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_PROVEEDOR", "openai")
+    with pytest.raises(ValueError, match="gemini, simulado"):
+        crear_proveedor("sistema")
+
+def test_simulado_determinista_por_repeticion(rapido):
+    a, b = ProveedorSimulado("sistema"), ProveedorSimulado("sistema")
+    primeras = [asyncio.run(a.generar(MENSAJES)).texto for _ in range(2)]
+    segundas = [asyncio.run(b.generar(MENSAJES)).texto for _ in range(2)]
+
+    # La n-ésima llamada coincide entre instancias
+    assert primeras == segundas
+    respuesta = asyncio.run(ProveedorSimulado("sistema").generar(MENSAJES))
+    assert respuesta.tokens_respuesta == 20 and len(respuesta.texto.split()) == 20
+
+def test_simulado_respeta_el_maximo_del_perfil(rapido):
+    respuesta = asyncio.run(ProveedorSimulado("sistema").generar(MENSAJES, "prueba"))
+    assert respuesta.tokens_respuesta == 10
+
+def test_simulado_stream_por_chunks(rapido):
+    async def leer():
+        return [chunk async for chunk in ProveedorSimulado("sistema").generar_stream(MENSAJES)]
+
+    chunks = asyncio.run(leer())
+    assert len(chunks) == 3
+    completo = asyncio.run(ProveedorSimulado("sistema").generar(MENSAJES)).texto
+    assert "".join(chunks) == completo
+
+def test_simulado_errores_configurables(rapido, monkeypatch):
+    monkeypatch.setattr(settings, "SIMULADO_TASA_ERROR", 1.0)
+    proveedor = ProveedorSimulado("sistema")
+    with pytest.raises(ErrorProveedorLLM) as error:
+        asyncio.run(proveedor.generar(MENSAJES))
+    assert proveedor.reintentable(error.value)
+
+def test_simulado_agota_el_plazo(rapido, monkeypatch):
+    monkeypatch.setattr(settings, "SIMULADO_TTFT_MS", 5000.0)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(ProveedorSimulado("sistema").generar(MENSAJES, timeout=0.01))
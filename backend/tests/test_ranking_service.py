@@ -0,0 +1,93 @@
+# tests/test_ranking_service.py
+"""Leaderboard en memoria: posiciones con empates, top N y reconciliación"""
+
+import asyncio
+import threading
+
+import pytest
+
+from app.services.ranking_service import RankingService
+from tests.bd_falsa import BDFalsa
+from tests.cliente_asgi import peticion
+
+USUARIOS = [
+    {"id_usuario": 1, "nombre": "Ana", "puntos_totales": 1200},
+    {"id_usuario": 2, "nombre": "Luis", "puntos_totales": 300},
+    {"id_usuario": 3, "nombre": None, "puntos_totales": 1200},
+]
+
+def _cargado() -> RankingService:
+    servicio = RankingService()
+    servicio.db_session = BDFalsa(USUARIOS)
+    asyncio.run(servicio.reconciliar())
+    return servicio
+
+def test_reconciliar_carga_desde_la_bd():
+    servicio = _cargado()
+    assert servicio._orden == [(-1200, 1), (-1200, 3), (-300, 2)]
+    assert servicio._nombres[3] == "Usuario 3"
+    assert servicio._suma_puntos == 2700
+
+def test_posicion_con_empates():
+    servicio = _cargado()
+    posiciones = {u: asyncio.run(servicio.get_posicion(u)) for u in (1, 2, 3)}
+    assert posiciones == {1: 1, 3: 1, 2: 3}
+    assert asyncio.run(servicio.get_posicion(99)) is None
+
+def test_actualizar_recoloca_y_retira():
+    servicio = _cargado()
+    servicio.actualizar(2, 2500, "Luis")
+    assert asyncio.run(servicio.get_posicion(2)) == 1
+    assert asyncio.run(servicio.get_posicion(1)) == 2
+
+    # Sin puntos deja de participar, igual que la vista original
+    servicio.actualizar(1, 0)
+    assert asyncio.run(servicio.get_posicion(1)) is None
+    assert servicio._suma_puntos == 3700
+    assert len(servicio._orden) == 2
+
+def test_leaderboard_top_n():
+    leaderboard = asyncio.run(_cargado().get_leaderboard(limite=2))
+    assert leaderboard.total_usuarios == 3
+    assert leaderboard.puntuacion_promedio == 900.0
+    assert [(u.usuario_id, u.posicion, u.nivel) for u in leaderboard.usuarios] == [
+        (1, 1, "Avanzado"), (3, 1, "Avanzado")
+    ]
+
+def test_reconciliar_consulta_fuera_del_event_loop():
+    servicio = RankingService()
+    servicio.db_session = BDFalsa(USUARIOS)
+    hilos = []
+    original = servicio._leer_usuarios
+
+    def leer(db):
+        hilos.append(threading.current_thread())
+        return original(db)
+
+    servicio._leer_usuarios = leer
+    asyncio.run(servicio.reconciliar())
+    assert hilos and hilos[0] is not threading.main_thread()
+
+def test_reconciliar_fallida_deshace_y_propaga():
+    servicio = RankingService()
+    servicio.db_session = bd = BDFalsa(RuntimeError("sin conexión"))
+    with pytest.raises(RuntimeError):
+        asyncio.run(servicio.reconciliar())
+    assert bd.rollbacks == 1
+
+@pytest.fixture
+def ranking_cargado(monkeypatch):
+    servicio = _cargado()
+    monkeypatch.setattr("app.api.endpoints.progreso.ranking_service", servicio)
+    return servicio
+
+def test_rutas_ranking_y_leaderboard(app_progreso, ranking_cargado):
+    respuesta = peticion(app_progreso, "GET", "/progreso/2/ranking")
+    assert respuesta.status == 200, respuesta.cuerpo
+    assert respuesta.json()["posicion"] == 3
+
+    assert peticion(app_progreso, "GET", "/progreso/99/ranking").status == 404
+
+    respuesta = peticion(app_progreso, "GET", "/progreso/leaderboard?limite=1")
+    assert respuesta.status == 200, respuesta.cuerpo
+    assert [u["usuario_id"] for u in respuesta.json()["usuarios"]] == [1]
@@ -0,0 +1,102 @@
+# tests/test_recuperacion_service.py
+"""
+Pruebas del tokenizador, el troceado en pasajes y el índice BM25 (sin base de datos).
+
+Ejecutar desde backend/:
+    python -m pytest tests
+"""
+
+import pytest
+
+from app.services.recuperacion_service import (
+    TAMANO_PASAJE, Pasaje, _IndiceBM25, _singular, partir_pasajes, tokenizar
+)
+
+# (plural, singular): ambas formas deben dar el mismo término
+PARES_SINGULAR = [
+    ("enlaces", "enlace"),
+    ("indices", "indice"),
+    ("gases", "gas"),
+    ("meses", "mes"),
+    ("leyes", "ley"),
+    ("luces", "luz"),
+    ("raices", "raiz"),
+    ("matrices", "matriz"),
+    ("bases", "base"),
+    ("fases", "fase"),
+    ("aires", "aire"),
+    ("acidos", "acido"),
+    ("compuestos", "compuesto"),
+    ("electrones", "electron"),
+    ("iones", "ion"),
+    ("soluciones", "solucion"),
+    ("metales", "metal"),
+    ("sales", "sal"),
+    ("moles", "mol"),
+    ("colores", "color"),
+    ("azucares", "azucar"),
+    ("redes", "red"),
+    ("unidades", "unidad"),
+    ("verdes", "verde"),
+    ("dobles", "doble"),
+    ("coloides", "coloide"),
+    ("nubes", "nube"),
+]
+
+@pytest.mark.parametrize("plural, singular", PARES_SINGULAR)
+def test_singular_une_plural_y_singular(plural, singular):
+    assert _singular(plural) == singular
+    assert _singular(singular) == singular
+
+@pytest.mark.parametrize("palabra", ["gas", "ion", "sal", "analisis", "acido"])
+def test_singular_no_cambia_palabras_sin_plural(palabra):
+    assert _singular(palabra) == _singular(_singular(palabra))
+
+def test_tokenizar_quita_tildes_stopwords_y_plurales():
+    assert tokenizar("¿Qué son los ENLACES covalentes de los gases?") == ["enlace", "covalente", "gas"]
+
+def test_tokenizar_pregunta_en_plural_coincide_con_singular():
+    assert tokenizar("las leyes de los gases") == tokenizar("la ley del gas")
+
+def test_partir_pasajes_agrupa_parrafos_cortos():
+    pasajes = partir_pasajes("Primer párrafo.\n\nSegundo párrafo.\n\n\nTercero.")
+    assert pasajes == ["Primer párrafo.\n\nSegundo párrafo.\n\nTercero."]
+
+def test_partir_pasajes_parte_por_frases():
+    frase = "El enlace covalente comparte pares de electrones entre dos átomos. "
+    parrafo = (frase * 30).strip()
+    pasajes = partir_pasajes(parrafo)
+    assert len(pasajes) > 1
+    assert all(len(p) <= TAMANO_PASAJE for p in pasajes)
+    # No se pierde ni se corta ninguna frase
+    assert " ".join(pasajes) == parrafo
+
+def _indice():
+    return _IndiceBM25([
+        Pasaje(1, "Enlace covalente", "Enlace Químico", "Los átomos comparten electrones en el enlace covalente."),
+        Pasaje(2, "Enlace iónico", "Enlace Químico", "Un metal cede electrones a un no metal y se forman iones."),
+        Pasaje(3, "Gases ideales", "Termoquímica", "La ley de los gases ideales relaciona presión, volumen y temperatura."),
+    ])
+
+def test_bm25_ordena_por_relevancia():
+    resultados = _indice().buscar("¿Qué son los enlaces covalentes?", limite=3)
+    assert [r.pasaje.teoria_id for r in resultados][:2] == [1, 2]
+    assert resultados[0].puntuacion > resultados[1].puntuacion
+    assert all(0 < r.confianza <= 1 for r in resultados)
+
+def test_bm25_plural_y_singular_coinciden():
+    resultados = _indice().buscar("ley del gas ideal", limite=3)
+    assert resultados[0].pasaje.teoria_id == 3
+
+def test_bm25_sin_coincidencias():
+    indice = _indice()
+    assert indice.buscar("fotosíntesis", limite=3) == []
+    assert indice.buscar("", limite=3) == []
+    assert _IndiceBM25([]).buscar("enlace", limite=3) == []
+
+def test_bm25_terminos_desconocidos_bajan_la_confianza():
+    indice = _indice()
+    conocida = indice.buscar("enlace covalente", limite=1)[0]
+    mezclada = indice.buscar("enlace covalente fotosíntesis clorofila", limite=1)[0]
+    assert mezclada.pasaje.teoria_id == conocida.pasaje.teoria_id
+    assert mezclada.confianza < conocida.confianza
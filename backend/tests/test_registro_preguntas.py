@@ -0,0 +1,68 @@
+# tests/test_registro_preguntas.py
+"""Cola acotada, lotes y desborde del registro de preguntas (INSERT sustituido)"""
+
+import asyncio
+import json
+
+import pytest
+
+from app.services.registro_preguntas import RegistroPreguntas
+
+@pytest.fixture
+def insertados(monkeypatch):
+    """Lotes "escritos": se sustituye el INSERT y el otorgamiento de logros"""
+    lotes = []
+    lotes_con_logros = []
+
+    def insertar(registros):
+        lotes.append(registros)
+        return sorted({r["usuario_id"] for r in registros if r["usuario_id"] is not None})
+
+    async def otorgar(self, usuarios):
+        lotes_con_logros.append(usuarios)
+
+    monkeypatch.setattr(RegistroPreguntas, "_insertar", staticmethod(insertar))
+    monkeypatch.setattr(RegistroPreguntas, "_otorgar_logros", otorgar)
+    return lotes, lotes_con_logros
+
+def test_volcar_escribe_en_lotes(insertados):
+    lotes, lotes_con_logros = insertados
+    registro = RegistroPreguntas(max_en_cola=100, tamano_lote=2, intervalo_segundos=1)
+    for i in range(5):
+        registro.registrar(f"pregunta {i}", "respuesta", usuario_id=i % 2 or None)
+    registro.registrar("", "respuesta vacía no se registra")
+
+    asyncio.run(registro.volcar())
+    assert [len(lote) for lote in lotes] == [2, 2, 1]
+    assert lotes_con_logros == [[1], [1], []]
+    assert registro.estado()["escritos"] == 5
+    assert registro.estado()["en_cola"] == 0
+
+def test_cola_llena_sin_desborde_descarta(insertados):
+    registro = RegistroPreguntas(max_en_cola=2, tamano_lote=10, intervalo_segundos=1)
+    for i in range(5):
+        registro.registrar(f"pregunta {i}", "respuesta")
+    assert registro.estado()["en_cola"] == 2
+    assert registro.descartados == 3
+
+def test_fallo_de_bd_pasa_al_desborde_y_se_recupera(tmp_path, monkeypatch, insertados):
+    lotes, _ = insertados
+    ruta = tmp_path / "desborde.jsonl"
+    registro = RegistroPreguntas(max_en_cola=10, tamano_lote=10, intervalo_segundos=1, ruta_desborde=str(ruta))
+
+    def caida(registros):
+        raise RuntimeError("BD caída")
+
+    with monkeypatch.context() as m:
+        m.setattr(RegistroPreguntas, "_insertar", staticmethod(caida))
+        registro.registrar("pregunta", "respuesta", usuario_id=7)
+        asyncio.run(registro.volcar())
+
+    assert registro.lotes_fallidos == 1
+    assert [json.loads(linea)["usuario_id"] for linea in ruta.read_text(encoding="utf-8").splitlines()] == [7]
+
+    # Con la BD de vuelta, el siguiente volcado reinserta lo desbordado
+    registro.registrar("otra pregunta", "respuesta")
+    asyncio.run(registro.volcar())
+    assert [r["pregunta"] for lote in lotes for r in lote] == ["otra pregunta", "pregunta"]
+    assert not ruta.exists()
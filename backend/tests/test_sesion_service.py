@@ -0,0 +1,111 @@
+# tests/test_sesion_service.py
+"""Sesiones de estudio: ciclo en memoria, volcado y cierre de huérfanas"""
+
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.sesion_service import SesionService
+from tests.bd_falsa import BDFalsa
+from tests.cliente_asgi import peticion
+
+def _registros_guardados(bd: BDFalsa):
+    """Filas enviadas al upsert de sesiones_estudio"""
+    return [
+        registro
+        for sentencia, parametros in bd.sentencias if "INSERT INTO sesiones_estudio" in sentencia
+        for registro in json.loads(parametros["lote"])
+    ]
+
+def _servicio(*resultados) -> SesionService:
+    servicio = SesionService()
+    servicio.db_session = BDFalsa(*resultados)
+    return servicio
+
+def test_latidos_solo_en_memoria_y_cierre_explicito():
+    servicio = _servicio([{"existe": 1}])
+    sesion = asyncio.run(servicio.iniciar(5, "simulacion"))
+    servicio.latido(5, sesion.id_sesion, actividades=2, puntos=10)
+    assert len(servicio.db_session.sentencias) == 1
+
+    cerrada = servicio.finalizar(5, sesion.id_sesion, actividades=1)
+    assert cerrada.activa is False and cerrada.actividades_realizadas == 3
+    assert servicio.finalizar(5, sesion.id_sesion) is None
+
+    assert asyncio.run(servicio.volcar()) == 1
+    [registro] = _registros_guardados(servicio.db_session)
+    assert registro["activa"] is False and registro["fecha_fin"] is not None
+    assert servicio.db_session.commits == 1
+
+def test_latido_de_otro_usuario_no_cuenta():
+    servicio = _servicio([{"existe": 1}])
+    sesion = asyncio.run(servicio.iniciar(5, "teoria"))
+    assert servicio.latido(6, sesion.id_sesion, puntos=50) is None
+    assert sesion.puntos_sesion == 0
+
+def test_huerfanas_se_cierran_como_un_put():
+    inicio = datetime(2026, 10, 1, 10, 0)
+    huerfana = {
+        "id_sesion": "0b9e2f4e-6a55-4c1f-9d44-3f1c1b7c2a10",
+        "usuario_id": 5,
+        "fecha_inicio": inicio,
+        "duracion_minutos": 3,
+        "actividades_realizadas": 4,
+        "puntos_sesion": 20,
+        "tipo_actividad_principal": "simulacion",
+        "dispositivo": "web",
+        "ultimo_latido": inicio + timedelta(minutes=25),
+    }
+    servicio = _servicio([huerfana])
+
+    assert asyncio.run(servicio.cerrar_sesiones_huerfanas()) == 1
+
+    # Mismo upsert que el volcado: guarda la duración y suma sesiones_completadas
+    sentencias = [sentencia for sentencia, _ in servicio.db_session.sentencias]
+    assert any("sesiones_completadas" in sentencia for sentencia in sentencias)
+    [registro] = _registros_guardados(servicio.db_session)
+    assert registro["activa"] is False
+    assert registro["duracion_minutos"] == 25
+    assert registro["fecha_fin"] == registro["ultimo_latido"] == "2026-10-01T10:25:00"
+    assert servicio.db_session.commits == 1
+
+def test_sin_huerfanas_no_escribe():
+    servicio = _servicio([])
+    assert asyncio.run(servicio.cerrar_sesiones_huerfanas()) == 0
+    assert len(servicio.db_session.sentencias) == 1
+
+def test_volcado_fallido_conserva_lo_pendiente():
+    servicio = _servicio([{"existe": 1}], RuntimeError("sin conexión"))
+    sesion = asyncio.run(servicio.iniciar(5, "teoria"))
+    servicio.finalizar(5, sesion.id_sesion)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(servicio.volcar())
+    assert sesion.id_sesion in servicio._finalizadas
+    assert servicio.db_session.rollbacks == 1
+
+@pytest.fixture
+def sesiones(monkeypatch):
+    servicio = _servicio([{"existe": 1}], [])
+    monkeypatch.setattr("app.api.endpoints.progreso.sesion_service", servicio)
+    return servicio
+
+def test_rutas_de_sesion(app_progreso, sesiones):
+    respuesta = peticion(app_progreso, "POST", "/progreso/5/sesion", cuerpo={"tipo_actividad": "teoria"})
+    assert respuesta.status == 200, respuesta.cuerpo
+    id_sesion = respuesta.json()["id_sesion"]
+
+    respuesta = peticion(app_progreso, "POST", f"/progreso/5/sesion/{id_sesion}/heartbeat",
+                         cuerpo={"actividades": 1, "puntos": 5})
+    assert respuesta.status == 200, respuesta.cuerpo
+    assert respuesta.json()["puntos_sesion"] == 5
+
+    respuesta = peticion(app_progreso, "PUT", f"/progreso/5/sesion/{id_sesion}", cuerpo={})
+    assert respuesta.status == 200, respuesta.cuerpo
+    assert respuesta.json()["activa"] is False
+
+    # Ya cerrada y no adoptable desde la BD
+    respuesta = peticion(app_progreso, "PUT", f"/progreso/5/sesion/{id_sesion}", cuerpo={})
+    assert respuesta.status == 404
@@ -0,0 +1,100 @@
+# tests/test_sonda_gemini.py
+"""Estado de /chat/health desde la sonda en segundo plano"""
+
+import asyncio
+
+import pytest
+
+import app.api.endpoints.chat as chat
+from app.core.config import settings
+from app.services import ia
+from app.services.ia import _SondaGemini
+from tests.cliente_asgi import peticion
+
+class _ProveedorFalso:
+    nombre = "falso"
+    modelo = "modelo-falso"
+    configurado = True
+
+    def __init__(self, error=None, espera=0.0):
+        self.error = error
+        self.espera = espera
+        self.sondeos = 0
+
+    async def sondear(self):
+        self.sondeos += 1
+        await asyncio.sleep(self.espera)
+        if self.error:
+            raise self.error
+
+@pytest.fixture
+def proveedor(monkeypatch):
+    def instalar(**kwargs):
+        falso = _ProveedorFalso(**kwargs)
+        monkeypatch.setattr(ia, "proveedor_llm", falso)
+        return falso
+    return instalar
+
+def test_sondeo_correcto(proveedor):
+    proveedor()
+    sonda = _SondaGemini()
+    resultado = asyncio.run(sonda.sondear())
+
+    assert resultado["status"] == "ok" and resultado["proveedor"] == "falso"
+    estado = sonda.estado()
+    assert estado["sondeo"] == "ligero"
+    assert estado["comprobado_hace_segundos"] is not None
+    assert "concurrencia" in estado
+
+def test_sondeo_fallido(proveedor):
+    proveedor(error=ConnectionError("sin red"))
+    resultado = asyncio.run(_SondaGemini().sondear())
+    assert resultado["status"] == "error"
+    assert "sin red" in resultado["message"]
+
+def test_sondeo_con_plazo(proveedor, monkeypatch):
+    monkeypatch.setattr(settings, "IA_SONDA_TIMEOUT_SEGUNDOS", 0.01)
+    proveedor(espera=1)
+    resultado = asyncio.run(_SondaGemini().sondear())
+    assert resultado["status"] == "error"
+    assert "TimeoutError" in resultado["message"]
+
+def test_sin_api_key_no_sondea(proveedor):
+    falso = proveedor()
+    falso.configurado = False
+    resultado = asyncio.run(_SondaGemini().sondear())
+    assert resultado["status"] == "error" and falso.sondeos == 0
+
+def test_estado_no_llama_al_proveedor(proveedor):
+    falso = proveedor()
+    sonda = _SondaGemini()
+    sonda.estado()
+    sonda.estado()
+    assert falso.sondeos == 0
+    assert sonda.estado()["status"] == "unknown"
+
+def test_health_sirve_el_estado_cacheado(app_chat, proveedor, monkeypatch):
+    proveedor()
+    sonda = _SondaGemini()
+    asyncio.run(sonda.sondear())
+    monkeypatch.setattr(chat, "sonda_gemini", sonda)
+
+    async def profundo():
+        raise AssertionError("sin ?deep=true no se genera texto")
+
+    monkeypatch.setattr(chat, "test_gemini_connection", profundo)
+    respuesta = peticion(app_chat, "GET", "/chat/health")
+    assert respuesta.status == 200
+    cuerpo = respuesta.json()
+    assert cuerpo["status"] == "ok" and cuerpo["details"]["sondeo"] == "ligero"
+
+def test_health_profundo(app_chat, monkeypatch):
+    llamadas = []
+
+    async def profundo():
+        llamadas.append(True)
+        return {"status": "ok", "message": "Conexión exitosa", "gemini_configured": True, "model": "m"}
+
+    monkeypatch.setattr(chat, "test_gemini_connection", profundo)
+    respuesta = peticion(app_chat, "GET", "/chat/health?deep=true")
+    assert respuesta.status == 200 and llamadas == [True]
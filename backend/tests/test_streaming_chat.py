@@ -0,0 +1,159 @@
+# tests/test_streaming_chat.py
+"""SSE de /chat/stream: ids, latidos, reanudación con Last-Event-ID y desconexión"""
+
+import asyncio
+
+import pytest
+
+import app.api.endpoints.chat as chat
+from app.services.streaming_chat import FIN, GestorStreams
+from tests.cliente_asgi import llamar
+
+class _PeticionFalsa:
+    """Lo único que usa GestorStreams de Request"""
+
+    def __init__(self):
+        self.desconectado = False
+
+    async def is_disconnected(self) -> bool:
+        return self.desconectado
+
+def _gestor() -> GestorStreams:
+    return GestorStreams(latido_segundos=0.01, retencion_segundos=60, max_streams=10)
+
+def _fuente(*chunks):
+    async def generar():
+        for chunk in chunks:
+            yield chunk
+        yield FIN
+    return generar
+
+async def _recoger(eventos, cortar_tras=None, peticion=None):
+    """Leer eventos; con cortar_tras=N el cliente se desconecta tras N eventos con id"""
+    recibidos = []
+    async for evento in eventos:
+        recibidos.append(evento)
+        if cortar_tras is not None and sum(e.startswith("id:") for e in recibidos) >= cortar_tras:
+            peticion.desconectado = True
+    return recibidos
+
+def _ids(eventos):
+    return [e.split("\n", 1)[0][len("id: "):] for e in eventos if e.startswith("id:")]
+
+def test_sse_con_ids_y_evento_done():
+    gestor = _gestor()
+    eventos = asyncio.run(_recoger(gestor.eventos_sse(_fuente("Hola", "mundo"), _PeticionFalsa())))
+
+    assert eventos[0] == "retry: 3000\n\n"
+    stream_id = _ids(eventos)[0].split(":")[0]
+    assert _ids(eventos) == [f"{stream_id}:0", f"{stream_id}:1", f"{stream_id}:2"]
+    assert "data: Hola" in eventos[1]
+    assert eventos[-1].split("\n")[1] == "event: done"
+    assert gestor.metricas.completados == 1
+
+def test_varias_lineas_en_un_chunk():
+    eventos = asyncio.run(_recoger(_gestor().eventos_sse(_fuente("a\nb"), _PeticionFalsa())))
+    assert eventos[1].endswith("data: a\ndata: b\n\n")
+
+def test_reanudar_stream_terminado_no_regenera():
+    gestor = _gestor()
+    primero = asyncio.run(_recoger(gestor.eventos_sse(_fuente("Hola", "mundo"), _PeticionFalsa())))
+    ultimo_recibido = _ids(primero)[0]
+
+    def no_llamar():
+        raise AssertionError("un stream terminado no se vuelve a generar")
+
+    reanudado = asyncio.run(_recoger(gestor.eventos_sse(no_llamar, _PeticionFalsa(), ultimo_recibido)))
+    assert reanudado == primero[2:]
+
+def test_reanudar_stream_cortado_emite_reset():
+    gestor = _gestor()
+    peticion = _PeticionFalsa()
+
+    async def lento():
+        yield "Hola"
+        await asyncio.sleep(1)
+        yield "mundo"
+
+    cortado = asyncio.run(_recoger(gestor.eventos_sse(lento, peticion), cortar_tras=1, peticion=peticion))
+    assert not any("event: done" in e for e in cortado)
+
+    reanudado = asyncio.run(_recoger(gestor.eventos_sse(_fuente("Otra vez"), _PeticionFalsa(), _ids(cortado)[0])))
+    assert "event: reset" in reanudado[1]
+    assert any("data: Otra vez" in e for e in reanudado)
+    assert "event: done" in reanudado[-1]
+
+def test_last_event_id_desconocido_empieza_de_cero():
+    eventos = asyncio.run(_recoger(_gestor().eventos_sse(_fuente("Hola"), _PeticionFalsa(), "no-existe:3")))
+    assert not any("event: reset" in e for e in eventos)
+
+def test_latido_mientras_espera_el_primer_token():
+    async def tarda():
+        await asyncio.sleep(0.05)
+        yield "Hola"
+
+    eventos = asyncio.run(_recoger(_gestor().eventos_sse(tarda, _PeticionFalsa())))
+    assert ": latido\n\n" in eventos
+
+def test_desconexion_cancela_la_generacion():
+    gestor = _gestor()
+    peticion = _PeticionFalsa()
+    cancelada = asyncio.Event()
+
+    async def sin_fin():
+        try:
+            yield "Hola"
+            await asyncio.sleep(10)
+            yield "nunca"
+        except asyncio.CancelledError:
+            cancelada.set()
+            raise
+
+    async def escenario():
+        await _recoger(gestor.eventos_sse(sin_fin, peticion), cortar_tras=1, peticion=peticion)
+        return cancelada.is_set()
+
+    assert asyncio.run(asyncio.wait_for(escenario(), timeout=2))
+    assert gestor.metricas.cancelados == 1 and gestor.metricas.completados == 0
+
+PREGUNTA = {"messages": [{"role": "user", "content": "¿Qué es un mol?"}]}
+
+@pytest.fixture
+def sin_cola(monkeypatch):
+    monkeypatch.setattr(chat, "buscar_en_cache", lambda messages: "en caché")
+
+def test_ruta_responde_sse_con_accept(app_chat, sin_cola, monkeypatch):
+    async def stream(messages, model=None):
+        yield "Un mol"
+        yield FIN
+
+    monkeypatch.setattr(chat, "chat_stream", stream)
+    respuesta = asyncio.run(llamar(
+        app_chat, "POST", "/chat/stream", cuerpo=PREGUNTA, cabeceras={"Accept": "text/event-stream"}
+    ))
+    assert respuesta.status == 200
+    assert respuesta.headers["content-type"].startswith("text/event-stream")
+    texto = respuesta.cuerpo.decode()
+    assert "data: Un mol" in texto and "event: done" in texto
+
+def test_ruta_desconexion_cancela(app_chat, sin_cola, monkeypatch):
+    cancelada = asyncio.Event()
+
+    async def stream(messages, model=None):
+        try:
+            yield "Un mol"
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelada.set()
+            raise
+
+    monkeypatch.setattr(chat, "chat_stream", stream)
+
+    async def escenario():
+        await llamar(
+            app_chat, "POST", "/chat/stream", cuerpo=PREGUNTA,
+            cabeceras={"Accept": "text/event-stream"}, desconectar_tras=2
+        )
+        return cancelada.is_set()
+
+    assert asyncio.run(asyncio.wait_for(escenario(), timeout=5))
@@ -0,0 +1,25 @@
+# tests/test_teoria_busqueda.py
+"""Fragmentos de la búsqueda de teoría por subcadena (respaldo de ts_headline)"""
+
+from app.crud.teoria import LONGITUD_FRAGMENTO, _fragmento_subcadena
+from app.schemas.teoria import TeoriaResultadoBusqueda
+
+def test_marca_la_coincidencia_sin_tildes():
+    fragmento = _fragmento_subcadena("El hidrógeno es el elemento más ligero.", "HIDROGENO")
+    assert fragmento == "El [[hidrógeno]] es el elemento más ligero."
+
+def test_recorta_alrededor_de_la_coincidencia():
+    contenido = "a" * 500 + " enlace covalente " + "b" * 500
+    fragmento = _fragmento_subcadena(contenido, "covalente")
+    assert fragmento.startswith("… ") and fragmento.endswith(" …")
+    assert "[[covalente]]" in fragmento
+    assert len(fragmento.replace("[[", "").replace("]]", "")) <= LONGITUD_FRAGMENTO + 4
+
+def test_sin_coincidencia_devuelve_el_principio():
+    contenido = "x" * 300
+    assert _fragmento_subcadena(contenido, "mol") == "x" * LONGITUD_FRAGMENTO + " …"
+    assert "[[" not in _fragmento_subcadena("Estequiometría básica", "")
+
+def test_resultado_sin_campo_leido():
+    # El estado de lectura sale de /teoria/progreso/{usuario_id}, no de la búsqueda
+    assert "leido" not in TeoriaResultadoBusqueda.model_fields
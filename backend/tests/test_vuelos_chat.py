@@ -0,0 +1,134 @@
+# tests/test_vuelos_chat.py
+"""Single-flight del chat (_VuelosChat): reparto y cancelación"""
+
+import asyncio
+
+import pytest
+
+from app.services.ia import _VuelosChat
+
+def test_completar_comparte_una_sola_generacion():
+    async def escenario():
+        vuelos = _VuelosChat()
+        llamadas = 0
+        liberar = asyncio.Event()
+
+        async def crear():
+            nonlocal llamadas
+            llamadas += 1
+            await liberar.wait()
+            return "respuesta"
+
+        peticiones = [asyncio.create_task(vuelos.completar("clave", crear)) for _ in range(5)]
+        await asyncio.sleep(0)
+        liberar.set()
+        resultados = await asyncio.gather(*peticiones)
+        return llamadas, resultados, vuelos.estado()
+
+    llamadas, resultados, estado = asyncio.run(escenario())
+    assert llamadas == 1
+    assert resultados == ["respuesta"] * 5
+    assert estado["peticiones_compartidas"] == 4
+    assert estado["completas_en_curso"] == 0
+
+def test_completar_sobrevive_a_la_cancelacion_del_iniciador():
+    async def escenario():
+        vuelos = _VuelosChat()
+        liberar = asyncio.Event()
+
+        async def crear():
+            await liberar.wait()
+            return "respuesta"
+
+        iniciador = asyncio.create_task(vuelos.completar("clave", crear))
+        await asyncio.sleep(0)
+        otra = asyncio.create_task(vuelos.completar("clave", crear))
+        await asyncio.sleep(0)
+        iniciador.cancel()
+        liberar.set()
+        with pytest.raises(asyncio.CancelledError):
+            await iniciador
+        return await otra
+
+    assert asyncio.run(escenario()) == "respuesta"
+
+async def _leer(flujo, hasta=None):
+    chunks = []
+    async for chunk in flujo:
+        chunks.append(chunk)
+        if hasta is not None and len(chunks) == hasta:
+            break
+    return chunks
+
+def test_suscribir_reparte_el_mismo_stream():
+    async def escenario():
+        vuelos = _VuelosChat()
+        llamadas = 0
+        liberar = asyncio.Event()
+
+        async def crear():
+            nonlocal llamadas
+            llamadas += 1
+            yield "uno "
+            await liberar.wait()
+            yield "dos"
+
+        primero = asyncio.create_task(_leer(vuelos.suscribir("clave", crear)))
+        await asyncio.sleep(0.01)
+        # Se une a mitad: recibe también lo ya emitido
+        segundo = asyncio.create_task(_leer(vuelos.suscribir("clave", crear)))
+        await asyncio.sleep(0.01)
+        liberar.set()
+        return llamadas, await primero, await segundo, vuelos.estado()
+
+    llamadas, primero, segundo, estado = asyncio.run(escenario())
+    assert llamadas == 1
+    assert primero == segundo == ["uno ", "dos"]
+    assert estado["streams_en_curso"] == 0
+
+def test_suscribir_propaga_errores_a_todos():
+    async def escenario():
+        vuelos = _VuelosChat()
+
+        async def crear():
+            yield "uno"
+            await asyncio.sleep(0.01)
+            raise RuntimeError("fallo del proveedor")
+
+        return await asyncio.gather(
+            _leer(vuelos.suscribir("clave", crear)),
+            _leer(vuelos.suscribir("clave", crear)),
+            return_exceptions=True
+        )
+
+    resultados = asyncio.run(escenario())
+    assert all(isinstance(r, RuntimeError) for r in resultados)
+
+def test_stream_se_cancela_con_el_ultimo_suscriptor():
+    async def escenario():
+        vuelos = _VuelosChat()
+        cancelado = asyncio.Event()
+
+        async def crear():
+            try:
+                yield "uno"
+                await asyncio.sleep(3600)
+                yield "nunca"
+            except asyncio.CancelledError:
+                cancelado.set()
+                raise
+
+        flujos = [vuelos.suscribir("clave", crear) for _ in range(2)]
+        assert await _leer(flujos[0], hasta=1) == ["uno"]
+        assert await _leer(flujos[1], hasta=1) == ["uno"]
+
+        # Con un suscriptor todavía escuchando la generación sigue
+        await flujos[0].aclose()
+        await asyncio.sleep(0)
+        assert not cancelado.is_set()
+
+        await flujos[1].aclose()
+        await asyncio.wait_for(cancelado.wait(), timeout=1)
+        return vuelos.estado()
+
+    assert asyncio.run(escenario())["streams_en_curso"] == 0
@@ -30,7 +30,7 @@ import {
 } from 'lucide-react';
 import { useTeoria } from '../hooks/useTeoria';
 import type { Teoria } from '../services/teoria.service';
-import { truncarTexto, getDificultadColor } from '../services/teoria.service';
+import { truncarTexto, partirFragmento, getDificultadColor } from '../services/teoria.service';
 
 // Constantes para categorías con iconos y colores mejorados
 const CATEGORIAS_CONFIG = {
@@ -106,6 +106,26 @@ const CATEGORIAS_CONFIG = {
   }
 };
 
+// Extracto de la tarjeta: en resultados de búsqueda, los términos encontrados en <mark>
+const ExtractoTeoria: React.FC<{ teoria: Teoria; limite: number }> = ({ teoria, limite }) => {
+  if (!teoria.fragmento) {
+    return <>{truncarTexto(teoria.contenido, limite)}</>;
+  }
+  return (
+    <>
+      {partirFragmento(teoria.fragmento, limite).map((segmento, i) =>
+        segmento.resaltado ? (
+          <mark key={i} className="bg-cyan-400/20 text-cyan-200 rounded px-0.5">
+            {segmento.texto}
+          </mark>
+        ) : (
+          <React.Fragment key={i}>{segmento.texto}</React.Fragment>
+        )
+      )}
+    </>
+  );
+};
+
 const TeoriaPage: React.FC = () => {
   const { 
     teorias, 
@@ -144,18 +164,10 @@ const TeoriaPage: React.FC = () => {
       filtered = filtered.filter(teoria => teoria.categoria === activeCategory);
     }
 
-    // Filtrar por búsqueda
-    if (searchQuery.trim()) {
-      const query = searchQuery.toLowerCase();
-      filtered = filtered.filter(teoria =>
-        teoria.titulo.toLowerCase().includes(query) ||
-        teoria.contenido.toLowerCase().includes(query) ||
-        teoria.categoria.toLowerCase().includes(query)
-      );
-    }
+    // La búsqueda por texto la resuelve el backend (sin tildes, con derivaciones)
 
     return filtered;
-  }, [teorias, activeCategory, searchQuery]);
+  }, [teorias, activeCategory]);
 
   const handleCategoryChange = (categoria: string) => {
     setActiveCategory(categoria);
@@ -312,7 +324,7 @@ const TeoriaPage: React.FC = () => {
 
           {/* Contenido truncado */}
           <p className="text-gray-400 text-sm mb-6 line-clamp-3 leading-relaxed">
-            {truncarTexto(teoria.contenido, 120)}
+            <ExtractoTeoria teoria={teoria} limite={120} />
           </p>
 
           {/* Footer */}
@@ -387,7 +399,7 @@ const TeoriaPage: React.FC = () => {
               </span>
             </div>
             <p className="text-gray-400 text-sm line-clamp-2 leading-relaxed mb-2">
-              {truncarTexto(teoria.contenido, 150)}
+              <ExtractoTeoria teoria={teoria} limite={150} />
             </p>
             
             <div className="flex items-center gap-4 text-xs text-gray-500">
@@ -96,6 +96,15 @@ export interface RespuestaGuardado {
   progreso_id?: number;
 }
 
+export interface RespuestaGuardadoLote {
+  success: boolean;
+  message: string;
+  timestamp: string;
+  usuario_id: number;
+  eventos_guardados: number;
+  progreso_ids: number[];
+}
+
 // ==================== CLASE DEL SERVICIO ====================
 
 export class ProgresoService {
@@ -521,6 +530,43 @@ export class ProgresoService {
     }
   }
 
+  async guardarProgresoLote(usuarioId: number, eventos: any[]): Promise<RespuestaGuardadoLote> {
+    try {
+      console.log(`💾 Guardando lote de ${eventos.length} eventos para usuario ${usuarioId}`);
+
+      const requestData = {
+        eventos: eventos.map((evento) => ({
+          accion: evento.accion || 'sesion_estudio',
+          descripcion: evento.descripcion || 'Progreso guardado',
+          puntos: evento.puntos || 0,
+          datos: evento.datos || {},
+          sesion_id: evento.sesion_id,
+          fecha: evento.fecha
+        }))
+      };
+
+      const response = await axios.post<RespuestaGuardadoLote>(
+        `${API_URL}/${usuarioId}/guardar/batch`,
+        requestData,
+        {
+          timeout: 15000,
+          headers: {
+            'Content-Type': 'application/json'
+          }
+        }
+      );
+
+      // Invalidar cache del usuario
+      this.invalidateUserCache(usuarioId);
+
+      console.log(`✅ Lote guardado: ${response.data.eventos_guardados} eventos`);
+      return response.data;
+    } catch (error) {
+      console.error('❌ Error guardando lote de progreso:', error);
+      throw this.handleError(error);
+    }
+  }
+
   async checkHealth(): Promise<any> {
     try {
       const response = await axios.get(`${API_URL}/health/status`, { timeout: 5000 });
@@ -8,6 +8,16 @@ export interface Teoria {
   categoria: string;
   fecha_creacion?: string;
   leido?: boolean;
+  // Solo en resultados de búsqueda: extracto con los términos entre [[ y ]]
+  fragmento?: string;
+}
+
+export interface TeoriaResultadoBusqueda {
+  id: number;
+  titulo: string;
+  categoria: string;
+  fragmento: string;
+  relevancia: number;
 }
 
 export interface TeoriaCreate {
@@ -129,7 +139,8 @@ export const getTeoriasPorCategoria = async (categoria: string): Promise<Teoria[
 };
 
 /**
- * Buscar teorías por término
+ * Buscar teorías por término (ordenadas por relevancia).
+ * El contenido de cada resultado es un fragmento; el artículo completo se obtiene con getTeoria.
  */
 export const buscarTeorias = async (
   searchTerm: string, 
@@ -140,13 +151,19 @@ export const buscarTeorias = async (
       return [];
     }
 
-    const response = await axiosInstance.get('/buscar', {
+    const response = await axiosInstance.get<TeoriaResultadoBusqueda[]>('/buscar', {
       params: {
         q: searchTerm,
         ...(categoria && { categoria }),
       },
     });
-    return response.data;
+    return response.data.map((resultado) => ({
+      id: resultado.id,
+      titulo: resultado.titulo,
+      categoria: resultado.categoria,
+      contenido: limpiarFragmento(resultado.fragmento),
+      fragmento: resultado.fragmento,
+    }));
   } catch (error) {
     console.error('Error buscando teorías:', error);
     throw error;
@@ -313,6 +330,43 @@ export const truncarTexto = (texto: string, limite: number = 150): string => {
   return texto.substring(0, limite) + '...';
 };
 
+// Marcas de ts_headline en /buscar (OPCIONES_FRAGMENTO del backend)
+const MARCAS_RESALTADO = /\[\[|\]\]/;
+
+export interface SegmentoFragmento {
+  texto: string;
+  resaltado: boolean;
+}
+
+/**
+ * Texto plano de un fragmento: sin marcas de resaltado ni negritas de markdown
+ */
+export const limpiarFragmento = (fragmento: string): string =>
+  fragmento.split(MARCAS_RESALTADO).join('').replace(/\*\*/g, '');
+
+/**
+ * Partir un fragmento en tramos normales y resaltados, truncado a `limite`
+ * caracteres visibles (los tramos resaltados se renderizan con <mark>)
+ */
+export const partirFragmento = (fragmento: string, limite: number = 150): SegmentoFragmento[] => {
+  const segmentos: SegmentoFragmento[] = [];
+  let restantes = limite;
+
+  // Las partes impares son las que iban entre [[ y ]]
+  const partes = fragmento.replace(/\*\*/g, '').split(MARCAS_RESALTADO);
+  for (let i = 0; i < partes.length && restantes > 0; i++) {
+    if (!partes[i]) continue;
+    const texto = partes[i].substring(0, restantes);
+    segmentos.push({ texto, resaltado: i % 2 === 1 });
+    restantes -= texto.length;
+  }
+
+  if (restantes <= 0 && limpiarFragmento(fragmento).length > limite) {
+    segmentos.push({ texto: '...', resaltado: false });
+  }
+  return segmentos;
+};
+
 export const validarCategoria = (categoria: string): boolean => {
   const categoriasValidas = [
     'Estructura Atómica',